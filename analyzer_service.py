@@ -18,6 +18,7 @@ from src.config import get_config, Config
 from src.notification import NotificationService
 from src.enums import ReportType
 from src.core.pipeline import StockAnalysisPipeline
+from src.core.registry import get_registry
 from src.core.market_review import run_market_review
 
 
@@ -43,12 +44,8 @@ def analyze_stock(
     if config is None:
         config = get_config()
     
-    # 创建分析流水线
-    pipeline = StockAnalysisPipeline(config=config)
-    
-    # 使用通知服务（如果提供）
-    if notifier:
-        pipeline.notifier = notifier
+    # 复用共享的分析流水线（通知服务按请求传入，不修改共享实例）
+    pipeline = get_registry().pipeline if config is get_config() else StockAnalysisPipeline(config=config)
     
     # 根据full_report参数设置报告类型
     report_type = ReportType.FULL if full_report else ReportType.SIMPLE
@@ -58,7 +55,8 @@ def analyze_stock(
         code=stock_code,
         skip_analysis=False,
         single_stock_notify=notifier is not None,
-        report_type=report_type
+        report_type=report_type,
+        notifier=notifier
     )
     
     return result
@@ -109,17 +107,18 @@ def perform_market_review(
     if config is None:
         config = get_config()
     
-    # 创建分析流水线以获取analyzer和search_service
-    pipeline = StockAnalysisPipeline(config=config)
+    # 复用共享的 analyzer 和 search_service
+    registry = get_registry()
+    registry.check_reload()
     
-    # 使用提供的通知服务或创建新的
-    review_notifier = notifier or pipeline.notifier
+    # 使用提供的通知服务或共享的通知服务
+    review_notifier = notifier or registry.notifier
     
     # 调用大盘复盘函数
     return run_market_review(
         notifier=review_notifier,
-        analyzer=pipeline.analyzer,
-        search_service=pipeline.search_service
+        analyzer=registry.analyzer,
+        search_service=registry.search_service
     )
 
 
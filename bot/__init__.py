@@ -10,6 +10,7 @@
 模块结构：
 - models.py: 统一的消息/响应模型
 - dispatcher.py: 命令分发器
+- scheduler.py: 分析任务调度器（有界队列 + 共享流水线）
 - commands/: 命令处理器
 - platforms/: 平台适配器
 - handler.py: Webhook 处理器
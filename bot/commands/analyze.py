@@ -75,32 +75,47 @@ class AnalyzeCommand(BotCommand):
         logger.info(f"[AnalyzeCommand] 分析股票: {code}, 报告类型: {report_type}")
         
         try:
-            # 调用分析服务
-            from web.services import get_analysis_service
+            from bot.scheduler import JobRejected, get_scheduler
             from src.enums import ReportType
             
-            service = get_analysis_service()
+            rtype = ReportType.from_str(report_type)
             
-            # 提交异步分析任务
-            result = service.submit_analysis(
-                code=code,
-                report_type=ReportType.from_str(report_type),
-                source_message=message
+            # 提交到任务队列（同一股票的重复请求合并为一个任务）
+            ticket = get_scheduler().submit(
+                key=("analyze", code, rtype.value),
+                label=f"分析 {code}",
+                message=message,
+                func=lambda pipeline, notifier: self._run_analysis(pipeline, notifier, code, rtype),
             )
             
-            if result.get("success"):
-                task_id = result.get("task_id", "")
-                return BotResponse.markdown_response(
-                    f"✅ **分析任务已提交**\n\n"
-                    f"• 股票代码: `{code}`\n"
-                    f"• 报告类型: {ReportType.from_str(report_type).display_name}\n"
-                    f"• 任务 ID: `{task_id[:20]}...`\n\n"
-                    f"分析完成后将自动推送结果。"
-                )
-            else:
-                error = result.get("error", "未知错误")
-                return BotResponse.error_response(f"提交分析任务失败: {error}")
-                
+            return BotResponse.markdown_response(
+                f"✅ **分析任务已提交**\n\n"
+                f"• 股票代码: `{code}`\n"
+                f"• 报告类型: {rtype.display_name}\n"
+                f"• 任务 ID: `{ticket.job_id}`\n"
+                f"• 队列状态: {ticket.describe()}\n\n"
+                f"分析完成后将自动推送结果。"
+            )
+        
+        except JobRejected as e:
+            return BotResponse.error_response(str(e))
         except Exception as e:
             logger.error(f"[AnalyzeCommand] 执行失败: {e}")
             return BotResponse.error_response(f"分析失败: {str(e)[:100]}")
+    
+    def _run_analysis(self, pipeline, notifier, code: str, report_type):
+        """在任务队列中执行分析并推送，返回回复给合并会话的报告"""
+        from src.enums import ReportType
+        
+        result = pipeline.process_single_stock(
+            code=code,
+            single_stock_notify=True,
+            report_type=report_type,
+            notifier=notifier,
+        )
+        if result is None:
+            raise RuntimeError(f"{code} 未获取到分析结果")
+        
+        if report_type == ReportType.FULL:
+            return notifier.build_report([result]).dashboard()
+        return notifier.generate_single_stock_report(result)
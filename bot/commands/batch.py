@@ -8,7 +8,6 @@
 """
 
 import logging
-import threading
 from typing import List
 
 from bot.commands.base import BotCommand
@@ -77,44 +76,41 @@ class BatchCommand(BotCommand):
         if limit:
             stock_list = stock_list[:limit]
         
-        logger.info(f"[BatchCommand] 开始批量分析 {len(stock_list)} 只股票")
+        from bot.scheduler import JobRejected, get_scheduler
         
-        # 在后台线程中执行分析
-        thread = threading.Thread(
-            target=self._run_batch_analysis,
-            args=(stock_list, message),
-            daemon=True
-        )
-        thread.start()
+        logger.info(f"[BatchCommand] 提交批量分析 {len(stock_list)} 只股票")
+        
+        # 提交到任务队列（相同股票列表的批量任务合并）
+        try:
+            ticket = get_scheduler().submit(
+                key=("batch", tuple(stock_list)),
+                label=f"批量分析 {len(stock_list)} 只股票",
+                message=message,
+                func=lambda pipeline, notifier: self._run_batch_analysis(pipeline, notifier, stock_list),
+            )
+        except JobRejected as e:
+            return BotResponse.error_response(str(e))
         
         return BotResponse.markdown_response(
-            f"✅ **批量分析任务已启动**\n\n"
+            f"✅ **批量分析任务已提交**\n\n"
             f"• 分析数量: {len(stock_list)} 只\n"
             f"• 股票列表: {', '.join(stock_list[:5])}"
-            f"{'...' if len(stock_list) > 5 else ''}\n\n"
+            f"{'...' if len(stock_list) > 5 else ''}\n"
+            f"• 任务 ID: `{ticket.job_id}`\n"
+            f"• 队列状态: {ticket.describe()}\n\n"
             f"分析完成后将自动推送汇总报告。"
         )
     
-    def _run_batch_analysis(self, stock_list: List[str], message: BotMessage) -> None:
-        """后台执行批量分析"""
-        try:
-            from src.config import get_config
-            from main import StockAnalysisPipeline
-            
-            config = get_config()
-            
-            # 创建分析管道
-            pipeline = StockAnalysisPipeline(config=config)
-            
-            # 执行分析（会自动推送汇总报告）
-            results = pipeline.run(
-                stock_codes=stock_list,
-                dry_run=False,
-                send_notification=True
-            )
-            
-            logger.info(f"[BatchCommand] 批量分析完成，成功 {len(results)} 只")
-            
-        except Exception as e:
-            logger.error(f"[BatchCommand] 批量分析失败: {e}")
-            logger.exception(e)
+    def _run_batch_analysis(self, pipeline, notifier, stock_list: List[str]):
+        """在任务队列中执行批量分析（会自动推送汇总报告），返回回复给合并会话的报告"""
+        results = pipeline.run(
+            stock_codes=stock_list,
+            dry_run=False,
+            send_notification=True,
+            notifier=notifier,
+        )
+        
+        logger.info(f"[BatchCommand] 批量分析完成，成功 {len(results)} 只")
+        if not results:
+            raise RuntimeError("没有成功分析的股票")
+        return notifier.build_report(results).dashboard()
@@ -8,7 +8,6 @@
 """
 
 import logging
-import threading
 from typing import List
 
 from bot.commands.base import BotCommand
@@ -49,68 +48,56 @@ class MarketCommand(BotCommand):
 
     def execute(self, message: BotMessage, args: List[str]) -> BotResponse:
         """执行大盘复盘命令"""
-        logger.info(f"[MarketCommand] 开始大盘复盘分析")
+        from bot.scheduler import JobRejected, get_scheduler
 
-        # 在后台线程中执行复盘（避免阻塞）
-        thread = threading.Thread(
-            target=self._run_market_review,
-            args=(message,),
-            daemon=True
-        )
-        thread.start()
+        logger.info(f"[MarketCommand] 提交大盘复盘任务")
+
+        # 提交到任务队列（复盘进行中时的重复请求合并）
+        try:
+            ticket = get_scheduler().submit(
+                key=("market",),
+                label="大盘复盘",
+                message=message,
+                func=self._run_market_review,
+            )
+        except JobRejected as e:
+            return BotResponse.error_response(str(e))
 
         return BotResponse.markdown_response(
-            "✅ **大盘复盘任务已启动**\n\n"
+            "✅ **大盘复盘任务已提交**\n\n"
             "正在分析：\n"
             "• 主要指数表现\n"
             "• 板块热点分析\n"
             "• 市场情绪判断\n"
             "• 后市展望\n\n"
+            f"队列状态: {ticket.describe()}\n\n"
             "分析完成后将自动推送结果。"
         )
 
-    def _run_market_review(self, message: BotMessage) -> None:
-        """后台执行大盘复盘"""
-        try:
-            from src.config import get_config
-            from src.notification import NotificationService
-            from src.market_analyzer import MarketAnalyzer
-            from src.search_service import SearchService
-            from src.analyzer import GeminiAnalyzer
-
-            config = get_config()
-            notifier = NotificationService(source_message=message)
-
-            # 初始化搜索服务
-            search_service = None
-            if config.bocha_api_keys or config.tavily_api_keys or config.serpapi_keys:
-                search_service = SearchService(
-                    bocha_keys=config.bocha_api_keys,
-                    tavily_keys=config.tavily_api_keys,
-                    serpapi_keys=config.serpapi_keys
-                )
-
-            # 初始化 AI 分析器
-            analyzer = None
-            if config.gemini_api_key or config.openai_api_key:
-                analyzer = GeminiAnalyzer()
-
-            # 执行复盘
-            market_analyzer = MarketAnalyzer(
-                search_service=search_service,
-                analyzer=analyzer
-            )
+    def _run_market_review(self, pipeline, notifier):
+        """在任务队列中执行大盘复盘（复用共享流水线的 AI 分析器与搜索服务）"""
+        from src.config import get_config
+        from src.market_analyzer import MarketAnalyzer
+
+        config = get_config()
+
+        # 仅在已配置时使用搜索服务 / AI 分析器
+        search_service = pipeline.search_service if pipeline.search_service.is_available else None
+        analyzer = pipeline.analyzer if (config.gemini_api_key or config.openai_api_key) else None
+
+        market_analyzer = MarketAnalyzer(
+            search_service=search_service,
+            analyzer=analyzer
+        )
 
-            review_report = market_analyzer.run_daily_review()
+        review_report = market_analyzer.run_daily_review()
 
-            if review_report:
-                # 推送结果
-                report_content = f"🎯 **大盘复盘**\n\n{review_report}"
-                notifier.send(report_content)
-                logger.info("[MarketCommand] 大盘复盘完成并已推送")
-            else:
-                logger.warning("[MarketCommand] 大盘复盘返回空结果")
+        if not review_report:
+            logger.warning("[MarketCommand] 大盘复盘返回空结果")
+            return None
 
-        except Exception as e:
-            logger.error(f"[MarketCommand] 大盘复盘失败: {e}")
-            logger.exception(e)
+        # 推送结果
+        report_content = f"🎯 **大盘复盘**\n\n{review_report}"
+        notifier.send(report_content)
+        logger.info("[MarketCommand] 大盘复盘完成并已推送")
+        return report_content
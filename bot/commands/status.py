@@ -81,6 +81,10 @@ class StatusCommand(BotCommand):
         status["notify_telegram"] = bool(config.telegram_bot_token and config.telegram_chat_id)
         status["notify_email"] = bool(config.email_sender and config.email_password)
         
+        # 分析任务队列
+        from bot.scheduler import get_scheduler
+        status["jobs"] = get_scheduler().stats()
+        
         return status
     
     def _format_status(self, status: dict, platform: str) -> str:
@@ -124,6 +128,10 @@ class StatusCommand(BotCommand):
             f"• 飞书: {icon(status['notify_feishu'])}",
             f"• Telegram: {icon(status['notify_telegram'])}",
             f"• 邮件: {icon(status['notify_email'])}",
+            "",
+            "**🧵 任务队列**",
+            f"• 执行中: {status['jobs']['running']}/{status['jobs']['workers']}",
+            f"• 排队中: {status['jobs']['queued']}/{status['jobs']['queue_size']}",
         ])
         
         # AI 服务总体状态
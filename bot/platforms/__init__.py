@@ -19,39 +19,37 @@ ALL_PLATFORMS = {
     'dingtalk': DingtalkPlatform,
 }
 
-# 钉钉 Stream 模式（可选）
-try:
-    from bot.platforms.dingtalk_stream import (
-        DingtalkStreamClient,
-        DingtalkStreamHandler,
-        get_dingtalk_stream_client,
-        start_dingtalk_stream_background,
-        DINGTALK_STREAM_AVAILABLE,
-    )
-except ImportError:
-    DINGTALK_STREAM_AVAILABLE = False
-    DingtalkStreamClient = None
-    DingtalkStreamHandler = None
-    get_dingtalk_stream_client = lambda: None
-    start_dingtalk_stream_background = lambda: False
+# Stream 模式（可选）：SDK 导入较慢（lark-oapi 需数秒），首次访问时才导入
+# 名称 -> (模块, SDK 缺失时的替代值)
+_STREAM_EXPORTS = {
+    # 钉钉 Stream 模式
+    'DingtalkStreamClient': ('bot.platforms.dingtalk_stream', None),
+    'DingtalkStreamHandler': ('bot.platforms.dingtalk_stream', None),
+    'get_dingtalk_stream_client': ('bot.platforms.dingtalk_stream', lambda: None),
+    'start_dingtalk_stream_background': ('bot.platforms.dingtalk_stream', lambda: False),
+    'DINGTALK_STREAM_AVAILABLE': ('bot.platforms.dingtalk_stream', False),
+    # 飞书 Stream 模式
+    'FeishuStreamClient': ('bot.platforms.feishu_stream', None),
+    'FeishuStreamHandler': ('bot.platforms.feishu_stream', None),
+    'FeishuReplyClient': ('bot.platforms.feishu_stream', None),
+    'get_feishu_stream_client': ('bot.platforms.feishu_stream', lambda: None),
+    'start_feishu_stream_background': ('bot.platforms.feishu_stream', lambda: False),
+    'FEISHU_SDK_AVAILABLE': ('bot.platforms.feishu_stream', False),
+}
+
+
+def __getattr__(name: str):
+    if name not in _STREAM_EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module_name, fallback = _STREAM_EXPORTS[name]
+    try:
+        import importlib
+        value = getattr(importlib.import_module(module_name), name)
+    except ImportError:
+        value = fallback
+    globals()[name] = value
+    return value
 
-# 飞书 Stream 模式（可选）
-try:
-    from bot.platforms.feishu_stream import (
-        FeishuStreamClient,
-        FeishuStreamHandler,
-        FeishuReplyClient,
-        get_feishu_stream_client,
-        start_feishu_stream_background,
-        FEISHU_SDK_AVAILABLE,
-    )
-except ImportError:
-    FEISHU_SDK_AVAILABLE = False
-    FeishuStreamClient = None
-    FeishuStreamHandler = None
-    FeishuReplyClient = None
-    get_feishu_stream_client = lambda: None
-    start_feishu_stream_background = lambda: False
 
 __all__ = [
     'BotPlatform',
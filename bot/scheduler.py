@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+机器人任务调度器
+===================================
+
+机器人命令触发的分析任务（/analyze、/batch、/market）统一在此排队执行：
+1. 固定数量的工作线程，所有任务共享资源注册表中预热的 StockAnalysisPipeline
+   （数据源、AI 分析器、搜索服务只初始化一次，.env 修改后按需重建）
+2. 全局排队上限 + 单用户任务上限，突发请求直接拒绝，不再无限制地开线程
+3. 相同任务（如同一股票的 /analyze）排队或执行中时合并，完成后分别回复各会话
+4. 提交时返回排队位置，由命令回复给用户
+"""
+
+import logging
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple
+
+from bot.models import BotMessage
+
+logger = logging.getLogger(__name__)
+
+# 任务函数：(共享流水线, 发起者的通知服务) -> 回复给合并进来的其他会话的内容（None 表示不回复）
+JobFunc = Callable[[Any, Any], Any]
+
+
+class JobRejected(Exception):
+    """任务被拒绝（队列已满 / 超过单用户任务上限），异常信息可直接回复给用户"""
+
+
+@dataclass
+class BotJob:
+    """排队中或执行中的任务"""
+    key: Hashable                       # 合并键：相同键的请求合并为一个任务
+    label: str                          # 任务描述（用于日志和回复）
+    func: JobFunc
+    owner: Tuple[str, str]              # 发起者 (platform, user_id)
+    subscribers: List[BotMessage] = field(default_factory=list)
+    job_id: str = field(default_factory=lambda: uuid.uuid4().hex[:8])
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+
+    def subscribe(self, message: BotMessage) -> None:
+        """追加订阅会话（同一会话只回复一次）"""
+        chat = (message.platform, message.chat_id)
+        if all((m.platform, m.chat_id) != chat for m in self.subscribers):
+            self.subscribers.append(message)
+
+
+@dataclass
+class JobTicket:
+    """任务提交结果"""
+    job_id: str
+    label: str
+    position: int                       # 0 表示执行中或立即开始，N 表示排队第 N 位
+    coalesced: bool = False             # 是否合并到了已有任务
+
+    def describe(self) -> str:
+        """排队状态（回复给用户）"""
+        if self.coalesced:
+            state = "已合并到进行中的相同任务"
+            if self.position:
+                state += f"（排队第 {self.position} 位）"
+            return state
+        if self.position:
+            return f"排队第 {self.position} 位"
+        return "立即开始"
+
+
+class BotJobScheduler:
+    """
+    机器人任务调度器
+
+    使用示例:
+        scheduler = get_scheduler()
+        ticket = scheduler.submit(
+            key=('analyze', '600519'), label="分析 600519", message=message,
+            func=lambda pipeline, notifier: ...,
+        )
+        reply = f"任务已提交，{ticket.describe()}"
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        queue_size: int = 20,
+        per_user: int = 2,
+        pipeline_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.per_user = max(1, per_user)
+        self._pipeline_factory = pipeline_factory
+
+        self._queue: Deque[BotJob] = deque()
+        self._jobs: Dict[Hashable, BotJob] = {}         # 排队中 + 执行中（按合并键）
+        self._running: Dict[str, BotJob] = {}
+        self._idle = 0
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+
+    # === 提交 ===
+
+    def submit(self, key: Hashable, label: str, message: BotMessage, func: JobFunc) -> JobTicket:
+        """
+        提交任务
+
+        Args:
+            key: 合并键（相同键的任务排队或执行中时，新请求合并进去）
+            label: 任务描述
+            message: 触发任务的消息（用于回复和单用户限额）
+            func: 任务函数 func(pipeline, notifier)，返回回复给合并会话的内容
+
+        Returns:
+            JobTicket
+
+        Raises:
+            JobRejected: 队列已满或超过单用户任务上限
+        """
+        owner = (message.platform, message.user_id)
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is not None:
+                job.subscribe(message)
+                logger.info(f"[Scheduler] {label} 合并到任务 {job.job_id}（{len(job.subscribers)} 个会话）")
+                return JobTicket(job.job_id, job.label, self._position(job), coalesced=True)
+
+            if len(self._queue) >= self.queue_size:
+                raise JobRejected(f"任务队列已满（{len(self._queue)} 个排队中），请稍后再试")
+            active = sum(1 for j in self._jobs.values() if j.owner == owner)
+            if active >= self.per_user:
+                raise JobRejected(f"你已有 {active} 个任务在排队或执行中，请等待完成后再提交")
+
+            job = BotJob(key=key, label=label, func=func, owner=owner, subscribers=[message])
+            self._queue.append(job)
+            self._jobs[key] = job
+            self._ensure_workers()
+            ticket = JobTicket(job.job_id, label, self._position(job))
+            self._cond.notify()
+
+        logger.info(f"[Scheduler] 任务 {job.job_id} {label} 已入队（{ticket.describe()}）")
+        return ticket
+
+    def _position(self, job: BotJob) -> int:
+        """排队位置（扣除空闲工作线程后仍需等待的位次），执行中为 0"""
+        if job.job_id in self._running:
+            return 0
+        try:
+            ahead = self._queue.index(job)
+        except ValueError:
+            return 0
+        return max(0, ahead + 1 - self._idle)
+
+    def stats(self) -> Dict[str, int]:
+        """队列状态"""
+        with self._cond:
+            return {
+                'workers': self.workers,
+                'running': len(self._running),
+                'queued': len(self._queue),
+                'queue_size': self.queue_size,
+            }
+
+    # === 执行 ===
+
+    @property
+    def pipeline(self):
+        """共享的分析流水线（默认取资源注册表中的实例，所有任务复用）"""
+        if self._pipeline_factory is None:
+            from src.core.registry import get_registry
+            return get_registry().pipeline
+        if self._pipeline is None:
+            with self._pipeline_lock:
+                if self._pipeline is None:
+                    self._pipeline = self._pipeline_factory()
+                    logger.info("[Scheduler] 分析流水线已初始化（所有机器人任务共享）")
+        return self._pipeline
+
+    def _ensure_workers(self) -> None:
+        """按需启动工作线程（调用方持有锁）"""
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._worker, name=f"bot-job-{len(self._threads) + 1}", daemon=True
+            )
+            self._threads.append(thread)
+            self._idle += 1
+            thread.start()
+
+    def _worker(self) -> None:
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job = self._queue.popleft()
+                self._idle -= 1
+                job.started_at = datetime.now()
+                self._running[job.job_id] = job
+            try:
+                self._execute(job)
+            finally:
+                with self._cond:
+                    self._running.pop(job.job_id, None)
+                    self._idle += 1
+
+    def _execute(self, job: BotJob) -> None:
+        from src.notification import NotificationService
+
+        logger.info(f"[Scheduler] 开始执行任务 {job.job_id} {job.label}")
+        error = None
+        reply = None
+        try:
+            notifier = NotificationService(source_message=job.subscribers[0])
+            reply = job.func(self.pipeline, notifier)
+        except Exception as e:
+            logger.exception(f"[Scheduler] 任务 {job.job_id} {job.label} 失败: {e}")
+            error = str(e)[:200]
+        finally:
+            # 出队后不再接受合并，此时的订阅列表即为最终回复对象
+            with self._cond:
+                self._jobs.pop(job.key, None)
+                subscribers = list(job.subscribers)
+
+        elapsed = (datetime.now() - job.started_at).total_seconds()
+        if error is not None:
+            self._reply(subscribers, f"❌ **{job.label}失败**\n\n{error}")
+        elif reply is not None and len(subscribers) > 1:
+            self._reply(subscribers[1:], reply)
+        logger.info(f"[Scheduler] 任务 {job.job_id} {job.label} 结束，耗时 {elapsed:.1f}s")
+
+    @staticmethod
+    def _reply(messages: List[BotMessage], content: Any) -> None:
+        """回复到各会话（只发消息上下文渠道，不重复推送到已配置的群机器人）"""
+        from src.notification import NotificationService
+
+        for message in messages:
+            try:
+                notifier = NotificationService(source_message=message)
+                if notifier._has_context_channel():
+                    notifier.dispatch(content, channels=[])
+            except Exception as e:
+                logger.warning(f"[Scheduler] 回复会话 {message.chat_id} 失败: {e}")
+
+
+# 全局调度器实例
+_scheduler: Optional[BotJobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> BotJobScheduler:
+    """
+    获取全局任务调度器
+
+    使用单例模式，首次调用时按配置创建（BOT_JOB_WORKERS / BOT_JOB_QUEUE_SIZE / BOT_JOB_PER_USER）。
+    """
+    global _scheduler
+
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from src.config import get_config
+
+                config = get_config()
+                _scheduler = BotJobScheduler(
+                    workers=getattr(config, 'bot_job_workers', 2),
+                    queue_size=getattr(config, 'bot_job_queue_size', 20),
+                    per_user=getattr(config, 'bot_job_per_user', 2),
+                )
+    return _scheduler
@@ -36,12 +36,14 @@ from tenacity import (
     stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
-    before_sleep_log,
 )
 
+from src import pacing, telemetry
+from . import securities
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from .market_snapshot import get_market_snapshot_service
 from .realtime_types import (
-    UnifiedRealtimeQuote, ChipDistribution, RealtimeSource,
+    UnifiedRealtimeQuote, ChipDistribution, RealtimeSource, CHIP_COLUMNS, chip_from_record,
     get_realtime_circuit_breaker, get_chip_circuit_breaker,
     safe_float, safe_int  # 使用统一的类型转换函数
 )
@@ -64,17 +66,6 @@ USER_AGENTS = [
 ]
 
 
-# 缓存实时行情数据（避免重复请求）
-# TTL 设为 20 分钟 (1200秒)：
-# - 批量分析场景：通常 30 只股票在 5 分钟内分析完，20 分钟足够覆盖
-# - 实时性要求：股票分析不需要秒级实时数据，20 分钟延迟可接受
-# - 防封禁：减少 API 调用频率
-_realtime_cache: Dict[str, Any] = {
-    'data': None,
-    'timestamp': 0,
-    'ttl': 1200  # 20分钟缓存有效期
-}
-
 # ETF 实时行情缓存
 _etf_realtime_cache: Dict[str, Any] = {
     'data': None,
@@ -85,11 +76,7 @@ _etf_realtime_cache: Dict[str, Any] = {
 
 def _is_etf_code(stock_code: str) -> bool:
     """
-    判断代码是否为 ETF 基金
-    
-    ETF 代码规则：
-    - 上交所 ETF: 51xxxx, 52xxxx, 56xxxx, 58xxxx
-    - 深交所 ETF: 15xxxx, 16xxxx, 18xxxx
+    判断代码是否为 ETF 基金（上交所 51/52/56/58、深交所 15/16/18 开头，见 data_provider/securities.py）
     
     Args:
         stock_code: 股票/基金代码
@@ -97,17 +84,12 @@ def _is_etf_code(stock_code: str) -> bool:
     Returns:
         True 表示是 ETF 代码，False 表示是普通股票代码
     """
-    etf_prefixes = ('51', '52', '56', '58', '15', '16', '18')
-    return stock_code.startswith(etf_prefixes) and len(stock_code) == 6
+    return securities.lookup(stock_code).is_etf
 
 
 def _is_hk_code(stock_code: str) -> bool:
     """
-    判断代码是否为港股
-
-    港股代码规则：
-    - 5位数字代码，如 '00700' (腾讯控股)
-    - 部分港股代码可能带有前缀，如 'hk00700', 'hk1810'
+    判断代码是否为港股（hk 前缀、.HK 后缀或 5 位纯数字，如 'hk00700'、'00700'）
 
     Args:
         stock_code: 股票代码
@@ -115,23 +97,12 @@ def _is_hk_code(stock_code: str) -> bool:
     Returns:
         True 表示是港股代码，False 表示不是港股代码
     """
-    # 去除可能的 'hk' 前缀并检查是否为纯数字
-    code = stock_code.lower()
-    if code.startswith('hk'):
-        # 带 hk 前缀的一定是港股，去掉前缀后应为纯数字（1-5位）
-        numeric_part = code[2:]
-        return numeric_part.isdigit() and 1 <= len(numeric_part) <= 5
-    # 无前缀时，5位纯数字才视为港股（避免误判 A 股代码）
-    return code.isdigit() and len(code) == 5
+    return securities.lookup(stock_code).is_hk
 
 
 def _is_us_code(stock_code: str) -> bool:
     """
-    判断代码是否为美股
-
-    美股代码规则：
-    - 1-5个大写字母，如 'AAPL' (苹果), 'TSLA' (特斯拉)
-    - 可能包含 '.' 用于特殊股票类别，如 'BRK.B' (伯克希尔B类股)
+    判断代码是否为美股（1-5 个字母，可带 .X 类别后缀，如 'AAPL'、'BRK.B'）
 
     Args:
         stock_code: 股票代码
@@ -142,8 +113,6 @@ def _is_us_code(stock_code: str) -> bool:
     Examples:
         >>> _is_us_code('AAPL')
         True
-        >>> _is_us_code('TSLA')
-        True
         >>> _is_us_code('BRK.B')
         True
         >>> _is_us_code('600519')
@@ -151,10 +120,7 @@ def _is_us_code(stock_code: str) -> bool:
         >>> _is_us_code('hk00700')
         False
     """
-    import re
-    code = stock_code.strip().upper()
-    # 美股：1-5个大写字母，可能包含一个点和字母（如 BRK.B）
-    return bool(re.match(r'^[A-Z]{1,5}(\.[A-Z])?$', code))
+    return securities.lookup(stock_code).is_us
 
 
 class AkshareFetcher(BaseFetcher):
@@ -165,13 +131,14 @@ class AkshareFetcher(BaseFetcher):
     数据来源：东方财富网爬虫
     
     关键策略：
-    - 每次请求前随机休眠 2.0-5.0 秒
+    - 每次请求前随机休眠 2.0-5.0 秒（按东方财富主机的限流信号自适应缩放）
     - 随机 User-Agent 轮换
     - 失败后指数退避重试（最多3次）
     """
     
     name = "AkshareFetcher"
     priority = 1
+    pacing_host = "eastmoney"  # 与 EfinanceFetcher 同为东方财富接口，共享请求间隔与自适应倍率
     
     def __init__(self, sleep_min: float = 2.0, sleep_max: float = 5.0):
         """
@@ -183,7 +150,6 @@ class AkshareFetcher(BaseFetcher):
         """
         self.sleep_min = sleep_min
         self.sleep_max = sleep_max
-        self._last_request_time: Optional[float] = None
     
     def _set_random_user_agent(self) -> None:
         """
@@ -204,29 +170,19 @@ class AkshareFetcher(BaseFetcher):
     def _enforce_rate_limit(self) -> None:
         """
         强制执行速率限制
-        
-        策略：
-        1. 检查距离上次请求的时间间隔
-        2. 如果间隔不足，补充休眠时间
-        3. 然后再执行随机 jitter 休眠
+
+        由节奏控制器按主机执行（见 src/pacing.py）：
+        1. 补足距上次请求（同主机的任意数据源）的最小间隔
+        2. 再执行随机 jitter 休眠
+        3. 两者都乘以该主机的自适应倍率（无限流时逐步缩小，被限流时翻倍）
         """
-        if self._last_request_time is not None:
-            elapsed = time.time() - self._last_request_time
-            min_interval = self.sleep_min
-            if elapsed < min_interval:
-                additional_sleep = min_interval - elapsed
-                logger.debug(f"补充休眠 {additional_sleep:.2f} 秒")
-                time.sleep(additional_sleep)
-        
-        # 执行随机 jitter 休眠
-        self.random_sleep(self.sleep_min, self.sleep_max)
-        self._last_request_time = time.time()
+        pacing.wait(self.pacing_host, self.sleep_min, self.sleep_max)
     
     @retry(
         stop=stop_after_attempt(3),  # 最多重试3次
         wait=wait_exponential(multiplier=1, min=2, max=30),  # 指数退避：2, 4, 8... 最大30秒
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=telemetry.retry_hook(logger, logging.WARNING),
     )
     def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -302,6 +258,7 @@ class AkshareFetcher(BaseFetcher):
             # 检测反爬封禁
             if any(keyword in error_msg for keyword in ['banned', 'blocked', '频率', 'rate', '限制']):
                 logger.warning(f"检测到可能被封禁: {e}")
+                pacing.throttled(self.pacing_host, str(e))
                 raise RateLimitError(f"Akshare 可能被限流: {e}") from e
             
             raise DataFetchError(f"Akshare 获取数据失败: {e}") from e
@@ -363,6 +320,7 @@ class AkshareFetcher(BaseFetcher):
             # 检测反爬封禁
             if any(keyword in error_msg for keyword in ['banned', 'blocked', '频率', 'rate', '限制']):
                 logger.warning(f"检测到可能被封禁: {e}")
+                pacing.throttled(self.pacing_host, str(e))
                 raise RateLimitError(f"Akshare 可能被限流: {e}") from e
             
             raise DataFetchError(f"Akshare 获取 ETF 数据失败: {e}") from e
@@ -427,6 +385,7 @@ class AkshareFetcher(BaseFetcher):
             # 检测反爬封禁
             if any(keyword in error_msg for keyword in ['banned', 'blocked', '频率', 'rate', '限制']):
                 logger.warning(f"检测到可能被封禁: {e}")
+                pacing.throttled(self.pacing_host, str(e))
                 raise RateLimitError(f"Akshare 可能被限流: {e}") from e
             
             raise DataFetchError(f"Akshare 获取港股数据失败: {e}") from e
@@ -514,101 +473,27 @@ class AkshareFetcher(BaseFetcher):
         """
         获取普通 A 股实时行情数据（东方财富数据源）
         
-        数据来源：ak.stock_zh_a_spot_em()
+        数据来源：ak.stock_zh_a_spot_em()，经全市场行情快照服务拉取（见 market_snapshot.py）
         优点：数据最全，含量比、换手率、市盈率、市净率、总市值、流通市值等
-        缺点：全量拉取，数据量大，容易超时/限流
+        缺点：全量拉取，数据量大，容易超时/限流；快照在会话内共享，大盘复盘与选股不再重复拉取
         """
-        import akshare as ak
-        circuit_breaker = get_realtime_circuit_breaker()
-        source_key = "akshare_em"
-        
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_realtime_cache['data'] is not None and 
-                current_time - _realtime_cache['timestamp'] < _realtime_cache['ttl']):
-                df = _realtime_cache['data']
-                cache_age = int(current_time - _realtime_cache['timestamp'])
-                logger.debug(f"[缓存命中] A股实时行情(东财) - 缓存年龄 {cache_age}s/{_realtime_cache['ttl']}s")
-            else:
-                # 触发全量刷新
-                logger.info(f"[缓存未命中] 触发全量刷新 A股实时行情(东财)")
-                last_error: Optional[Exception] = None
-                df = None
-                for attempt in range(1, 3):
-                    try:
-                        # 防封禁策略
-                        self._set_random_user_agent()
-                        self._enforce_rate_limit()
-
-                        logger.info(f"[API调用] ak.stock_zh_a_spot_em() 获取A股实时行情... (attempt {attempt}/2)")
-                        import time as _time
-                        api_start = _time.time()
-
-                        df = ak.stock_zh_a_spot_em()
-
-                        api_elapsed = _time.time() - api_start
-                        logger.info(f"[API返回] ak.stock_zh_a_spot_em 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
-                        circuit_breaker.record_success(source_key)
-                        break
-                    except Exception as e:
-                        last_error = e
-                        logger.warning(f"[API错误] ak.stock_zh_a_spot_em 获取失败 (attempt {attempt}/2): {e}")
-                        time.sleep(min(2 ** attempt, 5))
-
-                # 更新缓存：成功缓存数据；失败也缓存空数据，避免同一轮任务对同一接口反复请求
-                if df is None:
-                    logger.error(f"[API错误] ak.stock_zh_a_spot_em 最终失败: {last_error}")
-                    circuit_breaker.record_failure(source_key, str(last_error))
-                    df = pd.DataFrame()
-                _realtime_cache['data'] = df
-                _realtime_cache['timestamp'] = current_time
-                logger.info(f"[缓存更新] A股实时行情(东财) 缓存已刷新，TTL={_realtime_cache['ttl']}s")
-
-            if df is None or df.empty:
+            snapshot = get_market_snapshot_service().get(prefer="akshare_em", only=True)
+            if snapshot is None:
                 logger.warning(f"[实时行情] A股实时行情数据为空，跳过 {stock_code}")
                 return None
             
-            # 查找指定股票
-            row = df[df['代码'] == stock_code]
-            if row.empty:
+            quote = snapshot.quote(stock_code)
+            if quote is None:
                 logger.warning(f"[API返回] 未找到股票 {stock_code} 的实时行情")
                 return None
             
-            row = row.iloc[0]
-            
-            # 使用 realtime_types.py 中的统一转换函数
-            quote = UnifiedRealtimeQuote(
-                code=stock_code,
-                name=str(row.get('名称', '')),
-                source=RealtimeSource.AKSHARE_EM,
-                price=safe_float(row.get('最新价')),
-                change_pct=safe_float(row.get('涨跌幅')),
-                change_amount=safe_float(row.get('涨跌额')),
-                volume=safe_int(row.get('成交量')),
-                amount=safe_float(row.get('成交额')),
-                volume_ratio=safe_float(row.get('量比')),
-                turnover_rate=safe_float(row.get('换手率')),
-                amplitude=safe_float(row.get('振幅')),
-                open_price=safe_float(row.get('今开')),
-                high=safe_float(row.get('最高')),
-                low=safe_float(row.get('最低')),
-                pe_ratio=safe_float(row.get('市盈率-动态')),
-                pb_ratio=safe_float(row.get('市净率')),
-                total_mv=safe_float(row.get('总市值')),
-                circ_mv=safe_float(row.get('流通市值')),
-                change_60d=safe_float(row.get('60日涨跌幅')),
-                high_52w=safe_float(row.get('52周最高')),
-                low_52w=safe_float(row.get('52周最低')),
-            )
-            
             logger.info(f"[实时行情-东财] {stock_code} {quote.name}: 价格={quote.price}, 涨跌={quote.change_pct}%, "
                        f"量比={quote.volume_ratio}, 换手率={quote.turnover_rate}%")
             return quote
             
         except Exception as e:
             logger.error(f"[API错误] 获取 {stock_code} 实时行情(东财)失败: {e}")
-            circuit_breaker.record_failure(source_key, str(e))
             return None
     
     def _get_stock_realtime_quote_sina(self, stock_code: str) -> Optional[UnifiedRealtimeQuote]:
@@ -627,11 +512,8 @@ class AkshareFetcher(BaseFetcher):
         try:
             import requests
             
-            # 判断市场前缀
-            if stock_code.startswith(('6', '5', '9')):
-                symbol = f"sh{stock_code}"
-            else:
-                symbol = f"sz{stock_code}"
+            # 市场前缀（sh600519 / sz000001）
+            symbol = securities.lookup(stock_code).prefixed_code
             
             url = f"http://hq.sinajs.cn/list={symbol}"
             headers = {
@@ -725,11 +607,8 @@ class AkshareFetcher(BaseFetcher):
         try:
             import requests
             
-            # 判断市场前缀
-            if stock_code.startswith(('6', '5', '9')):
-                symbol = f"sh{stock_code}"
-            else:
-                symbol = f"sz{stock_code}"
+            # 市场前缀（sh600519 / sz000001）
+            symbol = securities.lookup(stock_code).prefixed_code
             
             url = f"http://qt.gtimg.cn/q={symbol}"
             headers = {
@@ -824,7 +703,9 @@ class AkshareFetcher(BaseFetcher):
                 current_time - _etf_realtime_cache['timestamp'] < _etf_realtime_cache['ttl']):
                 df = _etf_realtime_cache['data']
                 logger.debug(f"[缓存命中] 使用缓存的ETF实时行情数据")
+                telemetry.incr('cache_hits', cache='realtime_etf')
             else:
+                telemetry.incr('cache_misses', cache='realtime_etf')
                 last_error: Optional[Exception] = None
                 df = None
                 for attempt in range(1, 3):
@@ -846,7 +727,9 @@ class AkshareFetcher(BaseFetcher):
                     except Exception as e:
                         last_error = e
                         logger.warning(f"[API错误] ak.fund_etf_spot_em 获取失败 (attempt {attempt}/2): {e}")
-                        time.sleep(min(2 ** attempt, 5))
+                        pacing.observe(self.pacing_host, e)
+                        telemetry.incr('retries', func='ak.fund_etf_spot_em')
+                        pacing.pause(min(2 ** attempt, 5), 'retry', host=self.pacing_host)
 
                 if df is None:
                     logger.error(f"[API错误] ak.fund_etf_spot_em 最终失败: {last_error}")
@@ -973,20 +856,15 @@ class AkshareFetcher(BaseFetcher):
             circuit_breaker.record_failure(source_key, str(e))
             return None
     
-    def get_chip_distribution(self, stock_code: str) -> Optional[ChipDistribution]:
+    def get_chip_history(self, stock_code: str) -> Optional[pd.DataFrame]:
         """
-        获取筹码分布数据
-        
-        数据来源：ak.stock_cyq_em()
-        包含：获利比例、平均成本、筹码集中度
-        
-        注意：ETF/指数没有筹码分布数据，会直接返回 None
-        
-        Args:
-            stock_code: 股票代码
-            
+        获取筹码分布历史序列（ak.stock_cyq_em 一次返回近几个月每日数据）
+
+        美股、ETF/指数没有筹码分布，直接返回 None；接口异常向上抛出，
+        由调用方计入熔断器（见 DataFetcherManager.fetch_chip_history）
+
         Returns:
-            ChipDistribution 对象（最新一天的数据），获取失败返回 None
+            列为 date + CHIP_FIELDS 的 DataFrame（按日期升序）
         """
         import akshare as ak
 
@@ -999,49 +877,53 @@ class AkshareFetcher(BaseFetcher):
         if _is_etf_code(stock_code):
             logger.debug(f"[API跳过] {stock_code} 是 ETF/指数，无筹码分布数据")
             return None
-        
+
+        # 防封禁策略
+        self._set_random_user_agent()
+        self._enforce_rate_limit()
+
+        logger.info(f"[API调用] ak.stock_cyq_em(symbol={stock_code}) 获取筹码分布...")
+        api_start = time.time()
+        df = ak.stock_cyq_em(symbol=stock_code)
+        api_elapsed = time.time() - api_start
+
+        if df is None or df.empty:
+            logger.warning(f"[API返回] ak.stock_cyq_em 返回空数据, 耗时 {api_elapsed:.2f}s")
+            return None
+        logger.info(f"[API返回] ak.stock_cyq_em 成功: 返回 {len(df)} 天数据, 耗时 {api_elapsed:.2f}s")
+        logger.debug(f"[API返回] 筹码数据列名: {list(df.columns)}")
+
+        history = pd.DataFrame({'date': pd.to_datetime(df['日期'], errors='coerce').dt.date})
+        for column, name in CHIP_COLUMNS.items():
+            history[name] = pd.to_numeric(df[column], errors='coerce') if column in df.columns else float('nan')
+        return history.dropna(subset=['date']).sort_values('date').reset_index(drop=True)
+
+    def get_chip_distribution(self, stock_code: str) -> Optional[ChipDistribution]:
+        """
+        获取筹码分布数据（最新一天）
+
+        数据来源：ak.stock_cyq_em()
+        包含：获利比例、平均成本、筹码集中度
+
+        注意：ETF/指数没有筹码分布数据，会直接返回 None
+        分析流程经 src/chip_store.py 按交易日缓存整段序列，不直接调用本方法
+
+        Args:
+            stock_code: 股票代码
+
+        Returns:
+            ChipDistribution 对象（最新一天的数据），获取失败返回 None
+        """
         try:
-            # 防封禁策略
-            self._set_random_user_agent()
-            self._enforce_rate_limit()
-            
-            logger.info(f"[API调用] ak.stock_cyq_em(symbol={stock_code}) 获取筹码分布...")
-            import time as _time
-            api_start = _time.time()
-            
-            df = ak.stock_cyq_em(symbol=stock_code)
-            
-            api_elapsed = _time.time() - api_start
-            
-            if df.empty:
-                logger.warning(f"[API返回] ak.stock_cyq_em 返回空数据, 耗时 {api_elapsed:.2f}s")
+            history = self.get_chip_history(stock_code)
+            if history is None or history.empty:
                 return None
-            
-            logger.info(f"[API返回] ak.stock_cyq_em 成功: 返回 {len(df)} 天数据, 耗时 {api_elapsed:.2f}s")
-            logger.debug(f"[API返回] 筹码数据列名: {list(df.columns)}")
-            
-            # 取最新一天的数据
-            latest = df.iloc[-1]
-            
-            # 使用 realtime_types.py 中的统一转换函数
-            chip = ChipDistribution(
-                code=stock_code,
-                date=str(latest.get('日期', '')),
-                profit_ratio=safe_float(latest.get('获利比例')),
-                avg_cost=safe_float(latest.get('平均成本')),
-                cost_90_low=safe_float(latest.get('90成本-低')),
-                cost_90_high=safe_float(latest.get('90成本-高')),
-                concentration_90=safe_float(latest.get('90集中度')),
-                cost_70_low=safe_float(latest.get('70成本-低')),
-                cost_70_high=safe_float(latest.get('70成本-高')),
-                concentration_70=safe_float(latest.get('70集中度')),
-            )
-            
+            chip = chip_from_record(stock_code, history.iloc[-1].to_dict())
             logger.info(f"[筹码分布] {stock_code} 日期={chip.date}: 获利比例={chip.profit_ratio:.1%}, "
                        f"平均成本={chip.avg_cost}, 90%集中度={chip.concentration_90:.2%}, "
                        f"70%集中度={chip.concentration_70:.2%}")
             return chip
-            
+
         except Exception as e:
             logger.error(f"[API错误] 获取 {stock_code} 筹码分布失败: {e}")
             return None
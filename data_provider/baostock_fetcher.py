@@ -25,9 +25,10 @@ from tenacity import (
     stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
-    before_sleep_log,
 )
 
+from src import telemetry
+from . import securities
 from .base import BaseFetcher, DataFetchError, STANDARD_COLUMNS
 
 logger = logging.getLogger(__name__)
@@ -121,30 +122,20 @@ class BaostockFetcher(BaseFetcher):
             
         Returns:
             Baostock 格式代码，如 'sh.600519', 'sz.000001'
+            
+        Raises:
+            DataFetchError: 港股 / 美股（Baostock 仅支持 A 股）
         """
-        code = stock_code.strip()
-        
-        # 已经包含前缀的情况
-        if code.startswith(('sh.', 'sz.')):
-            return code.lower()
-        
-        # 去除可能的后缀
-        code = code.replace('.SH', '').replace('.SZ', '').replace('.sh', '').replace('.sz', '')
-        
-        # 根据代码前缀判断市场
-        if code.startswith(('600', '601', '603', '688')):
-            return f"sh.{code}"
-        elif code.startswith(('000', '002', '300')):
-            return f"sz.{code}"
-        else:
-            logger.warning(f"无法确定股票 {code} 的市场，默认使用深市")
-            return f"sz.{code}"
+        code = securities.lookup(stock_code).baostock_code
+        if not code:
+            raise DataFetchError(f"Baostock 不支持非 A 股代码 {stock_code}")
+        return code
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=telemetry.retry_hook(logger, logging.WARNING),
     )
     def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -16,7 +16,6 @@
 
 import logging
 import random
-import time
 from abc import ABC, abstractmethod
 from datetime import datetime
 from typing import Optional, List, Tuple
@@ -30,6 +29,8 @@ from tenacity import (
     retry_if_exception_type,
 )
 
+from src import pacing
+
 # 配置日志
 logger = logging.getLogger(__name__)
 
@@ -125,10 +126,8 @@ class BaseFetcher(ABC):
             end_date = datetime.now().strftime('%Y-%m-%d')
         
         if start_date is None:
-            # 默认获取最近 30 个交易日（按日历日估算，多取一些）
-            from datetime import timedelta
-            start_dt = datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=days * 2)
-            start_date = start_dt.strftime('%Y-%m-%d')
+            # 按交易日历回溯 days 个交易日（额外多取几个交易日，兼容停牌/日历误差）
+            start_date = self._calc_start_date(stock_code, end_date, days)
         
         logger.info(f"[{self.name}] 获取 {stock_code} 数据: {start_date} ~ {end_date}")
         
@@ -155,6 +154,24 @@ class BaseFetcher(ABC):
             logger.error(f"[{self.name}] 获取 {stock_code} 失败: {str(e)}")
             raise DataFetchError(f"[{self.name}] {stock_code}: {str(e)}") from e
     
+    @staticmethod
+    def _calc_start_date(stock_code: str, end_date: str, days: int) -> str:
+        """
+        根据交易日历计算取数起始日期
+
+        原先按 days * 2 个自然日估算，长假前后不是多取就是少取；
+        这里直接回溯 days + 5 个交易日，日历不可用时退回自然日估算。
+        """
+        try:
+            from .trading_calendar import get_calendar_for_code
+            calendar = get_calendar_for_code(stock_code)
+            return calendar.shift_trading_days(end_date, days + 5).strftime('%Y-%m-%d')
+        except Exception as e:
+            logger.debug(f"交易日历不可用，按自然日估算取数窗口: {e}")
+            from datetime import timedelta
+            start_dt = datetime.strptime(end_date, '%Y-%m-%d') - timedelta(days=days * 2)
+            return start_dt.strftime('%Y-%m-%d')
+
     def _clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
         数据清洗
@@ -219,10 +236,12 @@ class BaseFetcher(ABC):
         
         防封禁策略：模拟人类行为的随机延迟
         在请求之间加入不规则的等待时间
+
+        固定范围、不区分主机；需要按主机自适应缩放时使用 pacing.wait()
         """
         sleep_time = random.uniform(min_seconds, max_seconds)
         logger.debug(f"随机休眠 {sleep_time:.2f} 秒...")
-        time.sleep(sleep_time)
+        pacing.pause(sleep_time, 'jitter')
 
 
 class DataFetcherManager:
@@ -528,15 +547,31 @@ class DataFetcherManager:
         
         return None
     
+    def get_base_info_bulk(self, stock_codes: List[str]) -> Optional[pd.DataFrame]:
+        """
+        批量获取股票基本信息（名称、所处行业等，一次请求，供股票元数据缓存刷新）
+        
+        Args:
+            stock_codes: A 股代码列表
+            
+        Returns:
+            EfinanceFetcher.get_base_info_bulk() 的结果，数据源不可用时返回 None
+        """
+        for fetcher in self._fetchers:
+            if fetcher.name == "EfinanceFetcher":
+                return fetcher.get_base_info_bulk(stock_codes)
+        logger.debug("[基本信息] 未启用 EfinanceFetcher，跳过批量基本信息")
+        return None
+    
     def get_chip_distribution(self, stock_code: str):
         """
-        获取筹码分布数据（带熔断和降级）
+        获取筹码分布数据（按交易日缓存，带熔断和降级）
         
         策略：
         1. 检查配置开关
-        2. 检查熔断器状态
-        3. 调用 AkshareFetcher.get_chip_distribution()
-        4. 失败则返回 None（降级兜底）
+        2. 本地筹码库已有最近交易日数据时直接返回（见 src/chip_store.py）
+        3. 否则经 fetch_chip_history() 拉取整段序列入库后返回最新一天
+        4. 失败则返回库中已有的最近数据或 None（降级兜底）
         
         Args:
             stock_code: 股票代码
@@ -544,16 +579,25 @@ class DataFetcherManager:
         Returns:
             ChipDistribution 对象，失败则返回 None
         """
-        from .realtime_types import get_chip_circuit_breaker
         from src.config import get_config
-        
-        config = get_config()
+        from src.chip_store import get_chip_store
         
         # 如果筹码分布功能被禁用，直接返回 None
-        if not config.enable_chip_distribution:
+        if not get_config().enable_chip_distribution:
             logger.debug(f"[筹码分布] 功能已禁用，跳过 {stock_code}")
             return None
         
+        return get_chip_store().get(stock_code, self)
+    
+    def fetch_chip_history(self, stock_code: str):
+        """
+        从 AkshareFetcher 拉取筹码分布历史序列（带熔断）
+        
+        Returns:
+            date + CHIP_FIELDS 的 DataFrame；熔断中、无数据或失败返回 None
+        """
+        from .realtime_types import get_chip_circuit_breaker
+        
         # 检查熔断器状态
         circuit_breaker = get_chip_circuit_breaker()
         if not circuit_breaker.is_available("akshare_chip"):
@@ -561,14 +605,13 @@ class DataFetcherManager:
             return None
         
         try:
-            # 调用 AkshareFetcher 获取筹码分布
             for fetcher in self._fetchers:
                 if fetcher.name == "AkshareFetcher":
-                    if hasattr(fetcher, 'get_chip_distribution'):
-                        chip = fetcher.get_chip_distribution(stock_code)
-                        if chip is not None:
+                    if hasattr(fetcher, 'get_chip_history'):
+                        history = fetcher.get_chip_history(stock_code)
+                        if history is not None and not history.empty:
                             circuit_breaker.record_success("akshare_chip")
-                            return chip
+                            return history
                     break
             
             return None
@@ -34,15 +34,12 @@ from tenacity import (
     stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
-    before_sleep_log,
 )
 
+from src import pacing, telemetry
+from . import securities
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
-from .realtime_types import (
-    UnifiedRealtimeQuote, RealtimeSource,
-    get_realtime_circuit_breaker,
-    safe_float, safe_int  # 使用统一的类型转换函数
-)
+from .market_snapshot import get_market_snapshot_service
 
 
 # 保留旧的类型别名，用于向后兼容
@@ -101,22 +98,9 @@ USER_AGENTS = [
 ]
 
 
-# 缓存实时行情数据（避免重复请求）
-# TTL 设为 10 分钟 (600秒)：批量分析场景下避免重复拉取
-_realtime_cache: Dict[str, Any] = {
-    'data': None,
-    'timestamp': 0,
-    'ttl': 600  # 10分钟缓存有效期
-}
-
-
 def _is_etf_code(stock_code: str) -> bool:
     """
-    判断代码是否为 ETF 基金
-    
-    ETF 代码规则：
-    - 上交所 ETF: 51xxxx, 52xxxx, 56xxxx, 58xxxx
-    - 深交所 ETF: 15xxxx, 16xxxx, 18xxxx
+    判断代码是否为 ETF 基金（上交所 51/52/56/58、深交所 15/16/18 开头，见 data_provider/securities.py）
     
     Args:
         stock_code: 股票/基金代码
@@ -124,8 +108,7 @@ def _is_etf_code(stock_code: str) -> bool:
     Returns:
         True 表示是 ETF 代码，False 表示是普通股票代码
     """
-    etf_prefixes = ('51', '52', '56', '58', '15', '16', '18')
-    return stock_code.startswith(etf_prefixes) and len(stock_code) == 6
+    return securities.lookup(stock_code).is_etf
 
 
 class EfinanceFetcher(BaseFetcher):
@@ -142,13 +125,14 @@ class EfinanceFetcher(BaseFetcher):
     - ef.stock.get_realtime_quotes(): 获取实时行情
     
     关键策略：
-    - 每次请求前随机休眠 1.5-3.0 秒
+    - 每次请求前随机休眠 1.5-3.0 秒（按东方财富主机的限流信号自适应缩放）
     - 随机 User-Agent 轮换
     - 失败后指数退避重试（最多3次）
     """
     
     name = "EfinanceFetcher"
     priority = 0  # 最高优先级，排在 AkshareFetcher 之前
+    pacing_host = "eastmoney"  # 与 AkshareFetcher 同为东方财富接口，共享请求间隔与自适应倍率
     
     def __init__(self, sleep_min: float = 1.5, sleep_max: float = 3.0):
         """
@@ -160,7 +144,6 @@ class EfinanceFetcher(BaseFetcher):
         """
         self.sleep_min = sleep_min
         self.sleep_max = sleep_max
-        self._last_request_time: Optional[float] = None
     
     def _set_random_user_agent(self) -> None:
         """
@@ -178,23 +161,13 @@ class EfinanceFetcher(BaseFetcher):
     def _enforce_rate_limit(self) -> None:
         """
         强制执行速率限制
-        
-        策略：
-        1. 检查距离上次请求的时间间隔
-        2. 如果间隔不足，补充休眠时间
-        3. 然后再执行随机 jitter 休眠
+
+        由节奏控制器按主机执行（见 src/pacing.py）：
+        1. 补足距上次请求（同主机的任意数据源）的最小间隔
+        2. 再执行随机 jitter 休眠
+        3. 两者都乘以该主机的自适应倍率（无限流时逐步缩小，被限流时翻倍）
         """
-        if self._last_request_time is not None:
-            elapsed = time.time() - self._last_request_time
-            min_interval = self.sleep_min
-            if elapsed < min_interval:
-                additional_sleep = min_interval - elapsed
-                logger.debug(f"补充休眠 {additional_sleep:.2f} 秒")
-                time.sleep(additional_sleep)
-        
-        # 执行随机 jitter 休眠
-        self.random_sleep(self.sleep_min, self.sleep_max)
-        self._last_request_time = time.time()
+        pacing.wait(self.pacing_host, self.sleep_min, self.sleep_max)
     
     @retry(
         stop=stop_after_attempt(5),  # 增加到5次
@@ -206,7 +179,7 @@ class EfinanceFetcher(BaseFetcher):
             requests.exceptions.ConnectionError,
             requests.exceptions.ChunkedEncodingError
         )),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=telemetry.retry_hook(logger, logging.WARNING),
     )
     def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -292,6 +265,7 @@ class EfinanceFetcher(BaseFetcher):
             # 检测反爬封禁
             if any(keyword in error_msg for keyword in ['banned', 'blocked', '频率', 'rate', '限制']):
                 logger.warning(f"检测到可能被封禁: {e}")
+                pacing.throttled(self.pacing_host, str(e))
                 raise RateLimitError(f"efinance 可能被限流: {e}") from e
             
             raise DataFetchError(f"efinance 获取数据失败: {e}") from e
@@ -358,6 +332,7 @@ class EfinanceFetcher(BaseFetcher):
             # 检测反爬封禁
             if any(keyword in error_msg for keyword in ['banned', 'blocked', '频率', 'rate', '限制']):
                 logger.warning(f"检测到可能被封禁: {e}")
+                pacing.throttled(self.pacing_host, str(e))
                 raise RateLimitError(f"efinance 可能被限流: {e}") from e
             
             raise DataFetchError(f"efinance 获取 ETF 数据失败: {e}") from e
@@ -409,7 +384,8 @@ class EfinanceFetcher(BaseFetcher):
         """
         获取实时行情数据
         
-        数据来源：ef.stock.get_realtime_quotes()
+        数据来源：ef.stock.get_realtime_quotes()，经全市场行情快照服务拉取（见 market_snapshot.py）；
+        会话内已有其他数据源的有效快照时直接复用
         
         Args:
             stock_code: 股票代码
@@ -417,85 +393,16 @@ class EfinanceFetcher(BaseFetcher):
         Returns:
             UnifiedRealtimeQuote 对象，获取失败返回 None
         """
-        import efinance as ef
-        circuit_breaker = get_realtime_circuit_breaker()
-        source_key = "efinance"
-        
-        # 检查熔断器状态
-        if not circuit_breaker.is_available(source_key):
-            logger.warning(f"[熔断] 数据源 {source_key} 处于熔断状态，跳过")
-            return None
-        
         try:
-            # 检查缓存
-            current_time = time.time()
-            if (_realtime_cache['data'] is not None and 
-                current_time - _realtime_cache['timestamp'] < _realtime_cache['ttl']):
-                df = _realtime_cache['data']
-                cache_age = int(current_time - _realtime_cache['timestamp'])
-                logger.debug(f"[缓存命中] 实时行情(efinance) - 缓存年龄 {cache_age}s/{_realtime_cache['ttl']}s")
-            else:
-                # 触发全量刷新
-                logger.info(f"[缓存未命中] 触发全量刷新 实时行情(efinance)")
-                # 防封禁策略
-                self._set_random_user_agent()
-                self._enforce_rate_limit()
-                
-                logger.info(f"[API调用] ef.stock.get_realtime_quotes() 获取实时行情...")
-                import time as _time
-                api_start = _time.time()
-                
-                # efinance 的实时行情 API
-                df = ef.stock.get_realtime_quotes()
-                
-                api_elapsed = _time.time() - api_start
-                logger.info(f"[API返回] ef.stock.get_realtime_quotes 成功: 返回 {len(df)} 只股票, 耗时 {api_elapsed:.2f}s")
-                circuit_breaker.record_success(source_key)
-                
-                # 更新缓存
-                _realtime_cache['data'] = df
-                _realtime_cache['timestamp'] = current_time
-                logger.info(f"[缓存更新] 实时行情(efinance) 缓存已刷新，TTL={_realtime_cache['ttl']}s")
-            
-            # 查找指定股票
-            # efinance 返回的列名可能是 '股票代码' 或 'code'
-            code_col = '股票代码' if '股票代码' in df.columns else 'code'
-            row = df[df[code_col] == stock_code]
-            if row.empty:
-                logger.warning(f"[API返回] 未找到股票 {stock_code} 的实时行情")
+            snapshot = get_market_snapshot_service().get(prefer="efinance", only=True)
+            if snapshot is None:
+                logger.warning(f"[实时行情] efinance 实时行情数据为空，跳过 {stock_code}")
                 return None
             
-            row = row.iloc[0]
-            
-            # 使用 realtime_types.py 中的统一转换函数
-            # 获取列名（可能是中文或英文）
-            name_col = '股票名称' if '股票名称' in df.columns else 'name'
-            price_col = '最新价' if '最新价' in df.columns else 'price'
-            pct_col = '涨跌幅' if '涨跌幅' in df.columns else 'pct_chg'
-            chg_col = '涨跌额' if '涨跌额' in df.columns else 'change'
-            vol_col = '成交量' if '成交量' in df.columns else 'volume'
-            amt_col = '成交额' if '成交额' in df.columns else 'amount'
-            turn_col = '换手率' if '换手率' in df.columns else 'turnover_rate'
-            amp_col = '振幅' if '振幅' in df.columns else 'amplitude'
-            high_col = '最高' if '最高' in df.columns else 'high'
-            low_col = '最低' if '最低' in df.columns else 'low'
-            open_col = '开盘' if '开盘' in df.columns else 'open'
-            
-            quote = UnifiedRealtimeQuote(
-                code=stock_code,
-                name=str(row.get(name_col, '')),
-                source=RealtimeSource.EFINANCE,
-                price=safe_float(row.get(price_col)),
-                change_pct=safe_float(row.get(pct_col)),
-                change_amount=safe_float(row.get(chg_col)),
-                volume=safe_int(row.get(vol_col)),
-                amount=safe_float(row.get(amt_col)),
-                turnover_rate=safe_float(row.get(turn_col)),
-                amplitude=safe_float(row.get(amp_col)),
-                high=safe_float(row.get(high_col)),
-                low=safe_float(row.get(low_col)),
-                open_price=safe_float(row.get(open_col)),
-            )
+            quote = snapshot.quote(stock_code)
+            if quote is None:
+                logger.warning(f"[API返回] 未找到股票 {stock_code} 的实时行情")
+                return None
             
             logger.info(f"[实时行情-efinance] {stock_code} {quote.name}: 价格={quote.price}, 涨跌={quote.change_pct}%, "
                        f"换手率={quote.turnover_rate}%")
@@ -503,7 +410,6 @@ class EfinanceFetcher(BaseFetcher):
             
         except Exception as e:
             logger.error(f"[API错误] 获取 {stock_code} 实时行情(efinance)失败: {e}")
-            circuit_breaker.record_failure(source_key, str(e))
             return None
     
     def get_base_info(self, stock_code: str) -> Optional[Dict[str, Any]]:
@@ -552,6 +458,48 @@ class EfinanceFetcher(BaseFetcher):
             logger.error(f"[API错误] 获取 {stock_code} 基本信息失败: {e}")
             return None
     
+    def get_base_info_bulk(self, stock_codes: List[str]) -> Optional[pd.DataFrame]:
+        """
+        批量获取股票基本信息（一次请求）
+        
+        数据来源：ef.stock.get_base_info(代码列表)
+        列：股票代码、股票名称、所处行业、总市值、流通市值、市盈率(动)、市净率等
+        
+        Args:
+            stock_codes: 股票代码列表
+            
+        Returns:
+            每只股票一行的 DataFrame，获取失败返回 None
+        """
+        import efinance as ef
+        
+        if not stock_codes:
+            return None
+        
+        try:
+            # 防封禁策略
+            self._set_random_user_agent()
+            self._enforce_rate_limit()
+            
+            logger.info(f"[API调用] ef.stock.get_base_info({len(stock_codes)} 只) 批量获取基本信息...")
+            api_start = time.time()
+            
+            df = ef.stock.get_base_info(list(stock_codes))
+            
+            if isinstance(df, pd.Series):
+                df = df.to_frame().T
+            if df is None or df.empty:
+                logger.warning("[API返回] 批量基本信息为空")
+                return None
+            
+            logger.info(f"[API返回] ef.stock.get_base_info 成功: 返回 {len(df)} 只, 耗时 {time.time() - api_start:.2f}s")
+            return df
+            
+        except Exception as e:
+            pacing.observe(self.pacing_host, e)
+            logger.error(f"[API错误] 批量获取基本信息失败: {e}")
+            return None
+    
     def get_belong_board(self, stock_code: str) -> Optional[pd.DataFrame]:
         """
         获取股票所属板块
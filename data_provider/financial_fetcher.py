@@ -8,6 +8,8 @@
 1. 获取ROE（净资产收益率）
 2. 获取营收/利润增长率
 3. 为综合投资分析提供基本面数据
+4. 按报告期一次获取全市场业绩报表与资产负债率，由 src/financial_warehouse.py 入库，
+   个股分析只读本地数据
 
 数据来源：
 - 东方财富（AkShare）
@@ -15,13 +17,40 @@
 """
 
 import logging
-import time
-import random
+from datetime import date
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 
+from src import pacing
+
 logger = logging.getLogger(__name__)
 
+# 东方财富业绩报表（ak.stock_yjbb_em）列名 -> 入库字段
+YJBB_COLUMNS = {
+    '股票代码': 'code',
+    '每股收益': 'eps',
+    '营业总收入-营业总收入': 'revenue',
+    '营业总收入-同比增长': 'revenue_growth',
+    '净利润-净利润': 'net_profit',
+    '净利润-同比增长': 'profit_growth',
+    '每股净资产': 'bps',
+    '净资产收益率': 'roe',
+    '每股经营现金流量': 'ocf_per_share',
+    '销售毛利率': 'gross_profit_margin',
+    '最新公告日期': 'announce_date',
+}
+
+# 东方财富资产负债表（ak.stock_zcfz_em）列名 -> 入库字段
+ZCFZ_COLUMNS = {
+    '股票代码': 'code',
+    '资产负债率': 'debt_to_asset',
+}
+
+REPORT_FIELDS = (
+    'eps', 'revenue', 'revenue_growth', 'net_profit', 'profit_growth', 'bps', 'roe',
+    'ocf_per_share', 'gross_profit_margin', 'net_profit_margin', 'debt_to_asset',
+)
+
 
 @dataclass
 class FinancialIndicators:
@@ -93,10 +122,9 @@ class FinancialFetcher:
         self.sleep_min = sleep_min
         self.sleep_max = sleep_max
     
-    def _random_sleep(self):
-        """随机休眠（防封禁）"""
-        sleep_time = random.uniform(self.sleep_min, self.sleep_max)
-        time.sleep(sleep_time)
+    def _random_sleep(self, host: str):
+        """随机休眠（防封禁，按主机自适应缩放，见 src/pacing.py）"""
+        pacing.wait(host, self.sleep_min, self.sleep_max)
     
     def get_financial_indicators(self, stock_code: str) -> Optional[FinancialIndicators]:
         """
@@ -130,7 +158,7 @@ class FinancialFetcher:
             import akshare as ak
             import pandas as pd
             
-            self._random_sleep()
+            self._random_sleep('ths')
             
             logger.info(f"[财务数据] 获取 {stock_code} 的财务指标...")
             
@@ -181,11 +209,12 @@ class FinancialFetcher:
                     return indicators
                     
             except Exception as e:
+                pacing.observe('ths', e)
                 logger.debug(f"[财务数据] 财务摘要接口失败: {e}")
             
             # 尝试方法2：财务分析指标接口
             try:
-                self._random_sleep()
+                self._random_sleep('sina')
                 logger.debug(f"[API调用] ak.stock_financial_analysis_indicator(symbol={stock_code})")
                 df_indicator = ak.stock_financial_analysis_indicator(symbol=stock_code)
                 
@@ -226,11 +255,12 @@ class FinancialFetcher:
                         return indicators
                     
             except Exception as e:
+                pacing.observe('sina', e)
                 logger.debug(f"[财务数据] 财务分析指标接口失败: {e}")
             
             # 尝试方法3：利润表接口（计算增长率）
             try:
-                self._random_sleep()
+                self._random_sleep('sina')
                 logger.debug(f"[API调用] ak.stock_financial_report_sina(stock={stock_code}, symbol=利润表)")
                 df_income = ak.stock_financial_report_sina(stock=stock_code, symbol="利润表")
                 
@@ -273,6 +303,7 @@ class FinancialFetcher:
                         return indicators
                         
             except Exception as e:
+                pacing.observe('sina', e)
                 logger.debug(f"[财务数据] 利润表接口失败: {e}")
             
             logger.warning(f"[财务数据] {stock_code} 所有东财接口均失败")
@@ -282,6 +313,69 @@ class FinancialFetcher:
             logger.error(f"[财务数据] {stock_code} 获取失败: {e}")
             return None
     
+    def get_market_report(self, report_period: date):
+        """
+        一次获取某个报告期全市场的业绩报表（东方财富），并合并资产负债率
+
+        Args:
+            report_period: 报告期末日期（03-31 / 06-30 / 09-30 / 12-31）
+
+        Returns:
+            code / announce_date / REPORT_FIELDS 的 DataFrame；该期尚无披露时为空表，
+            请求失败返回 None
+        """
+        try:
+            import akshare as ak
+            import pandas as pd
+        except ImportError as e:
+            logger.warning(f"[财务数据] akshare 未安装: {e}")
+            return None
+
+        period = report_period.strftime('%Y%m%d')
+        try:
+            self._random_sleep('eastmoney')
+            logger.debug(f"[API调用] ak.stock_yjbb_em(date={period})")
+            df = ak.stock_yjbb_em(date=period)
+        except Exception as e:
+            pacing.observe('eastmoney', e)
+            logger.error(f"[财务数据] {period} 业绩报表获取失败: {e}")
+            return None
+        if df is None or df.empty or '股票代码' not in df.columns:
+            return pd.DataFrame(columns=['code', 'announce_date', *REPORT_FIELDS])
+        logger.debug(f"[API返回] 业绩报表 {period}: {len(df)} 条记录")
+
+        columns = {col: name for col, name in YJBB_COLUMNS.items() if col in df.columns}
+        report = df[list(columns)].rename(columns=columns)
+        report['code'] = report['code'].astype(str).str.zfill(6)
+        report = report.drop_duplicates('code')
+
+        # 资产负债率在资产负债表中，失败时该列留空
+        try:
+            self._random_sleep('eastmoney')
+            logger.debug(f"[API调用] ak.stock_zcfz_em(date={period})")
+            balance = ak.stock_zcfz_em(date=period)
+            if balance is not None and not balance.empty and '股票代码' in balance.columns:
+                columns = {col: name for col, name in ZCFZ_COLUMNS.items() if col in balance.columns}
+                balance = balance[list(columns)].rename(columns=columns)
+                balance['code'] = balance['code'].astype(str).str.zfill(6)
+                report = report.merge(balance.drop_duplicates('code'), on='code', how='left')
+        except Exception as e:
+            pacing.observe('eastmoney', e)
+            logger.warning(f"[财务数据] {period} 资产负债表获取失败，资产负债率留空: {e}")
+
+        for name in REPORT_FIELDS:
+            if name not in report.columns:
+                report[name] = float('nan')
+            elif name != 'net_profit_margin':
+                report[name] = pd.to_numeric(report[name], errors='coerce')
+        revenue = report['revenue'].where(report['revenue'] > 0)
+        report['net_profit_margin'] = (report['net_profit'] / revenue * 100).round(2)
+        if 'announce_date' in report.columns:
+            report['announce_date'] = pd.to_datetime(report['announce_date'], errors='coerce').dt.date
+        else:
+            report['announce_date'] = None
+        return report[['code', 'announce_date', *REPORT_FIELDS]]
+
     def _get_indicators_from_sina(self, stock_code: str) -> Optional[FinancialIndicators]:
         """从新浪财经获取财务指标（备选）"""
         # TODO: 实现新浪财经接口
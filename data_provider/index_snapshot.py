@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+主要指数行情快照服务
+===================================
+
+职责：
+1. 一次请求取得全部主要指数行情：首选新浪指数行情表（ak.stock_zh_index_spot_sina），
+   失败时用一次 yf.download 批量下载全部指数（替代逐个 yf.Ticker().history 的串行请求）
+2. 统一为 MarketIndex 字段名，按指数代码（sh000001 / sz399001 ...）返回
+3. 短时缓存：有效期内重复调用直接复用，拉取失败同样缓存到过期，
+   避免大盘复盘阶段对失败接口反复请求
+
+调用方：MarketAnalyzer._get_main_indices（大盘复盘阶段）
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from src import pacing, telemetry
+
+logger = logging.getLogger(__name__)
+
+# 指数代码 -> Yahoo Finance 代码
+YF_SYMBOLS = {
+    'sh000001': '000001.SS',
+    'sz399001': '399001.SZ',
+    'sz399006': '399006.SZ',
+    'sh000688': '000688.SS',
+    'sh000016': '000016.SS',
+    'sh000300': '000300.SS',
+}
+
+# 新浪指数行情列名 -> 统一字段名（与 MarketIndex 字段同名）
+SINA_COLUMNS = {
+    '最新价': 'current', '涨跌额': 'change', '涨跌幅': 'change_pct', '今开': 'open',
+    '最高': 'high', '最低': 'low', '昨收': 'prev_close', '成交量': 'volume', '成交额': 'amount',
+}
+
+INDEX_FIELDS = tuple(SINA_COLUMNS.values())
+
+
+@dataclass
+class IndexSnapshot:
+    """一次指数行情拉取的结果：指数代码 -> 统一字段"""
+    quotes: Dict[str, Dict[str, float]]
+    source: str
+    fetched_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    def get(self, code: str) -> Optional[Dict[str, float]]:
+        return self.quotes.get(code)
+
+
+def _to_float(value) -> float:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if pd.isna(value) else value
+
+
+def parse_sina(df: pd.DataFrame, codes: List[str]) -> Dict[str, Dict[str, float]]:
+    """从新浪指数行情表中取出指定指数（按代码建立一次索引，不逐个过滤全表）"""
+    if df is None or df.empty or '代码' not in df.columns:
+        return {}
+    table = df.assign(代码=df['代码'].astype(str)).drop_duplicates('代码').set_index('代码')
+    # 部分版本的代码不带交易所前缀
+    missing = [code for code in codes if code not in table.index]
+    aliases = {code[2:]: code for code in missing if code[2:] in table.index}
+    table = table.rename(index=aliases)
+    table = table.reindex([code for code in codes if code in table.index])
+    columns = [col for col in SINA_COLUMNS if col in table.columns]
+    table = table[columns].rename(columns=SINA_COLUMNS).apply(pd.to_numeric, errors='coerce')
+    return {
+        code: {name: _to_float(row.get(name)) for name in INDEX_FIELDS}
+        for code, row in zip(table.index, table.to_dict('records'))
+    }
+
+
+def parse_yfinance(df: pd.DataFrame, symbols: Dict[str, str]) -> Dict[str, Dict[str, float]]:
+    """
+    从 yf.download 的批量结果中取各指数最近两个交易日，计算涨跌
+
+    Args:
+        df: yf.download(..., group_by='ticker') 的结果（列为 (代码, 字段) 两级）
+        symbols: 指数代码 -> Yahoo Finance 代码
+    """
+    if df is None or df.empty:
+        return {}
+    quotes = {}
+    for code, symbol in symbols.items():
+        if isinstance(df.columns, pd.MultiIndex):
+            if symbol not in df.columns.get_level_values(0):
+                continue
+            hist = df[symbol]
+        else:
+            hist = df
+        hist = hist.dropna(subset=['Close'])
+        if hist.empty:
+            continue
+        today = hist.iloc[-1]
+        prev_close = float(hist['Close'].iloc[-2]) if len(hist) > 1 else float(today['Close'])
+        price = float(today['Close'])
+        change = price - prev_close
+        quotes[code] = {
+            'current': price,
+            'change': change,
+            'change_pct': change / prev_close * 100 if prev_close else 0.0,
+            'open': _to_float(today.get('Open')),
+            'high': _to_float(today.get('High')),
+            'low': _to_float(today.get('Low')),
+            'prev_close': prev_close,
+            'volume': _to_float(today.get('Volume')),
+            'amount': 0.0,
+        }
+    return quotes
+
+
+def _fetch_sina(codes: List[str]) -> Dict[str, Dict[str, float]]:
+    import akshare as ak
+    return parse_sina(ak.stock_zh_index_spot_sina(), codes)
+
+
+def _fetch_yfinance(codes: List[str]) -> Dict[str, Dict[str, float]]:
+    import yfinance as yf
+    symbols = {code: YF_SYMBOLS[code] for code in codes if code in YF_SYMBOLS}
+    if not symbols:
+        return {}
+    df = yf.download(
+        tickers=list(symbols.values()),
+        period='5d',
+        group_by='ticker',
+        auto_adjust=False,
+        threads=True,
+        progress=False,  # 禁止进度条
+    )
+    return parse_yfinance(df, symbols)
+
+
+class IndexSnapshotService:
+    """
+    主要指数行情快照服务（单例）
+
+    使用示例:
+        snapshot = get_index_snapshot_service().get(['sh000001', 'sz399001'])
+        if snapshot:
+            quote = snapshot.get('sh000001')
+    """
+
+    _instance: Optional['IndexSnapshotService'] = None
+    _instance_lock = threading.Lock()
+
+    # 数据源 -> 节奏控制主机
+    HOSTS = {'sina': 'sina', 'yfinance': 'yahoo'}
+
+    def __init__(self, ttl: float = 120):
+        """
+        Args:
+            ttl: 快照有效期（秒），拉取失败的冷却期相同
+        """
+        self.ttl = ttl
+        self._fetchers: Dict[str, Callable[[List[str]], Dict[str, Dict[str, float]]]] = {
+            'sina': _fetch_sina,
+            'yfinance': _fetch_yfinance,
+        }
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'IndexSnapshotService':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from src.config import get_config
+                    cls._instance = cls(ttl=get_config().index_cache_ttl)
+        return cls._instance
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    def get(self, codes: List[str]) -> Optional[IndexSnapshot]:
+        """
+        获取指数快照：有效期内直接复用，否则按 新浪 -> yfinance 顺序拉取
+
+        Args:
+            codes: 指数代码列表（数据源只返回其中部分指数时同样视为成功）
+
+        Returns:
+            IndexSnapshot；所有数据源都失败（或处于失败冷却期）时返回 None
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self._fresh(snapshot.fetched_at):
+            telemetry.incr('cache_hits', cache='index_snapshot')
+            return snapshot
+
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and self._fresh(snapshot.fetched_at):
+                telemetry.incr('cache_hits', cache='index_snapshot')
+                return snapshot
+            telemetry.incr('cache_misses', cache='index_snapshot')
+
+            for source in self._fetchers:
+                snapshot = self._fetch(source, codes, attempts=2 if source == 'sina' else 1)
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    return snapshot
+        return None
+
+    def _fetch(self, source: str, codes: List[str], attempts: int) -> Optional[IndexSnapshot]:
+        """从指定数据源拉取一次全部指数"""
+        failed_at = self._failed_at.get(source)
+        if failed_at is not None and self._fresh(failed_at):
+            logger.debug(f"[指数快照] {source} 本轮已拉取失败，跳过")
+            return None
+
+        host = self.HOSTS[source]
+        last_error: Optional[Exception] = None
+        for attempt in range(1, attempts + 1):
+            try:
+                logger.info(f"[指数快照] 拉取 {len(codes)} 个指数行情 ({source}, attempt {attempt}/{attempts})...")
+                start = time.time()
+                quotes = self._fetchers[source](codes)
+                if not quotes:
+                    raise ValueError("未返回所需指数")
+                logger.info(f"[指数快照] {source} 返回 {len(quotes)} 个指数, 耗时 {time.time() - start:.2f}s")
+                self._failed_at.pop(source, None)
+                return IndexSnapshot(quotes=quotes, source=source)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[指数快照] {source} 拉取失败 (attempt {attempt}/{attempts}): {e}")
+                pacing.observe(host, e)
+                if attempt < attempts:
+                    telemetry.incr('retries', func=f'index_snapshot.{source}')
+                    pacing.pause(min(2 ** attempt, 5), 'retry', host=host)
+
+        logger.error(f"[指数快照] {source} 最终失败: {last_error}")
+        self._failed_at[source] = time.time()
+        return None
+
+    def invalidate(self) -> None:
+        """丢弃已缓存的快照与失败记录（下次调用重新拉取）"""
+        with self._lock:
+            self._snapshot = None
+            self._failed_at.clear()
+
+
+def get_index_snapshot_service() -> IndexSnapshotService:
+    """获取指数行情快照服务单例"""
+    return IndexSnapshotService.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    service = get_index_snapshot_service()
+    snapshot = service.get(list(YF_SYMBOLS))
+    if snapshot is None:
+        print("指数行情拉取失败")
+    else:
+        print(f"来源: {snapshot.source}")
+        for code, quote in snapshot.quotes.items():
+            print(code, quote['current'], f"{quote['change_pct']:+.2f}%")
+        # 再次获取直接复用快照
+        assert service.get(list(YF_SYMBOLS)) is snapshot
@@ -0,0 +1,374 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+全市场行情快照服务
+===================================
+
+职责：
+1. 每个会话只拉取一次全市场 A 股行情表（东财 ak.stock_zh_a_spot_em / efinance
+   ef.stock.get_realtime_quotes，5000+ 行），统一列名后缓存
+2. 从同一份快照提供：个股实时行情、涨跌统计、成交额 / 涨幅排行
+3. 行业板块行情表同样只拉取一次，供板块涨跌榜使用
+
+调用方：
+- AkshareFetcher / EfinanceFetcher 的全量实时行情（个股分析阶段）
+- MarketAnalyzer 的涨跌统计与板块榜（大盘复盘阶段）
+- dynamic_stock_selector 的成交额 / 涨幅选股
+
+快照有效期为 REALTIME_CACHE_TTL（默认 30 分钟），覆盖一次完整的每日运行；
+拉取失败同样缓存到过期，避免同一轮任务对失败接口反复请求。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src import pacing, telemetry
+from src.market_breadth import MarketBreadth, compute_breadth
+
+from .realtime_types import (
+    RealtimeSource,
+    UnifiedRealtimeQuote,
+    get_realtime_circuit_breaker,
+    safe_float,
+    safe_int,
+)
+from .securities import BJ_PREFIXES, get_securities_master
+
+logger = logging.getLogger(__name__)
+
+# 快照统一列名（与 UnifiedRealtimeQuote 字段同名）
+SNAPSHOT_COLUMNS = (
+    'code', 'name', 'price', 'change_pct', 'change_amount', 'volume', 'amount',
+    'volume_ratio', 'turnover_rate', 'amplitude', 'open_price', 'high', 'low', 'pre_close',
+    'pe_ratio', 'pb_ratio', 'total_mv', 'circ_mv', 'change_60d', 'high_52w', 'low_52w',
+)
+
+# 东财（akshare）列名 -> 统一列名
+EM_COLUMNS = {
+    '代码': 'code', '名称': 'name', '最新价': 'price', '涨跌幅': 'change_pct',
+    '涨跌额': 'change_amount', '成交量': 'volume', '成交额': 'amount', '量比': 'volume_ratio',
+    '换手率': 'turnover_rate', '振幅': 'amplitude', '今开': 'open_price', '最高': 'high',
+    '最低': 'low', '昨收': 'pre_close', '市盈率-动态': 'pe_ratio', '市净率': 'pb_ratio',
+    '总市值': 'total_mv', '流通市值': 'circ_mv', '60日涨跌幅': 'change_60d',
+    '52周最高': 'high_52w', '52周最低': 'low_52w',
+}
+
+# efinance 列名 -> 统一列名（部分版本返回英文列名）
+EFINANCE_COLUMNS = {
+    '股票代码': 'code', '股票名称': 'name', '最新价': 'price', '涨跌幅': 'change_pct',
+    '涨跌额': 'change_amount', '成交量': 'volume', '成交额': 'amount', '量比': 'volume_ratio',
+    '换手率': 'turnover_rate', '振幅': 'amplitude', '今开': 'open_price', '开盘': 'open_price',
+    '最高': 'high', '最低': 'low', '昨日收盘': 'pre_close', '动态市盈率': 'pe_ratio',
+    '总市值': 'total_mv', '流通市值': 'circ_mv',
+    'pct_chg': 'change_pct', 'change': 'change_amount', 'open': 'open_price',
+}
+
+# 数据源 -> (列名映射, 行情来源标记)
+SOURCES: Dict[str, Tuple[Dict[str, str], RealtimeSource]] = {
+    'akshare_em': (EM_COLUMNS, RealtimeSource.AKSHARE_EM),
+    'efinance': (EFINANCE_COLUMNS, RealtimeSource.EFINANCE),
+}
+
+
+@dataclass
+class MarketSnapshot:
+    """一次全市场行情拉取的结果（统一列名，按代码索引）"""
+    frame: pd.DataFrame
+    source: str
+    fetched_at: float = field(default_factory=time.time)
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def quote(self, code: str) -> Optional[UnifiedRealtimeQuote]:
+        """个股实时行情（快照中没有该代码时返回 None）"""
+        if code not in self.frame.index:
+            return None
+        row = self.frame.loc[code]
+        if isinstance(row, pd.DataFrame):
+            row = row.iloc[0]
+        values = {col: row.get(col) for col in SNAPSHOT_COLUMNS[1:]}
+        volume = values.pop('volume')
+        name = values.pop('name')
+        return UnifiedRealtimeQuote(
+            code=code,
+            name='' if name is None or pd.isna(name) else str(name),
+            source=SOURCES[self.source][1],
+            volume=safe_int(volume),
+            **{col: safe_float(val) for col, val in values.items()},
+        )
+
+    def breadth(self) -> MarketBreadth:
+        """涨跌家数、分板块涨跌停、涨跌幅 / 换手率分布与两市成交额（见 src/market_breadth.py）"""
+        return compute_breadth(self.frame)
+
+    def top(self, n: int = 10, by: str = 'amount', exclude_st: bool = False, exclude_bj: bool = False) -> pd.DataFrame:
+        """
+        按指定列降序取前 N 只
+
+        Args:
+            by: 排序列（amount 成交额 / change_pct 涨跌幅 / turnover_rate 换手率等）
+            exclude_st: 排除 ST 股票
+            exclude_bj: 排除北交所股票
+        """
+        if by not in self.frame.columns:
+            return self.frame.iloc[0:0]
+        frame = self.frame
+        if exclude_bj:
+            frame = frame[~frame['code'].str.startswith(BJ_PREFIXES)]
+        if exclude_st and 'name' in frame.columns:
+            frame = frame[~frame['name'].astype(str).str.contains('ST', na=False)]
+        return frame.nlargest(n, by)
+
+
+def normalize_frame(raw: pd.DataFrame, source: str) -> pd.DataFrame:
+    """把数据源返回的行情表转换为统一列名，数值列转为数值类型，按代码建立索引"""
+    mapping = SOURCES[source][0]
+    columns = {col: mapping[col] for col in raw.columns if col in mapping}
+    frame = raw[list(columns)].rename(columns=columns)
+    frame = frame.loc[:, ~frame.columns.duplicated()]
+    if 'code' not in frame.columns:
+        raise ValueError(f"{source} 行情表缺少代码列: {list(raw.columns)[:10]}")
+    frame['code'] = frame['code'].astype(str)
+    for col in frame.columns:
+        if col not in ('code', 'name'):
+            frame[col] = pd.to_numeric(frame[col], errors='coerce')
+    return frame.set_index('code', drop=False)
+
+
+def _fetch_akshare_em() -> pd.DataFrame:
+    import akshare as ak
+    return ak.stock_zh_a_spot_em()
+
+
+def _fetch_efinance() -> pd.DataFrame:
+    import efinance as ef
+    return ef.stock.get_realtime_quotes()
+
+
+class MarketSnapshotService:
+    """
+    全市场行情快照服务（单例）
+
+    使用示例:
+        snapshot = get_market_snapshot_service().get(prefer='akshare_em')
+        if snapshot:
+            quote = snapshot.quote('600519')
+            breadth = snapshot.breadth()
+    """
+
+    _instance: Optional['MarketSnapshotService'] = None
+    _instance_lock = threading.Lock()
+
+    # 东财请求的 jitter 范围（与 AkshareFetcher 默认值一致）
+    SLEEP_MIN = 2.0
+    SLEEP_MAX = 5.0
+
+    def __init__(self, ttl: float = 1800.0, fetchers: Optional[Dict[str, Callable[[], pd.DataFrame]]] = None):
+        """
+        Args:
+            ttl: 快照有效期（秒）
+            fetchers: 数据源拉取函数（默认东财 + efinance，测试时可替换）
+        """
+        self.ttl = ttl
+        self._fetchers = fetchers or {'akshare_em': _fetch_akshare_em, 'efinance': _fetch_efinance}
+        self._snapshot: Optional[MarketSnapshot] = None
+        self._failed_at: Dict[str, float] = {}
+        self._sectors: Optional[pd.DataFrame] = None
+        self._sectors_at = 0.0
+        self._lock = threading.Lock()
+        self._sector_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'MarketSnapshotService':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from src.config import get_config
+                    cls._instance = cls(ttl=get_config().realtime_cache_ttl)
+        return cls._instance
+
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.time() - fetched_at < self.ttl
+
+    # === 全市场行情 ===
+
+    def peek(self) -> Optional[MarketSnapshot]:
+        """仅返回有效期内的快照，不触发拉取"""
+        snapshot = self._snapshot
+        if snapshot is not None and self._fresh(snapshot.fetched_at):
+            return snapshot
+        return None
+
+    def get(self, prefer: Optional[str] = None, only: bool = False) -> Optional[MarketSnapshot]:
+        """
+        获取快照：有效期内直接复用（不论来自哪个数据源），否则按偏好顺序拉取
+
+        Args:
+            prefer: 优先使用的数据源（akshare_em / efinance）
+            only: 为 True 时只尝试 prefer 指定的数据源（由调用方自行故障切换）
+
+        Returns:
+            MarketSnapshot；所有数据源都失败（或处于熔断 / 失败冷却期）时返回 None
+        """
+        snapshot = self.peek()
+        if snapshot is not None:
+            telemetry.incr('cache_hits', cache='market_snapshot')
+            return snapshot
+
+        with self._lock:
+            snapshot = self.peek()
+            if snapshot is not None:
+                telemetry.incr('cache_hits', cache='market_snapshot')
+                return snapshot
+            telemetry.incr('cache_misses', cache='market_snapshot')
+
+            order = [prefer] if prefer in self._fetchers else []
+            if not only or not order:
+                order += [name for name in self._fetchers if name not in order]
+            for source in order:
+                snapshot = self._fetch(source)
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    # 顺带登记上市名单与 ST 状态（证券主数据），并更新名称、流通股本（股票元数据）
+                    get_securities_master().update_from_snapshot(snapshot.frame)
+                    self._update_metadata(snapshot)
+                    return snapshot
+        return None
+
+    @staticmethod
+    def _update_metadata(snapshot: MarketSnapshot) -> None:
+        try:
+            from src.stock_metadata import get_stock_metadata
+            get_stock_metadata().update_from_snapshot(snapshot.frame, source='snapshot')
+        except Exception as e:
+            logger.warning(f"[行情快照] 更新股票元数据失败: {e}")
+
+    def refresh(self, order: Optional[List[str]] = None) -> Optional[MarketSnapshot]:
+        """
+        立即重新拉取（盘中监控按轮询间隔调用）：忽略有效期与失败冷却，只尝试一次、不做 jitter 休眠，
+        成功后替换会话快照，规则触发后的个股分析直接复用
+
+        Args:
+            order: 数据源尝试顺序（默认东财、efinance）
+        """
+        with self._lock:
+            for source in order or list(self._fetchers):
+                if source not in self._fetchers:
+                    continue
+                snapshot = self._fetch(source, attempts=1, cooldown=False, pace=False)
+                if snapshot is not None:
+                    self._snapshot = snapshot
+                    return snapshot
+        return None
+
+    def _fetch(
+        self, source: str, attempts: int = 2, cooldown: bool = True, pace: bool = True
+    ) -> Optional[MarketSnapshot]:
+        """从指定数据源拉取一次全市场行情"""
+        failed_at = self._failed_at.get(source)
+        if cooldown and failed_at is not None and self._fresh(failed_at):
+            logger.debug(f"[行情快照] {source} 本轮已拉取失败，跳过")
+            return None
+        circuit_breaker = get_realtime_circuit_breaker()
+        if not circuit_breaker.is_available(source):
+            logger.warning(f"[熔断] 数据源 {source} 处于熔断状态，跳过")
+            return None
+
+        last_error: Optional[Exception] = None
+        for attempt in range(1, attempts + 1):
+            try:
+                if pace:
+                    pacing.wait('eastmoney', self.SLEEP_MIN, self.SLEEP_MAX)
+                logger.info(f"[行情快照] 拉取全市场行情 ({source}, attempt {attempt}/{attempts})...")
+                start = time.time()
+                frame = normalize_frame(self._fetchers[source](), source)
+                if frame.empty:
+                    raise ValueError("返回空行情表")
+                logger.info(f"[行情快照] {source} 返回 {len(frame)} 只股票, 耗时 {time.time() - start:.2f}s")
+                circuit_breaker.record_success(source)
+                self._failed_at.pop(source, None)
+                return MarketSnapshot(frame=frame, source=source)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"[行情快照] {source} 拉取失败 (attempt {attempt}/{attempts}): {e}")
+                pacing.observe('eastmoney', e)
+                if attempt < attempts:
+                    telemetry.incr('retries', func=f'market_snapshot.{source}')
+                    pacing.pause(min(2 ** attempt, 5), 'retry', host='eastmoney')
+
+        logger.error(f"[行情快照] {source} 最终失败: {last_error}")
+        circuit_breaker.record_failure(source, str(last_error))
+        self._failed_at[source] = time.time()
+        return None
+
+    # === 行业板块 ===
+
+    def sectors(self) -> Optional[pd.DataFrame]:
+        """行业板块行情表（ak.stock_board_industry_name_em，涨跌幅已转为数值）"""
+        if self._sectors is not None and self._fresh(self._sectors_at):
+            telemetry.incr('cache_hits', cache='sector_snapshot')
+            return self._sectors if not self._sectors.empty else None
+
+        with self._sector_lock:
+            if self._sectors is None or not self._fresh(self._sectors_at):
+                telemetry.incr('cache_misses', cache='sector_snapshot')
+                self._sectors = self._fetch_sectors()
+                self._sectors_at = time.time()
+        return self._sectors if not self._sectors.empty else None
+
+    def _fetch_sectors(self) -> pd.DataFrame:
+        import akshare as ak
+        try:
+            pacing.wait('eastmoney', self.SLEEP_MIN, self.SLEEP_MAX)
+            logger.info("[行情快照] 拉取行业板块行情...")
+            df = ak.stock_board_industry_name_em()
+            if df is not None and not df.empty and '涨跌幅' in df.columns:
+                df = df.copy()
+                df['涨跌幅'] = pd.to_numeric(df['涨跌幅'], errors='coerce')
+                return df.dropna(subset=['涨跌幅'])
+        except Exception as e:
+            pacing.observe('eastmoney', e)
+            logger.error(f"[行情快照] 行业板块行情拉取失败: {e}")
+        return pd.DataFrame()
+
+    def invalidate(self) -> None:
+        """丢弃已缓存的快照与失败记录（下次调用重新拉取）"""
+        with self._lock, self._sector_lock:
+            self._snapshot = None
+            self._failed_at.clear()
+            self._sectors = None
+
+
+def get_market_snapshot_service() -> MarketSnapshotService:
+    """获取全市场行情快照服务单例"""
+    return MarketSnapshotService.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    service = get_market_snapshot_service()
+    snapshot = service.get()
+    if snapshot is None:
+        print("全市场行情拉取失败")
+    else:
+        print(f"来源: {snapshot.source}，共 {len(snapshot)} 只股票")
+        print(snapshot.breadth())
+        print(snapshot.top(5)[['code', 'name', 'amount']])
+        print(snapshot.quote('600519'))
+        # 再次获取直接复用快照
+        assert service.get() is snapshot
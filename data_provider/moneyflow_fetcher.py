@@ -8,6 +8,8 @@
 1. 获取个股资金流向（主力、大单、中单、小单）
 2. 获取北向资金流向（沪深港通）
 3. 为综合投资分析的"资金面"提供数据
+4. 全市场批量获取（按交易日一次请求），由 src/moneyflow_store.py 落库，
+   个股分析阶段只读本地数据，不再逐只请求
 
 数据来源：
 - Tushare Pro（主力）
@@ -15,14 +17,91 @@
 """
 
 import logging
-import time
-import random
 from typing import Optional, Dict, Any
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 
+import pandas as pd
+
+from src import pacing
+from . import securities
+
 logger = logging.getLogger(__name__)
 
+# 资金流向入库字段（单位：万元，占比为 %）
+FLOW_AMOUNT_FIELDS = (
+    'buy_sm_amount', 'sell_sm_amount', 'buy_md_amount', 'sell_md_amount',
+    'buy_lg_amount', 'sell_lg_amount', 'buy_elg_amount', 'sell_elg_amount',
+)
+FLOW_FIELDS = FLOW_AMOUNT_FIELDS + (
+    'net_mf_amount', 'net_mf_sm', 'net_mf_md', 'net_mf_lg', 'net_mf_elg',
+    'main_net_inflow', 'main_net_inflow_rate',
+)
+
+# 东方财富个股资金流排行（今日）列名 -> 入库字段（金额单位：元）
+AKSHARE_RANK_COLUMNS = {
+    '代码': 'code',
+    '今日主力净流入-净额': 'main_net_inflow',
+    '今日主力净流入-净占比': 'main_net_inflow_rate',
+    '今日超大单净流入-净额': 'net_mf_elg',
+    '今日大单净流入-净额': 'net_mf_lg',
+    '今日中单净流入-净额': 'net_mf_md',
+    '今日小单净流入-净额': 'net_mf_sm',
+}
+
+# 东方财富北向持股排行列名 -> 入库字段（市值单位：万元）
+AKSHARE_NORTH_COLUMNS = {
+    '代码': 'code',
+    '日期': 'date',
+    '今日持股-股数': 'hold_shares',
+    '今日持股-市值': 'hold_value',
+    '今日持股-占流通股比': 'hold_ratio',
+    '今日增持估计-市值': 'net_amount',
+}
+NORTH_FIELDS = ('hold_shares', 'hold_value', 'hold_ratio', 'net_amount')
+
+
+def north_trend_label(total_net_amount: float) -> str:
+    """北向资金 N 日累计净流入（万元）的趋势标签"""
+    if total_net_amount > 10000:  # 1亿元以上
+        return "持续流入"
+    elif total_net_amount > 0:
+        return "小幅流入"
+    elif total_net_amount > -10000:
+        return "小幅流出"
+    return "持续流出"
+
+
+def normalize_tushare_moneyflow(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tushare moneyflow 全市场结果 -> 入库字段（按列向量化计算各档净流入与主力占比）
+
+    moneyflow 只返回各档买卖金额与总净额，各档净额 = 买入 - 卖出，
+    主力净流入 = 特大单 + 大单，占比以各档买入金额之和（即成交额）为分母。
+    """
+    out = pd.DataFrame({'code': df['ts_code'].astype(str).str.split('.').str[0]})
+    for name in FLOW_AMOUNT_FIELDS + ('net_mf_amount',):
+        out[name] = pd.to_numeric(df[name], errors='coerce') if name in df.columns else float('nan')
+    for size in ('sm', 'md', 'lg', 'elg'):
+        out[f'net_mf_{size}'] = out[f'buy_{size}_amount'] - out[f'sell_{size}_amount']
+    out['main_net_inflow'] = out['net_mf_lg'] + out['net_mf_elg']
+    turnover = out[[f'buy_{size}_amount' for size in ('sm', 'md', 'lg', 'elg')]].sum(axis=1)
+    out['main_net_inflow_rate'] = (out['main_net_inflow'] / turnover.where(turnover > 0) * 100).round(2)
+    return out
+
+
+def normalize_akshare_rank(df: pd.DataFrame) -> pd.DataFrame:
+    """东方财富个股资金流排行 -> 入库字段（元 -> 万元）"""
+    columns = {col: name for col, name in AKSHARE_RANK_COLUMNS.items() if col in df.columns}
+    out = df[list(columns)].rename(columns=columns)
+    out['code'] = out['code'].astype(str).str.zfill(6)
+    for name in FLOW_FIELDS:
+        out[name] = pd.to_numeric(out[name], errors='coerce') if name in out.columns else float('nan')
+    for name in ('main_net_inflow', 'net_mf_elg', 'net_mf_lg', 'net_mf_md', 'net_mf_sm'):
+        out[name] = out[name] / 10000
+    out['net_mf_amount'] = out[['net_mf_elg', 'net_mf_lg', 'net_mf_md', 'net_mf_sm']].sum(axis=1, min_count=1)
+    return out[['code', *FLOW_FIELDS]]
+
 
 @dataclass
 class MoneyFlowData:
@@ -152,10 +231,9 @@ class MoneyFlowFetcher:
         except Exception as e:
             logger.debug(f"[资金流] Tushare API 初始化失败: {e}")
     
-    def _random_sleep(self):
-        """随机休眠（防封禁）"""
-        sleep_time = random.uniform(self.sleep_min, self.sleep_max)
-        time.sleep(sleep_time)
+    def _random_sleep(self, host: str):
+        """随机休眠（防封禁，按主机自适应缩放，见 src/pacing.py）"""
+        pacing.wait(host, self.sleep_min, self.sleep_max)
     
     def get_moneyflow(self, stock_code: str, trade_date: Optional[str] = None) -> Optional[MoneyFlowData]:
         """
@@ -198,13 +276,10 @@ class MoneyFlowFetcher:
             return None
         
         try:
-            self._random_sleep()
+            self._random_sleep('tushare')
             
             # 转换股票代码格式：600519 -> 600519.SH
-            if stock_code.startswith(('6', '9', '5')):
-                ts_code = f"{stock_code}.SH"
-            else:
-                ts_code = f"{stock_code}.SZ"
+            ts_code = securities.lookup(stock_code).tushare_code
             
             # 如果未指定日期，使用最近3个交易日（确保能获取到数据）
             if trade_date is None:
@@ -270,6 +345,7 @@ class MoneyFlowFetcher:
             return data
             
         except Exception as e:
+            pacing.observe('tushare', e)
             error_msg = str(e)
             
             # 检查是否是权限不足
@@ -292,13 +368,10 @@ class MoneyFlowFetcher:
         try:
             import akshare as ak
             
-            self._random_sleep()
+            self._random_sleep('eastmoney')
             
             # 判断市场（沪市/深市）
-            if stock_code.startswith(('6', '9', '5')):
-                market = 'sh'
-            else:
-                market = 'sz'
+            market = securities.lookup(stock_code).exchange.lower()
             
             logger.debug(f"[API调用] ak.stock_individual_fund_flow(stock={stock_code}, market={market})")
             df = ak.stock_individual_fund_flow(stock=stock_code, market=market)
@@ -344,6 +417,7 @@ class MoneyFlowFetcher:
             return data
             
         except Exception as e:
+            pacing.observe('eastmoney', e)
             logger.error(f"[资金流] {stock_code} AkShare 获取失败: {e}")
             return None
     
@@ -377,13 +451,10 @@ class MoneyFlowFetcher:
             return None
         
         try:
-            self._random_sleep()
+            self._random_sleep('tushare')
             
             # 转换股票代码格式
-            if stock_code.startswith(('6', '9', '5')):
-                ts_code = f"{stock_code}.SH"
-            else:
-                ts_code = f"{stock_code}.SZ"
+            ts_code = securities.lookup(stock_code).tushare_code
             
             # 获取最近N天的北向资金数据
             end_date = datetime.now().strftime('%Y%m%d')
@@ -410,14 +481,7 @@ class MoneyFlowFetcher:
             avg_net_amount = recent_df['net_amount'].mean() if 'net_amount' in recent_df else 0
             
             # 判断趋势
-            if total_net_amount > 10000:  # 1亿元以上
-                trend = "持续流入"
-            elif total_net_amount > 0:
-                trend = "小幅流入"
-            elif total_net_amount > -10000:
-                trend = "小幅流出"
-            else:
-                trend = "持续流出"
+            trend = north_trend_label(total_net_amount)
             
             result = {
                 'code': stock_code,
@@ -432,6 +496,7 @@ class MoneyFlowFetcher:
             return result
             
         except Exception as e:
+            pacing.observe('tushare', e)
             error_msg = str(e)
             
             if '没有权限' in error_msg or '权限' in error_msg:
@@ -454,7 +519,7 @@ class MoneyFlowFetcher:
         try:
             import akshare as ak
             
-            self._random_sleep()
+            self._random_sleep('eastmoney')
             
             logger.debug(f"[API调用] ak.stock_hsgt_individual_em(symbol={stock_code})")
             df = ak.stock_hsgt_individual_em(symbol=stock_code)
@@ -488,14 +553,7 @@ class MoneyFlowFetcher:
             avg_net_amount = total_net_amount / len(recent_df) if len(recent_df) > 0 else 0
             
             # 判断趋势
-            if total_net_amount > 10000:  # 1亿元以上
-                trend = "持续流入"
-            elif total_net_amount > 0:
-                trend = "小幅流入"
-            elif total_net_amount > -10000:
-                trend = "小幅流出"
-            else:
-                trend = "持续流出"
+            trend = north_trend_label(total_net_amount)
             
             result = {
                 'code': stock_code,
@@ -510,9 +568,94 @@ class MoneyFlowFetcher:
             return result
             
         except Exception as e:
+            pacing.observe('eastmoney', e)
             logger.debug(f"[北向资金] {stock_code} AkShare 获取失败: {e}")
             return None
 
+    # === 全市场批量获取（供 src/moneyflow_store.py 按交易日入库）===
+
+    @property
+    def has_tushare(self) -> bool:
+        return self._tushare_api is not None
+
+    def get_market_moneyflow(self, trade_date: str) -> Optional[pd.DataFrame]:
+        """
+        一次获取某个交易日全市场的个股资金流向（Tushare moneyflow 按 trade_date 查询）
+
+        Args:
+            trade_date: 交易日期 YYYYMMDD
+
+        Returns:
+            入库字段的 DataFrame（code + FLOW_FIELDS）；当日尚未更新时为空表，
+            未配置 Token、权限不足或请求失败返回 None
+        """
+        if not self._tushare_api:
+            return None
+        try:
+            self._random_sleep('tushare')
+            logger.debug(f"[API调用] tushare.moneyflow(trade_date={trade_date})")
+            df = self._tushare_api.moneyflow(trade_date=trade_date)
+        except Exception as e:
+            pacing.observe('tushare', e)
+            error_msg = str(e)
+            if '权限' in error_msg or '积分' in error_msg:
+                logger.warning(f"[资金流] Tushare 权限不足（需600积分）: {e}")
+            else:
+                logger.error(f"[资金流] {trade_date} 全市场资金流获取失败: {e}")
+            return None
+        if df is None or df.empty or 'ts_code' not in df.columns:
+            return pd.DataFrame(columns=['code', *FLOW_FIELDS])
+        logger.debug(f"[API返回] Tushare moneyflow({trade_date}): {len(df)} 条记录")
+        return normalize_tushare_moneyflow(df)
+
+    def get_market_moneyflow_today(self) -> Optional[pd.DataFrame]:
+        """
+        一次获取最近交易日全市场的个股资金流向（东方财富资金流排行，免费备选）
+
+        只有"今日"数据，没有历史，按天入库后逐步积累。
+        """
+        try:
+            import akshare as ak
+
+            self._random_sleep('eastmoney')
+            logger.debug("[API调用] ak.stock_individual_fund_flow_rank(indicator='今日')")
+            df = ak.stock_individual_fund_flow_rank(indicator='今日')
+        except Exception as e:
+            pacing.observe('eastmoney', e)
+            logger.error(f"[资金流] AkShare 全市场资金流获取失败: {e}")
+            return None
+        if df is None or df.empty or '代码' not in df.columns:
+            return None
+        logger.debug(f"[API返回] AkShare stock_individual_fund_flow_rank: {len(df)} 条记录")
+        return normalize_akshare_rank(df)
+
+    def get_market_north_holdings(self) -> Optional[pd.DataFrame]:
+        """
+        一次获取全市场北向持股及当日增持估计（东方财富北向持股排行）
+
+        Returns:
+            code / date / NORTH_FIELDS 的 DataFrame，失败返回 None
+        """
+        try:
+            import akshare as ak
+
+            self._random_sleep('eastmoney')
+            logger.debug("[API调用] ak.stock_hsgt_hold_stock_em(market='北向', indicator='今日排行')")
+            df = ak.stock_hsgt_hold_stock_em(market='北向', indicator='今日排行')
+        except Exception as e:
+            pacing.observe('eastmoney', e)
+            logger.error(f"[北向资金] 全市场北向持股获取失败: {e}")
+            return None
+        if df is None or df.empty or '代码' not in df.columns:
+            return None
+        columns = {col: name for col, name in AKSHARE_NORTH_COLUMNS.items() if col in df.columns}
+        out = df[list(columns)].rename(columns=columns)
+        out['code'] = out['code'].astype(str).str.zfill(6)
+        for name in NORTH_FIELDS:
+            out[name] = pd.to_numeric(out[name], errors='coerce') if name in out.columns else float('nan')
+        logger.debug(f"[API返回] AkShare stock_hsgt_hold_stock_em: {len(out)} 条记录")
+        return out
+
 
 if __name__ == "__main__":
     # 测试
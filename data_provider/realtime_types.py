@@ -20,6 +20,8 @@ from dataclasses import dataclass, field
 from typing import Optional, Dict, Any, Union
 from enum import Enum
 
+from src import telemetry
+
 logger = logging.getLogger(__name__)
 
 
@@ -261,6 +263,30 @@ class ChipDistribution:
         return "，".join(status_parts)
 
 
+# 东方财富筹码分布（ak.stock_cyq_em）列名 -> ChipDistribution 字段
+CHIP_COLUMNS = {
+    '获利比例': 'profit_ratio',
+    '平均成本': 'avg_cost',
+    '90成本-低': 'cost_90_low',
+    '90成本-高': 'cost_90_high',
+    '90集中度': 'concentration_90',
+    '70成本-低': 'cost_70_low',
+    '70成本-高': 'cost_70_high',
+    '70集中度': 'concentration_70',
+}
+CHIP_FIELDS = tuple(CHIP_COLUMNS.values())
+
+
+def chip_from_record(code: str, record: Dict[str, Any], source: str = "akshare") -> ChipDistribution:
+    """由一行筹码记录（date + CHIP_FIELDS）构造 ChipDistribution，缺失值按 0 处理"""
+    return ChipDistribution(
+        code=code,
+        date=str(record.get('date', '')),
+        source=source,
+        **{name: safe_float(record.get(name), 0.0) for name in CHIP_FIELDS},
+    )
+
+
 class CircuitBreaker:
     """
     熔断器 - 管理数据源的熔断/冷却状态
@@ -331,6 +357,7 @@ class CircuitBreaker:
             else:
                 remaining = self.cooldown_seconds - time_since_failure
                 logger.debug(f"[熔断器] {source} 处于熔断状态，剩余冷却时间: {remaining:.0f}s")
+                telemetry.incr('breaker_skips', source=source)
                 return False
         
         if state['state'] == self.HALF_OPEN:
@@ -366,9 +393,12 @@ class CircuitBreaker:
             # 半开状态下失败，继续熔断
             state['state'] = self.OPEN
             state['half_open_calls'] = 0
+            telemetry.incr('breaker_trips', source=source)
             logger.warning(f"[熔断器] {source} 半开状态请求失败，继续熔断 {self.cooldown_seconds}s")
         elif state['failures'] >= self.failure_threshold:
             # 达到阈值，进入熔断
+            if state['state'] != self.OPEN:
+                telemetry.incr('breaker_trips', source=source)
             state['state'] = self.OPEN
             logger.warning(f"[熔断器] {source} 连续失败 {state['failures']} 次，进入熔断状态 "
                           f"(冷却 {self.cooldown_seconds}s)")
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+证券主数据（代码分类索引）
+===================================
+
+职责：
+1. 统一解析各种写法的代码（600519 / sh600519 / 600519.SH / sh.600519 / hk00700 / 0700.HK / AAPL），
+   得到市场、品种（股票 / ETF）、交易所、板块与涨跌幅限制
+2. 预先生成各数据源所需的代码格式（Tushare / Baostock / Yahoo / 新浪腾讯前缀），
+   各 Fetcher 直接查表，不再各自按前缀规则重复解析（规则不一致会导致路由分歧）
+3. 全市场行情快照拉取后登记 A 股上市名单与 ST 状态，缓存到数据库同级目录，
+   下次运行启动即可用
+
+条目按 (规范代码, 交易所) 登记：显式写明交易所（sh000001 / 000001.SZ）只命中同交易所的条目，
+不会与按前缀推断交易所的裸代码（000001）互相覆盖。查询结果另按输入字符串缓存，重复查询为一次字典查找。
+"""
+
+import json
+import logging
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+from src.market_breadth import (
+    BOARD_BJ,
+    BOARD_CHINEXT,
+    BOARD_LIMITS,
+    BOARD_MAIN,
+    BOARD_STAR,
+)
+
+from .trading_calendar import MARKET_CN, MARKET_HK, MARKET_US
+
+logger = logging.getLogger(__name__)
+
+# 品种
+ASSET_STOCK = 'stock'
+ASSET_ETF = 'etf'
+
+# 交易所
+EXCHANGE_SH = 'SH'
+EXCHANGE_SZ = 'SZ'
+EXCHANGE_BJ = 'BJ'
+EXCHANGE_HK = 'HK'
+EXCHANGE_US = 'US'
+
+# A 股代码前缀规则
+SH_PREFIXES = ('6', '5', '900')
+BJ_PREFIXES = ('8', '4', '92')
+ETF_PREFIXES = ('51', '52', '56', '58', '15', '16', '18')
+
+# ETF 涨跌幅限制（%）
+ETF_LIMIT = 10.0
+
+# Yahoo Finance 交易所后缀
+YF_SUFFIXES = {EXCHANGE_SH: 'SS', EXCHANGE_SZ: 'SZ', EXCHANGE_BJ: 'BJ'}
+
+_US_PATTERN = re.compile(r'^[A-Z]{1,5}(\.[A-Z])?$')
+_CN_PREFIX_PATTERN = re.compile(r'^(SH|SZ|BJ)\.?(\d{6})$')
+_CN_SUFFIX_PATTERN = re.compile(r'^(\d{6})\.(SH|SS|SZ|BJ)$')
+_HK_PATTERN = re.compile(r'^(?:HK(\d{1,5})|(\d{5})|(\d{1,5})\.HK)$')
+
+
+@dataclass(frozen=True)
+class SecurityInfo:
+    """单个证券的分类信息与各数据源代码"""
+    code: str                   # 规范代码：A 股 6 位数字、港股 5 位数字、美股大写字母
+    market: str                 # cn / hk / us
+    asset_type: str             # stock / etf
+    exchange: str               # SH / SZ / BJ / HK / US
+    board: str = ''             # A 股板块：main / chinext / star / bj
+    is_st: bool = False
+    limit_pct: Optional[float] = None   # 涨跌幅限制（%），港股美股为 None
+    tushare_code: str = ''      # 600519.SH / 00700.HK
+    baostock_code: str = ''     # sh.600519（仅 A 股）
+    yfinance_code: str = ''     # 600519.SS / 0700.HK / AAPL
+    prefixed_code: str = ''     # sh600519 / hk00700（新浪、腾讯等接口）
+
+    @property
+    def is_etf(self) -> bool:
+        return self.asset_type == ASSET_ETF
+
+    @property
+    def is_hk(self) -> bool:
+        return self.market == MARKET_HK
+
+    @property
+    def is_us(self) -> bool:
+        return self.market == MARKET_US
+
+
+def _cn_exchange(code: str) -> str:
+    if code.startswith(SH_PREFIXES):
+        return EXCHANGE_SH
+    if code.startswith(BJ_PREFIXES):
+        return EXCHANGE_BJ
+    return EXCHANGE_SZ
+
+
+def _cn_board(code: str, exchange: str) -> str:
+    if exchange == EXCHANGE_BJ:
+        return BOARD_BJ
+    if code.startswith('30'):
+        return BOARD_CHINEXT
+    if code.startswith('68'):
+        return BOARD_STAR
+    return BOARD_MAIN
+
+
+def build_cn(code: str, exchange: Optional[str] = None, is_st: bool = False) -> SecurityInfo:
+    """生成 A 股 / ETF 条目（exchange 为空时按代码前缀判断）"""
+    code = sys.intern(code)
+    exchange = exchange or _cn_exchange(code)
+    if code.startswith(ETF_PREFIXES):
+        asset_type, board, limit_pct = ASSET_ETF, '', ETF_LIMIT
+    else:
+        asset_type = ASSET_STOCK
+        board = _cn_board(code, exchange)
+        limit_pct = BOARD_LIMITS[board]
+    return SecurityInfo(
+        code=code,
+        market=MARKET_CN,
+        asset_type=asset_type,
+        exchange=exchange,
+        board=board,
+        is_st=is_st,
+        limit_pct=limit_pct,
+        tushare_code=f"{code}.{exchange}",
+        baostock_code=f"{exchange.lower()}.{code}",
+        yfinance_code=f"{code}.{YF_SUFFIXES[exchange]}",
+        prefixed_code=f"{exchange.lower()}{code}",
+    )
+
+
+def build_hk(code: str) -> SecurityInfo:
+    code = sys.intern(code.zfill(5))
+    return SecurityInfo(
+        code=code,
+        market=MARKET_HK,
+        asset_type=ASSET_STOCK,
+        exchange=EXCHANGE_HK,
+        tushare_code=f"{code}.HK",
+        yfinance_code=f"{(code.lstrip('0') or '0').zfill(4)}.HK",
+        prefixed_code=f"hk{code}",
+    )
+
+
+def build_us(code: str) -> SecurityInfo:
+    code = sys.intern(code)
+    return SecurityInfo(
+        code=code,
+        market=MARKET_US,
+        asset_type=ASSET_STOCK,
+        exchange=EXCHANGE_US,
+        tushare_code=code,
+        yfinance_code=code,
+        prefixed_code=code.lower(),
+    )
+
+
+def parse_code(stock_code: str) -> Tuple[str, Optional[str], str]:
+    """
+    解析代码写法
+
+    Returns:
+        (市场, 显式交易所或 None, 规范代码)；无法识别时按 A 股深市处理
+    """
+    raw = (stock_code or '').strip()
+    code = raw.upper()
+    # 美股：1-5 个字母，可带一个 .X 类别后缀（如 BRK.B）
+    if _US_PATTERN.match(code):
+        return MARKET_US, EXCHANGE_US, code
+    match = _HK_PATTERN.match(code)
+    if match:
+        return MARKET_HK, EXCHANGE_HK, next(g for g in match.groups() if g).zfill(5)
+    match = _CN_PREFIX_PATTERN.match(code)
+    if match:
+        return MARKET_CN, match.group(1), match.group(2)
+    match = _CN_SUFFIX_PATTERN.match(code)
+    if match:
+        exchange = EXCHANGE_SH if match.group(2) == 'SS' else match.group(2)
+        return MARKET_CN, exchange, match.group(1)
+    if not (code.isdigit() and len(code) == 6):
+        logger.warning(f"无法识别代码 {stock_code} 的市场，按 A 股处理")
+    return MARKET_CN, None, raw
+
+
+class SecuritiesMaster:
+    """
+    证券主数据（单例）
+
+    使用示例:
+        info = get_securities_master().lookup('600519')
+        info.tushare_code   # '600519.SH'
+        info.limit_pct      # 10.0
+    """
+
+    _instance: Optional['SecuritiesMaster'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, cache_path: Optional[Path] = None):
+        """
+        Args:
+            cache_path: 上市名单缓存文件（None 表示不落盘）
+        """
+        self.cache_path = cache_path
+        # (规范代码, 交易所) -> 条目
+        self._table: Dict[Tuple[str, str], SecurityInfo] = {}
+        # 输入字符串 -> 条目
+        self._by_input: Dict[str, SecurityInfo] = {}
+        # 快照登记的 A 股上市名单：代码 -> 是否 ST
+        self._listed: Dict[str, bool] = {}
+        self._loaded = cache_path is None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def get_instance(cls) -> 'SecuritiesMaster':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls(cache_path=_default_cache_path())
+        return cls._instance
+
+    # === 查询 ===
+
+    def lookup(self, stock_code: str) -> SecurityInfo:
+        """按任意写法的代码查询（同一输入只解析一次）"""
+        info = self._by_input.get(stock_code)
+        if info is not None:
+            return info
+        if not self._loaded:
+            self._load()
+        market, exchange, code = parse_code(stock_code)
+        if market == MARKET_CN and exchange is None:
+            exchange = _cn_exchange(code)
+        key = (code, exchange)
+        info = self._table.get(key)
+        if info is None:
+            if market == MARKET_US:
+                info = build_us(code)
+            elif market == MARKET_HK:
+                info = build_hk(code)
+            else:
+                info = build_cn(code, exchange, is_st=self._listed.get(code, False))
+            self._table[key] = info
+        self._by_input[stock_code] = info
+        return info
+
+    def is_listed(self, code: str) -> Optional[bool]:
+        """A 股是否在最近一次快照的上市名单中（尚无名单时返回 None）"""
+        if not self._loaded:
+            self._load()
+        if not self._listed:
+            return None
+        return self.lookup(code).code in self._listed
+
+    def __len__(self) -> int:
+        return len(self._listed)
+
+    # === 登记 ===
+
+    def update_listing(self, codes: Iterable[str], names: Iterable[str]) -> int:
+        """
+        用全市场行情快照登记 A 股上市名单与 ST 状态（名单有变化时重建缓存并落盘）
+
+        Returns:
+            ST 状态或上市名单发生变化的代码数
+        """
+        listed = {
+            sys.intern(str(code)): 'ST' in str(name).upper()
+            for code, name in zip(codes, names)
+        }
+        if not listed:
+            return 0
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            changed = len(set(listed.items()) ^ set(self._listed.items()))
+            if not changed:
+                return 0
+            self._listed = listed
+            self._table.clear()
+            self._by_input.clear()
+        logger.info(f"[证券主数据] 登记 {len(listed)} 只 A 股（变化 {changed} 条）")
+        self._save()
+        return changed
+
+    def update_from_snapshot(self, frame) -> int:
+        """从统一列名的全市场行情表登记（见 data_provider/market_snapshot.py）"""
+        if frame is None or frame.empty or 'code' not in frame.columns or 'name' not in frame.columns:
+            return 0
+        return self.update_listing(frame['code'].tolist(), frame['name'].tolist())
+
+    # === 缓存 ===
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            path = self.cache_path
+            if path is None or not path.exists():
+                return
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+                st = set(payload.get('st', []))
+                self._listed = {sys.intern(code): code in st for code in payload.get('codes', [])}
+                logger.debug(f"[证券主数据] 从缓存加载 {len(self._listed)} 只 A 股")
+            except Exception as e:
+                logger.debug(f"[证券主数据] 读取缓存失败 {path}: {e}")
+
+    def _save(self) -> None:
+        path = self.cache_path
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            payload = {
+                'updated_at': time.time(),
+                'codes': sorted(self._listed),
+                'st': sorted(code for code, is_st in self._listed.items() if is_st),
+            }
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f)
+        except Exception as e:
+            logger.debug(f"[证券主数据] 写入缓存失败 {path}: {e}")
+
+
+def _default_cache_path() -> Path:
+    """缓存文件：与数据库文件同级的 securities_master.json"""
+    try:
+        from src.config import get_config
+        base = Path(get_config().database_path).parent
+    except Exception:
+        base = Path('./data')
+    return base / 'securities_master.json'
+
+
+def get_securities_master() -> SecuritiesMaster:
+    """获取证券主数据单例"""
+    return SecuritiesMaster.get_instance()
+
+
+def lookup(stock_code: str) -> SecurityInfo:
+    """查询代码分类信息（便捷函数）"""
+    return get_securities_master().lookup(stock_code)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+
+    master = SecuritiesMaster()
+    master.update_listing(['600519', '600001'], ['贵州茅台', '*ST某某'])
+    for code in ['600519', 'sh600001', '300750.SZ', '688981', '830799', '510300',
+                 'hk00700', '0700.HK', '09988', 'AAPL', 'BRK.B']:
+        info = master.lookup(code)
+        print(f"{code:>10} -> {info.market} {info.asset_type} {info.exchange} {info.board or '-'} "
+              f"limit={info.limit_pct} ts={info.tushare_code} bs={info.baostock_code or '-'} "
+              f"yf={info.yfinance_code} prefixed={info.prefixed_code}")
@@ -0,0 +1,529 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+交易日历模块
+===================================
+
+职责：
+1. 提供 A股 / 港股 / 美股 的本地交易日历
+2. 以紧凑的预计算数组保存交易日，O(1) 查询上一/下一交易日
+3. 供历史数据缓存、断点续传、定时调度、取数窗口估算统一使用
+
+数据来源（按优先级）：
+- 本地缓存文件（data/trading_calendar/<market>.json）
+- A股：akshare tool_trade_date_hist_sina（新浪交易日历，覆盖至当年年末）
+- 港股/美股：exchange_calendars（可选依赖）
+- 兜底：内置规则（周末 + 已知节假日表）
+
+索引结构：
+- _sessions: 升序交易日序数数组（date.toordinal()）
+- _rank: 按自然日展开的累计计数，_rank[i] = 起始日至第 i 天（含）的交易日数量
+  => 任意日期的 是否交易日 / 上一交易日 / 下一交易日 / 区间交易日数 均为 O(1)
+"""
+
+import json
+import logging
+import threading
+import time
+from array import array
+from datetime import date, datetime, time as dt_time, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+# 支持的市场
+MARKET_CN = 'cn'
+MARKET_HK = 'hk'
+MARKET_US = 'us'
+SUPPORTED_MARKETS = (MARKET_CN, MARKET_HK, MARKET_US)
+
+# 预计算覆盖范围：起始年份 ~ 当前年份 + 1
+CALENDAR_START_YEAR = 2000
+
+# 本地缓存有效期（秒）- 超过后尝试从远端刷新
+CALENDAR_CACHE_TTL = 7 * 24 * 3600
+
+# exchange_calendars 中的交易所代码
+_EXCHANGE_CODES = {
+    MARKET_HK: 'XHKG',
+    MARKET_US: 'XNYS',
+}
+
+# A股休市日（工作日部分，周末本身即休市）
+# 仅作为远端日历不可用时的兜底，数据取自沪深交易所休市安排公告
+_CN_HOLIDAYS = {
+    2024: [
+        '2024-01-01',
+        '2024-02-09', '2024-02-12', '2024-02-13', '2024-02-14', '2024-02-15', '2024-02-16',
+        '2024-04-04', '2024-04-05',
+        '2024-05-01', '2024-05-02', '2024-05-03',
+        '2024-06-10',
+        '2024-09-16', '2024-09-17',
+        '2024-10-01', '2024-10-02', '2024-10-03', '2024-10-04', '2024-10-07',
+    ],
+    2025: [
+        '2025-01-01',
+        '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31', '2025-02-03', '2025-02-04',
+        '2025-04-04',
+        '2025-05-01', '2025-05-02', '2025-05-05',
+        '2025-06-02',
+        '2025-10-01', '2025-10-02', '2025-10-03', '2025-10-06', '2025-10-07', '2025-10-08',
+    ],
+    2026: [
+        '2026-01-01', '2026-01-02',
+        '2026-02-16', '2026-02-17', '2026-02-18', '2026-02-19', '2026-02-20', '2026-02-23',
+        '2026-04-06',
+        '2026-05-01', '2026-05-04', '2026-05-05',
+        '2026-06-19',
+        '2026-09-25',
+        '2026-10-01', '2026-10-02', '2026-10-05', '2026-10-06', '2026-10-07',
+    ],
+}
+
+
+def detect_market(stock_code: str) -> str:
+    """
+    根据股票代码判断所属市场
+
+    规则（见 data_provider/securities.py）：
+    - hk 前缀、.HK 后缀或 5 位纯数字 → 港股
+    - 1-5 位字母（可带 .X 后缀）→ 美股
+    - 其余（6 位数字等）→ A股
+
+    Args:
+        stock_code: 股票代码
+
+    Returns:
+        'cn' / 'hk' / 'us'
+    """
+    from .securities import lookup
+    return lookup(stock_code).market
+
+
+def _to_date(value: Union[date, datetime, str, None]) -> date:
+    """统一转换为 date（None 表示今天）"""
+    if value is None:
+        return date.today()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _easter_sunday(year: int) -> date:
+    """复活节（公历，Anonymous Gregorian 算法），用于美股/港股耶稣受难日"""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    weekday_offset = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * weekday_offset) // 451
+    month, day = divmod(h + weekday_offset - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """某月第 n 个星期几（n=-1 表示最后一个）"""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """美股规则：周六假日提前到周五，周日假日顺延到周一"""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def _us_holidays(year: int) -> List[date]:
+    """NYSE 常规休市日（规则计算）"""
+    holidays = [
+        _nth_weekday(year, 1, 0, 3),              # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),              # Presidents' Day
+        _easter_sunday(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),             # Memorial Day
+        _observed(date(year, 7, 4)),              # Independence Day
+        _nth_weekday(year, 9, 0, 1),              # Labor Day
+        _nth_weekday(year, 11, 3, 4),             # Thanksgiving
+        _observed(date(year, 12, 25)),            # Christmas
+    ]
+    # 元旦落在周六时不提前到上一年
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.append(_observed(new_year))
+    if year >= 2022:
+        holidays.append(_observed(date(year, 6, 19)))  # Juneteenth
+    return holidays
+
+
+def _hk_holidays(year: int) -> List[date]:
+    """港股固定日期休市日（农历节日无法规则计算，仅作兜底）"""
+    easter = _easter_sunday(year)
+    holidays = [
+        easter - timedelta(days=2),  # 耶稣受难节
+        easter + timedelta(days=1),  # 复活节星期一
+    ]
+    for month, day in ((1, 1), (5, 1), (7, 1), (10, 1), (12, 25), (12, 26)):
+        holiday = date(year, month, day)
+        # 周日假日顺延到周一
+        if holiday.weekday() == 6:
+            holiday += timedelta(days=1)
+        holidays.append(holiday)
+    return holidays
+
+
+def _rule_based_sessions(market: str, start: date, end: date) -> List[date]:
+    """按周末 + 节假日规则生成交易日（兜底方案）"""
+    holidays = set()
+    for year in range(start.year, end.year + 1):
+        if market == MARKET_US:
+            holidays.update(_us_holidays(year))
+        elif market == MARKET_HK:
+            holidays.update(_hk_holidays(year))
+        else:
+            holidays.update(_to_date(d) for d in _CN_HOLIDAYS.get(year, []))
+
+    sessions = []
+    day = start
+    one_day = timedelta(days=1)
+    while day <= end:
+        if day.weekday() < 5 and day not in holidays:
+            sessions.append(day)
+        day += one_day
+    return sessions
+
+
+class TradingCalendar:
+    """
+    单个市场的交易日历
+
+    内部以两个 array 存储（约 10K 个 int），构建一次后只读，线程安全：
+    - _sessions[k]: 第 k 个交易日的序数
+    - _rank[i]: 自然日 base+i 及之前的交易日数量
+
+    覆盖范围之外的日期按"周一至周五"规则兜底计算。
+    """
+
+    def __init__(self, market: str, sessions: Iterable[date], start: date, end: date, source: str = 'rules'):
+        self.market = market
+        self.source = source
+        self.start = start
+        self.end = end
+        self._base = start.toordinal()
+
+        ordinals = sorted({
+            d.toordinal() for d in sessions
+            if start <= d <= end
+        })
+        self._sessions = array('l', ordinals)
+
+        span = end.toordinal() - self._base + 1
+        rank = array('l', [0]) * span
+        count = 0
+        pos = 0
+        for i in range(span):
+            if pos < len(ordinals) and ordinals[pos] == self._base + i:
+                count += 1
+                pos += 1
+            rank[i] = count
+        self._rank = rank
+
+        logger.debug(
+            f"[交易日历] {market} 构建完成: {start} ~ {end}, "
+            f"{len(self._sessions)} 个交易日, 来源: {source}"
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _offset(self, day: date) -> Optional[int]:
+        """日期在 _rank 中的下标，超出覆盖范围返回 None"""
+        i = day.toordinal() - self._base
+        if 0 <= i < len(self._rank):
+            return i
+        return None
+
+    def _count_through(self, day: date) -> Optional[int]:
+        """day（含）之前的交易日数量"""
+        i = day.toordinal() - self._base
+        if i < 0:
+            return 0
+        if i >= len(self._rank):
+            return None
+        return self._rank[i]
+
+    def is_trading_day(self, day: Union[date, datetime, str, None] = None) -> bool:
+        """是否为交易日"""
+        day = _to_date(day)
+        i = self._offset(day)
+        if i is None:
+            return day.weekday() < 5
+        prev = self._rank[i - 1] if i > 0 else 0
+        return self._rank[i] != prev
+
+    def latest_trading_day(self, day: Union[date, datetime, str, None] = None) -> date:
+        """
+        不晚于 day 的最近交易日（day 为交易日时返回其本身）
+
+        用于断点续传：周末/节假日时返回上一个交易日，避免无效重复获取
+        """
+        day = _to_date(day)
+        count = self._count_through(day)
+        if count is None or count == 0:
+            while day.weekday() >= 5:
+                day -= timedelta(days=1)
+            return day
+        return date.fromordinal(self._sessions[count - 1])
+
+    def latest_closed_session(
+        self,
+        now: Optional[datetime] = None,
+        ready: dt_time = dt_time(15, 30),
+    ) -> date:
+        """
+        盘后数据已就绪的最近交易日：交易日 ready 时刻之前返回上一交易日
+
+        用于资金流、筹码分布等按交易日更新的数据判断本地记录是否最新
+        """
+        now = now or datetime.now()
+        latest = self.latest_trading_day(now.date())
+        if latest == now.date() and now.time() < ready:
+            latest = self.prev_trading_day(latest)
+        return latest
+
+    def prev_trading_day(self, day: Union[date, datetime, str, None] = None) -> date:
+        """严格早于 day 的上一个交易日"""
+        return self.latest_trading_day(_to_date(day) - timedelta(days=1))
+
+    def next_trading_day(self, day: Union[date, datetime, str, None] = None) -> date:
+        """严格晚于 day 的下一个交易日"""
+        day = _to_date(day)
+        count = self._count_through(day)
+        if count is not None and count < len(self._sessions):
+            return date.fromordinal(self._sessions[count])
+        day += timedelta(days=1)
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        return day
+
+    def count_trading_days(
+        self,
+        start: Union[date, datetime, str],
+        end: Union[date, datetime, str, None] = None
+    ) -> int:
+        """闭区间 [start, end] 内的交易日数量"""
+        start, end = _to_date(start), _to_date(end)
+        if start > end:
+            return 0
+        hi = self._count_through(end)
+        lo = self._count_through(start - timedelta(days=1))
+        if hi is None or lo is None:
+            # 超出覆盖范围时按工作日粗略估算
+            return sum(
+                1 for n in range((end - start).days + 1)
+                if (start + timedelta(days=n)).weekday() < 5
+            )
+        return hi - lo
+
+    def shift_trading_days(self, day: Union[date, datetime, str, None], n: int) -> date:
+        """
+        从 day 所在（或之前最近）交易日起，向前回溯 n-1 个交易日
+
+        即返回"截至 day 的最近 n 个交易日"中最早的那一天，n<=1 时返回 latest_trading_day
+        """
+        anchor = self.latest_trading_day(day)
+        if n <= 1:
+            return anchor
+        count = self._count_through(anchor)
+        if count is not None and count >= n:
+            return date.fromordinal(self._sessions[count - n])
+        # 超出覆盖范围：按每周 5 个交易日估算
+        weeks, rest = divmod(n - 1, 5)
+        result = anchor - timedelta(weeks=weeks)
+        while rest > 0:
+            result -= timedelta(days=1)
+            if result.weekday() < 5:
+                rest -= 1
+        return result
+
+    def sessions_between(
+        self,
+        start: Union[date, datetime, str],
+        end: Union[date, datetime, str, None] = None
+    ) -> List[date]:
+        """闭区间 [start, end] 内的交易日列表"""
+        start, end = _to_date(start), _to_date(end)
+        lo = self._count_through(start - timedelta(days=1)) or 0
+        hi = self._count_through(end)
+        if hi is None:
+            hi = len(self._sessions)
+        return [date.fromordinal(o) for o in self._sessions[lo:hi]]
+
+
+# ============================================
+# 日历加载（缓存文件 / 远端 / 规则兜底）
+# ============================================
+
+_calendars: Dict[str, TradingCalendar] = {}
+_calendars_lock = threading.Lock()
+
+
+def _get_cache_dir() -> Path:
+    """缓存目录：与数据库文件同级的 trading_calendar/ 目录"""
+    try:
+        from src.config import get_config
+        base = Path(get_config().database_path).parent
+    except Exception:
+        base = Path('./data')
+    return base / 'trading_calendar'
+
+
+def _load_cache(market: str) -> Optional[Dict]:
+    """读取本地缓存文件"""
+    path = _get_cache_dir() / f"{market}.json"
+    if not path.exists():
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        logger.debug(f"[交易日历] 读取缓存失败 {path}: {e}")
+        return None
+
+
+def _save_cache(market: str, sessions: List[date], source: str) -> None:
+    """写入本地缓存文件"""
+    path = _get_cache_dir() / f"{market}.json"
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            'market': market,
+            'source': source,
+            'updated_at': time.time(),
+            'sessions': [d.isoformat() for d in sessions],
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(payload, f)
+    except Exception as e:
+        logger.debug(f"[交易日历] 写入缓存失败 {path}: {e}")
+
+
+def _fetch_remote_sessions(market: str, start: date, end: date) -> Optional[List[date]]:
+    """从远端获取交易日列表，失败返回 None"""
+    try:
+        if market == MARKET_CN:
+            import akshare as ak
+            df = ak.tool_trade_date_hist_sina()
+            if df is None or df.empty:
+                return None
+            return [_to_date(d) for d in df['trade_date'].tolist()]
+
+        import exchange_calendars as xcals
+        cal = xcals.get_calendar(_EXCHANGE_CODES[market])
+        lo = max(start, cal.first_session.date())
+        hi = min(end, cal.last_session.date())
+        return [ts.date() for ts in cal.sessions_in_range(lo.isoformat(), hi.isoformat())]
+    except ImportError:
+        logger.debug(f"[交易日历] {market} 远端日历依赖未安装，使用内置规则")
+        return None
+    except Exception as e:
+        logger.warning(f"[交易日历] {market} 远端日历获取失败: {e}")
+        return None
+
+
+def _build_calendar(market: str) -> TradingCalendar:
+    """构建交易日历：缓存 → 远端 → 规则"""
+    start = date(CALENDAR_START_YEAR, 1, 1)
+    end = date(date.today().year + 1, 12, 31)
+
+    cached = _load_cache(market)
+    remote_sessions: Optional[List[date]] = None
+    source = 'rules'
+
+    cache_fresh = (
+        cached is not None
+        and time.time() - cached.get('updated_at', 0) < CALENDAR_CACHE_TTL
+    )
+    if cache_fresh:
+        remote_sessions = [_to_date(d) for d in cached.get('sessions', [])]
+        source = f"cache:{cached.get('source', 'unknown')}"
+    else:
+        remote_sessions = _fetch_remote_sessions(market, start, end)
+        if remote_sessions:
+            source = 'akshare' if market == MARKET_CN else 'exchange_calendars'
+            _save_cache(market, remote_sessions, source)
+        elif cached is not None:
+            # 远端失败时使用过期缓存
+            remote_sessions = [_to_date(d) for d in cached.get('sessions', [])]
+            source = f"stale_cache:{cached.get('source', 'unknown')}"
+
+    if not remote_sessions:
+        return TradingCalendar(market, _rule_based_sessions(market, start, end), start, end, source)
+
+    # 远端数据只覆盖到某一天（新浪为当年年末），之后的日期用规则补齐
+    remote_end = max(remote_sessions)
+    tail = _rule_based_sessions(market, remote_end + timedelta(days=1), end)
+    return TradingCalendar(market, list(remote_sessions) + tail, start, end, source)
+
+
+def get_trading_calendar(market: str = MARKET_CN) -> TradingCalendar:
+    """
+    获取指定市场的交易日历（进程内单例，首次调用时构建）
+
+    Args:
+        market: 'cn' / 'hk' / 'us'
+    """
+    market = (market or MARKET_CN).lower()
+    if market not in SUPPORTED_MARKETS:
+        raise ValueError(f"不支持的市场: {market}")
+
+    calendar = _calendars.get(market)
+    if calendar is not None and calendar.end >= date.today():
+        return calendar
+
+    with _calendars_lock:
+        calendar = _calendars.get(market)
+        if calendar is None or calendar.end < date.today():
+            calendar = _build_calendar(market)
+            _calendars[market] = calendar
+            logger.info(
+                f"[交易日历] {market} 已加载 {len(calendar)} 个交易日（来源: {calendar.source}）"
+            )
+    return calendar
+
+
+def get_calendar_for_code(stock_code: str) -> TradingCalendar:
+    """按股票代码获取所属市场的交易日历"""
+    return get_trading_calendar(detect_market(stock_code))
+
+
+def reset_trading_calendars() -> None:
+    """清空进程内日历缓存（主要用于测试或强制刷新）"""
+    with _calendars_lock:
+        _calendars.clear()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+
+    for m in SUPPORTED_MARKETS:
+        cal = get_trading_calendar(m)
+        today = date.today()
+        print(f"[{m}] 今天是否交易日: {cal.is_trading_day(today)}")
+        print(f"[{m}] 最近交易日: {cal.latest_trading_day(today)}")
+        print(f"[{m}] 上一交易日: {cal.prev_trading_day(today)}")
+        print(f"[{m}] 下一交易日: {cal.next_trading_day(today)}")
+        print(f"[{m}] 最近30个交易日起点: {cal.shift_trading_days(today, 30)}")
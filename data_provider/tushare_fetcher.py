@@ -25,10 +25,11 @@ from tenacity import (
     stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
-    before_sleep_log,
 )
 
+from . import securities
 from .base import BaseFetcher, DataFetchError, RateLimitError, STANDARD_COLUMNS
+from src import pacing, telemetry
 from src.config import get_config
 
 logger = logging.getLogger(__name__)
@@ -161,7 +162,7 @@ class TushareFetcher(BaseFetcher):
                 f"等待 {sleep_time:.1f} 秒..."
             )
             
-            time.sleep(sleep_time)
+            pacing.pause(sleep_time, 'rate_limit', host='tushare')
             
             # 重置计数器
             self._minute_start = time.time()
@@ -178,6 +179,7 @@ class TushareFetcher(BaseFetcher):
         Tushare 要求的格式：
         - 沪市：600519.SH
         - 深市：000001.SZ
+        - 北交所：830799.BJ
         
         Args:
             stock_code: 原始代码，如 '600519', '000001'
@@ -185,29 +187,13 @@ class TushareFetcher(BaseFetcher):
         Returns:
             Tushare 格式代码，如 '600519.SH', '000001.SZ'
         """
-        code = stock_code.strip()
-        
-        # 已经包含后缀的情况
-        if '.' in code:
-            return code.upper()
-        
-        # 根据代码前缀判断市场
-        # 沪市：600xxx, 601xxx, 603xxx, 688xxx (科创板)
-        # 深市：000xxx, 002xxx, 300xxx (创业板)
-        if code.startswith(('600', '601', '603', '688')):
-            return f"{code}.SH"
-        elif code.startswith(('000', '002', '300')):
-            return f"{code}.SZ"
-        else:
-            # 默认尝试深市
-            logger.warning(f"无法确定股票 {code} 的市场，默认使用深市")
-            return f"{code}.SZ"
+        return securities.lookup(stock_code).tushare_code
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=telemetry.retry_hook(logger, logging.WARNING),
     )
     def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
@@ -252,6 +238,7 @@ class TushareFetcher(BaseFetcher):
             # 检测配额超限
             if any(keyword in error_msg for keyword in ['quota', '配额', 'limit', '权限']):
                 logger.warning(f"Tushare 配额可能超限: {e}")
+                pacing.observe('tushare', e)
                 raise RateLimitError(f"Tushare 配额超限: {e}") from e
             
             raise DataFetchError(f"Tushare 获取数据失败: {e}") from e
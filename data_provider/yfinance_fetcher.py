@@ -24,9 +24,10 @@ from tenacity import (
     stop_after_attempt,
     wait_exponential,
     retry_if_exception_type,
-    before_sleep_log,
 )
 
+from src import telemetry
+from . import securities
 from .base import BaseFetcher, DataFetchError, STANDARD_COLUMNS
 
 logger = logging.getLogger(__name__)
@@ -81,43 +82,13 @@ class YfinanceFetcher(BaseFetcher):
             >>> fetcher._convert_stock_code('AAPL')
             'AAPL'
         """
-        import re
-
-        code = stock_code.strip().upper()
-
-        # 美股：1-5个大写字母（可能包含 .），直接返回
-        if re.match(r'^[A-Z]{1,5}(\.[A-Z])?$', code):
-            logger.debug(f"识别为美股代码: {code}")
-            return code
-
-        # 港股：hk前缀 -> .HK后缀
-        if code.startswith('HK'):
-            hk_code = code[2:].lstrip('0') or '0'  # 去除前导0，但保留至少一个0
-            hk_code = hk_code.zfill(4)  # 补齐到4位
-            logger.debug(f"转换港股代码: {stock_code} -> {hk_code}.HK")
-            return f"{hk_code}.HK"
-
-        # 已经包含后缀的情况
-        if '.SS' in code or '.SZ' in code or '.HK' in code:
-            return code
-
-        # 去除可能的 .SH 后缀
-        code = code.replace('.SH', '')
-
-        # A股：根据代码前缀判断市场
-        if code.startswith(('600', '601', '603', '688')):
-            return f"{code}.SS"
-        elif code.startswith(('000', '002', '300')):
-            return f"{code}.SZ"
-        else:
-            logger.warning(f"无法确定股票 {code} 的市场，默认使用深市")
-            return f"{code}.SZ"
+        return securities.lookup(stock_code).yfinance_code
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=2, max=30),
         retry=retry_if_exception_type((ConnectionError, TimeoutError)),
-        before_sleep=before_sleep_log(logger, logging.WARNING),
+        before_sleep=telemetry.retry_hook(logger, logging.WARNING),
     )
     def _fetch_raw_data(self, stock_code: str, start_date: str, end_date: str) -> pd.DataFrame:
         """
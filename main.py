@@ -38,14 +38,11 @@ from datetime import datetime, timezone, timedelta
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 from typing import List, Optional
-from src.feishu_doc import FeishuDocManager
 
 from src.config import get_config, Config
-from src.notification import NotificationService
-from src.core.pipeline import StockAnalysisPipeline
-from src.core.market_review import run_market_review
-from src.search_service import SearchService
-from src.analyzer import GeminiAnalyzer
+
+# 数据栈（pandas / SQLAlchemy / 各数据源 SDK）、AI SDK、飞书 SDK 等重量级依赖在各运行模式内按需导入，
+# 启动耗时可用 --profile-startup 查看
 
 # 配置日志格式
 LOG_FORMAT = '%(asctime)s | %(levelname)-8s | %(name)-20s | %(message)s'
@@ -131,7 +128,10 @@ def parse_arguments() -> argparse.Namespace:
   python main.py --no-notify        # 不发送推送通知
   python main.py --single-notify    # 启用单股推送模式（每分析完一只立即推送）
   python main.py --schedule         # 启用定时任务模式
+  python main.py --watch            # 盘中监控模式（规则触发才调用 AI 和推送）
   python main.py --market-review    # 仅运行大盘复盘
+  python main.py --bot              # 仅运行机器人（Stream 模式，收到命令时才加载分析模块）
+  python main.py --profile-startup  # 分析启动耗时（可与 --market-review / --bot 等模式参数组合）
         '''
     )
     
@@ -178,6 +178,12 @@ def parse_arguments() -> argparse.Namespace:
         help='启用定时任务模式，每日定时执行'
     )
     
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='盘中监控模式：轮询全市场快照，规则触发时才调用 AI 分析并推送'
+    )
+    
     parser.add_argument(
         '--market-review',
         action='store_true',
@@ -190,6 +196,18 @@ def parse_arguments() -> argparse.Namespace:
         help='跳过大盘复盘分析'
     )
     
+    parser.add_argument(
+        '--bot',
+        action='store_true',
+        help='仅运行机器人：启动钉钉/飞书 Stream 客户端并常驻，分析模块在首个命令时才加载'
+    )
+    
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help='分析当前运行模式的启动导入耗时并与预算（STARTUP_BUDGET_MS）比较，不执行任务'
+    )
+    
     return parser.parse_args()
 
 
@@ -203,6 +221,11 @@ def run_full_analysis(
     
     这是定时任务调用的主函数
     """
+    from src import pacing
+    from src.core.pipeline import StockAnalysisPipeline
+    from src.core.market_review import run_market_review
+    from src.feishu_doc import FeishuDocManager
+
     try:
         # 命令行参数 --single-notify 覆盖配置（#55）
         if getattr(args, 'single_notify', False):
@@ -225,7 +248,7 @@ def run_full_analysis(
         analysis_delay = getattr(config, 'analysis_delay', 0)
         if analysis_delay > 0 and config.market_review_enabled and not args.no_market_review:
             logger.info(f"等待 {analysis_delay} 秒后执行大盘复盘（避免API限流）...")
-            time.sleep(analysis_delay)
+            pacing.pause(analysis_delay, 'analysis_delay')
 
         # 2. 运行大盘复盘（如果启用且不是仅个股模式）
         market_report = ""
@@ -280,7 +303,7 @@ def run_full_analysis(
                 if doc_url:
                     logger.info(f"飞书云文档创建成功: {doc_url}")
                     # 可选：将文档链接也推送到群里
-                    pipeline.notifier.send(f"[{now.strftime('%Y-%m-%d %H:%M')}] 复盘文档创建成功: {doc_url}")
+                    pipeline.notifier.deliver(f"[{now.strftime('%Y-%m-%d %H:%M')}] 复盘文档创建成功: {doc_url}")
 
         except Exception as e:
             logger.error(f"飞书文档生成失败: {e}")
@@ -289,14 +312,25 @@ def run_full_analysis(
         logger.exception(f"分析流程执行失败: {e}")
 
 
-def start_bot_stream_clients(config: Config) -> None:
-    """Start bot stream clients when enabled in config."""
+def start_bot_stream_clients(config: Config, warm_up: bool = True) -> bool:
+    """
+    Start bot stream clients when enabled in config.
+
+    Args:
+        config: 配置对象
+        warm_up: 是否在后台预热共享分析组件（机器人常驻模式下关闭，首个命令时再加载）
+
+    Returns:
+        是否至少启动了一个 Stream 客户端
+    """
+    started = False
     # 启动钉钉 Stream 客户端
     if config.dingtalk_stream_enabled:
         try:
             from bot.platforms import start_dingtalk_stream_background, DINGTALK_STREAM_AVAILABLE
             if DINGTALK_STREAM_AVAILABLE:
                 if start_dingtalk_stream_background():
+                    started = True
                     logger.info("[Main] Dingtalk Stream client started in background.")
                 else:
                     logger.warning("[Main] Dingtalk Stream client failed to start.")
@@ -312,6 +346,7 @@ def start_bot_stream_clients(config: Config) -> None:
             from bot.platforms import start_feishu_stream_background, FEISHU_SDK_AVAILABLE
             if FEISHU_SDK_AVAILABLE:
                 if start_feishu_stream_background():
+                    started = True
                     logger.info("[Main] Feishu Stream client started in background.")
                 else:
                     logger.warning("[Main] Feishu Stream client failed to start.")
@@ -321,6 +356,43 @@ def start_bot_stream_clients(config: Config) -> None:
         except Exception as exc:
             logger.error(f"[Main] Failed to start Feishu Stream client: {exc}")
 
+    # 后台预热共享分析组件，首个机器人命令无需等待初始化
+    if started and warm_up:
+        from src.core.registry import get_registry
+        get_registry().warm_up()
+
+    return started
+
+
+def get_run_mode(args: argparse.Namespace, config: Config) -> str:
+    """当前运行模式（与 src.startup_profile.STARTUP_MODULES 的键对应）"""
+    if args.market_review:
+        return 'market-review'
+    if args.bot:
+        return 'bot'
+    if args.watch:
+        return 'watch'
+    if args.schedule or config.schedule_enabled:
+        return 'schedule'
+    return 'analysis'
+
+
+def run_bot(config: Config) -> int:
+    """
+    机器人常驻模式：只启动 Stream 客户端，数据栈在首个分析命令时才导入
+    """
+    if not start_bot_stream_clients(config, warm_up=False):
+        logger.error("未启动任何机器人 Stream 客户端，请检查 DINGTALK_STREAM_ENABLED / FEISHU_STREAM_ENABLED 配置")
+        return 1
+
+    logger.info("机器人已就绪，等待命令（Ctrl+C 退出）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        logger.info("\n用户中断，机器人退出")
+        return 130
+
 
 def main() -> int:
     """
@@ -335,6 +407,11 @@ def main() -> int:
     # 加载配置（在设置日志前加载，以获取日志目录）
     config = get_config()
     
+    # 启动耗时分析：只测量，不执行任务
+    if args.profile_startup:
+        from src.startup_profile import run_startup_profile
+        return run_startup_profile(get_run_mode(args, config), budget_ms=config.startup_budget_ms)
+    
     # 配置日志（输出到控制台和文件）
     setup_logging(debug=args.debug, log_dir=config.log_dir)
     
@@ -348,6 +425,11 @@ def main() -> int:
     for warning in warnings:
         logger.warning(warning)
     
+    # 机器人常驻模式：不需要解析自选股列表
+    if args.bot:
+        logger.info("模式: 机器人")
+        return run_bot(config)
+    
     # 解析股票列表
     stock_codes = set()
     if args.stocks:
@@ -380,6 +462,11 @@ def main() -> int:
         # 模式1: 仅大盘复盘
         if args.market_review:
             logger.info("模式: 仅大盘复盘")
+            from src.notification import NotificationService
+            from src.core.market_review import run_market_review
+            from src.search_service import SearchService
+            from src.analyzer import GeminiAnalyzer
+
             notifier = NotificationService()
             
             # 初始化搜索服务和分析器（如果有配置）
@@ -399,7 +486,14 @@ def main() -> int:
             run_market_review(notifier, analyzer, search_service)
             return 0
         
-        # 模式2: 定时任务模式
+        # 模式2: 盘中监控模式
+        if args.watch:
+            logger.info("模式: 盘中监控")
+            from src.intraday_watch import run_intraday_watch
+            run_intraday_watch(stock_codes, config=config, send_notification=not args.no_notify)
+            return 0
+        
+        # 模式3: 定时任务模式
         if args.schedule or config.schedule_enabled:
             logger.info("模式: 定时任务")
             logger.info(f"每日执行时间: {config.schedule_time}")
@@ -409,14 +503,23 @@ def main() -> int:
             def scheduled_task():
                 run_full_analysis(config, args, stock_codes)
             
+            # 非交易日跳过：按自选股所属市场判断（大盘复盘只看 A股）
+            trading_markets = None
+            if config.schedule_skip_non_trading_days:
+                from data_provider.trading_calendar import detect_market
+                trading_markets = {detect_market(code) for code in (stock_codes or config.stock_list)}
+                if config.market_review_enabled:
+                    trading_markets.add('cn')
+            
             run_with_schedule(
                 task=scheduled_task,
                 schedule_time=config.schedule_time,
-                run_immediately=True  # 启动时先执行一次
+                run_immediately=True,  # 启动时先执行一次
+                trading_markets=trading_markets
             )
             return 0
         
-        # 模式3: 正常单次运行
+        # 模式4: 正常单次运行
         run_full_analysis(config, args, stock_codes)
         
         logger.info("\n程序执行完成")
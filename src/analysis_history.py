@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 分析结果历史
+===================================
+
+职责：
+1. 每次个股分析完成后写入 analysis_history 表：评分、操作建议、信号等级、
+   仪表盘 JSON、模型名称、调用耗时与 token 用量
+2. 写入时与该股票上一交易日（及更早）最近一次分析对比，
+   把评分变化、上次建议回填到 AnalysisResult，供报告与机器人展示
+3. 评分走势、信号筛选只查询标量列，走 (code, trade_date) / (signal, trade_date) 索引
+
+命令行：
+    python -m src.analysis_history trend 600519 --days 90
+    python -m src.analysis_history signals strong_buy --days 7
+"""
+
+import argparse
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 信号等级文字（report_builder.get_signal_level）-> 入库代码
+SIGNAL_CODES = {
+    '强烈买入': 'strong_buy',
+    '买入': 'buy',
+    '持有': 'hold',
+    '观望': 'watch',
+    '减仓': 'reduce',
+    '卖出': 'sell',
+}
+
+# 入库的 AnalysisResult 字段（与 AnalysisHistory 列同名）
+RESULT_FIELDS = (
+    'code', 'name', 'sentiment_score', 'value_score', 'funding_score', 'news_score',
+    'trend_score', 'trend_prediction', 'operation_advice', 'confidence_level',
+    'success', 'error_message', 'model_name', 'latency_ms', 'prompt_tokens',
+    'completion_tokens', 'analysis_summary', 'dashboard', 'dimensions',
+)
+
+
+def signal_code(result) -> str:
+    """AnalysisResult 的信号等级代码"""
+    from src.report_builder import get_signal_level
+    return SIGNAL_CODES.get(get_signal_level(result)[0], 'watch')
+
+
+def record(result, trade_date: Optional[date] = None) -> Optional[int]:
+    """
+    保存一次分析结果，并回填与上次分析的对比
+
+    Args:
+        result: AnalysisResult
+        trade_date: 分析所依据的交易日（默认今天）
+
+    Returns:
+        记录 id；写入失败时返回 None（不影响分析流程）
+    """
+    from src.storage import get_db
+
+    trade_date = trade_date or date.today()
+    db = get_db()
+    try:
+        if result.success:
+            previous = db.get_latest_analysis(result.code, before=trade_date)
+            if previous is not None and previous.get('sentiment_score') is not None:
+                result.score_change = result.sentiment_score - previous['sentiment_score']
+                result.previous_advice = previous.get('operation_advice')
+
+        values: Dict[str, Any] = {name: getattr(result, name) for name in RESULT_FIELDS}
+        values.update({'trade_date': trade_date, 'signal': signal_code(result)})
+        return db.save_analysis_result(values)
+    except Exception as e:
+        logger.warning(f"[分析历史] {result.code} 写入失败: {e}")
+        return None
+
+
+def score_trend(code: str, days: int = 90) -> List[Dict[str, Any]]:
+    """个股最近 days 个自然日的分析记录（按日期升序，不含 JSON 字段）"""
+    from src.storage import get_db
+    return get_db().get_analysis_history(code, since=date.today() - timedelta(days=days))
+
+
+def signals(signal: str, days: int = 7) -> List[Dict[str, Any]]:
+    """
+    最近 days 个自然日内某信号等级的全部分析记录
+
+    Args:
+        signal: 信号代码（strong_buy / buy / ...）或中文信号等级
+    """
+    from src.storage import get_db
+    signal = SIGNAL_CODES.get(signal, signal)
+    return get_db().get_signal_history(signal, since=date.today() - timedelta(days=days))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """评分走势 / 信号筛选 命令行入口"""
+    parser = argparse.ArgumentParser(description='AI 分析结果历史查询')
+    sub = parser.add_subparsers(dest='command', required=True)
+    trend_parser = sub.add_parser('trend', help='个股评分走势')
+    trend_parser.add_argument('code', help='股票代码')
+    trend_parser.add_argument('--days', type=int, default=90, help='最近天数（默认 90）')
+    signal_parser = sub.add_parser('signals', help='按信号等级筛选')
+    signal_parser.add_argument('signal', choices=sorted(SIGNAL_CODES.values()), help='信号等级')
+    signal_parser.add_argument('--days', type=int, default=7, help='最近天数（默认 7）')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)-8s | %(message)s')
+
+    if args.command == 'trend':
+        rows = score_trend(args.code, days=args.days)
+        for row in rows:
+            print(f"{row['trade_date']} {row['sentiment_score']:>3} {row['operation_advice'] or '':<4} {row['signal']}")
+        print(f"{args.code} 最近 {args.days} 天共 {len(rows)} 次分析")
+    elif args.command == 'signals':
+        rows = signals(args.signal, days=args.days)
+        for row in rows:
+            print(f"{row['trade_date']} {row['code']} {row['name'] or '':<8} {row['sentiment_score']:>3} {row['operation_advice'] or ''}")
+        print(f"最近 {args.days} 天 {args.signal} 信号共 {len(rows)} 条")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -12,6 +12,7 @@ A股自选股智能分析系统 - AI分析层
 
 import json
 import logging
+import threading
 import time
 from dataclasses import dataclass
 from typing import Optional, Dict, Any, List
@@ -24,69 +25,13 @@ from tenacity import (
     before_sleep_log,
 )
 
+from src import pacing, telemetry
 from src.config import get_config
+from src.stock_metadata import get_stock_name
 
 logger = logging.getLogger(__name__)
 
 
-# 股票名称映射（常见股票）
-STOCK_NAME_MAP = {
-    # === A股 ===
-    '600519': '贵州茅台',
-    '000001': '平安银行',
-    '300750': '宁德时代',
-    '002594': '比亚迪',
-    '600036': '招商银行',
-    '601318': '中国平安',
-    '000858': '五粮液',
-    '600276': '恒瑞医药',
-    '601012': '隆基绿能',
-    '002475': '立讯精密',
-    '300059': '东方财富',
-    '002415': '海康威视',
-    '600900': '长江电力',
-    '601166': '兴业银行',
-    '600028': '中国石化',
-
-    # === 美股 ===
-    'AAPL': '苹果',
-    'TSLA': '特斯拉',
-    'MSFT': '微软',
-    'GOOGL': '谷歌A',
-    'GOOG': '谷歌C',
-    'AMZN': '亚马逊',
-    'NVDA': '英伟达',
-    'META': 'Meta',
-    'AMD': 'AMD',
-    'INTC': '英特尔',
-    'BABA': '阿里巴巴',
-    'PDD': '拼多多',
-    'JD': '京东',
-    'BIDU': '百度',
-    'NIO': '蔚来',
-    'XPEV': '小鹏汽车',
-    'LI': '理想汽车',
-    'COIN': 'Coinbase',
-    'MSTR': 'MicroStrategy',
-
-    # === 港股 (5位数字) ===
-    '00700': '腾讯控股',
-    '03690': '美团',
-    '01810': '小米集团',
-    '09988': '阿里巴巴',
-    '09618': '京东集团',
-    '09888': '百度集团',
-    '01024': '快手',
-    '00981': '中芯国际',
-    '02015': '理想汽车',
-    '09868': '小鹏汽车',
-    '00005': '汇丰控股',
-    '01299': '友邦保险',
-    '00941': '中国移动',
-    '00883': '中国海洋石油',
-}
-
-
 @dataclass
 class AnalysisResult:
     """
@@ -149,6 +94,16 @@ class AnalysisResult:
     success: bool = True
     error_message: Optional[str] = None
     
+    # ========== 调用信息（写入分析历史）==========
+    model_name: str = ""  # 实际使用的模型
+    latency_ms: Optional[int] = None  # LLM 调用耗时（含重试）
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    
+    # ========== 与上一交易日对比（由 src/analysis_history.py 在入库时填充）==========
+    score_change: Optional[int] = None  # 评分变化
+    previous_advice: Optional[str] = None  # 上次操作建议
+    
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
         return {
@@ -185,6 +140,12 @@ class AnalysisResult:
             'search_performed': self.search_performed,
             'success': self.success,
             'error_message': self.error_message,
+            'model_name': self.model_name,
+            'latency_ms': self.latency_ms,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'score_change': self.score_change,
+            'previous_advice': self.previous_advice,
         }
     
     def get_dimension_summary(self) -> str:
@@ -498,6 +459,7 @@ class GeminiAnalyzer:
         self._using_fallback = False  # 是否正在使用备选模型
         self._use_openai = False  # 是否使用 OpenAI 兼容 API
         self._openai_client = None  # OpenAI 客户端
+        self._usage = threading.local()  # 各工作线程最近一次调用的 token 用量
         
         # 检查 Gemini API Key 是否有效（过滤占位符）
         gemini_key_valid = self._api_key and not self._api_key.startswith('your_') and len(self._api_key) > 10
@@ -645,7 +607,16 @@ class GeminiAnalyzer:
     def is_available(self) -> bool:
         """检查分析器是否可用"""
         return self._model is not None or self._openai_client is not None
-    
+
+    @property
+    def _pacing_host(self) -> str:
+        """当前使用的 LLM 服务（请求间隔按服务分别自适应）"""
+        return 'openai' if self._use_openai else 'gemini'
+
+    def _record_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        """记录当前线程最近一次调用的 token 用量（分析器被多个工作线程共享）"""
+        self._usage.tokens = (prompt_tokens, completion_tokens)
+
     def _call_openai_api(self, prompt: str, generation_config: dict) -> str:
         """
         调用 OpenAI 兼容 API
@@ -667,7 +638,8 @@ class GeminiAnalyzer:
                     delay = base_delay * (2 ** (attempt - 1))
                     delay = min(delay, 60)
                     logger.info(f"[OpenAI] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
-                    time.sleep(delay)
+                    telemetry.incr('retries', func='openai')
+                    pacing.pause(delay, 'retry', host='openai')
                 
                 config = get_config()
                 response = self._openai_client.chat.completions.create(
@@ -681,6 +653,10 @@ class GeminiAnalyzer:
                 )
                 
                 if response and response.choices and response.choices[0].message.content:
+                    usage = getattr(response, 'usage', None)
+                    self._record_usage(
+                        getattr(usage, 'prompt_tokens', None), getattr(usage, 'completion_tokens', None)
+                    )
                     return response.choices[0].message.content
                 else:
                     raise ValueError("OpenAI API 返回空响应")
@@ -691,6 +667,7 @@ class GeminiAnalyzer:
                 
                 if is_rate_limit:
                     logger.warning(f"[OpenAI] API 限流，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+                    pacing.throttled('openai', error_str)
                 else:
                     logger.warning(f"[OpenAI] API 调用失败，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
                 
@@ -735,7 +712,8 @@ class GeminiAnalyzer:
                     delay = base_delay * (2 ** (attempt - 1))  # 指数退避: 5, 10, 20, 40...
                     delay = min(delay, 60)  # 最大60秒
                     logger.info(f"[Gemini] 第 {attempt + 1} 次重试，等待 {delay:.1f} 秒...")
-                    time.sleep(delay)
+                    telemetry.incr('retries', func='gemini')
+                    pacing.pause(delay, 'retry', host='gemini')
                 
                 response = self._model.generate_content(
                     prompt,
@@ -744,6 +722,10 @@ class GeminiAnalyzer:
                 )
                 
                 if response and response.text:
+                    usage = getattr(response, 'usage_metadata', None)
+                    self._record_usage(
+                        getattr(usage, 'prompt_token_count', None), getattr(usage, 'candidates_token_count', None)
+                    )
                     return response.text
                 else:
                     raise ValueError("Gemini 返回空响应")
@@ -757,6 +739,7 @@ class GeminiAnalyzer:
                 
                 if is_rate_limit:
                     logger.warning(f"[Gemini] API 限流 (429)，第 {attempt + 1}/{max_retries} 次尝试: {error_str[:100]}")
+                    pacing.throttled('gemini', error_str)
                     
                     # 如果已经重试了一半次数且还没切换过备选模型，尝试切换
                     if attempt >= max_retries // 2 and not tried_fallback:
@@ -815,11 +798,11 @@ class GeminiAnalyzer:
         code = context.get('code', 'Unknown')
         config = get_config()
         
-        # 请求前增加延时（防止连续请求触发限流）
+        # 请求前增加延时（防止连续请求触发限流；无限流时按倍率缩短，被限流后拉长）
         request_delay = config.gemini_request_delay
         if request_delay > 0:
-            logger.debug(f"[LLM] 请求前等待 {request_delay:.1f} 秒...")
-            time.sleep(request_delay)
+            logger.debug(f"[LLM] 请求前等待约 {request_delay:.1f} 秒...")
+            pacing.wait(self._pacing_host, request_delay, request_delay, min_interval=0, reason='llm_delay')
         
         # 优先从上下文获取股票名称（由 main.py 传入）
         name = context.get('stock_name')
@@ -828,8 +811,8 @@ class GeminiAnalyzer:
             if 'realtime' in context and context['realtime'].get('name'):
                 name = context['realtime']['name']
             else:
-                # 最后从映射表获取
-                name = STOCK_NAME_MAP.get(code, f'股票{code}')
+                # 最后从股票元数据缓存获取
+                name = get_stock_name(code, f'股票{code}')
         
         # 如果模型不可用，返回默认结果
         if not self.is_available():
@@ -877,6 +860,7 @@ class GeminiAnalyzer:
             logger.info(f"[LLM调用] 开始调用 Gemini API (temperature={generation_config['temperature']}, max_tokens={generation_config['max_output_tokens']})...")
             
             # 使用带重试的 API 调用
+            self._usage.tokens = (None, None)
             start_time = time.time()
             response_text = self._call_api_with_retry(prompt, generation_config)
             elapsed = time.time() - start_time
@@ -893,6 +877,9 @@ class GeminiAnalyzer:
             result = self._parse_response(response_text, code, name)
             result.raw_response = response_text
             result.search_performed = bool(news_context)
+            result.model_name = self._current_model_name or model_name
+            result.latency_ms = int(elapsed * 1000)
+            result.prompt_tokens, result.completion_tokens = self._usage.tokens
             
             logger.info(f"[LLM解析] {name}({code}) 分析完成: {result.trend_prediction}, 评分 {result.sentiment_score}")
             
@@ -934,7 +921,7 @@ class GeminiAnalyzer:
         # 优先使用上下文中的股票名称（从 realtime_quote 获取）
         stock_name = context.get('stock_name', name)
         if not stock_name or stock_name == f'股票{code}':
-            stock_name = STOCK_NAME_MAP.get(code, f'股票{code}')
+            stock_name = get_stock_name(code, f'股票{code}')
             
         today = context.get('today', {})
         
@@ -946,6 +933,7 @@ class GeminiAnalyzer:
 |------|------|
 | 股票代码 | **{code}** |
 | 股票名称 | **{stock_name}** |
+| 所属行业 | {context.get('industry') or '未知'} |
 | 分析日期 | {context.get('date', '未知')} |
 
 ---
@@ -1002,6 +990,11 @@ class GeminiAnalyzer:
 | 90%筹码集中度 | {chip.get('concentration_90', 0):.2%} | <15%为集中 |
 | 70%筹码集中度 | {chip.get('concentration_70', 0):.2%} | |
 | 筹码状态 | {chip.get('chip_status', '未知')} | |
+"""
+            if chip.get('profit_ratio_trend'):
+                trend_text = " → ".join(f"{ratio:.1%}" for _, ratio in chip['profit_ratio_trend'])
+                prompt += f"""
+**获利比例走势（近{len(chip['profit_ratio_trend'])}日）**: {trend_text}
 """
         
         # 添加财务数据（价值投资面核心数据）
@@ -1016,6 +1009,7 @@ class GeminiAnalyzer:
 | **净利润增长率** | **{fin.get('profit_growth', 'N/A')}%** | 同比增长率 |
 | 销售毛利率 | {fin.get('gross_profit_margin', 'N/A')}% | 盈利能力指标 |
 | 销售净利率 | {fin.get('net_profit_margin', 'N/A')}% | 盈利质量指标 |
+| 资产负债率 | {fin.get('debt_to_asset', 'N/A')}% | 财务健康指标 |
 | 财报日期 | {fin.get('report_date', 'N/A')} | 数据时效性 |
 
 **数据来源**: {fin.get('data_source', 'unknown')}
@@ -1042,7 +1036,11 @@ class GeminiAnalyzer:
 | 中单净流入 | {(mf.get('net_mf_md', 0) or 0) / 10000:.2f}亿元 | 单笔4-20万 |
 | 小单净流入 | {(mf.get('net_mf_sm', 0) or 0) / 10000:.2f}亿元 | 单笔<4万 |
 | 交易日期 | {mf.get('trade_date', 'N/A')} | 数据时效性 |
-
+"""
+            if mf.get('main_net_inflow_total') is not None:
+                prompt += f"""| 近{mf.get('days')}日主力累计净流入 | {mf['main_net_inflow_total'] / 10000:.2f}亿元 | 其中{mf.get('inflow_days', 0)}日净流入 |
+"""
+            prompt += f"""
 **资金流向趋势**: {'流入' if main_inflow_yi > 0 else '流出'}
 """
             
@@ -1058,6 +1056,9 @@ class GeminiAnalyzer:
 | 最近{north.get('days', 5)}日累计净流入 | {north_inflow_yi:.2f}亿元 |
 | 日均净流入 | {north.get('avg_net_amount', 0) / 10000:.2f}亿元 |
 | **趋势判断** | **{north.get('trend', '未知')}** |
+"""
+                if north.get('hold_ratio') is not None:
+                    prompt += f"""| 北向持股占流通股比 | {north['hold_ratio']:.2f}% |
 """
         else:
             prompt += """
@@ -1386,7 +1387,7 @@ sentiment_score = 价值面×0.4 + 资金面×0.25 + 消息面×0.25 + 趋势面
         for i, context in enumerate(contexts):
             if i > 0:
                 logger.debug(f"等待 {delay_between} 秒后继续...")
-                time.sleep(delay_between)
+                pacing.pause(delay_between, 'llm_delay', host=self._pacing_host)
             
             result = self.analyze(context)
             results.append(result)
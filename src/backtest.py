@@ -0,0 +1,693 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+趋势信号回测引擎
+===================================
+
+职责：
+1. 基于本地历史行情，向量化重放 StockTrendAnalyzer 的评分与买入信号
+2. 逐日滚动计算（walk-forward），第 t 日的信号只使用 t 日及之前的数据，无未来函数
+3. 按信号分桶统计：样本数、胜率、N 日前瞻收益、持有期最大回撤
+4. 参数扫描：对 BIAS_THRESHOLD / VOLUME_SHRINK_RATIO 等类常量做网格搜索，多进程并行
+
+与 StockTrendAnalyzer.analyze 的对应关系：
+- 均线 / 乖离率 / 量能 / 支撑 / MACD / RSI / 综合评分 的规则逐条向量化实现
+- analyze() 对传入窗口从头计算 EMA；这里从全部历史的第一根 K 线开始递推，
+  同样只使用过去数据，长窗口下两者差异可忽略
+
+数据来源：
+- 优先读取列式存储（src.bar_store，零拷贝），不可用时回退到 SQLite stock_daily 表
+
+命令行：
+    python -m src.backtest --stocks 600519,000001 --horizons 1,5,10,20
+    python -m src.backtest --sweep "BIAS_THRESHOLD=3,5,7;VOLUME_SHRINK_RATIO=0.6,0.7,0.8" --workers 4
+"""
+
+import argparse
+import itertools
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, asdict, fields, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.stock_analyzer import BuySignal, StockTrendAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+# BuySignal -> 整数编码（按枚举定义顺序，便于 bincount 分桶）
+SIGNAL_ORDER: List[BuySignal] = list(BuySignal)
+SIGNAL_CODES: Dict[BuySignal, int] = {signal: i for i, signal in enumerate(SIGNAL_ORDER)}
+
+# 与 StockTrendAnalyzer.analyze 的最少数据要求一致
+MIN_BARS = 20
+
+DEFAULT_HORIZONS = (1, 5, 10, 20)
+
+
+@dataclass(frozen=True)
+class SignalParams:
+    """
+    信号参数（对应 StockTrendAnalyzer 的类常量）
+
+    扫描时可用类常量名（如 BIAS_THRESHOLD）或字段名（bias_threshold）指定
+    """
+    bias_threshold: float = StockTrendAnalyzer.BIAS_THRESHOLD
+    volume_shrink_ratio: float = StockTrendAnalyzer.VOLUME_SHRINK_RATIO
+    volume_heavy_ratio: float = StockTrendAnalyzer.VOLUME_HEAVY_RATIO
+    ma_support_tolerance: float = StockTrendAnalyzer.MA_SUPPORT_TOLERANCE
+    macd_fast: int = StockTrendAnalyzer.MACD_FAST
+    macd_slow: int = StockTrendAnalyzer.MACD_SLOW
+    macd_signal: int = StockTrendAnalyzer.MACD_SIGNAL
+    rsi_short: int = StockTrendAnalyzer.RSI_SHORT
+    rsi_mid: int = StockTrendAnalyzer.RSI_MID
+    rsi_long: int = StockTrendAnalyzer.RSI_LONG
+    rsi_overbought: float = StockTrendAnalyzer.RSI_OVERBOUGHT
+    rsi_oversold: float = StockTrendAnalyzer.RSI_OVERSOLD
+
+    @classmethod
+    def field_name(cls, name: str) -> str:
+        """类常量名 / 字段名 -> 字段名"""
+        key = name.strip().lower()
+        valid = {f.name for f in fields(cls)}
+        if key not in valid:
+            raise ValueError(f"未知参数: {name}（可选: {', '.join(sorted(valid))}）")
+        return key
+
+    def with_overrides(self, overrides: Dict[str, float]) -> 'SignalParams':
+        return replace(self, **{self.field_name(k): v for k, v in overrides.items()})
+
+    def indicator_key(self) -> Tuple[int, ...]:
+        """只影响指标计算（不影响阈值判断）的参数，用于缓存中间结果"""
+        return (self.macd_fast, self.macd_slow, self.macd_signal,
+                self.rsi_short, self.rsi_mid, self.rsi_long)
+
+
+# ============================================
+# 向量化指标
+# ============================================
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """等价于 pd.Series.rolling(window).mean()，前 window-1 个为 NaN"""
+    out = np.full(len(x), np.nan)
+    if len(x) < window:
+        return out
+    csum = np.cumsum(np.insert(x, 0, 0.0))
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def _ema(x: np.ndarray, span: int, block: int = 256) -> np.ndarray:
+    """
+    等价于 pd.Series.ewm(span=span, adjust=False).mean()
+
+    y[t] = a * x[t] + (1 - a) * y[t-1]，按块展开为闭式解（避免逐元素 Python 循环），
+    块长限制在 256 以内保证 (1-a)^-k 不溢出
+    """
+    n = len(x)
+    out = np.empty(n)
+    if n == 0:
+        return out
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    k = np.arange(1, block + 1, dtype=np.float64)
+    growth = decay ** -k       # (1-a)^-k
+    shrink = decay ** k        # (1-a)^k
+
+    prev = x[0]
+    out[0] = prev
+    pos = 1
+    while pos < n:
+        end = min(pos + block, n)
+        m = end - pos
+        acc = np.cumsum(alpha * x[pos:end] * growth[:m])
+        out[pos:end] = shrink[:m] * (prev + acc)
+        prev = out[end - 1]
+        pos = end
+    return out
+
+
+def _rsi(close: np.ndarray, period: int) -> np.ndarray:
+    """与 StockTrendAnalyzer._calculate_rsi 一致：简单滚动均值，NaN 填 50"""
+    # diff 的第一个值为 NaN，where(delta > 0, 0) 会把它替换为 0
+    delta = np.diff(close, prepend=np.nan)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain = _rolling_mean(gain, period)
+    avg_loss = _rolling_mean(loss, period)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100.0 - 100.0 / (1.0 + rs)
+    return np.where(np.isnan(rsi), 50.0, rsi)
+
+
+def _shift(x: np.ndarray, n: int, fill=np.nan) -> np.ndarray:
+    """x[t-n]（n>0 向后看历史），越界填 fill"""
+    out = np.full(len(x), fill, dtype=np.float64)
+    if n < len(x):
+        out[n:] = x[:len(x) - n]
+    return out
+
+
+def compute_indicators(close: np.ndarray, params: SignalParams) -> Dict[str, np.ndarray]:
+    """计算与阈值无关的指标序列（均线 / MACD / RSI）"""
+    close = np.asarray(close, dtype=np.float64)
+    dif = _ema(close, params.macd_fast) - _ema(close, params.macd_slow)
+    dea = _ema(dif, params.macd_signal)
+    return {
+        'ma5': _rolling_mean(close, 5),
+        'ma10': _rolling_mean(close, 10),
+        'ma20': _rolling_mean(close, 20),
+        'dif': dif,
+        'dea': dea,
+        'rsi_mid': _rsi(close, params.rsi_mid),
+    }
+
+
+def compute_signals(
+    close: np.ndarray,
+    volume: np.ndarray,
+    params: Optional[SignalParams] = None,
+    indicators: Optional[Dict[str, np.ndarray]] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    逐日计算综合评分与买入信号（walk-forward，无未来函数）
+
+    Args:
+        close: 收盘价序列（按日期升序）
+        volume: 成交量序列
+        params: 信号参数，默认取 StockTrendAnalyzer 类常量
+        indicators: 预先计算的 compute_indicators 结果（参数扫描时复用）
+
+    Returns:
+        (score, signal)：int 数组；前 MIN_BARS-1 天数据不足，signal 记为 -1
+    """
+    params = params or SignalParams()
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    n = len(close)
+    ind = indicators or compute_indicators(close, params)
+    ma5, ma10, ma20 = ind['ma5'], ind['ma10'], ind['ma20']
+    idx = np.arange(n)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # === 趋势（对应 _analyze_trend，prev 为 4 个交易日前）===
+        prev_ma5, prev_ma20 = _shift(ma5, 4), _shift(ma20, 4)
+        bull = (ma5 > ma10) & (ma10 > ma20)
+        bear = (ma5 < ma10) & (ma10 < ma20)
+        bull_spread_prev = np.where(prev_ma20 > 0, (prev_ma5 - prev_ma20) / prev_ma20 * 100, 0.0)
+        bull_spread_curr = np.where(ma20 > 0, (ma5 - ma20) / ma20 * 100, 0.0)
+        bear_spread_prev = np.where(prev_ma5 > 0, (prev_ma20 - prev_ma5) / prev_ma5 * 100, 0.0)
+        bear_spread_curr = np.where(ma5 > 0, (ma20 - ma5) / ma5 * 100, 0.0)
+        strong_bull = bull & (bull_spread_curr > bull_spread_prev) & (bull_spread_curr > 5)
+        strong_bear = bear & (bear_spread_curr > bear_spread_prev) & (bear_spread_curr > 5)
+        weak_bull = ~bull & (ma5 > ma10) & (ma10 <= ma20)
+        weak_bear = ~bull & ~weak_bull & ~bear & (ma5 < ma10) & (ma10 >= ma20)
+
+        trend_score = np.full(n, 12)  # 盘整
+        trend_score[weak_bear] = 8
+        trend_score[bear] = 4
+        trend_score[strong_bear] = 0
+        trend_score[weak_bull] = 18
+        trend_score[bull] = 26
+        trend_score[strong_bull] = 30
+
+        # === 乖离率（对应 _calculate_bias + 评分）===
+        bias = np.where(ma5 > 0, (close - ma5) / ma5 * 100, 0.0)
+        bias_score = np.select(
+            [bias <= -5, bias <= -3, bias < 0, bias < 2, bias < params.bias_threshold],
+            [8, 16, 20, 18, 14],
+            default=4,
+        )
+
+        # === 量能（对应 _analyze_volume：当日量 / 前 5 日均量）===
+        vol_csum = np.cumsum(np.insert(volume, 0, 0.0))
+        vol_avg5 = np.full(n, np.nan)
+        vol_avg5[5:] = (vol_csum[5:n] - vol_csum[0:n - 5]) / 5
+        # 数据不足 6 根时 iloc[-6:-1] 取到的是全部前序 K 线
+        for t in range(1, min(5, n)):
+            vol_avg5[t] = volume[:t].mean()
+        vol_ratio = np.where(vol_avg5 > 0, volume / vol_avg5, 0.0)
+        price_change = (close - _shift(close, 1)) / _shift(close, 1) * 100
+        up = price_change > 0
+        heavy = vol_ratio >= params.volume_heavy_ratio
+        shrink = ~heavy & (vol_ratio <= params.volume_shrink_ratio)
+        volume_score = np.full(n, 10)
+        volume_score[heavy & up] = 12
+        volume_score[heavy & ~up] = 0
+        volume_score[shrink & up] = 6
+        volume_score[shrink & ~up] = 15
+
+        # === 支撑（对应 _analyze_support_resistance）===
+        tol = params.ma_support_tolerance
+        support5 = (ma5 > 0) & (np.abs(close - ma5) / ma5 <= tol) & (close >= ma5)
+        support10 = (ma10 > 0) & (np.abs(close - ma10) / ma10 <= tol) & (close >= ma10)
+        support_score = support5 * 5 + support10 * 5
+
+        # === MACD（对应 _analyze_macd，数据不足时默认"多头"8 分）===
+        dif, dea = ind['dif'], ind['dea']
+        diff = dif - dea
+        prev_diff = _shift(diff, 1)
+        prev_dif = _shift(dif, 1)
+        golden = (prev_diff <= 0) & (diff > 0)
+        death = (prev_diff >= 0) & (diff < 0)
+        cross_up = (prev_dif <= 0) & (dif > 0)
+        cross_down = (prev_dif >= 0) & (dif < 0)
+        macd_score = np.select(
+            [golden & (dif > 0), cross_up, golden, death, cross_down, (dif > 0) & (dea > 0), (dif < 0) & (dea < 0)],
+            [15, 10, 12, 0, 0, 8, 2],
+            default=8,
+        )
+        macd_score = np.where(idx + 1 >= params.macd_slow, macd_score, 8)
+
+        # === RSI（对应 _analyze_rsi，数据不足时默认"中性"5 分）===
+        rsi = ind['rsi_mid']
+        rsi_score = np.select(
+            [rsi > params.rsi_overbought, rsi > 60, rsi >= 40, rsi >= params.rsi_oversold],
+            [0, 8, 5, 3],
+            default=10,
+        )
+        rsi_score = np.where(idx + 1 >= params.rsi_long, rsi_score, 5)
+
+    score = (trend_score + bias_score + volume_score + support_score + macd_score + rsi_score).astype(np.int64)
+
+    # === 买入信号（对应 _generate_signal）===
+    strong_trend = bull  # STRONG_BULL / BULL
+    signal = np.select(
+        [
+            (score >= 75) & strong_trend,
+            (score >= 60) & (strong_trend | weak_bull),
+            score >= 45,
+            score >= 30,
+            bear,
+        ],
+        [
+            SIGNAL_CODES[BuySignal.STRONG_BUY],
+            SIGNAL_CODES[BuySignal.BUY],
+            SIGNAL_CODES[BuySignal.HOLD],
+            SIGNAL_CODES[BuySignal.WAIT],
+            SIGNAL_CODES[BuySignal.STRONG_SELL],
+        ],
+        default=SIGNAL_CODES[BuySignal.SELL],
+    ).astype(np.int64)
+    signal[:MIN_BARS - 1] = -1
+    return score, signal
+
+
+# ============================================
+# 前瞻收益与分桶统计
+# ============================================
+
+def forward_returns(close: np.ndarray, horizon: int) -> np.ndarray:
+    """t 日收盘买入、t+horizon 日收盘卖出的收益率（%），末尾不足的为 NaN"""
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(len(close), np.nan)
+    if horizon < len(close):
+        out[:-horizon] = (close[horizon:] / close[:-horizon] - 1.0) * 100
+    return out
+
+
+def forward_drawdown(close: np.ndarray, low: np.ndarray, horizon: int) -> np.ndarray:
+    """持有 horizon 日内相对买入价的最大回撤（%，<=0），末尾不足的为 NaN"""
+    close = np.asarray(close, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(close)
+    out = np.full(n, np.nan)
+    if horizon >= n:
+        return out
+    # 滑动窗口最小值：low[t+1 .. t+horizon]
+    windows = np.lib.stride_tricks.sliding_window_view(low[1:], horizon)
+    window_min = windows.min(axis=1)[:n - horizon]
+    out[:n - horizon] = np.minimum(window_min / close[:n - horizon] - 1.0, 0.0) * 100
+    return out
+
+
+@dataclass
+class BucketStats:
+    """单个信号分桶的统计结果"""
+    signal: str
+    count: int
+    hit_rate: Dict[int, float]        # 各持有期胜率（%）
+    avg_return: Dict[int, float]      # 各持有期平均收益（%）
+    median_return: Dict[int, float]   # 各持有期收益中位数（%）
+    avg_drawdown: float               # 最长持有期内平均最大回撤（%）
+    worst_drawdown: float             # 最长持有期内最差回撤（%）
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class BacktestReport:
+    """回测报告"""
+    params: SignalParams
+    horizons: Tuple[int, ...]
+    symbols: int
+    samples: int
+    buckets: List[BucketStats]
+    elapsed: float = 0.0
+
+    def bucket(self, signal: BuySignal) -> Optional[BucketStats]:
+        for b in self.buckets:
+            if b.signal == signal.value:
+                return b
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            'params': asdict(self.params),
+            'horizons': list(self.horizons),
+            'symbols': self.symbols,
+            'samples': self.samples,
+            'buckets': [b.to_dict() for b in self.buckets],
+            'elapsed': self.elapsed,
+        }
+
+    def format_text(self) -> str:
+        """格式化为文本表格"""
+        header = f"{'信号':<6}{'样本':>8}" + ''.join(
+            f"{f'胜率{h}d':>10}{f'均值{h}d':>10}" for h in self.horizons
+        ) + f"{'均回撤':>10}{'最大回撤':>10}"
+        lines = [
+            f"=== 趋势信号回测：{self.symbols} 只股票，{self.samples} 个样本，耗时 {self.elapsed:.2f}s ===",
+            header,
+        ]
+        for b in self.buckets:
+            row = f"{b.signal:<6}{b.count:>8}"
+            for h in self.horizons:
+                row += f"{b.hit_rate[h]:>10.1f}{b.avg_return[h]:>10.2f}"
+            row += f"{b.avg_drawdown:>10.2f}{b.worst_drawdown:>10.2f}"
+            lines.append(row)
+        return "\n".join(lines)
+
+
+def _evaluate_symbol(
+    data: Dict[str, np.ndarray],
+    params: SignalParams,
+    horizons: Sequence[int],
+    indicators: Optional[Dict[str, np.ndarray]] = None,
+) -> Tuple[np.ndarray, Dict[int, np.ndarray], np.ndarray]:
+    """单只股票：返回 (signal, {h: 前瞻收益}, 最长持有期回撤)"""
+    close = np.asarray(data['close'], dtype=np.float64)
+    volume = np.asarray(data['volume'], dtype=np.float64)
+    _, signal = compute_signals(close, volume, params, indicators)
+    returns, drawdown = _forward_outcomes(data, horizons)
+    return signal, returns, drawdown
+
+
+def _forward_outcomes(
+    data: Dict[str, np.ndarray],
+    horizons: Sequence[int],
+) -> Tuple[Dict[int, np.ndarray], np.ndarray]:
+    """前瞻收益与回撤（与信号参数无关，参数扫描时可复用）"""
+    close = np.asarray(data['close'], dtype=np.float64)
+    low = np.asarray(data.get('low', close), dtype=np.float64)
+    returns = {h: forward_returns(close, h) for h in horizons}
+    drawdown = forward_drawdown(close, low, max(horizons))
+    return returns, drawdown
+
+
+def _summarize(
+    signals: np.ndarray,
+    returns: Dict[int, np.ndarray],
+    drawdown: np.ndarray,
+    horizons: Sequence[int],
+) -> List[BucketStats]:
+    """按信号分桶汇总"""
+    buckets = []
+    for signal in SIGNAL_ORDER:
+        mask = signals == SIGNAL_CODES[signal]
+        count = int(mask.sum())
+        hit, avg, med = {}, {}, {}
+        for h in horizons:
+            r = returns[h][mask]
+            r = r[~np.isnan(r)]
+            hit[h] = float((r > 0).mean() * 100) if len(r) else 0.0
+            avg[h] = float(r.mean()) if len(r) else 0.0
+            med[h] = float(np.median(r)) if len(r) else 0.0
+        dd = drawdown[mask]
+        dd = dd[~np.isnan(dd)]
+        buckets.append(BucketStats(
+            signal=signal.value,
+            count=count,
+            hit_rate=hit,
+            avg_return=avg,
+            median_return=med,
+            avg_drawdown=float(dd.mean()) if len(dd) else 0.0,
+            worst_drawdown=float(dd.min()) if len(dd) else 0.0,
+        ))
+    return buckets
+
+
+def run_backtest(
+    history: Dict[str, Dict[str, np.ndarray]],
+    params: Optional[SignalParams] = None,
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    indicator_cache: Optional[Dict] = None,
+) -> BacktestReport:
+    """
+    对多只股票执行回测
+
+    Args:
+        history: {code: {'close', 'volume', 'low', ...}}，见 load_history
+        params: 信号参数
+        horizons: 前瞻持有期（交易日）
+        indicator_cache: 指标 / 前瞻收益缓存（参数扫描时跨参数组合复用）
+
+    Returns:
+        BacktestReport
+    """
+    start = time.time()
+    params = params or SignalParams()
+    horizons = tuple(sorted(set(int(h) for h in horizons)))
+
+    all_signals, all_drawdown = [], []
+    all_returns: Dict[int, List[np.ndarray]] = {h: [] for h in horizons}
+    for code, data in history.items():
+        if len(data['close']) < MIN_BARS:
+            continue
+        if indicator_cache is None:
+            signal, returns, drawdown = _evaluate_symbol(data, params, horizons)
+        else:
+            key = (code, params.indicator_key())
+            indicators = indicator_cache.get(key)
+            if indicators is None:
+                indicators = compute_indicators(data['close'], params)
+                indicator_cache[key] = indicators
+            outcome_key = (code, 'forward', horizons)
+            outcomes = indicator_cache.get(outcome_key)
+            if outcomes is None:
+                outcomes = _forward_outcomes(data, horizons)
+                indicator_cache[outcome_key] = outcomes
+            _, signal = compute_signals(data['close'], data['volume'], params, indicators)
+            returns, drawdown = outcomes
+        all_signals.append(signal)
+        all_drawdown.append(drawdown)
+        for h in horizons:
+            all_returns[h].append(returns[h])
+
+    if not all_signals:
+        return BacktestReport(params, horizons, 0, 0, _summarize(
+            np.empty(0, dtype=np.int64), {h: np.empty(0) for h in horizons}, np.empty(0), horizons
+        ), time.time() - start)
+
+    signals = np.concatenate(all_signals)
+    returns = {h: np.concatenate(all_returns[h]) for h in horizons}
+    drawdown = np.concatenate(all_drawdown)
+    return BacktestReport(
+        params=params,
+        horizons=horizons,
+        symbols=len(all_signals),
+        samples=int((signals >= 0).sum()),
+        buckets=_summarize(signals, returns, drawdown, horizons),
+        elapsed=time.time() - start,
+    )
+
+
+# ============================================
+# 数据加载
+# ============================================
+
+def load_history(
+    codes: Optional[Iterable[str]] = None,
+    last_n: Optional[int] = None,
+) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    加载回测用历史数据
+
+    Args:
+        codes: 股票代码（默认列式存储中的全部股票）
+        last_n: 每只股票只取最近 N 个交易日
+
+    Returns:
+        {code: {'date', 'close', 'low', 'volume'}}
+    """
+    columns = ['close', 'low', 'volume']
+    try:
+        from src.bar_store import get_bar_store
+        store = get_bar_store()
+        if store is not None:
+            codes = list(codes) if codes else store.list_symbols()
+            history = store.read_many(codes, columns=columns, last_n=last_n)
+            if history:
+                return history
+    except Exception as e:
+        logger.warning(f"[回测] 列式存储读取失败，回退到 SQLite: {e}")
+
+    from sqlalchemy import select, distinct
+    from src.storage import StockDaily, get_db
+
+    db = get_db()
+    table = StockDaily.__table__
+    history = {}
+    with db.get_session() as session:
+        if not codes:
+            codes = [row[0] for row in session.execute(select(distinct(table.c.code))).all()]
+        for code in codes:
+            rows = session.execute(
+                select(table.c.date, table.c.close, table.c.low, table.c.volume)
+                .where(table.c.code == code)
+                .order_by(table.c.date)
+            ).all()
+            if last_n:
+                rows = rows[-last_n:]
+            if not rows:
+                continue
+            dates, close, low, volume = zip(*rows)
+            history[code] = {
+                'date': np.array(dates, dtype='datetime64[D]').astype(np.int64),
+                'close': np.array(close, dtype=np.float64),
+                'low': np.array([lo if lo is not None else c for lo, c in zip(low, close)], dtype=np.float64),
+                'volume': np.nan_to_num(np.array(volume, dtype=np.float64)),
+            }
+    return history
+
+
+# ============================================
+# 参数扫描（多进程）
+# ============================================
+
+# 子进程内的全局数据（由 initializer 设置，避免每个任务重复序列化历史数据）
+_worker_history: Dict[str, Dict[str, np.ndarray]] = {}
+_worker_cache: Dict = {}
+
+
+def _init_worker(history: Dict[str, Dict[str, np.ndarray]]) -> None:
+    global _worker_history, _worker_cache
+    _worker_history = history
+    _worker_cache = {}
+
+
+def _run_combo(args: Tuple[SignalParams, Tuple[int, ...]]) -> BacktestReport:
+    params, horizons = args
+    return run_backtest(_worker_history, params, horizons, indicator_cache=_worker_cache)
+
+
+def expand_grid(grid: Dict[str, Sequence[float]], base: Optional[SignalParams] = None) -> List[SignalParams]:
+    """网格展开：{'BIAS_THRESHOLD': [3, 5, 7], ...} -> [SignalParams, ...]"""
+    base = base or SignalParams()
+    keys = [SignalParams.field_name(k) for k in grid]
+    combos = itertools.product(*grid.values())
+    return [base.with_overrides(dict(zip(keys, values))) for values in combos]
+
+
+def parameter_sweep(
+    history: Dict[str, Dict[str, np.ndarray]],
+    grid: Dict[str, Sequence[float]],
+    horizons: Sequence[int] = DEFAULT_HORIZONS,
+    workers: Optional[int] = None,
+    objective_horizon: Optional[int] = None,
+) -> List[BacktestReport]:
+    """
+    参数网格扫描
+
+    每个子进程只接收一次历史数据；与阈值无关的指标（均线/MACD/RSI）在进程内按参数缓存复用。
+
+    Args:
+        history: 历史数据（load_history 的返回值）
+        grid: 参数网格，键为类常量名或字段名
+        horizons: 前瞻持有期
+        workers: 进程数（默认 CPU 核数，1 表示单进程）
+        objective_horizon: 排序使用的持有期（默认最短持有期）
+
+    Returns:
+        按"买入类信号平均收益"降序排列的报告列表
+    """
+    combos = expand_grid(grid)
+    horizons = tuple(sorted(set(int(h) for h in horizons)))
+    objective_horizon = objective_horizon or horizons[0]
+    workers = workers or os.cpu_count() or 1
+    logger.info(f"[回测] 参数扫描: {len(combos)} 组参数, {len(history)} 只股票, {workers} 个进程")
+
+    tasks = [(params, horizons) for params in combos]
+    if workers <= 1 or len(combos) == 1:
+        _init_worker(history)
+        reports = [_run_combo(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(history,)) as pool:
+            reports = list(pool.map(_run_combo, tasks, chunksize=chunksize))
+
+    def objective(report: BacktestReport) -> float:
+        buy_buckets = [report.bucket(BuySignal.STRONG_BUY), report.bucket(BuySignal.BUY)]
+        total = sum(b.count for b in buy_buckets if b)
+        if total == 0:
+            return float('-inf')
+        return sum(b.avg_return[objective_horizon] * b.count for b in buy_buckets if b) / total
+
+    return sorted(reports, key=objective, reverse=True)
+
+
+def _parse_grid(text: str) -> Dict[str, List[float]]:
+    """解析 "BIAS_THRESHOLD=3,5,7;VOLUME_SHRINK_RATIO=0.6,0.7" """
+    grid = {}
+    for part in text.split(';'):
+        if not part.strip():
+            continue
+        key, values = part.split('=', 1)
+        grid[key.strip()] = [float(v) if '.' in v else int(v) for v in values.split(',') if v.strip()]
+    return grid
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """回测命令行入口"""
+    parser = argparse.ArgumentParser(description='趋势信号回测 / 参数扫描')
+    parser.add_argument('--stocks', type=str, help='股票代码（逗号分隔，默认本地全部）')
+    parser.add_argument('--days', type=int, default=None, help='每只股票最近 N 个交易日')
+    parser.add_argument('--horizons', type=str, default='1,5,10,20', help='前瞻持有期（交易日，逗号分隔）')
+    parser.add_argument('--sweep', type=str, default=None,
+                        help='参数网格，如 "BIAS_THRESHOLD=3,5,7;VOLUME_SHRINK_RATIO=0.6,0.7,0.8"')
+    parser.add_argument('--workers', type=int, default=None, help='参数扫描进程数')
+    parser.add_argument('--top', type=int, default=10, help='参数扫描输出前 N 组')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)-8s | %(message)s')
+
+    codes = [c.strip() for c in args.stocks.split(',') if c.strip()] if args.stocks else None
+    horizons = [int(h) for h in args.horizons.split(',') if h.strip()]
+
+    history = load_history(codes, last_n=args.days)
+    if not history:
+        print("没有可用的历史数据，请先运行分析或执行 python -m src.bar_store rebuild")
+        return 1
+
+    if not args.sweep:
+        print(run_backtest(history, horizons=horizons).format_text())
+        return 0
+
+    start = time.time()
+    reports = parameter_sweep(history, _parse_grid(args.sweep), horizons, args.workers)
+    print(f"参数扫描完成: {len(reports)} 组，耗时 {time.time() - start:.2f}s")
+    for rank, report in enumerate(reports[:args.top], 1):
+        swept = {k: v for k, v in asdict(report.params).items() if v != getattr(SignalParams(), k)}
+        print(f"\n#{rank} {swept or '默认参数'}")
+        print(report.format_text())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
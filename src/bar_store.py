@@ -0,0 +1,618 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+本地列式行情存储（内存映射）
+===================================
+
+职责：
+1. 按股票分目录、按列分文件存储日线数据（定长 float32 / int64）
+2. 只追加写入，与 DatabaseManager.save_daily_data 保持同步
+3. 读取时通过 np.memmap 零拷贝映射为 NumPy 数组，供指标计算 / 趋势分析 / 回测使用
+4. 提供压缩整理工具（去重、排序、打包），可从 SQLite 全量重建
+
+目录结构（默认与 stock_analysis.db 同级）：
+    data/bars/<code>/date.i8      交易日（距 1970-01-01 的天数）
+    data/bars/<code>/open.f4      ...
+    data/bars/<code>/meta.json    {"rows", "last_date", "ordered", "updated_at"}
+    data/bars/_pack/<col>.bin     全市场打包文件（compact 时生成，各股票首尾相接）
+    data/bars/_pack/index.json    {code: [offset, rows]}
+    data/bars/_pack/stale.txt     打包后又有写入的股票（读取时回退到单股文件）
+
+写入规则：
+- 新日期直接追加，文件保持按日期升序（ordered=True），读取为纯内存映射
+- 对已有日期的修正也以追加方式写入（后写覆盖先写），文件标记为 ordered=False，
+  读取时按"最后一次写入"去重（产生拷贝），compact 后恢复零拷贝
+
+批量读取：
+- 全市场扫描优先走打包文件：每列只映射一次，单股数据是该映射上的切片（零拷贝）
+- 未打包或已过期的股票逐个读取单股文件
+
+命令行：
+    python -m src.bar_store stats
+    python -m src.bar_store compact [code ...]   # 不带代码时整理全部并重新打包
+    python -m src.bar_store rebuild [code ...]   # 从 SQLite 重建
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# 列定义：列名 -> dtype
+BAR_COLUMNS: Dict[str, np.dtype] = {
+    'date': np.dtype('<i8'),      # 距 epoch 的天数，可零拷贝 view 为 datetime64[D]
+    'open': np.dtype('<f4'),
+    'high': np.dtype('<f4'),
+    'low': np.dtype('<f4'),
+    'close': np.dtype('<f4'),
+    'volume': np.dtype('<i8'),    # 成交量（股）
+    'amount': np.dtype('<i8'),    # 成交额（元，取整）
+    'pct_chg': np.dtype('<f4'),   # 涨跌幅（%）
+}
+
+PRICE_COLUMNS = ('open', 'high', 'low', 'close', 'volume', 'amount', 'pct_chg')
+
+PACK_DIR = '_pack'
+
+_SUFFIX = {'<i8': 'i8', '<f4': 'f4'}
+
+
+def _column_file(code_dir: str, column: str) -> str:
+    return os.path.join(code_dir, f"{column}.{_SUFFIX[BAR_COLUMNS[column].str]}")
+
+
+def _empty_columns(columns: Iterable[str]) -> Dict[str, np.ndarray]:
+    return {col: np.empty(0, dtype=BAR_COLUMNS[col]) for col in columns}
+
+
+def _normalize_columns(columns: Optional[Sequence[str]]) -> List[str]:
+    columns = list(columns or BAR_COLUMNS.keys())
+    if 'date' not in columns:
+        columns.insert(0, 'date')
+    return columns
+
+
+class BarStore:
+    """
+    列式日线存储
+
+    线程安全：写操作（append/compact/rebuild）持有全局锁；
+    读操作不加锁，行数以 meta（数据写完后才更新）为准，追加中的数据不会被读到半行。
+    """
+
+    _instance: Optional['BarStore'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, root: Optional[str] = None):
+        if root is None:
+            from src.config import get_config
+            config = get_config()
+            root = config.bar_store_dir or os.path.join(os.path.dirname(config.database_path), 'bars')
+        self.root = str(root)
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.RLock()
+
+        # 打包文件缓存（按 index.json 的 mtime 失效）
+        self._pack_mtime: Optional[float] = None
+        self._pack_index: Dict[str, List[int]] = {}
+        self._pack_maps: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def get_instance(cls) -> 'BarStore':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        """重置单例（用于测试）"""
+        cls._instance = None
+
+    # ========== 元数据 ==========
+
+    def _code_dir(self, code: str) -> str:
+        return os.path.join(self.root, code)
+
+    def _read_meta(self, code: str) -> Dict:
+        path = os.path.join(self.root, code, 'meta.json')
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'rows': 0, 'last_date': None, 'ordered': True}
+        except Exception as e:
+            logger.warning(f"[BarStore] {code} meta 读取失败，按无序处理: {e}")
+            return {'rows': None, 'last_date': None, 'ordered': False}
+
+    def _write_meta(self, code: str, meta: Dict) -> None:
+        path = os.path.join(self.root, code, 'meta.json')
+        tmp = path + '.tmp'
+        meta['updated_at'] = time.time()
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp, path)
+
+    def _row_count(self, code: str) -> int:
+        """以各列文件中最短者为准（兼容写入中断导致的列长度不一致）"""
+        code_dir = self._code_dir(code)
+        counts = []
+        for col, dtype in BAR_COLUMNS.items():
+            try:
+                counts.append(os.path.getsize(_column_file(code_dir, col)) // dtype.itemsize)
+            except FileNotFoundError:
+                return 0
+        return min(counts) if counts else 0
+
+    def has_symbol(self, code: str) -> bool:
+        return self._row_count(code) > 0
+
+    def list_symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith('_') and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    # ========== 写入 ==========
+
+    @staticmethod
+    def _frame_to_columns(df) -> Dict[str, np.ndarray]:
+        """DataFrame -> 定长列数组（按日期升序，同一日期保留最后一行）"""
+        import pandas as pd
+
+        frame = df.dropna(subset=['close'])
+        if frame.empty:
+            return _empty_columns(BAR_COLUMNS)
+        dates = pd.to_datetime(frame['date']).values.astype('datetime64[D]').astype(np.int64)
+
+        order = np.argsort(dates, kind='stable')
+        dates = dates[order]
+        # 同一日期保留最后一行
+        keep = np.ones(len(dates), dtype=bool)
+        keep[:-1] = dates[1:] != dates[:-1]
+
+        columns = {'date': dates[keep].astype(BAR_COLUMNS['date'])}
+        for col in PRICE_COLUMNS:
+            dtype = BAR_COLUMNS[col]
+            if col in frame.columns:
+                values = pd.to_numeric(frame[col], errors='coerce').to_numpy(dtype=np.float64)[order][keep]
+            else:
+                values = np.full(int(keep.sum()), np.nan)
+            if dtype.kind == 'i':
+                values = np.nan_to_num(values, nan=0.0).round()
+            columns[col] = values.astype(dtype)
+        return columns
+
+    def _repair_tail(self, code: str) -> int:
+        """截断写入中断留下的多余尾部，使各列行数一致"""
+        rows = self._row_count(code)
+        code_dir = self._code_dir(code)
+        for col, dtype in BAR_COLUMNS.items():
+            path = _column_file(code_dir, col)
+            if os.path.exists(path) and os.path.getsize(path) != rows * dtype.itemsize:
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * dtype.itemsize)
+        return rows
+
+    def _mark_pack_stale(self, code: str) -> None:
+        """打包之后又写入的股票记入 stale.txt，批量读取时改读单股文件"""
+        pack_dir = os.path.join(self.root, PACK_DIR)
+        # 已记过的不再追加，stale.txt 最多每只股票一行
+        if os.path.isdir(pack_dir) and code not in self._pack_stale_codes():
+            with open(os.path.join(pack_dir, 'stale.txt'), 'a', encoding='utf-8') as f:
+                f.write(code + '\n')
+
+    def append(self, code: str, df) -> int:
+        """
+        追加日线数据（与 save_daily_data 同步调用）
+
+        与已存储数据完全相同的历史行会被跳过，因此重复保存同一窗口不会膨胀文件。
+
+        Args:
+            code: 股票代码
+            df: 含 date/open/high/low/close/volume/amount/pct_chg 列的 DataFrame
+
+        Returns:
+            实际写入的行数
+        """
+        if df is None or df.empty:
+            return 0
+
+        new = self._frame_to_columns(df)
+        if len(new['date']) == 0:
+            return 0
+
+        with self._lock:
+            code_dir = self._code_dir(code)
+            os.makedirs(code_dir, exist_ok=True)
+            rows = self._repair_tail(code)
+            meta = self._read_meta(code)
+
+            ordered = bool(meta.get('ordered', True))
+            last_date = meta.get('last_date')
+            if rows == 0:
+                last_date = None
+                ordered = True
+
+            mask = np.ones(len(new['date']), dtype=bool)
+            if last_date is not None:
+                old_mask = new['date'] <= last_date
+                if old_mask.any():
+                    existing = self.read(code)
+                    idx = np.searchsorted(existing['date'], new['date'][old_mask])
+                    idx = np.minimum(idx, max(len(existing['date']) - 1, 0))
+                    same = existing['date'][idx] == new['date'][old_mask]
+                    for col in PRICE_COLUMNS:
+                        old_values = existing[col][idx]
+                        new_values = new[col][old_mask]
+                        equal = old_values == new_values
+                        if BAR_COLUMNS[col].kind == 'f':
+                            equal |= np.isnan(old_values) & np.isnan(new_values)
+                        same &= equal
+                    # 已存在且完全相同的行不再写入
+                    mask[np.flatnonzero(old_mask)[same]] = False
+                    if (~same).any():
+                        ordered = False
+
+            count = int(mask.sum())
+            if count == 0:
+                return 0
+
+            for col in BAR_COLUMNS:
+                with open(_column_file(code_dir, col), 'ab') as f:
+                    f.write(np.ascontiguousarray(new[col][mask]).tobytes())
+
+            max_new = int(new['date'][mask].max())
+            self._write_meta(code, {
+                'rows': rows + count,
+                'last_date': max(max_new, last_date) if last_date is not None else max_new,
+                'ordered': ordered,
+            })
+            self._mark_pack_stale(code)
+
+        if not ordered:
+            logger.debug(f"[BarStore] {code} 存在历史修正行，建议执行 compact")
+        return count
+
+    # ========== 读取 ==========
+
+    def _map_column(self, code: str, column: str, rows: int, start: int = 0, copy: bool = False) -> np.ndarray:
+        """映射（或一次性读取）某列的 [start, rows) 区间"""
+        dtype = BAR_COLUMNS[column]
+        if rows <= start:
+            return np.empty(0, dtype=dtype)
+        path = _column_file(self._code_dir(code), column)
+        if copy:
+            # 批量读取时不保留 mmap（每个 mmap 占用一个文件描述符）
+            return np.fromfile(path, dtype=dtype, count=rows - start, offset=start * dtype.itemsize)
+        return np.memmap(path, dtype=dtype, mode='r', shape=(rows,))[start:]
+
+    def read(
+        self,
+        code: str,
+        columns: Optional[Sequence[str]] = None,
+        last_n: Optional[int] = None,
+        copy: bool = False,
+    ) -> Dict[str, np.ndarray]:
+        """
+        读取单只股票的列数据
+
+        有序文件直接返回 memmap 视图（零拷贝，只读）；
+        存在修正行时按日期去重（后写覆盖先写），返回普通数组。
+
+        Args:
+            code: 股票代码
+            columns: 需要的列（默认全部，date 总会返回）
+            last_n: 只取最近 N 行
+            copy: 直接读入内存而不保留 mmap
+
+        Returns:
+            {列名: np.ndarray}，按日期升序
+        """
+        columns = _normalize_columns(columns)
+
+        # meta 在数据写完后才更新，其行数总不大于文件实际行数，可免去逐列 stat
+        meta = self._read_meta(code)
+        rows = meta.get('rows')
+        if rows is None:
+            rows = self._row_count(code)
+        if rows == 0:
+            return _empty_columns(columns)
+
+        if meta.get('ordered', True):
+            start = max(rows - last_n, 0) if last_n else 0
+            return {col: self._map_column(code, col, rows, start, copy) for col in columns}
+
+        dates = self._map_column(code, 'date', rows)
+        # 反转后 unique 取首次出现 = 原序列中最后一次写入
+        _, rev_idx = np.unique(dates[::-1], return_index=True)
+        idx = rows - 1 - rev_idx
+        if last_n:
+            idx = idx[-last_n:]
+        return {col: np.asarray(self._map_column(code, col, rows)[idx]) for col in columns}
+
+    def _load_pack(self) -> bool:
+        """加载（或复用）打包文件索引，返回打包文件是否可用"""
+        pack_dir = os.path.join(self.root, PACK_DIR)
+        index_path = os.path.join(pack_dir, 'index.json')
+        try:
+            mtime = os.path.getmtime(index_path)
+        except FileNotFoundError:
+            self._pack_mtime, self._pack_index, self._pack_maps = None, {}, {}
+            return False
+
+        if mtime != self._pack_mtime:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            self._pack_index = payload.get('codes', {})
+            self._pack_maps = {}
+            total = int(payload.get('total_rows', 0))
+            if total > 0:
+                for col, dtype in BAR_COLUMNS.items():
+                    self._pack_maps[col] = np.memmap(
+                        os.path.join(pack_dir, f"{col}.bin"), dtype=dtype, mode='r', shape=(total,)
+                    )
+            self._pack_mtime = mtime
+        return bool(self._pack_maps)
+
+    def _pack_stale_codes(self) -> set:
+        try:
+            with open(os.path.join(self.root, PACK_DIR, 'stale.txt'), 'r', encoding='utf-8') as f:
+                return {line.strip() for line in f if line.strip()}
+        except FileNotFoundError:
+            return set()
+
+    def read_many(
+        self,
+        codes: Iterable[str],
+        columns: Optional[Sequence[str]] = None,
+        last_n: Optional[int] = None,
+    ) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        批量读取多只股票（全市场扫描 / 回测使用），无数据的股票不返回
+
+        已打包且未过期的股票直接在打包映射上切片（零拷贝）；
+        其余股票逐列一次性读入内存，避免同时持有上万个 mmap 句柄。
+        """
+        columns = _normalize_columns(columns)
+        result = {}
+
+        with self._lock:
+            use_pack = self._load_pack()
+            pack_index = self._pack_index
+            pack_maps = self._pack_maps
+        stale = self._pack_stale_codes() if use_pack else set()
+
+        for code in codes:
+            entry = pack_index.get(code) if use_pack and code not in stale else None
+            if entry is not None:
+                offset, rows = entry
+                start = offset + max(rows - last_n, 0) if last_n else offset
+                end = offset + rows
+                data = {col: pack_maps[col][start:end] for col in columns}
+            else:
+                data = self.read(code, columns=columns, last_n=last_n, copy=True)
+            if len(data['date']):
+                result[code] = data
+        return result
+
+    def to_dataframe(self, code: str, last_n: Optional[int] = None):
+        """
+        读取为 DataFrame（兼容 StockTrendAnalyzer.analyze 的输入格式）
+
+        Returns:
+            含 date/open/high/low/close/volume/amount/pct_chg 列的 DataFrame，无数据返回 None
+        """
+        import pandas as pd
+
+        data = self.read(code, last_n=last_n)
+        if len(data['date']) == 0:
+            return None
+        frame = {'date': data['date'].view('datetime64[D]').astype('datetime64[ns]')}
+        for col in PRICE_COLUMNS:
+            frame[col] = data[col].astype(np.float64)
+        return pd.DataFrame(frame)
+
+    # ========== 维护 ==========
+
+    def compact(self, code: str) -> int:
+        """
+        压缩整理：按日期去重排序后原子替换各列文件
+
+        Returns:
+            整理后的行数
+        """
+        with self._lock:
+            rows = self._repair_tail(code)
+            if rows == 0:
+                return 0
+            meta = self._read_meta(code)
+            if meta.get('ordered', True) and meta.get('rows') == rows:
+                return rows
+
+            data = {col: np.array(arr) for col, arr in self.read(code).items()}
+            self._write_columns(code, data)
+            self._mark_pack_stale(code)
+            return len(data['date'])
+
+    def _write_columns(self, code: str, data: Dict[str, np.ndarray]) -> None:
+        """整体重写某只股票的所有列文件（先写临时文件再 os.replace）"""
+        code_dir = self._code_dir(code)
+        os.makedirs(code_dir, exist_ok=True)
+        for col, dtype in BAR_COLUMNS.items():
+            path = _column_file(code_dir, col)
+            tmp = path + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(np.ascontiguousarray(data[col], dtype=dtype).tobytes())
+            os.replace(tmp, path)
+        rows = len(data['date'])
+        self._write_meta(code, {
+            'rows': rows,
+            'last_date': int(data['date'][-1]) if rows else None,
+            'ordered': True,
+        })
+
+    def pack(self) -> int:
+        """
+        将全部（已整理的）股票首尾相接写入 _pack/ 打包文件
+
+        全市场读取只需映射 8 个文件，5000 只 × 5 年的加载时间与单只股票相当。
+
+        Returns:
+            打包的股票数量
+        """
+        with self._lock:
+            pack_dir = os.path.join(self.root, PACK_DIR)
+            os.makedirs(pack_dir, exist_ok=True)
+            codes = self.list_symbols()
+
+            index: Dict[str, List[int]] = {}
+            handles = {col: open(os.path.join(pack_dir, f"{col}.bin.tmp"), 'wb') for col in BAR_COLUMNS}
+            offset = 0
+            try:
+                for code in codes:
+                    data = self.read(code, copy=True)
+                    rows = len(data['date'])
+                    if rows == 0:
+                        continue
+                    for col, f in handles.items():
+                        f.write(np.ascontiguousarray(data[col], dtype=BAR_COLUMNS[col]).tobytes())
+                    index[code] = [offset, rows]
+                    offset += rows
+            finally:
+                for f in handles.values():
+                    f.close()
+
+            for col in BAR_COLUMNS:
+                os.replace(os.path.join(pack_dir, f"{col}.bin.tmp"), os.path.join(pack_dir, f"{col}.bin"))
+            stale_path = os.path.join(pack_dir, 'stale.txt')
+            if os.path.exists(stale_path):
+                os.remove(stale_path)
+            tmp = os.path.join(pack_dir, 'index.json.tmp')
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'created_at': time.time(), 'total_rows': offset, 'codes': index}, f)
+            os.replace(tmp, os.path.join(pack_dir, 'index.json'))
+
+            # 旧映射指向已被替换的文件，强制下次重新加载
+            self._pack_mtime, self._pack_index, self._pack_maps = None, {}, {}
+            return len(index)
+
+    def compact_all(self) -> Dict[str, int]:
+        """整理全部股票并重新打包"""
+        result = {code: self.compact(code) for code in self.list_symbols()}
+        self.pack()
+        return result
+
+    def rebuild_from_db(self, code: str, db=None) -> int:
+        """
+        从 SQLite（stock_daily 表）全量重建某只股票的列式文件
+
+        Returns:
+            重建后的行数
+        """
+        import pandas as pd
+        from sqlalchemy import select
+        from src.storage import StockDaily, get_db
+
+        db = db or get_db()
+        table = StockDaily.__table__
+        with db.get_session() as session:
+            rows = session.execute(
+                select(
+                    table.c.date, table.c.open, table.c.high, table.c.low, table.c.close,
+                    table.c.volume, table.c.amount, table.c.pct_chg,
+                ).where(table.c.code == code).order_by(table.c.date)
+            ).all()
+
+        df = pd.DataFrame(rows, columns=['date'] + list(PRICE_COLUMNS))
+        with self._lock:
+            self._write_columns(code, self._frame_to_columns(df) if not df.empty else _empty_columns(BAR_COLUMNS))
+            self._mark_pack_stale(code)
+        return len(df)
+
+    def rebuild_all_from_db(self, db=None) -> Dict[str, int]:
+        """从 SQLite 重建全部股票并重新打包"""
+        from sqlalchemy import select, distinct
+        from src.storage import StockDaily, get_db
+
+        db = db or get_db()
+        with db.get_session() as session:
+            codes = [row[0] for row in session.execute(select(distinct(StockDaily.code))).all()]
+        result = {code: self.rebuild_from_db(code, db=db) for code in codes}
+        self.pack()
+        return result
+
+    def stats(self) -> Dict[str, Dict]:
+        """各股票的行数 / 最新日期 / 是否需要整理"""
+        result = {}
+        for code in self.list_symbols():
+            meta = self._read_meta(code)
+            last = meta.get('last_date')
+            result[code] = {
+                'rows': self._row_count(code),
+                'last_date': str(np.datetime64(last, 'D')) if last is not None else None,
+                'ordered': meta.get('ordered', True),
+            }
+        return result
+
+
+def get_bar_store() -> Optional[BarStore]:
+    """获取列式存储实例的快捷方式（配置关闭时返回 None）"""
+    from src.config import get_config
+    if not get_config().bar_store_enabled:
+        return None
+    return BarStore.get_instance()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """压缩整理 / 重建 / 统计 命令行入口"""
+    parser = argparse.ArgumentParser(description='本地列式行情存储维护工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('stats', help='查看存储统计')
+    compact_parser = sub.add_parser('compact', help='去重排序并重新打包，恢复零拷贝读取')
+    compact_parser.add_argument('codes', nargs='*', help='股票代码（默认全部）')
+    rebuild_parser = sub.add_parser('rebuild', help='从 SQLite 全量重建')
+    rebuild_parser.add_argument('codes', nargs='*', help='股票代码（默认全部）')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)-8s | %(message)s')
+    store = BarStore.get_instance()
+    start = time.time()
+
+    if args.command == 'stats':
+        stats = store.stats()
+        dirty = [code for code, s in stats.items() if not s['ordered']]
+        for code, s in stats.items():
+            print(f"{code}: {s['rows']} 行, 最新 {s['last_date']}, {'有序' if s['ordered'] else '待整理'}")
+        print(f"共 {len(stats)} 只股票，待整理 {len(dirty)} 只")
+    elif args.command == 'compact':
+        if args.codes:
+            result = {c: store.compact(c) for c in args.codes}
+        else:
+            result = store.compact_all()
+        print(f"整理完成: {len(result)} 只股票，共 {sum(result.values())} 行")
+    elif args.command == 'rebuild':
+        if args.codes:
+            result = {c: store.rebuild_from_db(c) for c in args.codes}
+        else:
+            result = store.rebuild_all_from_db()
+        print(f"重建完成: {len(result)} 只股票，共 {sum(result.values())} 行")
+
+    print(f"耗时 {time.time() - start:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 筹码分布本地库
+===================================
+
+职责：
+1. 筹码分布按 (code, trade_date) 存入 SQLite（stock_chip_daily 表）；
+   ak.stock_cyq_em 一次返回的整段序列全部入库，而不是只取最后一天
+2. 快速路径：库中已有最近交易日（收盘后数据就绪前为上一交易日）的记录时直接返回，
+   同一交易日的重复分析、机器人查询与重跑不再请求接口
+3. 运行开始时在后台线程为自选股预取筹码分布，熔断器打开时立即停止
+4. 提供获利比例等字段的历史走势
+
+接口暂未更新到最近交易日时，同一只股票 RECHECK_INTERVAL 秒内不重复请求，先返回库中最近数据。
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 接口数据未更新到最近交易日时，同一只股票的重新检查间隔（秒）
+RECHECK_INTERVAL = 1800
+
+# 筹码走势默认天数
+TREND_DAYS = 5
+
+
+class ChipStore:
+    """
+    筹码分布本地库（单例）
+
+    使用示例:
+        store = get_chip_store()
+        chip = store.get('600519', fetcher_manager)          # 当日首次请求接口，之后读库
+        store.get_history('600519', days=5)                  # 最近 5 日序列
+        store.start_prefetch(stock_codes, fetcher_manager)   # 后台预取自选股
+    """
+
+    _instance: Optional['ChipStore'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._checked_at: Dict[str, float] = {}
+        self._code_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'ChipStore':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _code_lock(self, code: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._code_locks.get(code)
+            if lock is None:
+                lock = self._code_locks[code] = threading.Lock()
+            return lock
+
+    @staticmethod
+    def expected_date(now: Optional[datetime] = None) -> date:
+        """最近一个筹码数据应已更新的交易日"""
+        from data_provider.trading_calendar import get_trading_calendar
+        return get_trading_calendar().latest_closed_session(now)
+
+    # === 读取 ===
+
+    def _latest(self, code: str) -> Optional[Dict]:
+        from src.storage import get_db
+        rows = get_db().get_chip_history(code, days=1)
+        return rows[0] if rows else None
+
+    def is_fresh(self, code: str, now: Optional[datetime] = None) -> bool:
+        latest = self._latest(code)
+        return latest is not None and latest['date'] >= self.expected_date(now)
+
+    def get(self, code: str, fetcher_manager=None):
+        """
+        最近交易日的筹码分布
+
+        Args:
+            code: 股票代码
+            fetcher_manager: DataFetcherManager（提供 fetch_chip_history），为 None 时只读本地库
+
+        Returns:
+            ChipDistribution；库中没有且拉取失败时返回 None
+        """
+        from data_provider.realtime_types import chip_from_record
+
+        expected = self.expected_date()
+        latest = self._latest(code)
+        if latest is not None and latest['date'] >= expected:
+            return chip_from_record(code, latest, source=latest.get('data_source') or 'akshare')
+        if fetcher_manager is None:
+            return chip_from_record(code, latest) if latest else None
+
+        with self._code_lock(code):
+            # 等锁期间其他线程（预取或并发分析）可能已经入库
+            latest = self._latest(code)
+            fresh = latest is not None and latest['date'] >= expected
+            checked_at = self._checked_at.get(code)
+            recently_checked = checked_at is not None and time.time() - checked_at < RECHECK_INTERVAL
+            if not fresh and not recently_checked:
+                self._checked_at[code] = time.time()
+                if self._refresh(code, fetcher_manager):
+                    latest = self._latest(code)
+                elif latest is not None:
+                    logger.info(f"[筹码库] {code} 拉取失败，使用库中 {latest['date']} 的数据")
+
+        if latest is None:
+            return None
+        return chip_from_record(code, latest, source=latest.get('data_source') or 'akshare')
+
+    def get_history(self, code: str, days: int = TREND_DAYS) -> List[Dict]:
+        """最近 N 个交易日的筹码分布（按日期升序，只读本地库）"""
+        from src.storage import get_db
+        return list(reversed(get_db().get_chip_history(code, days=days)))
+
+    # === 拉取 / 预取 ===
+
+    def _refresh(self, code: str, fetcher_manager) -> bool:
+        """拉取整段筹码序列并入库"""
+        history = fetcher_manager.fetch_chip_history(code)
+        if history is None or history.empty:
+            return False
+        from src.storage import get_db
+        get_db().save_chip_history(code, history.to_dict('records'), source='akshare_cyq')
+        return True
+
+    def start_prefetch(self, codes: Iterable[str], fetcher_manager) -> None:
+        """后台线程依次预取库中不是最新的自选股（幂等，已在预取时直接返回）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._prefetch, args=(list(codes), fetcher_manager),
+                name="chip-prefetch", daemon=True,
+            )
+            self._thread.start()
+
+    def _prefetch(self, codes: List[str], fetcher_manager) -> None:
+        from data_provider.realtime_types import get_chip_circuit_breaker
+
+        breaker = get_chip_circuit_breaker()
+        fetched = 0
+        try:
+            for code in codes:
+                if self.is_fresh(code):
+                    continue
+                if not breaker.is_available("akshare_chip"):
+                    logger.info(f"[筹码库] 筹码接口熔断，停止预取（已预取 {fetched} 只）")
+                    return
+                if self.get(code, fetcher_manager) is not None:
+                    fetched += 1
+            if fetched:
+                logger.info(f"[筹码库] 后台预取完成: {fetched} 只")
+        except Exception as e:
+            logger.warning(f"[筹码库] 后台预取失败: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待后台预取结束，返回是否已结束"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+
+def get_chip_store() -> ChipStore:
+    """获取筹码分布本地库单例"""
+    return ChipStore.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    from data_provider import DataFetcherManager
+
+    manager = DataFetcherManager()
+    store = get_chip_store()
+    print(f"最近交易日: {store.expected_date()}")
+    print(store.get('600519', manager))
+    # 同一交易日再次获取直接读库
+    print(store.get('600519', manager))
+    for row in store.get_history('600519'):
+        print(row['date'], f"{row['profit_ratio']:.1%}")
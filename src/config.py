@@ -14,7 +14,7 @@ import os
 from pathlib import Path
 from typing import List, Optional
 from dotenv import load_dotenv, dotenv_values
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 
 
 @dataclass
@@ -111,9 +111,26 @@ class Config:
     # 消息长度限制（字节）- 超长自动分批发送
     feishu_max_bytes: int = 20000  # 飞书限制约 20KB，默认 20000 字节
     wechat_max_bytes: int = 4000   # 企业微信限制 4096 字节，默认 4000 字节
+
+    # 多渠道并发推送的整体截止时间（秒），超时未完成的渠道记为超时
+    notification_deadline: float = 120.0
+
+    # 通知发件箱：报告先写入 SQLite，由后台线程按渠道限速发送，失败按指数退避重试（跨重启保留）
+    notification_outbox_enabled: bool = True
+    notification_outbox_max_attempts: int = 6
+    notification_outbox_backoff: float = 30.0   # 首次重试间隔（秒），之后逐次翻倍
+    report_stream_threshold: int = 500          # 结果数达到该值时流式生成 / 推送日报（0 表示关闭）
     
     # === 数据库配置 ===
     database_path: str = "./data/stock_analysis.db"
+    # SQLite 引擎调优（WAL 模式下读不等待写；写锁冲突时最多等待 busy_timeout 毫秒）
+    database_wal_enabled: bool = True
+    database_busy_timeout_ms: int = 15000
+    database_cache_size_mb: int = 64
+    database_pool_size: int = 10  # 连接池常驻连接数（流水线 + 机器人 + 后台线程共享）
+    # 列式行情存储（内存映射，与 SQLite 同步写入；目录为空时使用数据库同级的 bars/）
+    bar_store_enabled: bool = True
+    bar_store_dir: Optional[str] = None
     
     # === 日志配置 ===
     log_dir: str = "./logs"  # 日志文件目录
@@ -122,6 +139,13 @@ class Config:
     # === 系统配置 ===
     max_workers: int = 3  # 低并发防封禁
     debug: bool = False
+    telemetry_enabled: bool = True            # 是否记录流水线各阶段耗时并在运行结束时输出摘要
+    telemetry_dir: str = "./data/telemetry"   # 遥测导出目录（每次运行一份 JSON + 覆盖写入的 .prom）
+    pacing_adaptive: bool = True     # 数据源 / LLM 请求间隔是否按限流信号自适应调整（见 src/pacing.py）
+    pacing_min_scale: float = 0.3    # 自适应休眠倍率下限（持续无限流时逐步降到该值）
+    pacing_max_scale: float = 4.0    # 自适应休眠倍率上限（遇到 429 / 封禁时翻倍，不超过该值）
+    pacing_relax_after: int = 10     # 连续多少次无限流请求后缩小一次倍率
+    startup_budget_ms: int = 1500  # --profile-startup 的启动导入耗时预算（毫秒，0 表示不检查）
     http_proxy: Optional[str] = None  # HTTP 代理 (例如: http://127.0.0.1:10809)
     https_proxy: Optional[str] = None # HTTPS 代理
     
@@ -129,6 +153,14 @@ class Config:
     schedule_enabled: bool = False            # 是否启用定时任务
     schedule_time: str = "18:00"              # 每日推送时间（HH:MM 格式）
     market_review_enabled: bool = True        # 是否启用大盘复盘
+    schedule_skip_non_trading_days: bool = True  # 非交易日（周末/节假日）跳过定时任务
+
+    # === 盘中监控配置 ===
+    intraday_watch_interval: int = 60         # 全市场快照轮询间隔（秒）
+    intraday_volume_ratio_alert: float = 2.0  # 量比异动阈值
+    intraday_bias_alert: float = 5.0          # 乖离率（相对 MA5，%）预警阈值
+    intraday_alert_cooldown: int = 1800       # 同一股票同一规则的最短提醒间隔（秒）
+    intraday_llm_on_alert: bool = True        # 规则触发时是否调用 AI 生成分析
 
     # === 实时行情增强数据配置 ===
     # 实时行情开关（关闭后使用历史收盘价进行分析）
@@ -137,8 +169,16 @@ class Config:
     enable_chip_distribution: bool = True
     # 实时行情数据源优先级（逗号分隔）
     realtime_source_priority: str = "akshare_sina,tencent,efinance,akshare_em"
-    # 实时行情缓存时间（秒）
-    realtime_cache_ttl: int = 600
+    # 实时行情缓存时间（秒）：全市场行情快照的有效期，需覆盖一次完整运行（个股分析 + 大盘复盘）
+    realtime_cache_ttl: int = 1800
+    # 主要指数行情缓存时间（秒）：大盘复盘的指数快照有效期，拉取失败同样冷却该时长
+    index_cache_ttl: int = 120
+    # 股票元数据（行业、上市日期等）的批量刷新周期（天），名称与流通股本随行情快照更新
+    stock_metadata_max_age_days: int = 30
+    # 资金流向本地库：每次运行检查并补齐最近 N 个交易日的全市场资金流
+    moneyflow_history_days: int = 10
+    # 财务指标仓库：财报披露窗口内同一报告期两次批量刷新的最小间隔（小时）
+    financial_refresh_hours: float = 12
     # 熔断器冷却时间（秒）
     circuit_breaker_cooldown: int = 300
 
@@ -163,6 +203,9 @@ class Config:
     bot_rate_limit_requests: int = 10     # 频率限制：窗口内最大请求数
     bot_rate_limit_window: int = 60       # 频率限制：窗口时间（秒）
     bot_admin_users: List[str] = field(default_factory=list)  # 管理员用户 ID 列表
+    bot_job_workers: int = 2              # 分析任务并发执行数（共享同一个流水线实例）
+    bot_job_queue_size: int = 20          # 全局排队任务上限（不含执行中）
+    bot_job_per_user: int = 2             # 单个用户同时排队 / 执行中的任务上限
     
     # 飞书机器人（事件订阅）- 已有 feishu_app_id, feishu_app_secret
     feishu_verification_token: Optional[str] = None  # 事件订阅验证 Token
@@ -188,6 +231,9 @@ class Config:
     
     # 单例实例存储
     _instance: Optional['Config'] = None
+
+    # 上次从 .env 读取的键值（热更新时用于判断环境变量是否来自 .env）
+    _dotenv_loaded = None
     
     @classmethod
     def get_instance(cls) -> 'Config':
@@ -214,9 +260,10 @@ class Config:
         3. 代码中的默认值
         """
         # 加载项目根目录下的 .env 文件
-        # src/config.py -> src/ -> root
-        env_path = Path(__file__).parent.parent / '.env'
+        env_path = cls.env_path()
         load_dotenv(dotenv_path=env_path)
+        if cls._dotenv_loaded is None:
+            cls._dotenv_loaded = cls._read_dotenv(env_path)
 
         # === 智能代理配置 (关键修复) ===
         # 如果配置了代理，自动设置 NO_PROXY 以排除国内数据源，避免行情获取失败
@@ -324,22 +371,49 @@ class Config:
             analysis_delay=float(os.getenv('ANALYSIS_DELAY', '0')),
             feishu_max_bytes=int(os.getenv('FEISHU_MAX_BYTES', '20000')),
             wechat_max_bytes=int(os.getenv('WECHAT_MAX_BYTES', '4000')),
+            notification_deadline=float(os.getenv('NOTIFICATION_DEADLINE', '120')),
+            notification_outbox_enabled=os.getenv('NOTIFICATION_OUTBOX_ENABLED', 'true').lower() == 'true',
+            notification_outbox_max_attempts=int(os.getenv('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', '6')),
+            notification_outbox_backoff=float(os.getenv('NOTIFICATION_OUTBOX_BACKOFF', '30')),
+            report_stream_threshold=int(os.getenv('REPORT_STREAM_THRESHOLD', '500')),
             database_path=os.getenv('DATABASE_PATH', './data/stock_analysis.db'),
+            database_wal_enabled=os.getenv('DATABASE_WAL_ENABLED', 'true').lower() == 'true',
+            database_busy_timeout_ms=int(os.getenv('DATABASE_BUSY_TIMEOUT_MS', '15000')),
+            database_cache_size_mb=int(os.getenv('DATABASE_CACHE_SIZE_MB', '64')),
+            database_pool_size=int(os.getenv('DATABASE_POOL_SIZE', '10')),
+            bar_store_enabled=os.getenv('BAR_STORE_ENABLED', 'true').lower() == 'true',
+            bar_store_dir=os.getenv('BAR_STORE_DIR') or None,
             log_dir=os.getenv('LOG_DIR', './logs'),
             log_level=os.getenv('LOG_LEVEL', 'INFO'),
             max_workers=int(os.getenv('MAX_WORKERS', '3')),
             debug=os.getenv('DEBUG', 'false').lower() == 'true',
+            telemetry_enabled=os.getenv('TELEMETRY_ENABLED', 'true').lower() == 'true',
+            telemetry_dir=os.getenv('TELEMETRY_DIR', './data/telemetry'),
+            pacing_adaptive=os.getenv('PACING_ADAPTIVE', 'true').lower() == 'true',
+            pacing_min_scale=float(os.getenv('PACING_MIN_SCALE', '0.3')),
+            pacing_max_scale=float(os.getenv('PACING_MAX_SCALE', '4.0')),
+            pacing_relax_after=int(os.getenv('PACING_RELAX_AFTER', '10')),
+            startup_budget_ms=int(os.getenv('STARTUP_BUDGET_MS', '1500')),
             http_proxy=os.getenv('HTTP_PROXY'),
             https_proxy=os.getenv('HTTPS_PROXY'),
             schedule_enabled=os.getenv('SCHEDULE_ENABLED', 'false').lower() == 'true',
             schedule_time=os.getenv('SCHEDULE_TIME', '18:00'),
             market_review_enabled=os.getenv('MARKET_REVIEW_ENABLED', 'true').lower() == 'true',
+            schedule_skip_non_trading_days=os.getenv('SCHEDULE_SKIP_NON_TRADING_DAYS', 'true').lower() == 'true',
+            intraday_watch_interval=int(os.getenv('INTRADAY_WATCH_INTERVAL', '60')),
+            intraday_volume_ratio_alert=float(os.getenv('INTRADAY_VOLUME_RATIO_ALERT', '2.0')),
+            intraday_bias_alert=float(os.getenv('INTRADAY_BIAS_ALERT', '5.0')),
+            intraday_alert_cooldown=int(os.getenv('INTRADAY_ALERT_COOLDOWN', '1800')),
+            intraday_llm_on_alert=os.getenv('INTRADAY_LLM_ON_ALERT', 'true').lower() == 'true',
             # 机器人配置
             bot_enabled=os.getenv('BOT_ENABLED', 'true').lower() == 'true',
             bot_command_prefix=os.getenv('BOT_COMMAND_PREFIX', '/'),
             bot_rate_limit_requests=int(os.getenv('BOT_RATE_LIMIT_REQUESTS', '10')),
             bot_rate_limit_window=int(os.getenv('BOT_RATE_LIMIT_WINDOW', '60')),
             bot_admin_users=[u.strip() for u in os.getenv('BOT_ADMIN_USERS', '').split(',') if u.strip()],
+            bot_job_workers=int(os.getenv('BOT_JOB_WORKERS', '2')),
+            bot_job_queue_size=int(os.getenv('BOT_JOB_QUEUE_SIZE', '20')),
+            bot_job_per_user=int(os.getenv('BOT_JOB_PER_USER', '2')),
             # 飞书机器人
             feishu_verification_token=os.getenv('FEISHU_VERIFICATION_TOKEN'),
             feishu_encrypt_key=os.getenv('FEISHU_ENCRYPT_KEY'),
@@ -364,7 +438,11 @@ class Config:
             # - akshare_sina/tencent: 单股票直连查询，轻量级，推荐放前面
             # - efinance/akshare_em: 全量拉取，数据丰富但负载大
             realtime_source_priority=os.getenv('REALTIME_SOURCE_PRIORITY', 'akshare_sina,tencent,efinance,akshare_em'),
-            realtime_cache_ttl=int(os.getenv('REALTIME_CACHE_TTL', '600')),
+            realtime_cache_ttl=int(os.getenv('REALTIME_CACHE_TTL', '1800')),
+            index_cache_ttl=int(os.getenv('INDEX_CACHE_TTL', '120')),
+            stock_metadata_max_age_days=int(os.getenv('STOCK_METADATA_MAX_AGE_DAYS', '30')),
+            moneyflow_history_days=int(os.getenv('MONEYFLOW_HISTORY_DAYS', '10')),
+            financial_refresh_hours=float(os.getenv('FINANCIAL_REFRESH_HOURS', '12')),
             circuit_breaker_cooldown=int(os.getenv('CIRCUIT_BREAKER_COOLDOWN', '300'))
         )
     
@@ -373,6 +451,51 @@ class Config:
         """重置单例（主要用于测试）"""
         cls._instance = None
 
+    @staticmethod
+    def env_path() -> Path:
+        """项目根目录下的 .env 文件路径"""
+        # src/config.py -> src/ -> root
+        return Path(__file__).parent.parent / '.env'
+
+    @staticmethod
+    def _read_dotenv(env_path: Path) -> dict:
+        if not env_path.exists():
+            return {}
+        return {k: v for k, v in dotenv_values(env_path).items() if v is not None}
+
+    @classmethod
+    def reload(cls) -> List[str]:
+        """
+        热更新配置：重新读取 .env 并原地更新单例（已持有 Config 引用的模块同样生效）
+
+        系统环境变量仍然优先：只覆盖未设置、或仍等于上次 .env 取值的环境变量。
+
+        Returns:
+            发生变化的配置项名称
+        """
+        env_path = cls.env_path()
+        previous = cls._dotenv_loaded or {}
+        current = cls._read_dotenv(env_path)
+        for key, value in current.items():
+            if key not in os.environ or os.environ[key] == previous.get(key):
+                os.environ[key] = value
+        for key, value in previous.items():
+            if key not in current and os.environ.get(key) == value:
+                del os.environ[key]
+        cls._dotenv_loaded = current
+
+        fresh = cls._load_from_env()
+        instance = cls.get_instance()
+        changed = []
+        for f in fields(cls):
+            if f.name.startswith('_'):
+                continue
+            value = getattr(fresh, f.name)
+            if getattr(instance, f.name) != value:
+                setattr(instance, f.name, value)
+                changed.append(f.name)
+        return changed
+
     def refresh_stock_list(self) -> None:
         """
         热读取 STOCK_LIST 环境变量并更新配置中的自选股列表
@@ -14,18 +14,25 @@ A股自选股智能分析系统 - 核心分析流水线
 import logging
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import date
 from typing import List, Dict, Any, Optional, Tuple
 
+from src import pacing, telemetry
 from src.config import get_config, Config
 from src.storage import get_db
-from data_provider import DataFetcherManager
+from src.core.registry import get_registry
 from data_provider.realtime_types import ChipDistribution
-from src.analyzer import GeminiAnalyzer, AnalysisResult, STOCK_NAME_MAP
+from src.analyzer import AnalysisResult
+from src.analysis_history import record as record_analysis
 from src.notification import NotificationService, NotificationChannel
-from src.search_service import SearchService
+from src.report_builder import ReportBuilder
 from src.enums import ReportType
-from src.stock_analyzer import StockTrendAnalyzer, TrendAnalysisResult
+from src.stock_analyzer import TrendAnalysisResult
+from src.chip_store import TREND_DAYS as CHIP_TREND_DAYS, get_chip_store
+from src.financial_warehouse import get_financial_warehouse
+from src.moneyflow_store import get_moneyflow_store
+from src.stock_metadata import get_stock_metadata
 from bot.models import BotMessage
 
 
@@ -51,9 +58,13 @@ class StockAnalysisPipeline:
         """
         初始化调度器
         
+        数据源、AI 分析器、搜索服务等重量级组件从共享资源注册表读取（进程内只初始化一次，
+        配置热更新后自动切换到重建的实例），构造调度器本身没有初始化开销。
+        
         Args:
             config: 配置对象（可选，默认使用全局配置）
             max_workers: 最大并发线程数（可选，默认从配置读取）
+            source_message: 触发分析的机器人消息（可选，用于回复消息上下文渠道）
         """
         self.config = config or get_config()
         self.max_workers = max_workers or self.config.max_workers
@@ -61,18 +72,8 @@ class StockAnalysisPipeline:
         
         # 初始化各模块
         self.db = get_db()
-        self.fetcher_manager = DataFetcherManager()
-        # 不再单独创建 akshare_fetcher，统一使用 fetcher_manager 获取增强数据
-        self.trend_analyzer = StockTrendAnalyzer()  # 趋势分析器
-        self.analyzer = GeminiAnalyzer()
-        self.notifier = NotificationService(source_message=source_message)
-        
-        # 初始化搜索服务
-        self.search_service = SearchService(
-            bocha_keys=self.config.bocha_api_keys,
-            tavily_keys=self.config.tavily_api_keys,
-            serpapi_keys=self.config.serpapi_keys,
-        )
+        self.registry = get_registry()
+        self._notifier: Optional[NotificationService] = None
         
         logger.info(f"调度器初始化完成，最大并发数: {self.max_workers}")
         logger.info("已启用趋势分析器 (MA5>MA10>MA20 多头判断)")
@@ -90,6 +91,42 @@ class StockAnalysisPipeline:
         else:
             logger.warning("搜索服务未启用（未配置 API Key）")
     
+    # === 共享组件（读取注册表，热更新后自动使用新实例） ===
+
+    @property
+    def fetcher_manager(self):
+        """数据源管理器（不再单独创建 akshare_fetcher，统一使用 fetcher_manager 获取增强数据）"""
+        return self.registry.fetcher_manager
+
+    @property
+    def trend_analyzer(self):
+        """趋势分析器"""
+        return self.registry.trend_analyzer
+
+    @property
+    def analyzer(self):
+        """AI 分析器"""
+        return self.registry.analyzer
+
+    @property
+    def search_service(self):
+        """搜索服务"""
+        return self.registry.search_service
+
+    @property
+    def notifier(self) -> NotificationService:
+        """通知服务（指定了 source_message 时为本调度器独立创建，否则共享）"""
+        if self._notifier is not None:
+            return self._notifier
+        if self.source_message is not None:
+            self._notifier = NotificationService(source_message=self.source_message)
+            return self._notifier
+        return self.registry.notifier
+
+    @notifier.setter
+    def notifier(self, value: Optional[NotificationService]) -> None:
+        self._notifier = value
+    
     def fetch_and_save_stock_data(
         self, 
         code: str,
@@ -99,7 +136,7 @@ class StockAnalysisPipeline:
         获取并保存单只股票数据
         
         断点续传逻辑：
-        1. 检查数据库是否已有今日数据
+        1. 检查数据库是否已有最近交易日的数据（周末/节假日取上一交易日）
         2. 如果有且不强制刷新，则跳过网络请求
         3. 否则从数据源获取并保存
         
@@ -111,22 +148,27 @@ class StockAnalysisPipeline:
             Tuple[是否成功, 错误信息]
         """
         try:
-            today = date.today()
-            
-            # 断点续传检查：如果今日数据已存在，跳过
-            if not force_refresh and self.db.has_today_data(code, today):
-                logger.info(f"[{code}] 今日数据已存在，跳过获取（断点续传）")
+            with telemetry.span('db_read'):
+                trading_day = self.db.get_latest_trading_day(code)
+                has_data = not force_refresh and self.db.has_today_data(code, trading_day)
+            
+            # 断点续传检查：如果最近交易日数据已存在，跳过
+            if has_data:
+                telemetry.incr('cache_hits', cache='daily_db')
+                logger.info(f"[{code}] {trading_day} 数据已存在，跳过获取（断点续传）")
                 return True, None
             
             # 从数据源获取数据
             logger.info(f"[{code}] 开始从数据源获取数据...")
-            df, source_name = self.fetcher_manager.get_daily_data(code, days=30)
+            with telemetry.span('fetch'):
+                df, source_name = self.fetcher_manager.get_daily_data(code, days=30)
             
             if df is None or df.empty:
                 return False, "获取数据为空"
             
             # 保存到数据库
-            saved_count = self.db.save_daily_data(df, code, source_name)
+            with telemetry.span('db_save'):
+                saved_count = self.db.save_daily_data(df, code, source_name)
             logger.info(f"[{code}] 数据保存成功（来源: {source_name}，新增 {saved_count} 条）")
             
             return True, None
@@ -155,17 +197,20 @@ class StockAnalysisPipeline:
             AnalysisResult 或 None（如果分析失败）
         """
         try:
-            # 获取股票名称（优先从实时行情获取真实名称）
-            stock_name = STOCK_NAME_MAP.get(code, '')
+            # 获取股票名称（元数据缓存，实时行情返回名称时以行情为准）
+            metadata = get_stock_metadata()
+            stock_name = metadata.get_name(code)
             
             # Step 1: 获取实时行情（量比、换手率等）- 使用统一入口，自动故障切换
             realtime_quote = None
             try:
-                realtime_quote = self.fetcher_manager.get_realtime_quote(code)
+                with telemetry.span('realtime'):
+                    realtime_quote = self.fetcher_manager.get_realtime_quote(code)
                 if realtime_quote:
                     # 使用实时行情返回的真实股票名称
                     if realtime_quote.name:
                         stock_name = realtime_quote.name
+                        metadata.remember_name(code, stock_name)
                     # 兼容不同数据源的字段（有些数据源可能没有 volume_ratio）
                     volume_ratio = getattr(realtime_quote, 'volume_ratio', None)
                     turnover_rate = getattr(realtime_quote, 'turnover_rate', None)
@@ -184,7 +229,8 @@ class StockAnalysisPipeline:
             # Step 2: 获取筹码分布 - 使用统一入口，带熔断保护
             chip_data = None
             try:
-                chip_data = self.fetcher_manager.get_chip_distribution(code)
+                with telemetry.span('chip'):
+                    chip_data = self.fetcher_manager.get_chip_distribution(code)
                 if chip_data:
                     logger.info(f"[{code}] 筹码分布: 获利比例={chip_data.profit_ratio:.1%}, "
                               f"90%集中度={chip_data.concentration_90:.2%}")
@@ -196,16 +242,14 @@ class StockAnalysisPipeline:
             # Step 3: 趋势分析（基于交易理念）
             trend_result: Optional[TrendAnalysisResult] = None
             try:
-                # 获取历史数据进行趋势分析
-                context = self.db.get_analysis_context(code)
-                if context and 'raw_data' in context:
-                    import pandas as pd
-                    raw_data = context['raw_data']
-                    if isinstance(raw_data, list) and len(raw_data) > 0:
-                        df = pd.DataFrame(raw_data)
+                # 获取历史数据进行趋势分析（优先列式存储，回退 SQLite）
+                with telemetry.span('trend'):
+                    df = self.db.get_history_dataframe(code, days=120)
+                    if df is not None and not df.empty:
                         trend_result = self.trend_analyzer.analyze(df, code)
-                        logger.info(f"[{code}] 趋势分析: {trend_result.trend_status.value}, "
-                                  f"买入信号={trend_result.buy_signal.value}, 评分={trend_result.signal_score}")
+                if trend_result is not None:
+                    logger.info(f"[{code}] 趋势分析: {trend_result.trend_status.value}, "
+                              f"买入信号={trend_result.buy_signal.value}, 评分={trend_result.signal_score}")
             except Exception as e:
                 logger.warning(f"[{code}] 趋势分析失败: {e}")
             
@@ -215,11 +259,12 @@ class StockAnalysisPipeline:
                 logger.info(f"[{code}] 开始多维度情报搜索...")
                 
                 # 使用多维度搜索（最多3次搜索）
-                intel_results = self.search_service.search_comprehensive_intel(
-                    stock_code=code,
-                    stock_name=stock_name,
-                    max_searches=3
-                )
+                with telemetry.span('search'):
+                    intel_results = self.search_service.search_comprehensive_intel(
+                        stock_code=code,
+                        stock_name=stock_name,
+                        max_searches=3
+                    )
                 
                 # 格式化情报报告
                 if intel_results:
@@ -233,11 +278,11 @@ class StockAnalysisPipeline:
                 logger.info(f"[{code}] 搜索服务不可用，跳过情报搜索")
             
             # Step 5: 获取分析上下文（技术面数据）
-            context = self.db.get_analysis_context(code)
+            with telemetry.span('db_read'):
+                context = self.db.get_analysis_context(code)
             
             if context is None:
                 logger.warning(f"[{code}] 无法获取历史行情数据，将仅基于新闻和实时行情分析")
-                from datetime import date
                 context = {
                     'code': code,
                     'stock_name': stock_name,
@@ -255,9 +300,20 @@ class StockAnalysisPipeline:
                 trend_result,
                 stock_name  # 传入股票名称
             )
+            enhanced_context['industry'] = metadata.get_industry(code)
             
             # Step 7: 调用 AI 分析（传入增强的上下文和新闻）
-            result = self.analyzer.analyze(enhanced_context, news_context=news_context)
+            with telemetry.span('llm'):
+                result = self.analyzer.analyze(enhanced_context, news_context=news_context)
+
+            # Step 8: 写入分析历史（回填与上次分析的评分变化）
+            if result is not None:
+                try:
+                    trade_date = date.fromisoformat(str(context.get('date'))[:10])
+                except ValueError:
+                    trade_date = date.today()
+                with telemetry.span('db_save'):
+                    record_analysis(result, trade_date=trade_date)
             
             return result
             
@@ -327,6 +383,16 @@ class StockAnalysisPipeline:
                 'concentration_70': chip_data.concentration_70,
                 'chip_status': chip_data.get_chip_status(current_price or 0),
             }
+            # 获利比例走势（本地筹码库中的近几日序列，读取失败时不附带走势）
+            try:
+                history = get_chip_store().get_history(chip_data.code, days=CHIP_TREND_DAYS)
+                if len(history) > 1:
+                    enhanced['chip']['profit_ratio_trend'] = [
+                        (row['date'].isoformat(), row['profit_ratio']) for row in history
+                        if row.get('profit_ratio') is not None
+                    ]
+            except Exception as e:
+                logger.warning(f"[{chip_data.code}] 读取筹码走势失败: {e}")
         
         # 添加趋势分析结果
         if trend_result:
@@ -370,7 +436,8 @@ class StockAnalysisPipeline:
         code: str,
         skip_analysis: bool = False,
         single_stock_notify: bool = False,
-        report_type: ReportType = ReportType.SIMPLE
+        report_type: ReportType = ReportType.SIMPLE,
+        notifier: Optional[NotificationService] = None
     ) -> Optional[AnalysisResult]:
         """
         处理单只股票的完整流程
@@ -388,10 +455,12 @@ class StockAnalysisPipeline:
             skip_analysis: 是否跳过 AI 分析
             single_stock_notify: 是否启用单股推送模式（每分析完一只立即推送）
             report_type: 报告类型枚举（从配置读取，Issue #119）
+            notifier: 推送使用的通知服务（可选，默认 self.notifier；共享流水线时按请求传入）
 
         Returns:
             AnalysisResult 或 None
         """
+        notifier = notifier or self.notifier
         logger.info(f"========== 开始处理 {code} ==========")
         
         try:
@@ -416,19 +485,22 @@ class StockAnalysisPipeline:
                 )
                 
                 # 单股推送模式（#55）：每分析完一只股票立即推送
-                if single_stock_notify and self.notifier.is_available():
+                if single_stock_notify and notifier.is_available():
                     try:
                         # 根据报告类型选择生成方法
-                        if report_type == ReportType.FULL:
-                            # 完整报告：使用决策仪表盘格式
-                            report_content = self.notifier.generate_dashboard_report([result])
-                            logger.info(f"[{code}] 使用完整报告格式")
-                        else:
-                            # 精简报告：使用单股报告格式（默认）
-                            report_content = self.notifier.generate_single_stock_report(result)
-                            logger.info(f"[{code}] 使用精简报告格式")
+                        with telemetry.span('render'):
+                            if report_type == ReportType.FULL:
+                                # 完整报告：使用决策仪表盘格式
+                                report_content = notifier.build_report([result]).dashboard()
+                                logger.info(f"[{code}] 使用完整报告格式")
+                            else:
+                                # 精简报告：使用单股报告格式（默认）
+                                report_content = notifier.generate_single_stock_report(result)
+                                logger.info(f"[{code}] 使用精简报告格式")
                         
-                        if self.notifier.send(report_content):
+                        with telemetry.span('push'):
+                            delivered = notifier.deliver(report_content)
+                        if delivered:
                             logger.info(f"[{code}] 单股推送成功")
                         else:
                             logger.warning(f"[{code}] 单股推送失败")
@@ -446,7 +518,8 @@ class StockAnalysisPipeline:
         self, 
         stock_codes: Optional[List[str]] = None,
         dry_run: bool = False,
-        send_notification: bool = True
+        send_notification: bool = True,
+        notifier: Optional[NotificationService] = None
     ) -> List[AnalysisResult]:
         """
         运行完整的分析流程
@@ -456,11 +529,13 @@ class StockAnalysisPipeline:
         2. 使用线程池并发处理
         3. 收集分析结果
         4. 发送通知
+        5. 输出运行耗时摘要（TELEMETRY_ENABLED）
         
         Args:
             stock_codes: 股票代码列表（可选，默认使用配置中的自选股）
             dry_run: 是否仅获取数据不分析
             send_notification: 是否发送推送通知
+            notifier: 推送使用的通知服务（可选，默认 self.notifier；共享流水线时按请求传入）
             
         Returns:
             分析结果列表
@@ -480,13 +555,73 @@ class StockAnalysisPipeline:
         logger.info(f"股票列表: {', '.join(stock_codes)}")
         logger.info(f"并发数: {self.max_workers}, 模式: {'仅获取数据' if dry_run else '完整分析'}")
         
+        # 运行遥测：记录各阶段耗时、休眠、重试、缓存命中等，结束时输出摘要并导出
+        run_telemetry = None
+        if getattr(self.config, 'telemetry_enabled', False):
+            run_telemetry = telemetry.RunTelemetry(
+                'pipeline', stocks=len(stock_codes), workers=self.max_workers, dry_run=dry_run
+            )
+        
+        with run_telemetry.activate() if run_telemetry else nullcontext():
+            results = self._run_batch(
+                stock_codes, dry_run, send_notification, notifier, run_telemetry
+            )
+        
+        # 统计
+        elapsed_time = time.time() - start_time
+        
+        # dry-run 模式下，数据获取成功即视为成功
+        if dry_run:
+            # 检查哪些股票的数据今天已存在
+            success_count = sum(1 for code in stock_codes if self.db.has_today_data(code))
+            fail_count = len(stock_codes) - success_count
+        else:
+            success_count = len(results)
+            fail_count = len(stock_codes) - success_count
+        
+        logger.info("===== 分析完成 =====")
+        logger.info(f"成功: {success_count}, 失败: {fail_count}, 耗时: {elapsed_time:.2f} 秒")
+        
+        if run_telemetry:
+            self._report_telemetry(run_telemetry)
+        
+        return results
+    
+    def _run_batch(
+        self,
+        stock_codes: List[str],
+        dry_run: bool,
+        send_notification: bool,
+        notifier: Optional[NotificationService],
+        run_telemetry: Optional[telemetry.RunTelemetry] = None
+    ) -> List[AnalysisResult]:
+        """并发分析股票列表并推送汇总报告（run 的主体）"""
         # === 批量预取实时行情（优化：避免每只股票都触发全量拉取）===
         # 只有股票数量 >= 5 时才进行预取，少量股票直接逐个查询更高效
         if len(stock_codes) >= 5:
-            prefetch_count = self.fetcher_manager.prefetch_realtime_quotes(stock_codes)
+            with telemetry.span('prefetch'):
+                prefetch_count = self.fetcher_manager.prefetch_realtime_quotes(stock_codes)
             if prefetch_count > 0:
                 logger.info(f"已启用批量预取架构：一次拉取全市场数据，{len(stock_codes)} 只股票共享缓存")
         
+        # === 股票元数据：缺少基本信息或已过期的自选股一次批量补齐（名称、行业）===
+        try:
+            with telemetry.span('prefetch'):
+                get_stock_metadata().refresh(stock_codes, self.fetcher_manager)
+        except Exception as e:
+            logger.warning(f"股票元数据刷新失败: {e}")
+
+        # === 筹码分布：后台为自选股预取当日数据（熔断时停止），分析时直接读库 ===
+        if self.config.enable_chip_distribution:
+            get_chip_store().start_prefetch(stock_codes, self.fetcher_manager)
+
+        # === 财务指标：披露窗口内按报告期后台批量刷新，不阻塞分析 ===
+        get_financial_warehouse().start_background_refresh()
+
+        # === 资金流向：按交易日批量补齐全市场数据，个股分析只读本地库 ===
+        with telemetry.span('prefetch'):
+            get_moneyflow_store().sync()
+        
         # 单股推送模式（#55）：从配置读取
         single_stock_notify = getattr(self.config, 'single_stock_notify', False)
         # Issue #119: 从配置读取报告类型
@@ -503,14 +638,16 @@ class StockAnalysisPipeline:
         # 使用线程池并发处理
         # 注意：max_workers 设置较低（默认3）以避免触发反爬
         with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交任务
+            # 提交任务（启用遥测时在工作线程中绑定本次运行，各阶段耗时归属到对应股票）
             future_to_code = {
                 executor.submit(
-                    self.process_single_stock,
+                    run_telemetry.bind(self.process_single_stock, code) if run_telemetry
+                    else self.process_single_stock,
                     code,
                     skip_analysis=dry_run,
                     single_stock_notify=single_stock_notify and send_notification,
-                    report_type=report_type  # Issue #119: 传递报告类型
+                    report_type=report_type,  # Issue #119: 传递报告类型
+                    notifier=notifier
                 ): code
                 for code in stock_codes
             }
@@ -526,38 +663,41 @@ class StockAnalysisPipeline:
                     # Issue #128: 分析间隔 - 在个股分析和大盘分析之间添加延迟
                     if idx < len(stock_codes) - 1 and analysis_delay > 0:
                         logger.debug(f"等待 {analysis_delay} 秒后继续下一只股票...")
-                        time.sleep(analysis_delay)
+                        pacing.pause(analysis_delay, 'analysis_delay')
 
                 except Exception as e:
                     logger.error(f"[{code}] 任务执行失败: {e}")
         
-        # 统计
-        elapsed_time = time.time() - start_time
-        
-        # dry-run 模式下，数据获取成功即视为成功
-        if dry_run:
-            # 检查哪些股票的数据今天已存在
-            success_count = sum(1 for code in stock_codes if self.db.has_today_data(code))
-            fail_count = len(stock_codes) - success_count
-        else:
-            success_count = len(results)
-            fail_count = len(stock_codes) - success_count
-        
-        logger.info("===== 分析完成 =====")
-        logger.info(f"成功: {success_count}, 失败: {fail_count}, 耗时: {elapsed_time:.2f} 秒")
-        
         # 发送通知（单股推送模式下跳过汇总推送，避免重复）
         if results and send_notification and not dry_run:
             if single_stock_notify:
                 # 单股推送模式：只保存汇总报告，不再重复推送
                 logger.info("单股推送模式：跳过汇总推送，仅保存报告到本地")
-                self._send_notifications(results, skip_push=True)
+                self._send_notifications(results, skip_push=True, notifier=notifier)
             else:
-                self._send_notifications(results)
+                self._send_notifications(results, notifier=notifier)
         
         return results
     
-    def _send_notifications(self, results: List[AnalysisResult], skip_push: bool = False) -> None:
+    def _report_telemetry(self, run_telemetry: telemetry.RunTelemetry) -> None:
+        """输出运行耗时摘要，并导出 JSON / Prometheus 文本文件"""
+        run_telemetry.finish()
+        logger.info("\n" + run_telemetry.format_summary())
+        pacing_summary = pacing.get_pacer().format_summary()
+        if pacing_summary:
+            logger.info("\n" + pacing_summary)
+        try:
+            json_path, prom_path = run_telemetry.export(self.config.telemetry_dir)
+            logger.info(f"运行遥测已导出: {json_path}, {prom_path}")
+        except OSError as e:
+            logger.warning(f"运行遥测导出失败: {e}")
+    
+    def _send_notifications(
+        self,
+        results: List[AnalysisResult],
+        skip_push: bool = False,
+        notifier: Optional[NotificationService] = None
+    ) -> None:
         """
         发送分析结果通知
         
@@ -566,15 +706,26 @@ class StockAnalysisPipeline:
         Args:
             results: 分析结果列表
             skip_push: 是否跳过推送（仅保存到本地，用于单股推送模式）
+            notifier: 推送使用的通知服务（可选，默认 self.notifier）
         """
+        notifier = notifier or self.notifier
         try:
             logger.info("生成决策仪表盘日报...")
             
-            # 生成决策仪表盘格式的详细日报
-            report = self.notifier.generate_dashboard_report(results)
-            
-            # 保存到本地
-            filepath = self.notifier.save_report_to_file(report)
+            # 生成决策仪表盘格式的详细日报（报告文档只构建一次，各渠道按需序列化）
+            builder = notifier.build_report(results)
+
+            # 超大自选股列表：逐节生成，边写文件边分块推送（生成与推送交织，整体计入 push）
+            threshold = getattr(self.config, 'report_stream_threshold', 0)
+            if threshold and len(results) >= threshold:
+                with telemetry.span('push'):
+                    self._stream_notifications(builder, skip_push, notifier)
+                return
+
+            with telemetry.span('render'):
+                report = builder.dashboard()
+                # 保存到本地
+                filepath = notifier.save_report_to_file(report)
             logger.info(f"决策仪表盘日报已保存: {filepath}")
             
             # 跳过推送（单股推送模式）
@@ -582,42 +733,22 @@ class StockAnalysisPipeline:
                 return
             
             # 推送通知
-            if self.notifier.is_available():
-                channels = self.notifier.get_available_channels()
-                context_success = self.notifier.send_to_context(report)
+            if notifier.is_available():
+                channels = notifier.get_available_channels()
 
-                # 企业微信：只发精简版（平台限制）
-                wechat_success = False
+                # 企业微信：只发精简版（平台限制）；其他渠道发完整报告
+                overrides = {}
                 if NotificationChannel.WECHAT in channels:
-                    dashboard_content = self.notifier.generate_wechat_dashboard(results)
-                    logger.info(f"企业微信仪表盘长度: {len(dashboard_content)} 字符")
-                    logger.debug(f"企业微信推送内容:\n{dashboard_content}")
-                    wechat_success = self.notifier.send_to_wechat(dashboard_content)
-
-                # 其他渠道：发完整报告（避免自定义 Webhook 被 wechat 截断逻辑污染）
-                non_wechat_success = False
-                for channel in channels:
-                    if channel == NotificationChannel.WECHAT:
-                        continue
-                    if channel == NotificationChannel.FEISHU:
-                        non_wechat_success = self.notifier.send_to_feishu(report) or non_wechat_success
-                    elif channel == NotificationChannel.TELEGRAM:
-                        non_wechat_success = self.notifier.send_to_telegram(report) or non_wechat_success
-                    elif channel == NotificationChannel.EMAIL:
-                        non_wechat_success = self.notifier.send_to_email(report) or non_wechat_success
-                    elif channel == NotificationChannel.CUSTOM:
-                        non_wechat_success = self.notifier.send_to_custom(report) or non_wechat_success
-                    elif channel == NotificationChannel.PUSHPLUS:
-                        non_wechat_success = self.notifier.send_to_pushplus(report) or non_wechat_success
-                    elif channel == NotificationChannel.DISCORD:
-                        non_wechat_success = self.notifier.send_to_discord(report) or non_wechat_success
-                    elif channel == NotificationChannel.PUSHOVER:
-                        non_wechat_success = self.notifier.send_to_pushover(report) or non_wechat_success
-                    else:
-                        logger.warning(f"未知通知渠道: {channel}")
-
-                success = wechat_success or non_wechat_success or context_success
-                if success:
+                    with telemetry.span('render'):
+                        dashboard_content = builder.wechat_dashboard()
+                    logger.info(f"企业微信仪表盘长度: {len(dashboard_content.markdown)} 字符")
+                    logger.debug(f"企业微信推送内容:\n{dashboard_content.markdown}")
+                    overrides[NotificationChannel.WECHAT] = dashboard_content
+
+                # 启用发件箱时入队即返回，由后台线程发送；否则各渠道并发发送
+                with telemetry.span('push'):
+                    delivered = notifier.deliver(report, overrides=overrides)
+                if delivered:
                     logger.info("决策仪表盘推送成功")
                 else:
                     logger.warning("决策仪表盘推送失败")
@@ -626,3 +757,41 @@ class StockAnalysisPipeline:
                 
         except Exception as e:
             logger.error(f"发送通知失败: {e}")
+
+    def _stream_notifications(
+        self,
+        builder: ReportBuilder,
+        skip_push: bool,
+        notifier: NotificationService
+    ) -> None:
+        """流式生成并推送决策仪表盘（结果数达到 REPORT_STREAM_THRESHOLD 时使用）"""
+        from src.report_stream import ReportStreamer
+
+        logger.info(f"分析结果 {len(builder.results)} 条，流式生成日报")
+        channels = [] if skip_push else notifier.get_available_channels()
+        streamer = ReportStreamer(notifier, self.config)
+
+        # 企业微信：只发精简版（平台限制）；其他渠道发完整报告
+        full_channels = [ch for ch in channels if ch != NotificationChannel.WECHAT]
+        report = streamer.stream(
+            builder.iter_dashboard(),
+            filepath=notifier.get_report_path(),
+            channels=full_channels,
+            include_context=not skip_push,
+        )
+        logger.info(f"决策仪表盘日报已保存: {report.filepath}")
+        success = report.success
+        if NotificationChannel.WECHAT in channels:
+            wechat = streamer.stream(
+                builder.iter_wechat_dashboard(),
+                channels=[NotificationChannel.WECHAT],
+                include_context=False,
+            )
+            success = success or wechat.success
+
+        if skip_push:
+            return
+        if success:
+            logger.info("决策仪表盘推送成功")
+        else:
+            logger.warning("决策仪表盘推送失败")
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 共享资源注册表
+===================================
+
+职责：
+1. 进程级共享重量级组件：数据源管理器（导入 akshare/efinance/tushare 等并登录 Tushare）、
+   AI 分析器、搜索服务、通知服务、趋势分析器，以及预热的分析流水线
+2. 按组件懒加载：首次使用时才初始化，每个组件独立加锁，互不阻塞
+3. 配置热更新：.env 修改后原地刷新 Config，只重建依赖了变更配置项的组件
+
+StockAnalysisPipeline 的各组件属性均从此处读取，构造流水线不再有初始化开销；
+分析服务层、机器人任务调度器直接复用注册表中的流水线实例。
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.config import Config, get_config
+
+logger = logging.getLogger(__name__)
+
+# .env 修改检查的最小间隔（秒）
+RELOAD_CHECK_INTERVAL = 5.0
+
+
+@dataclass(frozen=True)
+class ComponentSpec:
+    """组件定义：工厂函数 + 依赖的配置项（前缀匹配）"""
+    factory: Callable[[], Any]
+    watches: Tuple[str, ...] = ()
+
+    def affected_by(self, changed: Iterable[str]) -> bool:
+        return any(name.startswith(self.watches) for name in changed) if self.watches else False
+
+
+def _build_fetcher_manager():
+    from data_provider import DataFetcherManager
+    return DataFetcherManager()
+
+
+def _build_trend_analyzer():
+    from src.stock_analyzer import StockTrendAnalyzer
+    return StockTrendAnalyzer()
+
+
+def _build_analyzer():
+    from src.analyzer import GeminiAnalyzer
+    return GeminiAnalyzer()
+
+
+def _build_search_service():
+    from src.search_service import SearchService
+    config = get_config()
+    return SearchService(
+        bocha_keys=config.bocha_api_keys,
+        tavily_keys=config.tavily_api_keys,
+        serpapi_keys=config.serpapi_keys,
+    )
+
+
+def _build_notifier():
+    from src.notification import NotificationService
+    return NotificationService()
+
+
+def _build_pipeline():
+    from src.core.pipeline import StockAnalysisPipeline
+    return StockAnalysisPipeline()
+
+
+DEFAULT_COMPONENTS: Dict[str, ComponentSpec] = {
+    'fetcher_manager': ComponentSpec(_build_fetcher_manager, ('tushare_',)),
+    'trend_analyzer': ComponentSpec(_build_trend_analyzer),
+    'analyzer': ComponentSpec(_build_analyzer, ('gemini_', 'openai_')),
+    'search_service': ComponentSpec(_build_search_service, ('bocha_', 'tavily_', 'serpapi_')),
+    'notifier': ComponentSpec(_build_notifier, (
+        'wechat_', 'feishu_', 'telegram_', 'email_', 'pushover_', 'pushplus_',
+        'custom_webhook_', 'discord_', 'dingtalk_', 'bark_', 'notification_',
+    )),
+    'pipeline': ComponentSpec(_build_pipeline, ('max_workers',)),
+}
+
+
+class ResourceRegistry:
+    """
+    共享资源注册表 - 单例模式
+
+    使用示例:
+        registry = get_registry()
+        registry.analyzer              # 首次访问时初始化
+        registry.pipeline.run([...])   # 复用预热的流水线
+        registry.warm_up()             # 后台预热（机器人启动时）
+    """
+
+    _instance: Optional['ResourceRegistry'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, config: Optional[Config] = None, components: Optional[Dict[str, ComponentSpec]] = None):
+        self.config = config or get_config()
+        self._specs: Dict[str, ComponentSpec] = dict(DEFAULT_COMPONENTS if components is None else components)
+        self._values: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {name: threading.Lock() for name in self._specs}
+        self._lock = threading.Lock()
+        self._env_mtime = self._read_env_mtime()
+        self._last_check = time.monotonic()
+
+    @classmethod
+    def get_instance(cls) -> 'ResourceRegistry':
+        """获取单例实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    # === 组件 ===
+
+    def register(self, name: str, factory: Callable[[], Any], watches: Tuple[str, ...] = ()) -> None:
+        """注册（或替换）组件，已初始化的旧实例随之失效"""
+        with self._lock:
+            self._specs[name] = ComponentSpec(factory, watches)
+            self._locks.setdefault(name, threading.Lock())
+            self._values.pop(name, None)
+
+    def get(self, name: str) -> Any:
+        """获取组件（首次访问时初始化；同一组件并发访问只初始化一次）"""
+        try:
+            return self._values[name]
+        except KeyError:
+            pass
+        spec = self._specs[name]
+        with self._locks[name]:
+            if name not in self._values:
+                start = time.perf_counter()
+                self._values[name] = spec.factory()
+                logger.info(f"[资源] {name} 初始化完成，耗时 {time.perf_counter() - start:.2f}s")
+            return self._values[name]
+
+    def is_ready(self, name: str) -> bool:
+        return name in self._values
+
+    def invalidate(self, *names: str) -> None:
+        """使组件失效（下次访问时重建；正在使用旧实例的任务不受影响）"""
+        with self._lock:
+            for name in names or list(self._values):
+                if self._values.pop(name, None) is not None:
+                    logger.info(f"[资源] {name} 已失效，下次使用时重建")
+
+    @property
+    def fetcher_manager(self):
+        return self.get('fetcher_manager')
+
+    @property
+    def trend_analyzer(self):
+        return self.get('trend_analyzer')
+
+    @property
+    def analyzer(self):
+        return self.get('analyzer')
+
+    @property
+    def search_service(self):
+        return self.get('search_service')
+
+    @property
+    def notifier(self):
+        return self.get('notifier')
+
+    @property
+    def pipeline(self):
+        """共享的分析流水线（使用前检查 .env 是否修改）"""
+        self.check_reload()
+        return self.get('pipeline')
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, background: bool = True) -> Optional[threading.Thread]:
+        """
+        预热组件，避免首个请求承担初始化耗时
+
+        Args:
+            names: 要预热的组件（默认全部）
+            background: 是否在后台线程中预热
+        """
+        names = list(names or self._specs)
+
+        def run() -> None:
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logger.warning(f"[资源] {name} 预热失败: {e}")
+
+        if not background:
+            run()
+            return None
+        thread = threading.Thread(target=run, name="resource-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    # === 配置热更新 ===
+
+    def reload(self) -> List[str]:
+        """
+        重新读取配置，并使依赖了变更配置项的组件失效
+
+        Returns:
+            发生变化的配置项名称
+        """
+        changed = Config.reload()
+        if not changed:
+            logger.info("[资源] 配置未变化")
+            return changed
+        affected = [name for name, spec in self._specs.items() if spec.affected_by(changed)]
+        logger.info(f"[资源] 配置已更新: {', '.join(changed)}；重建组件: {', '.join(affected) or '无'}")
+        if affected:
+            self.invalidate(*affected)
+        return changed
+
+    def check_reload(self) -> bool:
+        """.env 文件修改时自动热更新（最多每 RELOAD_CHECK_INTERVAL 秒检查一次）"""
+        now = time.monotonic()
+        if now - self._last_check < RELOAD_CHECK_INTERVAL:
+            return False
+        self._last_check = now
+        mtime = self._read_env_mtime()
+        if mtime == self._env_mtime:
+            return False
+        self._env_mtime = mtime
+        try:
+            self.reload()
+        except Exception as e:
+            logger.error(f"[资源] 配置热更新失败，继续使用当前配置: {e}")
+            return False
+        return True
+
+    @staticmethod
+    def _read_env_mtime() -> Optional[float]:
+        try:
+            return os.path.getmtime(Config.env_path())
+        except OSError:
+            return None
+
+
+def get_registry() -> ResourceRegistry:
+    """获取共享资源注册表的快捷方式"""
+    return ResourceRegistry.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    registry = get_registry()
+    start = time.perf_counter()
+    registry.warm_up(background=False)
+    print(f"首次初始化耗时 {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    for _ in range(100):
+        registry.pipeline
+    print(f"复用流水线 100 次耗时 {(time.perf_counter() - start) * 1000:.2f}ms")
+    print(f"配置变更: {registry.reload()}")
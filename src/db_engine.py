@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 数据库引擎
+===================================
+
+职责：
+1. 创建 DatabaseManager 使用的 SQLAlchemy 引擎
+2. SQLite 每个新连接执行 PRAGMA：
+   - journal_mode=WAL：读事务读取快照，不被写事务阻塞（写仍然串行）
+   - synchronous=NORMAL：WAL 下只在检查点 fsync，断电最多丢失最后几个事务，不会损坏库
+   - busy_timeout：写锁被占用时等待而不是立即报 database is locked
+   - cache_size / temp_store：加大页缓存，临时表放内存
+3. 连接池大小由 DATABASE_POOL_SIZE 配置，供流水线线程、机器人线程与后台预取线程共享，
+   连接可跨线程归还复用（check_same_thread=False）
+"""
+
+import logging
+from typing import Any, Dict
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import QueuePool, StaticPool
+
+logger = logging.getLogger(__name__)
+
+# 连接池满时额外允许的临时连接数
+POOL_OVERFLOW = 10
+
+# 等待连接池归还连接的超时（秒）
+POOL_TIMEOUT = 30
+
+
+def sqlite_pragmas(
+    wal: bool = True,
+    busy_timeout_ms: int = 15000,
+    cache_size_mb: int = 64,
+) -> Dict[str, Any]:
+    """新连接要执行的 PRAGMA（按执行顺序）"""
+    pragmas: Dict[str, Any] = {}
+    if wal:
+        pragmas['journal_mode'] = 'WAL'
+        pragmas['synchronous'] = 'NORMAL'
+    pragmas['busy_timeout'] = max(int(busy_timeout_ms), 0)
+    # 负数表示 KiB
+    pragmas['cache_size'] = -max(int(cache_size_mb), 1) * 1024
+    pragmas['temp_store'] = 'MEMORY'
+    return pragmas
+
+
+def create_db_engine(
+    db_url: str,
+    wal: bool = True,
+    busy_timeout_ms: int = 15000,
+    cache_size_mb: int = 64,
+    pool_size: int = 10,
+) -> Engine:
+    """
+    创建数据库引擎
+
+    Args:
+        db_url: 数据库连接 URL
+        wal / busy_timeout_ms / cache_size_mb: SQLite 调优参数（见 sqlite_pragmas）
+        pool_size: 连接池常驻连接数
+
+    Returns:
+        SQLAlchemy Engine；非 SQLite 数据库只启用连接健康检查
+    """
+    url = make_url(db_url)
+    if url.get_backend_name() != 'sqlite':
+        return create_engine(db_url, echo=False, pool_pre_ping=True)
+
+    # busy_timeout 由 PRAGMA 设置，sqlite3 自身的 timeout 设为相同值（秒）
+    connect_args = {'check_same_thread': False, 'timeout': max(busy_timeout_ms, 0) / 1000}
+    if url.database in (None, '', ':memory:'):
+        # 内存库每个连接各自独立，只能共享同一个连接；WAL 不适用
+        engine = create_engine(db_url, echo=False, connect_args=connect_args, poolclass=StaticPool)
+        wal = False
+    else:
+        engine = create_engine(
+            db_url,
+            echo=False,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=max(pool_size, 1),
+            max_overflow=POOL_OVERFLOW,
+            pool_timeout=POOL_TIMEOUT,
+        )
+
+    pragmas = sqlite_pragmas(wal=wal, busy_timeout_ms=busy_timeout_ms, cache_size_mb=cache_size_mb)
+
+    @event.listens_for(engine, 'connect')
+    def _apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+    return engine
+
+
+def read_pragmas(engine: Engine, names=('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'temp_store')) -> Dict[str, Any]:
+    """读取当前连接上的 PRAGMA 值（诊断用）"""
+    with engine.connect() as conn:
+        return {name: conn.execute(text(f"PRAGMA {name}")).scalar() for name in names}
+
+
+def get_engine_options() -> Dict[str, Any]:
+    """从配置读取 create_db_engine 的调优参数"""
+    from src.config import get_config
+    config = get_config()
+    return {
+        'wal': config.database_wal_enabled,
+        'busy_timeout_ms': config.database_busy_timeout_ms,
+        'cache_size_mb': config.database_cache_size_mb,
+        'pool_size': config.database_pool_size,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    from src.config import get_config
+
+    engine = create_db_engine(get_config().get_db_url(), **get_engine_options())
+    print(engine.url, type(engine.pool).__name__)
+    print(read_pragmas(engine))
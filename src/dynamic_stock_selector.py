@@ -8,13 +8,17 @@
 1. 根据市场数据自动选择股票（成交额、涨幅等）
 2. 支持多种选股策略
 3. 提供容错机制，选股失败时返回空列表
+
+优先从会话内的全市场行情快照（data_provider/market_snapshot.py）排序选股，
+快照不可用时再直接请求东方财富排行接口。
 """
 import logging
 import requests
-import time
 from typing import List, Optional
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
+from src import pacing
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,6 +31,32 @@ _retry_decorator = retry(
 )
 
 
+def _top_from_snapshot(n: int, by: str, exclude_st: bool = False) -> Optional[List[str]]:
+    """从全市场行情快照排序选股，快照不可用时返回 None"""
+    try:
+        from data_provider.market_snapshot import get_market_snapshot_service
+        snapshot = get_market_snapshot_service().get()
+    except Exception as e:
+        logger.debug(f"全市场行情快照不可用: {e}")
+        return None
+    if snapshot is None or by not in snapshot.frame.columns:
+        return None
+
+    # 与排行接口的 fs 参数一致：只含沪深主板、创业板、科创板
+    top = snapshot.top(n, by=by, exclude_st=exclude_st, exclude_bj=True)
+    if top.empty:
+        return None
+
+    logger.info(f"✅ 从全市场行情快照选出前{len(top)}只股票（来源 {snapshot.source}）:")
+    for code, name, value in zip(top['code'], top['name'], top[by]):
+        if by == 'amount':
+            text = f"成交额: {value / 1e8:.2f}亿" if value >= 1e8 else f"成交额: {value / 1e4:.2f}万"
+        else:
+            text = f"涨跌幅: {value:.2f}%"
+        logger.info(f"  {code} {name:8s} {text}")
+    return top['code'].tolist()
+
+
 @_retry_decorator
 def get_top_stocks_by_volume(n: int = 10) -> List[str]:
     """
@@ -49,6 +79,10 @@ def get_top_stocks_by_volume(n: int = 10) -> List[str]:
     try:
         logger.info(f"🔍 正在获取A股成交额前{n}只股票...")
         
+        codes = _top_from_snapshot(n, 'amount')
+        if codes:
+            return codes
+        
         # 东方财富行情 API
         # pz: 每页数量
         # po: 1=降序排列
@@ -83,8 +117,8 @@ def get_top_stocks_by_volume(n: int = 10) -> List[str]:
         response = session.get(url, timeout=15, proxies=proxies, headers=headers)
         response.raise_for_status()
         
-        # 添加延迟，避免请求过快
-        time.sleep(0.5)
+        # 添加延迟，避免请求过快（与其他东方财富接口共享自适应倍率）
+        pacing.wait('eastmoney', 0.5, 0.5, min_interval=0)
         
         data = response.json()
         
@@ -146,6 +180,10 @@ def get_top_stocks_by_change(n: int = 10, exclude_st: bool = True) -> List[str]:
     try:
         logger.info(f"🔍 正在获取A股涨幅前{n * 2}只股票（将过滤ST后取前{n}只）...")
         
+        codes = _top_from_snapshot(n, 'change_pct', exclude_st=exclude_st)
+        if codes:
+            return codes
+        
         # 东方财富行情 API
         # fid: f3=涨跌幅排序
         url = (
@@ -177,8 +215,8 @@ def get_top_stocks_by_change(n: int = 10, exclude_st: bool = True) -> List[str]:
         response = session.get(url, timeout=15, proxies=proxies, headers=headers)
         response.raise_for_status()
         
-        # 添加延迟，避免请求过快
-        time.sleep(0.5)
+        # 添加延迟，避免请求过快（与其他东方财富接口共享自适应倍率）
+        pacing.wait('eastmoney', 0.5, 0.5, min_interval=0)
         
         data = response.json()
         
@@ -2,11 +2,12 @@
 # -*- coding: utf-8 -*-
 import logging
 import json
-import lark_oapi as lark
-from lark_oapi.api.docx.v1 import *
-from typing import List, Dict, Any, Optional
+from typing import TYPE_CHECKING, List, Dict, Any, Optional
 from src.config import get_config
 
+if TYPE_CHECKING:
+    from lark_oapi.api.docx.v1 import Block
+
 logger = logging.getLogger(__name__)
 
 
@@ -21,7 +22,10 @@ class FeishuDocManager:
 
         # 初始化 SDK 客户端
         # SDK 会自动处理 tenant_access_token 的获取和刷新，无需人工干预
+        # lark-oapi 导入较慢（数秒），只在配置完整时才导入
         if self.is_configured():
+            import lark_oapi as lark
+
             self.client = lark.Client.builder() \
                 .app_id(self.app_id) \
                 .app_secret(self.app_secret) \
@@ -42,6 +46,13 @@ class FeishuDocManager:
             logger.warning("飞书 SDK 未初始化或配置缺失，跳过创建")
             return None
 
+        from lark_oapi.api.docx.v1 import (
+            CreateDocumentBlockChildrenRequest,
+            CreateDocumentBlockChildrenRequestBody,
+            CreateDocumentRequest,
+            CreateDocumentRequestBody,
+        )
+
         try:
             # 1. 创建文档
             # 使用官方 SDK 的 Builder 模式构造请求
@@ -98,10 +109,14 @@ class FeishuDocManager:
             logger.error(traceback.format_exc())
             return None
 
-    def _markdown_to_sdk_blocks(self, md_text: str) -> List[Block]:
+    def _markdown_to_sdk_blocks(self, md_text: str) -> List['Block']:
         """
         将简单的 Markdown 转换为飞书 SDK 的 Block 对象
         """
+        from lark_oapi.api.docx.v1 import (
+            Block, Divider, Text, TextElement, TextElementStyle, TextRun, TextStyle,
+        )
+
         blocks = []
         lines = md_text.split('\n')
 
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 财务指标仓库
+===================================
+
+职责：
+1. 按报告期整期入库全市场财务指标（stock_financial_report 表，(code, report_period) 唯一）：
+   一次 ak.stock_yjbb_em + ak.stock_zcfz_em 覆盖全市场，不再逐只请求
+2. 按财报披露日历决定刷新：披露窗口（报告期末至法定披露截止日后一周）内
+   每隔 FINANCIAL_REFRESH_HOURS 小时刷新一次，窗口结束后补刷一次即不再请求
+3. 刷新在后台线程进行，个股分析只做一次本地索引读取
+
+披露截止日：一季报 4/30、半年报 8/31、三季报 10/31、年报次年 4/30。
+首次运行时仓库为空，刷新完成前开始分析的股票暂缺财务数据，之后的运行直接读取。
+"""
+
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 报告期末（月, 日）
+PERIOD_ENDS = ((3, 31), (6, 30), (9, 30), (12, 31))
+
+# 报告期末月份 -> 法定披露截止日（月, 日, 跨年数）
+DISCLOSURE_DEADLINES = {
+    3: (4, 30, 0),
+    6: (8, 31, 0),
+    9: (10, 31, 0),
+    12: (4, 30, 1),
+}
+
+# 截止日后仍视为披露窗口的天数（延期披露、更正公告）
+DISCLOSURE_GRACE_DAYS = 7
+
+# 入库的最近报告期数
+HISTORY_PERIODS = 4
+
+
+def report_periods(today: date, count: int = HISTORY_PERIODS) -> List[date]:
+    """today 之前已结束的最近 count 个报告期（降序）"""
+    periods = []
+    year = today.year
+    while len(periods) < count:
+        for month, day in reversed(PERIOD_ENDS):
+            period = date(year, month, day)
+            if period < today:
+                periods.append(period)
+                if len(periods) == count:
+                    break
+        year -= 1
+    return periods
+
+
+def disclosure_deadline(period: date) -> date:
+    """报告期的法定披露截止日"""
+    month, day, years = DISCLOSURE_DEADLINES[period.month]
+    return date(period.year + years, month, day)
+
+
+def disclosure_window_end(period: date) -> date:
+    return disclosure_deadline(period) + timedelta(days=DISCLOSURE_GRACE_DAYS)
+
+
+class FinancialWarehouse:
+    """
+    财务指标仓库（单例）
+
+    使用示例:
+        warehouse = get_financial_warehouse()
+        warehouse.start_background_refresh()     # 运行开始时触发，不等待
+        warehouse.get_indicators('600519')        # 本地读取最近报告期
+    """
+
+    _instance: Optional['FinancialWarehouse'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, refresh_hours: float = 12, fetcher=None):
+        """
+        Args:
+            refresh_hours: 披露窗口内同一报告期两次刷新的最小间隔（小时）
+            fetcher: FinancialFetcher（默认首次刷新时创建）
+        """
+        self.refresh_interval = timedelta(hours=max(refresh_hours, 0))
+        self._fetcher = fetcher
+        # 本进程内已尝试过的报告期（无数据或失败时避免同一进程反复请求）
+        self._attempted: Dict[date, datetime] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'FinancialWarehouse':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from src.config import get_config
+                    cls._instance = cls(refresh_hours=get_config().financial_refresh_hours)
+        return cls._instance
+
+    @property
+    def fetcher(self):
+        if self._fetcher is None:
+            from data_provider.financial_fetcher import FinancialFetcher
+            self._fetcher = FinancialFetcher()
+        return self._fetcher
+
+    # === 刷新计划 ===
+
+    def due_periods(self, now: Optional[datetime] = None) -> List[date]:
+        """
+        需要刷新的报告期（降序）：
+        - 从未入库的报告期
+        - 披露窗口内距上次刷新超过 refresh_interval
+        - 窗口已结束但上次刷新在窗口结束前（补刷最后一次）
+        """
+        from src.storage import get_db
+
+        now = now or datetime.now()
+        periods = report_periods(now.date())
+        status = get_db().get_financial_period_status(periods[-1])
+        due = []
+        for period in periods:
+            attempted = self._attempted.get(period)
+            if attempted is not None and now - attempted < self.refresh_interval:
+                continue
+            fetched_at = status.get(period)
+            window_end = disclosure_window_end(period)
+            if fetched_at is None:
+                due.append(period)
+            elif now.date() <= window_end:
+                if now - fetched_at >= self.refresh_interval:
+                    due.append(period)
+            elif fetched_at.date() <= window_end:
+                due.append(period)
+        return due
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """
+        同步刷新所有到期的报告期
+
+        Returns:
+            写入的记录数
+        """
+        from src.storage import get_db
+
+        with self._refresh_lock:
+            due = self.due_periods(now)
+            if not due:
+                logger.debug("[财务仓库] 无需刷新")
+                return 0
+            logger.info(f"[财务仓库] 按报告期批量刷新: {', '.join(p.isoformat() for p in due)}")
+            total = 0
+            for period in due:
+                self._attempted[period] = now or datetime.now()
+                df = self.fetcher.get_market_report(period)
+                if df is None:
+                    continue
+                if df.empty:
+                    logger.info(f"[财务仓库] {period} 尚无披露数据")
+                    continue
+                count = get_db().save_financial_reports(period, df.to_dict('records'), source='eastmoney_yjbb')
+                logger.info(f"[财务仓库] {period} 写入 {count} 只股票")
+                total += count
+            return total
+
+    def start_background_refresh(self) -> None:
+        """在后台线程刷新到期的报告期（幂等，已在刷新时直接返回）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="financial-refresh", daemon=True)
+            self._thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待后台刷新结束，返回是否已结束"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    def _run(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.warning(f"[财务仓库] 后台刷新失败，使用已有数据: {e}")
+
+    # === 个股查询（只读本地库）===
+
+    def get_indicators(self, code: str):
+        """
+        最近报告期的财务指标
+
+        Returns:
+            FinancialIndicators；非 A 股或仓库中没有该股票时返回 None
+        """
+        from data_provider.financial_fetcher import FinancialIndicators
+        from data_provider.securities import lookup
+        from src.storage import get_db
+
+        info = lookup(code)
+        if info.market != 'cn' or info.is_etf:
+            return None
+        rows = get_db().get_financial_reports(code, periods=1)
+        if not rows:
+            return None
+        row = rows[0]
+        return FinancialIndicators(
+            code=code,
+            roe=row.get('roe'),
+            gross_profit_margin=row.get('gross_profit_margin'),
+            net_profit_margin=row.get('net_profit_margin'),
+            revenue_growth=row.get('revenue_growth'),
+            profit_growth=row.get('profit_growth'),
+            debt_to_asset=row.get('debt_to_asset'),
+            report_date=row['report_period'].isoformat(),
+            update_time=row['fetched_at'].isoformat(sep=' ', timespec='seconds') if row.get('fetched_at') else None,
+            data_source=row.get('data_source') or 'unknown',
+        )
+
+
+def get_financial_warehouse() -> FinancialWarehouse:
+    """获取财务指标仓库单例"""
+    return FinancialWarehouse.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    today = date.today()
+    for period in report_periods(today):
+        print(period, "披露截止", disclosure_deadline(period))
+
+    warehouse = get_financial_warehouse()
+    print("待刷新:", warehouse.due_periods())
+    warehouse.refresh()
+    print(warehouse.get_indicators('600519'))
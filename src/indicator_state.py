@@ -0,0 +1,517 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+增量指标状态（盘中实时刷新）
+===================================
+
+职责：
+1. 为每只股票维护 StockTrendAnalyzer 所需指标的增量状态
+   - 均线：收盘价环形缓冲 + 已收盘 K 线的窗口和
+   - MACD：快慢 EMA 与 DEA 的递推状态
+   - RSI：涨跌幅环形缓冲 + 各周期窗口和
+2. 盘中每个 tick 只基于已收盘状态计算"未收盘 K 线"的指标，O(1)，不修改状态
+3. 收盘后 push_bar() 提交当日 K 线，状态前进一天
+4. 状态可持久化为 JSON，重启后从最后一根已存储 K 线继续（缺失的 K 线从数据库补齐）
+
+与全量重算的关系：
+- 均线 / RSI / 量比 与 StockTrendAnalyzer.analyze 完全一致
+- EMA 从状态建立时的第一根 K 线开始递推；analyze 从传入窗口的第一根开始，
+  两者在 120 日窗口下差异已收敛到可忽略
+
+使用方式：
+    store = get_indicator_state_store()
+    state = store.get('600519')
+    result = StockTrendAnalyzer().analyze_state(state, price=1700.0, volume=35000)
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Deque, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.stock_analyzer import StockTrendAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+# 持久化格式版本（字段变化时递增，旧文件会被丢弃并从数据库重建）
+STATE_VERSION = 1
+
+# 重建状态时读取的历史 K 线数量（与 pipeline 趋势分析窗口一致）
+REHYDRATE_DAYS = 120
+
+MA_WINDOWS = (5, 10, 20, 60)
+RSI_PERIODS = (StockTrendAnalyzer.RSI_SHORT, StockTrendAnalyzer.RSI_MID, StockTrendAnalyzer.RSI_LONG)
+
+# frame() 输出的行数：覆盖 analyze 各项规则的最大回看长度
+FRAME_ROWS = max(StockTrendAnalyzer.MACD_SLOW, StockTrendAnalyzer.RSI_LONG, 20) + 1
+
+# frame() 的列（与 StockTrendAnalyzer 计算后的 DataFrame 列名一致）
+FRAME_COLUMNS = [
+    'close', 'high', 'volume', 'MA5', 'MA10', 'MA20', 'MA60',
+    'MACD_DIF', 'MACD_DEA', 'MACD_BAR',
+] + [f'RSI_{p}' for p in RSI_PERIODS]
+
+
+@dataclass
+class IndicatorSnapshot:
+    """某一时刻（含未收盘 K 线）的指标值"""
+    close: float
+    high: float
+    volume: float
+    ma5: float
+    ma10: float
+    ma20: float
+    ma60: float
+    macd_dif: float
+    macd_dea: float
+    macd_bar: float
+    rsi: Dict[int, float]
+    volume_ratio_5d: float = 0.0
+
+    @property
+    def bias_ma5(self) -> float:
+        return (self.close - self.ma5) / self.ma5 * 100 if self.ma5 > 0 else 0.0
+
+    def to_row(self) -> List[float]:
+        return [
+            self.close, self.high, self.volume, self.ma5, self.ma10, self.ma20, self.ma60,
+            self.macd_dif, self.macd_dea, self.macd_bar,
+        ] + [self.rsi[p] for p in RSI_PERIODS]
+
+
+def _alpha(span: int) -> float:
+    return 2.0 / (span + 1.0)
+
+
+class IndicatorState:
+    """
+    单只股票的增量指标状态
+
+    只保存已收盘 K 线的状态；update()/frame() 以"当前价作为今日收盘"临时计算，
+    不修改状态，因此同一交易日内可以任意次刷新。
+    """
+
+    def __init__(self, code: str):
+        self.code = code
+        self.last_date: Optional[date] = None
+        self.bars = 0
+
+        # 收盘价环形缓冲（最长均线窗口 - 1）
+        self.closes: Deque[float] = deque(maxlen=max(MA_WINDOWS) - 1)
+        # 已收盘 K 线中最近 n-1 根的收盘价之和（按窗口）
+        self.close_sums: Dict[int, float] = {n: 0.0 for n in MA_WINDOWS}
+
+        # MACD 递推状态
+        self.ema_fast: Optional[float] = None
+        self.ema_slow: Optional[float] = None
+        self.dea: Optional[float] = None
+
+        # RSI：涨跌幅环形缓冲（最长周期 - 1）与窗口和
+        self.gains: Deque[float] = deque(maxlen=max(RSI_PERIODS) - 1)
+        self.losses: Deque[float] = deque(maxlen=max(RSI_PERIODS) - 1)
+        self.gain_sums: Dict[int, float] = {p: 0.0 for p in RSI_PERIODS}
+        self.loss_sums: Dict[int, float] = {p: 0.0 for p in RSI_PERIODS}
+
+        # 最近若干根已收盘 K 线的完整指标行（供 frame() 输出规则判断窗口）
+        self.rows: Deque[List[float]] = deque(maxlen=FRAME_ROWS - 1)
+
+    # ---------- 增量计算 ----------
+
+    def _compute(self, price: float, volume: float, high: float) -> Tuple[IndicatorSnapshot, Tuple[float, ...]]:
+        """
+        以 price 作为下一根 K 线收盘价计算指标（O(1)，不修改状态）
+
+        Returns:
+            (指标快照, 提交时需要的递推量 (ema_fast, ema_slow, gain, loss))
+        """
+        bars = self.bars + 1
+
+        mas = {}
+        for n in MA_WINDOWS:
+            mas[n] = (self.close_sums[n] + price) / n if bars >= n else math.nan
+        if bars < 60:
+            mas[60] = mas[20]
+
+        if self.ema_fast is None:
+            ema_fast = ema_slow = price
+            dif = 0.0
+            dea = 0.0
+        else:
+            a_fast = _alpha(StockTrendAnalyzer.MACD_FAST)
+            a_slow = _alpha(StockTrendAnalyzer.MACD_SLOW)
+            ema_fast = a_fast * price + (1 - a_fast) * self.ema_fast
+            ema_slow = a_slow * price + (1 - a_slow) * self.ema_slow
+            dif = ema_fast - ema_slow
+            a_sig = _alpha(StockTrendAnalyzer.MACD_SIGNAL)
+            dea = a_sig * dif + (1 - a_sig) * self.dea
+
+        # 第一根 K 线的 diff 为 NaN，按 analyze 的处理视为涨跌 0
+        delta = price - self.closes[-1] if self.closes else 0.0
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+        rsi = {}
+        for p in RSI_PERIODS:
+            if bars < p:
+                rsi[p] = 50.0
+                continue
+            avg_gain = (self.gain_sums[p] + gain) / p
+            avg_loss = (self.loss_sums[p] + loss) / p
+            if avg_loss > 0:
+                rsi[p] = 100 - 100 / (1 + avg_gain / avg_loss)
+            else:
+                rsi[p] = 100.0 if avg_gain > 0 else 50.0
+
+        # 量比：当日量 / 前 5 日均量（前序不足 5 根时取全部）
+        prev_volumes = [row[2] for row in list(self.rows)[-5:]]
+        vol_avg = sum(prev_volumes) / len(prev_volumes) if prev_volumes else 0.0
+        volume_ratio = volume / vol_avg if vol_avg > 0 else 0.0
+
+        return IndicatorSnapshot(
+            close=price,
+            high=high,
+            volume=volume,
+            ma5=mas[5],
+            ma10=mas[10],
+            ma20=mas[20],
+            ma60=mas[60],
+            macd_dif=dif,
+            macd_dea=dea,
+            macd_bar=(dif - dea) * 2,
+            rsi=rsi,
+            volume_ratio_5d=volume_ratio,
+        ), (ema_fast, ema_slow, gain, loss)
+
+    def update(self, price: float, volume: Optional[float] = None, high: Optional[float] = None) -> IndicatorSnapshot:
+        """
+        盘中 tick：以最新价作为今日收盘价计算指标（不修改状态）
+
+        Args:
+            price: 最新价
+            volume: 当日累计成交量（缺省沿用上一交易日成交量）
+            high: 当日最高价（缺省为最新价）
+        """
+        snapshot, _ = self._compute(*self._tick_args(price, volume, high))
+        return snapshot
+
+    def _tick_args(self, price: float, volume: Optional[float], high: Optional[float]) -> Tuple[float, float, float]:
+        if volume is None:
+            volume = self.rows[-1][2] if self.rows else 0.0
+        return float(price), float(volume), float(high if high is not None else price)
+
+    def push_bar(
+        self,
+        bar_date: date,
+        close: float,
+        volume: float = 0.0,
+        high: Optional[float] = None,
+    ) -> bool:
+        """
+        提交一根已收盘 K 线
+
+        Returns:
+            是否提交（日期不晚于 last_date 的 K 线会被忽略）
+        """
+        bar_date = _to_date(bar_date)
+        if self.last_date is not None and bar_date <= self.last_date:
+            return False
+
+        snapshot, (ema_fast, ema_slow, gain, loss) = self._compute(*self._tick_args(close, volume, high))
+        self.ema_fast, self.ema_slow = ema_fast, ema_slow
+        self.dea = snapshot.macd_dea
+
+        self.gains.append(gain)
+        self.losses.append(loss)
+        self.closes.append(snapshot.close)
+        self.rows.append(snapshot.to_row())
+        self.bars += 1
+        self.last_date = bar_date
+        self._resum()
+        return True
+
+    def _resum(self) -> None:
+        """按环形缓冲重算窗口和（每根 K 线一次，避免浮点累计误差）"""
+        closes = list(self.closes)
+        gains = list(self.gains)
+        losses = list(self.losses)
+        for n in MA_WINDOWS:
+            self.close_sums[n] = math.fsum(closes[-(n - 1):])
+        for p in RSI_PERIODS:
+            self.gain_sums[p] = math.fsum(gains[-(p - 1):])
+            self.loss_sums[p] = math.fsum(losses[-(p - 1):])
+
+    def frame(self, price: float, volume: Optional[float] = None, high: Optional[float] = None) -> pd.DataFrame:
+        """
+        输出规则判断窗口（最近 FRAME_ROWS 根 K 线 + 未收盘 K 线），列名与 analyze 一致
+
+        供 StockTrendAnalyzer.analyze_state 使用。
+        """
+        snapshot = self.update(price, volume, high)
+        rows = list(self.rows) + [snapshot.to_row()]
+        return pd.DataFrame(rows, columns=FRAME_COLUMNS)
+
+    # ---------- 构建与持久化 ----------
+
+    @classmethod
+    def from_history(cls, code: str, df: pd.DataFrame, before: Optional[date] = None) -> 'IndicatorState':
+        """
+        从历史 K 线构建状态
+
+        Args:
+            code: 股票代码
+            df: 包含 date/close/volume/high 列的 DataFrame
+            before: 只提交该日期之前的 K 线（盘中重建时传入今天，避免把未收盘数据计入状态）
+        """
+        state = cls(code)
+        state.extend(df, before=before)
+        return state
+
+    def extend(self, df: Optional[pd.DataFrame], before: Optional[date] = None) -> int:
+        """追加 last_date 之后的 K 线，返回提交数量"""
+        if df is None or df.empty:
+            return 0
+        df = df.sort_values('date')
+        before = _to_date(before) if before is not None else None
+        has_high = 'high' in df.columns
+        committed = 0
+        for row in df.itertuples(index=False):
+            bar_date = _to_date(row.date)
+            if before is not None and bar_date >= before:
+                break
+            volume = row.volume if row.volume == row.volume else 0.0  # NaN -> 0
+            high = row.high if has_high and row.high == row.high else None
+            if self.push_bar(bar_date, float(row.close), float(volume), high):
+                committed += 1
+        return committed
+
+    def to_dict(self) -> Dict:
+        return {
+            'version': STATE_VERSION,
+            'code': self.code,
+            'last_date': self.last_date.isoformat() if self.last_date else None,
+            'bars': self.bars,
+            'closes': list(self.closes),
+            'ema_fast': self.ema_fast,
+            'ema_slow': self.ema_slow,
+            'dea': self.dea,
+            'gains': list(self.gains),
+            'losses': list(self.losses),
+            'rows': [list(r) for r in self.rows],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> Optional['IndicatorState']:
+        """从 to_dict() 的结果恢复，版本不匹配返回 None"""
+        if data.get('version') != STATE_VERSION:
+            return None
+        state = cls(data['code'])
+        state.last_date = _to_date(data['last_date']) if data.get('last_date') else None
+        state.bars = int(data.get('bars', 0))
+        state.closes.extend(data.get('closes', []))
+        state.ema_fast = data.get('ema_fast')
+        state.ema_slow = data.get('ema_slow')
+        state.dea = data.get('dea')
+        state.gains.extend(data.get('gains', []))
+        state.losses.extend(data.get('losses', []))
+        state.rows.extend(data.get('rows', []))
+        state._resum()
+        return state
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+class IndicatorStateStore:
+    """
+    增量指标状态管理（单例）
+
+    状态查找顺序：内存 → JSON 文件（<数据库目录>/indicator_state/<code>.json）→ 数据库历史重建；
+    文件中的状态落后于数据库时，补提交缺失的 K 线。
+    """
+
+    _instance: Optional['IndicatorStateStore'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, root: Optional[str] = None):
+        if root is None:
+            from src.config import get_config
+            root = os.path.join(os.path.dirname(get_config().database_path) or '.', 'indicator_state')
+        self.root = root
+        self._states: Dict[str, IndicatorState] = {}
+        # 已与数据库同步过的 before 日期（同一 before 内重复 get() 不再读库）
+        self._synced: Dict[str, date] = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def get_instance(cls) -> 'IndicatorStateStore':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    def reset_instance(cls) -> None:
+        with cls._instance_lock:
+            cls._instance = None
+
+    def _path(self, code: str) -> str:
+        return os.path.join(self.root, f"{code}.json")
+
+    def _load_file(self, code: str) -> Optional[IndicatorState]:
+        path = self._path(code)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return IndicatorState.from_dict(json.load(f))
+        except Exception as e:
+            logger.warning(f"[指标状态] {code} 状态文件损坏，将重建: {e}")
+            return None
+
+    def get(self, code: str, before: Optional[date] = None, db=None) -> IndicatorState:
+        """
+        获取股票的指标状态（已提交到 before 之前的最后一根 K 线）
+
+        Args:
+            code: 股票代码
+            before: 只提交该日期之前的 K 线，默认今天（盘中今天的 K 线尚未收盘）
+            db: DatabaseManager（默认 get_db()）
+        """
+        before = _to_date(before) if before is not None else date.today()
+        with self._lock:
+            if self._synced.get(code) == before and code in self._states:
+                return self._states[code]
+            state = self._states.get(code) or self._load_file(code)
+
+        if state is None or (state.last_date is not None and state.last_date >= before):
+            # 状态不存在，或已包含 before 当天（无法回退），从数据库重建
+            state = None
+        state = self._rehydrate(code, state, before, db)
+
+        with self._lock:
+            self._states[code] = state
+            self._synced[code] = before
+        return state
+
+    def _rehydrate(
+        self,
+        code: str,
+        state: Optional[IndicatorState],
+        before: date,
+        db=None,
+    ) -> IndicatorState:
+        """从数据库补齐缺失的 K 线；缺口超出读取窗口时整体重建"""
+        if db is None:
+            from src.storage import get_db
+            db = get_db()
+        try:
+            df = db.get_history_dataframe(code, days=REHYDRATE_DAYS)
+        except Exception as e:
+            logger.warning(f"[指标状态] {code} 读取历史数据失败: {e}")
+            df = None
+
+        if df is None or df.empty:
+            return state or IndicatorState(code)
+
+        if state is not None and state.last_date is not None:
+            dates = pd.to_datetime(df['date']).dt.date
+            if state.last_date >= dates.iloc[0]:
+                committed = state.extend(df[dates > state.last_date], before=before)
+                if committed:
+                    logger.debug(f"[指标状态] {code} 补齐 {committed} 根 K 线")
+                return state
+
+        state = IndicatorState.from_history(code, df, before=before)
+        logger.debug(f"[指标状态] {code} 从历史数据重建，共 {state.bars} 根 K 线")
+        return state
+
+    def get_many(self, codes: List[str], before: Optional[date] = None) -> Dict[str, IndicatorState]:
+        """批量获取（盘中监控初始化使用）"""
+        return {code: self.get(code, before=before) for code in codes}
+
+    def push_bar(self, code: str, bar_date: date, close: float, volume: float = 0.0,
+                 high: Optional[float] = None) -> bool:
+        """向已加载的状态提交收盘 K 线（未加载的股票会在下次 get() 时从数据库补齐）"""
+        with self._lock:
+            state = self._states.get(code)
+        if state is None:
+            return False
+        return state.push_bar(bar_date, close, volume, high)
+
+    def save(self, code: str) -> bool:
+        with self._lock:
+            state = self._states.get(code)
+        if state is None:
+            return False
+        os.makedirs(self.root, exist_ok=True)
+        path = self._path(code)
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(state.to_dict(), f)
+        os.replace(tmp, path)
+        return True
+
+    def save_all(self) -> int:
+        with self._lock:
+            codes = list(self._states)
+        saved = 0
+        for code in codes:
+            try:
+                saved += self.save(code)
+            except Exception as e:
+                logger.warning(f"[指标状态] {code} 保存失败: {e}")
+        return saved
+
+    def clear(self) -> None:
+        with self._lock:
+            self._states.clear()
+            self._synced.clear()
+
+
+def get_indicator_state_store() -> IndicatorStateStore:
+    """获取增量指标状态管理器"""
+    return IndicatorStateStore.get_instance()
+
+
+if __name__ == "__main__":
+    import time
+    import numpy as np
+
+    logging.basicConfig(level=logging.INFO)
+
+    np.random.seed(42)
+    n = 120
+    prices = 10 * np.cumprod(1 + np.random.normal(0.001, 0.02, n))
+    df = pd.DataFrame({
+        'date': pd.date_range(end=date.today(), periods=n, freq='B'),
+        'close': prices,
+        'high': prices * 1.01,
+        'volume': np.random.randint(1_000_000, 5_000_000, n).astype(float),
+    })
+
+    state = IndicatorState.from_history('TEST', df.iloc[:-1])
+    analyzer = StockTrendAnalyzer()
+
+    start = time.time()
+    for tick in range(1000):
+        result = analyzer.analyze_state(state, price=prices[-1] * (1 + tick * 1e-5), volume=2_000_000)
+    print(f"1000 次增量评分耗时: {time.time() - start:.3f}s")
+
+    full = analyzer.analyze(df.assign(volume=df['volume'].where(df.index < n - 1, 2_000_000)), 'TEST')
+    incremental = analyzer.analyze_state(state, price=prices[-1], volume=2_000_000, high=prices[-1] * 1.01)
+    print(f"全量: {full.signal_score} {full.buy_signal.value} | 增量: {incremental.signal_score} {incremental.buy_signal.value}")
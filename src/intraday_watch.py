@@ -0,0 +1,406 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+盘中监控模式
+===================================
+
+职责：
+1. 交易时段内按固定间隔拉取一次全市场实时快照（efinance / 东财），一次请求覆盖全部自选股
+2. 用快照价格增量更新每只股票的指标状态（src.indicator_state），不重算历史
+3. 评估预警规则：价格上穿/跌破 MA5、MA10，量比异动，乖离率超阈值
+4. 只有规则触发时才调用 AI 分析和推送通知，其余轮询只消耗本地计算
+
+规则为边沿触发（状态从不满足变为满足时才提醒），并对同一股票同一规则做冷却，
+避免价格在均线附近反复穿越时刷屏。
+
+使用方式：
+    python main.py --watch
+    python main.py --watch --stocks 600519,300750
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from src.config import Config, get_config
+from src.indicator_state import IndicatorSnapshot, IndicatorState, get_indicator_state_store
+from src.stock_analyzer import StockTrendAnalyzer
+
+logger = logging.getLogger(__name__)
+
+
+# A股交易时段（北京时间）
+CN_TZ = timezone(timedelta(hours=8))
+CN_SESSIONS: Tuple[Tuple[dtime, dtime], ...] = (
+    (dtime(9, 30), dtime(11, 30)),
+    (dtime(13, 0), dtime(15, 0)),
+)
+
+# 支持一次拉取全市场的实时行情数据源
+BULK_SOURCES = ('efinance', 'akshare_em')
+
+# 监控使用的快照列
+SPOT_COLUMNS = ('name', 'price', 'high', 'volume', 'volume_ratio', 'change_pct')
+
+
+@dataclass
+class AlertEvent:
+    """预警事件"""
+    code: str
+    name: str
+    rule: str                   # 规则标识，如 cross_up_ma5 / volume_spike / bias_high
+    message: str
+    price: float
+    triggered_at: datetime = field(default_factory=lambda: datetime.now(CN_TZ))
+
+
+def is_cn_trading_session(now: Optional[datetime] = None) -> bool:
+    """当前是否处于 A股交易时段（含交易日判断）"""
+    now = now or datetime.now(CN_TZ)
+    if now.tzinfo is not None:
+        now = now.astimezone(CN_TZ)
+    try:
+        from data_provider.trading_calendar import get_trading_calendar
+        if not get_trading_calendar('cn').is_trading_day(now.date()):
+            return False
+    except Exception as e:
+        logger.debug(f"[盘中监控] 交易日历不可用，按工作日判断: {e}")
+        if now.weekday() >= 5:
+            return False
+    current = now.time()
+    return any(start <= current <= end for start, end in CN_SESSIONS)
+
+
+# ============================================
+# 全市场快照
+# ============================================
+
+def _bulk_source_order(config: Config) -> List[str]:
+    """按 REALTIME_SOURCE_PRIORITY 中的先后顺序选取全量数据源"""
+    priority = [s.strip().lower() for s in config.realtime_source_priority.split(',') if s.strip()]
+    ordered = [s for s in priority if s in BULK_SOURCES]
+    return ordered + [s for s in BULK_SOURCES if s not in ordered]
+
+
+def _normalize_spot(frame: pd.DataFrame) -> pd.DataFrame:
+    """取监控所需列：name/price/high/volume/volume_ratio/change_pct（快照缺失的列为 NaN）"""
+    spot = frame.reindex(columns=SPOT_COLUMNS)
+    spot = spot[spot['price'] > 0]
+    return spot[~spot.index.duplicated()]
+
+
+def fetch_spot_snapshot(config: Optional[Config] = None) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    拉取一次全市场实时快照
+
+    经全市场行情快照服务拉取（data_provider/market_snapshot.py），拉取成功后替换会话快照，
+    规则触发后的 AI 分析会直接复用这份快照，不会再发起一次全量请求。
+
+    Returns:
+        (以代码为索引的快照 DataFrame, 数据源名)，全部失败返回 (None, None)
+    """
+    from data_provider.market_snapshot import get_market_snapshot_service
+
+    config = config or get_config()
+    start = time.time()
+    snapshot = get_market_snapshot_service().refresh(_bulk_source_order(config))
+    if snapshot is None:
+        return None, None
+    logger.debug(f"[盘中监控] {snapshot.source} 快照 {len(snapshot)} 只股票，耗时 {time.time() - start:.2f}s")
+    return _normalize_spot(snapshot.frame), snapshot.source
+
+
+# ============================================
+# 监控器
+# ============================================
+
+class IntradayWatcher:
+    """
+    盘中监控器
+
+    每轮轮询：一次快照请求 → 逐股 O(1) 指标更新 → 规则评估 → 触发时异步分析并推送
+    """
+
+    def __init__(
+        self,
+        stock_codes: List[str],
+        config: Optional[Config] = None,
+        notifier=None,
+        send_notification: bool = True,
+    ):
+        self.config = config or get_config()
+        self.stock_codes = list(dict.fromkeys(stock_codes))
+        self.interval = max(5, self.config.intraday_watch_interval)
+        self.send_notification = send_notification
+        self._notifier = notifier
+        self._pipeline = None
+        self._pipeline_lock = threading.Lock()
+
+        self.trend_analyzer = StockTrendAnalyzer()
+        self.state_store = get_indicator_state_store()
+
+        self._states: Dict[str, IndicatorState] = {}
+        # 每只股票最近一次 tick：(price, volume, high)
+        self._last_ticks: Dict[str, Tuple[float, Optional[float], Optional[float]]] = {}
+        self._session_date: Optional[date] = None
+        self._saved_date: Optional[date] = None
+        # 每只股票各规则上一次的条件值（边沿触发）
+        self._conditions: Dict[str, Dict[str, bool]] = {}
+        # (code, rule) -> 上次提醒时间戳（冷却）
+        self._last_fired: Dict[Tuple[str, str], float] = {}
+        # 分析与推送放到后台线程，避免阻塞下一轮轮询
+        self._dispatcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="intraday_alert")
+
+    # ---------- 懒加载重型依赖 ----------
+
+    @property
+    def notifier(self):
+        if self._notifier is None:
+            from src.notification import NotificationService
+            self._notifier = NotificationService()
+        return self._notifier
+
+    @property
+    def pipeline(self):
+        """规则首次触发且需要 AI 分析时才创建流水线（含 LLM / 搜索服务）"""
+        with self._pipeline_lock:
+            if self._pipeline is None:
+                from src.core.pipeline import StockAnalysisPipeline
+                self._pipeline = StockAnalysisPipeline(config=self.config, max_workers=1)
+            return self._pipeline
+
+    # ---------- 每日准备 ----------
+
+    def prepare_session(self, today: Optional[date] = None) -> None:
+        """
+        交易日开盘前准备：补齐日线数据并加载指标状态（只提交今天之前的 K 线）
+
+        每只股票每天最多一次日线请求（已有数据时由断点续传直接跳过）。
+        """
+        today = today or datetime.now(CN_TZ).date()
+        logger.info(f"[盘中监控] 准备 {today} 交易时段，共 {len(self.stock_codes)} 只股票")
+
+        from src.storage import get_db
+        from data_provider import DataFetcherManager
+        db = get_db()
+        fetcher_manager = None
+        for code in self.stock_codes:
+            try:
+                if not db.has_today_data(code, db.get_latest_trading_day(code, today - timedelta(days=1))):
+                    fetcher_manager = fetcher_manager or DataFetcherManager()
+                    df, source = fetcher_manager.get_daily_data(code, days=30)
+                    if df is not None and not df.empty:
+                        db.save_daily_data(df, code, source)
+            except Exception as e:
+                logger.warning(f"[盘中监控] {code} 日线补齐失败，使用已有数据: {e}")
+
+        self.state_store.clear()
+        self._states = self.state_store.get_many(self.stock_codes, before=today)
+        self._conditions = {code: self._baseline_conditions(state) for code, state in self._states.items()}
+        self._session_date = today
+
+        ready = sum(1 for s in self._states.values() if s.bars >= 20)
+        logger.info(f"[盘中监控] 指标状态就绪: {ready}/{len(self.stock_codes)} 只（不足 20 根 K 线的股票不参与预警）")
+
+    @staticmethod
+    def _baseline_conditions(state: IndicatorState) -> Dict[str, bool]:
+        """以上一根已收盘 K 线的状态作为初始条件，开盘即穿越也能被识别"""
+        if not state.rows:
+            return {}
+        close, _, _, ma5, ma10 = state.rows[-1][:5]
+        conditions = {}
+        if ma5 == ma5:  # 非 NaN
+            conditions['above_ma5'] = close > ma5
+        if ma10 == ma10:
+            conditions['above_ma10'] = close > ma10
+        return conditions
+
+    # ---------- 规则评估 ----------
+
+    def evaluate(self, code: str, name: str, quote: pd.Series, snapshot: IndicatorSnapshot) -> List[AlertEvent]:
+        """评估单只股票的预警规则，返回本轮新触发的事件"""
+        price = snapshot.close
+        volume_ratio = quote.get('volume_ratio')
+        if volume_ratio is None or volume_ratio != volume_ratio:
+            volume_ratio = snapshot.volume_ratio_5d
+        bias = snapshot.bias_ma5
+        bias_alert = self.config.intraday_bias_alert
+
+        current = {
+            'above_ma5': price > snapshot.ma5,
+            'above_ma10': price > snapshot.ma10,
+            'volume_spike': volume_ratio >= self.config.intraday_volume_ratio_alert,
+            'bias_high': bias >= bias_alert,
+            'bias_low': bias <= -bias_alert,
+        }
+        previous = self._conditions.setdefault(code, {})
+        events = []
+
+        for ma_name, key, ma_value in (('MA5', 'above_ma5', snapshot.ma5), ('MA10', 'above_ma10', snapshot.ma10)):
+            if key not in previous or previous[key] == current[key]:
+                continue
+            if current[key]:
+                events.append((f"cross_up_{ma_name.lower()}", f"📈 价格 {price:.2f} 上穿 {ma_name}（{ma_value:.2f}）"))
+            else:
+                events.append((f"cross_down_{ma_name.lower()}", f"📉 价格 {price:.2f} 跌破 {ma_name}（{ma_value:.2f}）"))
+
+        if current['volume_spike'] and not previous.get('volume_spike', False):
+            events.append(('volume_spike', f"🔊 量比异动 {volume_ratio:.2f}（阈值 {self.config.intraday_volume_ratio_alert}）"))
+        if current['bias_high'] and not previous.get('bias_high', False):
+            events.append(('bias_high', f"⚠️ 乖离率 {bias:.1f}% 超过 {bias_alert}%，严禁追高"))
+        if current['bias_low'] and not previous.get('bias_low', False):
+            events.append(('bias_low', f"⚡ 乖离率 {bias:.1f}% 低于 -{bias_alert}%，关注超跌支撑"))
+
+        previous.update(current)
+
+        now = time.time()
+        fired = []
+        for rule, message in events:
+            last = self._last_fired.get((code, rule), 0)
+            if now - last < self.config.intraday_alert_cooldown:
+                logger.debug(f"[盘中监控] {code} {rule} 冷却中，跳过")
+                continue
+            self._last_fired[(code, rule)] = now
+            fired.append(AlertEvent(code=code, name=name, rule=rule, message=message, price=price))
+        return fired
+
+    def poll_once(self) -> List[AlertEvent]:
+        """执行一轮轮询，返回触发的事件（已提交后台分析/推送）"""
+        spot, source = fetch_spot_snapshot(self.config)
+        if spot is None:
+            logger.warning("[盘中监控] 本轮未获取到实时快照")
+            return []
+
+        events: List[AlertEvent] = []
+        for code, state in self._states.items():
+            if state.bars < 20 or code not in spot.index:
+                continue
+            quote = spot.loc[code]
+            high = quote['high'] if quote['high'] == quote['high'] else None
+            volume = quote['volume'] if quote['volume'] == quote['volume'] else None
+            snapshot = state.update(quote['price'], volume, high)
+            self._last_ticks[code] = (quote['price'], volume, high)
+            name = quote['name'] if isinstance(quote['name'], str) else code
+            events.extend(self.evaluate(code, name, quote, snapshot))
+
+        if events:
+            logger.info(f"[盘中监控] 本轮触发 {len(events)} 条预警（数据源 {source}）")
+            self._dispatcher.submit(self._dispatch, events)
+        else:
+            logger.debug(f"[盘中监控] 本轮无预警（数据源 {source}，{len(self._states)} 只股票）")
+        return events
+
+    # ---------- 分析与推送 ----------
+
+    def _dispatch(self, events: List[AlertEvent]) -> None:
+        """按股票合并事件：规则提醒 + 趋势评分 +（可选）AI 分析，一只股票一条消息"""
+        by_code: Dict[str, List[AlertEvent]] = {}
+        for event in events:
+            by_code.setdefault(event.code, []).append(event)
+
+        for code, code_events in by_code.items():
+            try:
+                content = self._build_message(code, code_events)
+                if not self.send_notification:
+                    logger.info(f"[盘中监控] {code} 预警（未推送）:\n{content}")
+                    continue
+                if not self.notifier.is_available():
+                    logger.info(f"[盘中监控] {code} 预警（未配置通知渠道）:\n{content}")
+                    continue
+                if self.notifier.send(content):
+                    logger.info(f"[盘中监控] {code} 预警推送成功")
+                else:
+                    logger.warning(f"[盘中监控] {code} 预警推送失败")
+            except Exception as e:
+                logger.error(f"[盘中监控] {code} 预警处理失败: {e}")
+
+    def _build_message(self, code: str, events: List[AlertEvent]) -> str:
+        first = events[0]
+        lines = [f"⏰ **盘中预警 | {first.name}({code})** {first.triggered_at.strftime('%H:%M')}", ""]
+        lines.extend(f"- {event.message}" for event in events)
+
+        state = self._states.get(code)
+        if state is not None:
+            price, volume, high = self._last_ticks.get(code, (first.price, None, None))
+            trend = self.trend_analyzer.analyze_state(state, price, volume, high)
+            lines.append("")
+            lines.append(
+                f"趋势: {trend.trend_status.value} | 评分 {trend.signal_score} | {trend.buy_signal.value}"
+            )
+
+        if self.config.intraday_llm_on_alert:
+            result = self.pipeline.analyze_stock(code)
+            if result is not None:
+                lines.extend(["", "---", "", self.notifier.generate_single_stock_report(result)])
+
+        return "\n".join(lines)
+
+    # ---------- 主循环 ----------
+
+    def run(self, shutdown=None) -> None:
+        """
+        阻塞运行，直到收到退出信号
+
+        Args:
+            shutdown: GracefulShutdown 实例（默认新建）
+        """
+        if shutdown is None:
+            from src.scheduler import GracefulShutdown
+            shutdown = GracefulShutdown()
+
+        logger.info(f"[盘中监控] 启动，轮询间隔 {self.interval}s，监控 {len(self.stock_codes)} 只股票")
+        try:
+            while not shutdown.should_shutdown:
+                now = datetime.now(CN_TZ)
+                if not is_cn_trading_session(now):
+                    # 收盘后保存一次状态（次日启动时从数据库补齐今日 K 线）
+                    if (self._session_date == now.date() and self._saved_date != now.date()
+                            and now.time() > CN_SESSIONS[-1][1]):
+                        self.state_store.save_all()
+                        self._saved_date = now.date()
+                    self._sleep(60, shutdown)
+                    continue
+
+                if self._session_date != now.date():
+                    self.prepare_session(now.date())
+
+                started = time.time()
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    logger.exception(f"[盘中监控] 轮询异常: {e}")
+                self._sleep(self.interval - (time.time() - started), shutdown)
+        finally:
+            self._dispatcher.shutdown(wait=True)
+            self.state_store.save_all()
+            logger.info("[盘中监控] 已退出")
+
+    @staticmethod
+    def _sleep(seconds: float, shutdown) -> None:
+        """可被退出信号打断的睡眠"""
+        deadline = time.time() + max(0.0, seconds)
+        while not shutdown.should_shutdown and time.time() < deadline:
+            time.sleep(min(1.0, deadline - time.time()))
+
+
+def run_intraday_watch(
+    stock_codes: List[str],
+    config: Optional[Config] = None,
+    send_notification: bool = True,
+) -> None:
+    """盘中监控入口（供 main.py --watch 调用）"""
+    if not stock_codes:
+        logger.error("[盘中监控] 未配置自选股列表，请在 .env 文件中设置 STOCK_LIST")
+        return
+    IntradayWatcher(stock_codes, config=config, send_notification=send_notification).run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s | %(levelname)-8s | %(message)s')
+    run_intraday_watch(get_config().stock_list, send_notification=False)
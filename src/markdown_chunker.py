@@ -0,0 +1,411 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - Markdown 分块引擎
+===================================
+
+职责：
+1. 将报告一次性解析为分节树（分隔线 > 标题 > 段落 > 行），逐行预计算字节 / 字符长度
+2. 按渠道分块规格（ChunkProfile：上限、计量单位、分页标记）线性打包为消息块
+3. 各推送渠道共用；同一报告的分节树、长度前缀和与各规格的打包结果均被缓存
+4. 流式分块（StreamChunker）：逐节喂入、凑满即产出，内存只保留当前未满的一块
+
+分块原则：尽量在高层级边界处断开（整只股票 > 标题 > 段落 > 行），
+放不下的节点才逐层拆分，单行仍超长时按字节 / 字符硬切（不在多字节字符中间断开）。
+"""
+
+import re
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple, Union
+
+# 顶层分隔线（股票之间的 ---，纯文本报告中的 ────）
+HR_LINE = re.compile(r'^\s*(?:-{3,}|─{3,}|━{3,}|\*{3,}|_{3,})\s*$')
+
+# 标题行（兼容 AI 未输出标准 Markdown 标题、以加粗作为小标题的情况）
+HEADING_LINE = re.compile(r'^(?:#{1,6}\s|\*\*)')
+
+UNIT_BYTES = 'bytes'
+UNIT_CHARS = 'chars'
+
+# 分节树节点：(起始行, 结束行, 子节点)，行区间左闭右开
+Node = Tuple[int, int, tuple]
+
+
+@dataclass(frozen=True)
+class ChunkProfile:
+    """
+    渠道分块规格
+
+    Attributes:
+        max_size: 单条消息上限（含分页标记）
+        unit: 计量单位，bytes（UTF-8 字节）或 chars（字符）
+        marker: 分页标记模板（含 {index}/{total}），多于一块时追加到每块末尾
+        section_pattern: 顶层分节起始行的正则（默认按分隔线分节）
+        isolate_sections: 每个顶层分节单独成块（如 Bark 每只股票一条）
+    """
+    max_size: int
+    unit: str = UNIT_BYTES
+    marker: str = ''
+    section_pattern: Optional[str] = None
+    isolate_sections: bool = False
+
+    def measure(self, text: str) -> int:
+        return len(text.encode('utf-8')) if self.unit == UNIT_BYTES else len(text)
+
+    @property
+    def budget(self) -> int:
+        """扣除分页标记预留后的正文上限"""
+        reserve = self.measure(self.marker.format(index=999, total=999)) if self.marker else 0
+        return max(16, self.max_size - reserve)
+
+
+class MarkdownDocument:
+    """
+    解析后的报告：行列表 + 分节树 + 按单位的长度前缀和
+
+    使用示例:
+        doc = parse_markdown(report)
+        chunks = doc.pack(ChunkProfile(4000, marker="\\n\\n📄 ({index}/{total})"))
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.lines = content.split('\n')
+        self._hr = [bool(HR_LINE.match(line)) for line in self.lines]
+        self._prefix: Dict[str, List[int]] = {}
+        self._trees: Dict[Optional[str], Tuple[Node, ...]] = {}
+        self._packed: Dict[ChunkProfile, List[str]] = {}
+        self._lock = threading.Lock()
+
+    # === 长度 ===
+
+    def _prefix_sums(self, unit: str) -> List[int]:
+        prefix = self._prefix.get(unit)
+        if prefix is None:
+            if unit == UNIT_BYTES:
+                sizes = (len(line.encode('utf-8')) for line in self.lines)
+            else:
+                sizes = (len(line) for line in self.lines)
+            prefix = self._prefix[unit] = [0, *accumulate(sizes)]
+        return prefix
+
+    def span_size(self, start: int, end: int, unit: str = UNIT_BYTES) -> int:
+        """行区间 [start, end) 以换行拼接后的长度（换行符在两种单位下都计 1）"""
+        prefix = self._prefix_sums(unit)
+        return prefix[end] - prefix[start] + (end - start - 1)
+
+    def span_text(self, start: int, end: int) -> str:
+        return '\n'.join(self.lines[start:end])
+
+    # === 分节树 ===
+
+    def tree(self, section_pattern: Optional[str] = None) -> Tuple[Node, ...]:
+        """顶层分节列表（按分隔线，或按 section_pattern 匹配的起始行）"""
+        tree = self._trees.get(section_pattern)
+        if tree is None:
+            if section_pattern:
+                starts = re.compile(section_pattern)
+                bounds = self._split_before(0, len(self.lines), lambda i: bool(starts.search(self.lines[i])))
+            else:
+                bounds = self._split_at(0, len(self.lines), lambda i: self._hr[i])
+            tree = self._trees[section_pattern] = tuple(
+                (a, b, self._headings(a, b)) for a, b in bounds
+            )
+        return tree
+
+    def _headings(self, start: int, end: int) -> tuple:
+        bounds = self._split_before(start, end, lambda i: bool(HEADING_LINE.match(self.lines[i])))
+        return tuple((a, b, self._paragraphs(a, b)) for a, b in bounds)
+
+    def _paragraphs(self, start: int, end: int) -> tuple:
+        bounds = self._split_at(start, end, lambda i: not self.lines[i].strip())
+        return tuple((a, b, tuple((i, i + 1, ()) for i in range(a, b))) for a, b in bounds)
+
+    @staticmethod
+    def _split_at(start: int, end: int, is_separator) -> List[Tuple[int, int]]:
+        """在分隔行处拆分（分隔行本身不属于任何子节点）"""
+        bounds = []
+        begin = start
+        for i in range(start, end):
+            if is_separator(i):
+                if i > begin:
+                    bounds.append((begin, i))
+                begin = i + 1
+        if end > begin:
+            bounds.append((begin, end))
+        return bounds
+
+    @staticmethod
+    def _split_before(start: int, end: int, is_start) -> List[Tuple[int, int]]:
+        """在起始行之前拆分（首个起始行之前的内容并入第一节）"""
+        bounds = []
+        begin = start
+        seen_start = False
+        for i in range(start, end):
+            if is_start(i):
+                if seen_start:
+                    bounds.append((begin, i))
+                    begin = i
+                seen_start = True
+        if end > begin:
+            bounds.append((begin, end))
+        return bounds
+
+    # === 打包 ===
+
+    def pack(self, profile: ChunkProfile) -> List[str]:
+        """按规格打包为消息块（结果按规格缓存）"""
+        chunks = self._packed.get(profile)
+        if chunks is None:
+            with self._lock:
+                chunks = self._packed.get(profile)
+                if chunks is None:
+                    chunks = self._packed[profile] = self._pack(profile)
+        return chunks
+
+    def _pack(self, profile: ChunkProfile) -> List[str]:
+        chunks = [
+            piece if isinstance(piece, str) else self.span_text(*piece)
+            for piece in self.layout(profile)
+        ]
+        chunks = [chunk for chunk in (c.strip() for c in chunks) if chunk]
+        total = len(chunks)
+        if profile.marker and total > 1:
+            chunks = [chunk + profile.marker.format(index=i + 1, total=total) for i, chunk in enumerate(chunks)]
+        return chunks
+
+    def layout(self, profile: ChunkProfile) -> List[Union[Tuple[int, int], str]]:
+        """
+        贪心打包的块布局（不加分页标记）
+
+        Returns:
+            每块为行区间 (起始行, 结束行)，单行硬切产生的片段为字符串
+        """
+        return [piece for piece, _ in self._layout(profile)]
+
+    def _layout(
+        self, profile: ChunkProfile, start_line: int = 0
+    ) -> List[Tuple[Union[Tuple[int, int], str], int]]:
+        """
+        layout 的实现：每块附带其最后一行的行号
+
+        Args:
+            start_line: 从该行起继续打包（之前的内容已产出）。跨越该行的节点按已被拆分处理，
+                与整篇打包时的决定一致（块只会在被拆分的节点内部断开），供 StreamChunker 续打包
+        """
+        budget = profile.budget
+        unit = profile.unit
+        prefix = self._prefix_sums(unit)
+        chunks: List[Tuple[Union[Tuple[int, int], str], int]] = []
+        current: List[Optional[int]] = [None, None]   # 当前块的 [起始行, 结束行)
+
+        def size(a: int, b: int) -> int:
+            return prefix[b] - prefix[a] + (b - a - 1)
+
+        def flush() -> None:
+            if current[0] is not None:
+                chunks.append(((current[0], current[1]), current[1] - 1))
+                current[0] = None
+
+        def place(node: Node) -> None:
+            a, b, children = node
+            if b <= start_line:
+                return
+            if a < start_line:
+                for child in children:
+                    place(child)
+            elif current[0] is not None and size(current[0], b) <= budget:
+                current[1] = b
+            elif size(a, b) <= budget:
+                flush()
+                current[0], current[1] = a, b
+            elif children:
+                for child in children:
+                    place(child)
+            else:
+                flush()
+                chunks.extend((part, a) for part in split_text(self.lines[a], budget, unit))
+
+        for i, section in enumerate(self.tree(profile.section_pattern)):
+            if profile.isolate_sections and i > 0:
+                flush()
+            place(section)
+        flush()
+        return chunks
+
+
+class StreamChunker:
+    """
+    流式分块器：报告逐节生成时增量打包，不必先拼出整篇报告
+
+    窗口保留未产出内容所在顶层分节起的原始文本，每喂入一节即从上次停下的行续打包，
+    只产出位于最后一个顶层分节（可能在下一节中延续）之前、且不会再并入后续内容的块；
+    窗口通常不超过「一个顶层分节 + 一节」。
+    产出的消息块与对整篇报告（各节以换行拼接）调用 chunk_markdown 的结果一致，
+    唯一区别是分页标记中的 total 在结束前未知，先以 "…" 占位，最后一块写实际总数；
+    为保证只有一块时不加标记，产出始终滞后一块。
+
+    使用示例:
+        chunker = StreamChunker(ChunkProfile(4000, marker="\\n\\n📄 ({index}/{total})"))
+        for text in sections:
+            for chunk in chunker.feed(text):
+                send(chunk)
+        for chunk in chunker.close():
+            send(chunk)
+    """
+
+    PENDING_TOTAL = '…'
+
+    def __init__(self, profile: ChunkProfile):
+        self.profile = profile
+        # 打包时不加标记，标记由 _release 统一追加
+        self._packing = ChunkProfile(
+            profile.budget, profile.unit, '', profile.section_pattern, profile.isolate_sections
+        )
+        self._window: List[str] = []
+        self._window_size = 0
+        self._start_line = 0     # 窗口中尚未产出内容的起始行
+        self._held: Optional[str] = None
+        self.count = 0
+
+    def feed(self, text: str) -> List[str]:
+        """喂入一节文本，返回已确定的消息块"""
+        # 空节也要保留：拼接后的空行会影响段落划分
+        self._window.append(text)
+        self._window_size += self.profile.measure(text) + 1
+        # 整篇不超过上限时 chunk_markdown 原样返回单块，因此按 max_size（而非扣除标记后的 budget）判断
+        if self._window_size <= self.profile.max_size:
+            return []
+
+        doc = MarkdownDocument('\n'.join(self._window))
+        tree = doc.tree(self._packing.section_pattern)
+        # 窗口中最后一个顶层分节可能在下一节中延续（节末不一定是分隔线），涉及它的打包决定尚未确定：
+        # 只产出完全位于其之前的块；其中最后一块仍可能并入该分节，与之一起留在窗口
+        open_start = tree[-1][0]
+        pieces = doc._layout(self._packing, self._start_line)
+        layout = [piece for piece, last_line in pieces if last_line < open_start]
+        resume = open_start
+        if len(layout) < len(pieces):
+            # 跨入该分节的块（当时正在打包的块）整体留待续打包
+            piece, last_line = pieces[len(layout)]
+            resume = min(resume, last_line if isinstance(piece, str) else piece[0])
+        if layout and not isinstance(layout[-1], str):
+            # 单行硬切的片段各自成块、不会再并入后续内容；行区间块则可能继续并入
+            resume = min(resume, layout.pop()[0])
+
+        # 保留 resume 所在顶层分节起的原始文本，续打包时分节树与整篇报告一致
+        window_start = max((a for a, _, _ in tree if a <= resume), default=0)
+        tail = doc.span_text(window_start, len(doc.lines))
+        self._window = [tail]
+        self._window_size = self.profile.measure(tail) + 1
+        self._start_line = resume - window_start
+        released = []
+        for piece in layout:
+            chunk = (piece if isinstance(piece, str) else doc.span_text(*piece)).strip()
+            if chunk:
+                released.extend(self._release(chunk))
+        return released
+
+    def close(self) -> List[str]:
+        """结束输入，返回剩余消息块（最后一块带实际总数）"""
+        fed = bool(self._window)
+        content = '\n'.join(self._window)
+        start_line = self._start_line
+        self._window, self._window_size, self._start_line = [], 0, 0
+        if self.count == 0 and fed and self.profile.measure(content) <= self.profile.max_size:
+            # 未超出上限：与 chunk_markdown 一致，原样返回单块、不加标记
+            return [content]
+        released = []
+        if content.strip():
+            doc = MarkdownDocument(content)
+            for piece, _ in doc._layout(self._packing, start_line):
+                chunk = (piece if isinstance(piece, str) else doc.span_text(*piece)).strip()
+                if chunk:
+                    released.extend(self._release(chunk))
+        if self._held is not None:
+            total = self.count
+            if total > 1 and self.profile.marker:
+                released.append(self._held + self.profile.marker.format(index=total, total=total))
+            else:
+                released.append(self._held)
+            self._held = None
+        return released
+
+    def _release(self, chunk: str) -> List[str]:
+        """暂存新块，放出上一块（此时已知不止一块，可加标记）"""
+        previous, self._held = self._held, chunk
+        self.count += 1
+        if previous is None:
+            return []
+        if self.profile.marker:
+            previous += self.profile.marker.format(index=self.count - 1, total=self.PENDING_TOTAL)
+        return [previous]
+
+
+def split_text(text: str, limit: int, unit: str = UNIT_BYTES) -> List[str]:
+    """按长度硬切文本（字节模式下不在多字节字符中间断开）"""
+    if unit == UNIT_CHARS:
+        return [text[i:i + limit] for i in range(0, len(text), limit)]
+
+    encoded = text.encode('utf-8')
+    parts = []
+    start = 0
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # 回退到字符边界（UTF-8 续字节形如 10xxxxxx）
+        while end < len(encoded) and end > start and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        if end == start:
+            end = min(start + limit, len(encoded))
+        parts.append(encoded[start:end].decode('utf-8', errors='ignore'))
+        start = end
+    return parts
+
+
+@lru_cache(maxsize=16)
+def parse_markdown(content: str) -> MarkdownDocument:
+    """解析报告（同一内容只解析一次，多渠道共享）"""
+    return MarkdownDocument(content)
+
+
+def chunk_markdown(content: str, profile: ChunkProfile) -> List[str]:
+    """
+    按规格切分消息
+
+    未超出上限时原样返回单块（不加分页标记），否则解析为分节树后打包。
+    """
+    if profile.measure(content) <= profile.max_size:
+        return [content]
+    return parse_markdown(content).pack(profile)
+
+
+def truncate_text(text: str, limit: int, unit: str = UNIT_BYTES) -> str:
+    """截断到指定长度（字节模式下不在多字节字符中间断开）"""
+    if unit == UNIT_CHARS:
+        return text[:limit]
+    encoded = text.encode('utf-8')
+    if len(encoded) <= limit:
+        return text
+    return encoded[:limit].decode('utf-8', errors='ignore')
+
+
+if __name__ == "__main__":
+    import time
+
+    block = "### 🟢 贵州茅台(600519)\n\n**操作建议**: 持有\n\n" + "技术面分析内容。" * 60
+    report = "# 📊 决策仪表盘\n\n" + "\n---\n".join(block for _ in range(500))
+
+    start = time.perf_counter()
+    profiles = [
+        ChunkProfile(4000, marker="\n\n📄 *({index}/{total})*"),
+        ChunkProfile(20000, marker="\n\n📄 ({index}/{total})"),
+        ChunkProfile(4096, unit=UNIT_CHARS),
+    ]
+    for profile in profiles:
+        chunks = chunk_markdown(report, profile)
+        largest = max(profile.measure(c) for c in chunks)
+        print(f"上限 {profile.max_size} {profile.unit}: {len(chunks)} 块，最大 {largest}")
+    print(f"耗时 {(time.perf_counter() - start) * 1000:.1f}ms（报告 {len(report.encode('utf-8'))} 字节）")
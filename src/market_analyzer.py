@@ -8,21 +8,22 @@
 1. 获取大盘指数数据（上证、深证、创业板）
 2. 搜索市场新闻形成复盘情报
 3. 使用大模型生成每日大盘复盘报告
+4. 记录每日市场宽度，复盘时附带近几日宽度趋势
 """
 
 import logging
-import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, Dict, Any, List
-
-import akshare as ak
-import pandas as pd
-import yfinance as yf
+from typing import Optional, Dict, Any, List, TYPE_CHECKING
 
+from src import telemetry
 from src.config import get_config
 from src.search_service import SearchService
 
+if TYPE_CHECKING:
+    from src.market_breadth import MarketBreadth
+
 logger = logging.getLogger(__name__)
 
 
@@ -75,6 +76,10 @@ class MarketOverview:
     top_sectors: List[Dict] = field(default_factory=list)     # 涨幅前5板块
     bottom_sectors: List[Dict] = field(default_factory=list)  # 跌幅前5板块
 
+    # 市场宽度（分板块涨跌停、涨跌幅 / 换手率分布）与近几日宽度记录
+    breadth: Optional['MarketBreadth'] = None
+    breadth_history: List[Dict] = field(default_factory=list)
+
 
 class MarketAnalyzer:
     """
@@ -97,6 +102,9 @@ class MarketAnalyzer:
         'sh000016': '上证50',
         'sh000300': '沪深300',
     }
+
+    # 复盘附带的宽度趋势天数（不含当日）
+    BREADTH_TREND_DAYS = 5
     
     def __init__(self, search_service: Optional[SearchService] = None, analyzer=None):
         """
@@ -114,211 +122,138 @@ class MarketAnalyzer:
         """
         获取市场概览数据
         
+        指数行情（新浪 / Yahoo）与涨跌统计、板块榜（东方财富）来自不同主机，
+        指数在后台线程拉取，与后两者并行。
+        
         Returns:
             MarketOverview: 市场概览数据对象
         """
         today = datetime.now().strftime('%Y-%m-%d')
         overview = MarketOverview(date=today)
         
-        # 1. 获取主要指数行情
-        overview.indices = self._get_main_indices()
-        
-        # 2. 获取涨跌统计
-        self._get_market_statistics(overview)
-        
-        # 3. 获取板块涨跌榜
-        self._get_sector_rankings(overview)
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="market_indices") as executor:
+            # 1. 获取主要指数行情（后台线程绑定当前运行的遥测）
+            run_telemetry = telemetry.current()
+            indices_future = executor.submit(
+                run_telemetry.bind(self._get_main_indices) if run_telemetry else self._get_main_indices
+            )
+            
+            # 2. 获取涨跌统计
+            self._get_market_statistics(overview)
+            
+            # 3. 获取板块涨跌榜
+            self._get_sector_rankings(overview)
+            
+            overview.indices = indices_future.result()
         
         # 4. 获取北向资金（可选）
         # self._get_north_flow(overview)
         
         return overview
-
-    def _call_akshare_with_retry(self, fn, name: str, attempts: int = 2):
-        last_error: Optional[Exception] = None
-        for attempt in range(1, attempts + 1):
-            try:
-                return fn()
-            except Exception as e:
-                last_error = e
-                logger.warning(f"[大盘] {name} 获取失败 (attempt {attempt}/{attempts}): {e}")
-                if attempt < attempts:
-                    time.sleep(min(2 ** attempt, 5))
-        logger.error(f"[大盘] {name} 最终失败: {last_error}")
-        return None
     
     def _get_main_indices(self) -> List[MarketIndex]:
-        """获取主要指数实时行情"""
+        """获取主要指数实时行情（指数快照服务：新浪一次取全部，失败时 yfinance 批量下载兜底）"""
         indices = []
         
         try:
             logger.info("[大盘] 获取主要指数实时行情...")
             
-            # 使用 akshare 获取指数行情（新浪财经接口，包含深市指数）
-            df = self._call_akshare_with_retry(ak.stock_zh_index_spot_sina, "指数行情", attempts=2)
+            from data_provider.index_snapshot import get_index_snapshot_service
+            snapshot = get_index_snapshot_service().get(list(self.MAIN_INDICES))
             
-            if df is not None and not df.empty:
+            if snapshot is not None:
                 for code, name in self.MAIN_INDICES.items():
-                    # 查找对应指数
-                    row = df[df['代码'] == code]
-                    if row.empty:
-                        # 尝试带前缀查找
-                        row = df[df['代码'].str.contains(code)]
-                    
-                    if not row.empty:
-                        row = row.iloc[0]
-                        index = MarketIndex(
-                            code=code,
-                            name=name,
-                            current=float(row.get('最新价', 0) or 0),
-                            change=float(row.get('涨跌额', 0) or 0),
-                            change_pct=float(row.get('涨跌幅', 0) or 0),
-                            open=float(row.get('今开', 0) or 0),
-                            high=float(row.get('最高', 0) or 0),
-                            low=float(row.get('最低', 0) or 0),
-                            prev_close=float(row.get('昨收', 0) or 0),
-                            volume=float(row.get('成交量', 0) or 0),
-                            amount=float(row.get('成交额', 0) or 0),
-                        )
-                        # 计算振幅
-                        if index.prev_close > 0:
-                            index.amplitude = (index.high - index.low) / index.prev_close * 100
-                        indices.append(index)
-
-            # 如果 akshare 获取失败或为空，尝试使用 yfinance 兜底
-            if not indices:
-                logger.warning("[大盘] 国内源获取失败，尝试使用 Yfinance 兜底...")
-                indices = self._get_indices_from_yfinance()
-
-            logger.info(f"[大盘] 获取到 {len(indices)} 个指数行情")
-
-        except Exception as e:
-            logger.error(f"[大盘] 获取指数行情失败: {e}")
-            # 异常时也尝试兜底
-            if not indices:
-                indices = self._get_indices_from_yfinance()
-
-        return indices
-
-    def _get_indices_from_yfinance(self) -> List[MarketIndex]:
-        """从 Yahoo Finance 获取指数行情（兜底方案）"""
-        indices = []
-        # 映射关系：akshare代码 -> yfinance代码
-        yf_mapping = {
-            'sh000001': ('000001.SS', '上证指数'),
-            'sz399001': ('399001.SZ', '深证成指'),
-            'sz399006': ('399006.SZ', '创业板指'),
-            'sh000688': ('000688.SS', '科创50'),
-            'sh000016': ('000016.SS', '上证50'),
-            'sh000300': ('000300.SS', '沪深300'),
-        }
-
-        try:
-            for ak_code, (yf_code, name) in yf_mapping.items():
-                if ak_code not in self.MAIN_INDICES:
-                    continue
-
-                ticker = yf.Ticker(yf_code)
-                try:
-                    hist = ticker.history(period='2d')
-                    if hist.empty:
+                    quote = snapshot.get(code)
+                    if quote is None:
                         continue
-
-                    today = hist.iloc[-1]
-                    prev = hist.iloc[-2] if len(hist) > 1 else today
-
-                    price = float(today['Close'])
-                    prev_close = float(prev['Close'])
-                    change = price - prev_close
-                    change_pct = (change / prev_close) * 100 if prev_close else 0
-
-                    index = MarketIndex(
-                        code=ak_code,
-                        name=name,
-                        current=price,
-                        change=change,
-                        change_pct=change_pct,
-                        open=float(today['Open']),
-                        high=float(today['High']),
-                        low=float(today['Low']),
-                        prev_close=prev_close,
-                        volume=float(today['Volume']),
-                        amount=0.0
-                    )
+                    index = MarketIndex(code=code, name=name, **quote)
+                    # 计算振幅
+                    if index.prev_close > 0:
+                        index.amplitude = (index.high - index.low) / index.prev_close * 100
                     indices.append(index)
-                    logger.info(f"[大盘] Yfinance 成功获取: {name}")
-                except Exception as e:
-                    logger.debug(f"[大盘] Yfinance 获取 {name} 失败: {e}")
-
+                
+                logger.info(f"[大盘] 获取到 {len(indices)} 个指数行情（来源 {snapshot.source}，"
+                            f"{snapshot.age:.0f}s 前）")
+            else:
+                logger.warning("[大盘] 新浪与 Yfinance 指数行情均不可用")
+            
         except Exception as e:
-            logger.error(f"[大盘] Yfinance 兜底失败: {e}")
-
+            logger.error(f"[大盘] 获取指数行情失败: {e}")
+        
         return indices
     
     def _get_market_statistics(self, overview: MarketOverview):
-        """获取市场涨跌统计"""
+        """获取市场涨跌统计（复用会话内的全市场行情快照，个股阶段已拉取时不再请求）"""
         try:
             logger.info("[大盘] 获取市场涨跌统计...")
             
-            # 获取全部A股实时行情
-            df = self._call_akshare_with_retry(ak.stock_zh_a_spot_em, "A股实时行情", attempts=2)
+            from data_provider.market_snapshot import get_market_snapshot_service
+            snapshot = get_market_snapshot_service().get()
+            if snapshot is None:
+                logger.warning("[大盘] 全市场行情不可用，跳过涨跌统计")
+                return
             
-            if df is not None and not df.empty:
-                # 涨跌统计
-                change_col = '涨跌幅'
-                if change_col in df.columns:
-                    df[change_col] = pd.to_numeric(df[change_col], errors='coerce')
-                    overview.up_count = len(df[df[change_col] > 0])
-                    overview.down_count = len(df[df[change_col] < 0])
-                    overview.flat_count = len(df[df[change_col] == 0])
-                    
-                    # 涨停跌停统计（涨跌幅 >= 9.9% 或 <= -9.9%）
-                    overview.limit_up_count = len(df[df[change_col] >= 9.9])
-                    overview.limit_down_count = len(df[df[change_col] <= -9.9])
-                
-                # 两市成交额
-                amount_col = '成交额'
-                if amount_col in df.columns:
-                    df[amount_col] = pd.to_numeric(df[amount_col], errors='coerce')
-                    overview.total_amount = df[amount_col].sum() / 1e8  # 转为亿元
-                
-                logger.info(f"[大盘] 涨:{overview.up_count} 跌:{overview.down_count} 平:{overview.flat_count} "
-                          f"涨停:{overview.limit_up_count} 跌停:{overview.limit_down_count} "
-                          f"成交额:{overview.total_amount:.0f}亿")
+            breadth = snapshot.breadth()
+            overview.breadth = breadth
+            overview.up_count = breadth.up_count
+            overview.down_count = breadth.down_count
+            overview.flat_count = breadth.flat_count
+            overview.limit_up_count = breadth.limit_up_count
+            overview.limit_down_count = breadth.limit_down_count
+            overview.total_amount = breadth.total_amount
+            
+            logger.info(f"[大盘] 涨:{overview.up_count} 跌:{overview.down_count} 平:{overview.flat_count} "
+                      f"涨停:{overview.limit_up_count} 跌停:{overview.limit_down_count} "
+                      f"成交额:{overview.total_amount:.0f}亿（快照来源 {snapshot.source}，"
+                      f"{snapshot.age:.0f}s 前）")
+            
+            self._record_breadth(overview, breadth, snapshot.source)
                 
         except Exception as e:
             logger.error(f"[大盘] 获取涨跌统计失败: {e}")
     
+    def _record_breadth(self, overview: MarketOverview, breadth: 'MarketBreadth', source: str):
+        """
+        保存市场宽度，并读取此前几个交易日的记录作为趋势（失败不影响复盘）
+
+        按已收盘的最近交易日入库：周末 / 节假日复盘时快照即该交易日收盘数据；
+        交易日盘中复盘时快照尚未收盘，不入库，只读取趋势。
+        """
+        try:
+            from data_provider.trading_calendar import get_trading_calendar
+            from src.storage import get_db
+            db = get_db()
+            calendar = get_trading_calendar()
+            now = datetime.now()
+            trade_date = calendar.latest_closed_session(now)
+            if calendar.latest_trading_day(now.date()) == trade_date:
+                db.save_market_breadth(breadth, trade_date=trade_date, data_source=source)
+            else:
+                logger.info("[大盘] 盘中复盘，市场宽度不入库")
+                trade_date = now.date()
+            overview.breadth_history = db.get_market_breadth_history(
+                days=self.BREADTH_TREND_DAYS, before=trade_date
+            )
+        except Exception as e:
+            logger.warning(f"[大盘] 市场宽度记录失败: {e}")
+    
     def _get_sector_rankings(self, overview: MarketOverview):
         """获取板块涨跌榜"""
         try:
             logger.info("[大盘] 获取板块涨跌榜...")
             
-            # 获取行业板块行情
-            df = self._call_akshare_with_retry(ak.stock_board_industry_name_em, "行业板块行情", attempts=2)
+            # 获取行业板块行情（会话内只拉取一次）
+            from data_provider.market_snapshot import get_market_snapshot_service
+            from src.market_breadth import sector_heatmap
+            heatmap = sector_heatmap(get_market_snapshot_service().sectors())
             
-            if df is not None and not df.empty:
-                change_col = '涨跌幅'
-                if change_col in df.columns:
-                    df[change_col] = pd.to_numeric(df[change_col], errors='coerce')
-                    df = df.dropna(subset=[change_col])
-                    
-                    # 涨幅前5
-                    top = df.nlargest(5, change_col)
-                    overview.top_sectors = [
-                        {'name': row['板块名称'], 'change_pct': row[change_col]}
-                        for _, row in top.iterrows()
-                    ]
-                    
-                    # 跌幅前5
-                    bottom = df.nsmallest(5, change_col)
-                    overview.bottom_sectors = [
-                        {'name': row['板块名称'], 'change_pct': row[change_col]}
-                        for _, row in bottom.iterrows()
-                    ]
-                    
-                    logger.info(f"[大盘] 领涨板块: {[s['name'] for s in overview.top_sectors]}")
-                    logger.info(f"[大盘] 领跌板块: {[s['name'] for s in overview.bottom_sectors]}")
+            if heatmap:
+                # 涨幅前5 / 跌幅前5（热力图已按涨跌幅降序）
+                overview.top_sectors = [s.to_dict() for s in heatmap[:5]]
+                overview.bottom_sectors = [s.to_dict() for s in heatmap[::-1][:5]]
+                
+                logger.info(f"[大盘] 领涨板块: {[s['name'] for s in overview.top_sectors]}")
+                logger.info(f"[大盘] 领跌板块: {[s['name'] for s in overview.bottom_sectors]}")
                     
         except Exception as e:
             logger.error(f"[大盘] 获取板块涨跌榜失败: {e}")
@@ -449,6 +384,9 @@ class MarketAnalyzer:
         top_sectors_text = ", ".join([f"{s['name']}({s['change_pct']:+.2f}%)" for s in overview.top_sectors[:3]])
         bottom_sectors_text = ", ".join([f"{s['name']}({s['change_pct']:+.2f}%)" for s in overview.bottom_sectors[:3]])
         
+        breadth_text = self._format_breadth(overview)
+        trend_text = self._format_breadth_trend(overview)
+        
         # 新闻信息 - 支持 SearchResult 对象或字典
         news_text = ""
         for i, n in enumerate(news[:6], 1):
@@ -484,7 +422,8 @@ class MarketAnalyzer:
 - 涨停: {overview.limit_up_count} 家 | 跌停: {overview.limit_down_count} 家
 - 两市成交额: {overview.total_amount:.0f} 亿元
 - 北向资金: {overview.north_flow:+.2f} 亿元
-
+{breadth_text}
+{f"{chr(10)}## 近期市场宽度（含今日）{chr(10)}{trend_text}{chr(10)}" if trend_text else ""}
 ## 板块表现
 领涨: {top_sectors_text if top_sectors_text else "暂无数据"}
 领跌: {bottom_sectors_text if bottom_sectors_text else "暂无数据"}
@@ -507,7 +446,7 @@ class MarketAnalyzer:
 （分析上证、深证、创业板等各指数走势特点）
 
 ### 三、资金动向
-（解读成交额和北向资金流向的含义）
+（解读成交额和北向资金流向的含义，结合近期市场宽度变化判断赚钱效应）
 
 ### 四、热点解读
 （分析领涨领跌板块背后的逻辑和驱动因素）
@@ -550,6 +489,7 @@ class MarketAnalyzer:
         # 板块信息
         top_text = "、".join([s['name'] for s in overview.top_sectors[:3]])
         bottom_text = "、".join([s['name'] for s in overview.bottom_sectors[:3]])
+        trend_text = self._format_breadth_trend(overview)
         
         report = f"""## 📊 {overview.date} 大盘复盘
 
@@ -568,7 +508,7 @@ class MarketAnalyzer:
 | 跌停 | {overview.limit_down_count} |
 | 两市成交额 | {overview.total_amount:.0f}亿 |
 | 北向资金 | {overview.north_flow:+.2f}亿 |
-
+{f"{chr(10)}**近期市场宽度**{chr(10)}{chr(10)}{trend_text}{chr(10)}" if trend_text else ""}
 ### 四、板块表现
 - **领涨**: {top_text}
 - **领跌**: {bottom_text}
@@ -581,6 +521,48 @@ class MarketAnalyzer:
 """
         return report
     
+    @staticmethod
+    def _format_breadth(overview: MarketOverview) -> str:
+        """分板块涨跌停与涨跌幅 / 换手率分布（Prompt 用，无宽度数据时为空）"""
+        breadth = overview.breadth
+        if breadth is None:
+            return ""
+        lines = []
+        boards = breadth.format_boards()
+        if boards:
+            lines.append(f"- 分板块涨跌停: {boards}")
+        lines.append(f"- 涨跌幅中位数: {breadth.median_change:+.2f}%")
+        if breadth.change_distribution:
+            lines.append(f"- 涨跌幅分布: {breadth.format_distribution(breadth.change_distribution)}")
+        if breadth.turnover_distribution:
+            lines.append(f"- 换手率分布: {breadth.format_distribution(breadth.turnover_distribution)}")
+        return "\n".join(lines)
+    
+    @staticmethod
+    def _format_breadth_trend(overview: MarketOverview) -> str:
+        """近几日市场宽度表格（历史记录 + 今日，不足两日时为空）"""
+        rows = list(overview.breadth_history)
+        if not rows:
+            return ""
+        rows.append({
+            'date': overview.date,
+            'up_count': overview.up_count,
+            'down_count': overview.down_count,
+            'limit_up_count': overview.limit_up_count,
+            'limit_down_count': overview.limit_down_count,
+            'total_amount': overview.total_amount,
+        })
+        lines = [
+            "| 日期 | 上涨 | 下跌 | 涨停 | 跌停 | 成交额(亿) |",
+            "|------|------|------|------|------|------------|",
+        ]
+        for row in rows:
+            lines.append(
+                f"| {row['date']} | {row['up_count']} | {row['down_count']} | "
+                f"{row['limit_up_count']} | {row['limit_down_count']} | {row['total_amount'] or 0:.0f} |"
+            )
+        return "\n".join(lines)
+    
     def run_daily_review(self) -> str:
         """
         执行每日大盘复盘流程
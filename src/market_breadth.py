@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 市场宽度分析
+===================================
+
+职责：
+1. 对全市场行情快照做一次 NumPy 向量化计算，得到涨跌家数、涨跌幅分布、
+   分板块（主板 / 创业板 / 科创板 / 北交所）涨跌停家数、换手率分布与成交额
+2. 按板块使用各自的涨跌停幅度（主板 10%、创业板 / 科创板 20%、北交所 30%，
+   ST 与所在板块相同），以昨收计算涨跌停价判定，避免统一按 9.9% 误判
+3. 对行业板块行情表向量化生成板块热力图（涨跌幅、板块内上涨占比、领涨股）
+
+每日宽度统计写入 market_breadth_daily 表（见 src/storage.py），
+复盘时直接读取近几日记录形成趋势，不额外请求接口。
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 板块标识
+BOARD_MAIN = 'main'
+BOARD_CHINEXT = 'chinext'
+BOARD_STAR = 'star'
+BOARD_BJ = 'bj'
+
+BOARDS = (BOARD_MAIN, BOARD_CHINEXT, BOARD_STAR, BOARD_BJ)
+
+BOARD_NAMES = {
+    BOARD_MAIN: '主板',
+    BOARD_CHINEXT: '创业板',
+    BOARD_STAR: '科创板',
+    BOARD_BJ: '北交所',
+}
+
+# 各板块涨跌停幅度（%）；2025-07-07 起主板 ST 由 5% 调整为 10%，各板块 ST 均与所在板块相同
+BOARD_LIMITS = {
+    BOARD_MAIN: 10.0,
+    BOARD_CHINEXT: 20.0,
+    BOARD_STAR: 20.0,
+    BOARD_BJ: 30.0,
+}
+
+# 没有昨收时按涨跌幅判定，允许的舍入误差（百分点）
+LIMIT_PCT_TOLERANCE = 0.1
+
+# 涨跌幅分布区间边界（%），平盘单独成桶
+CHANGE_EDGES = (-7.0, -5.0, -3.0, -1.0, 0.0, 1.0, 3.0, 5.0, 7.0)
+CHANGE_LABELS = (
+    '<-7%', '-7~-5%', '-5~-3%', '-3~-1%', '-1~0%', '平盘',
+    '0~1%', '1~3%', '3~5%', '5~7%', '>7%',
+)
+_FLAT_BUCKET = CHANGE_LABELS.index('平盘')
+
+# 换手率分布区间边界（%）
+TURNOVER_EDGES = (1.0, 3.0, 5.0, 10.0, 20.0)
+TURNOVER_LABELS = ('<1%', '1~3%', '3~5%', '5~10%', '10~20%', '>20%')
+
+
+@dataclass
+class BoardBreadth:
+    """单个板块的涨跌停统计"""
+    count: int = 0
+    up_count: int = 0
+    down_count: int = 0
+    limit_up_count: int = 0
+    limit_down_count: int = 0
+
+
+@dataclass
+class MarketBreadth:
+    """全市场宽度统计"""
+    up_count: int = 0
+    down_count: int = 0
+    flat_count: int = 0
+    limit_up_count: int = 0
+    limit_down_count: int = 0
+    total_amount: float = 0.0                   # 两市成交额（亿元）
+    median_change: float = 0.0                  # 涨跌幅中位数（%）
+    boards: Dict[str, BoardBreadth] = field(default_factory=dict)
+    change_distribution: Dict[str, int] = field(default_factory=dict)
+    turnover_distribution: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def advance_ratio(self) -> float:
+        """上涨家数占涨跌家数之比（0~1）"""
+        total = self.up_count + self.down_count
+        return self.up_count / total if total else 0.0
+
+    def format_boards(self) -> str:
+        """分板块涨跌停，如 "主板 涨停58/跌停3，创业板 涨停12/跌停1" """
+        parts = []
+        for board in BOARDS:
+            stats = self.boards.get(board)
+            if stats and stats.count:
+                parts.append(
+                    f"{BOARD_NAMES[board]} 涨停{stats.limit_up_count}/跌停{stats.limit_down_count}"
+                )
+        return "，".join(parts)
+
+    @staticmethod
+    def format_distribution(distribution: Dict[str, int]) -> str:
+        return " | ".join(f"{label}: {count}" for label, count in distribution.items())
+
+
+@dataclass
+class SectorHeat:
+    """板块热力图中的一格"""
+    name: str
+    change_pct: float
+    up_count: int = 0
+    down_count: int = 0
+    leader: str = ''
+
+    @property
+    def advance_ratio(self) -> float:
+        total = self.up_count + self.down_count
+        return self.up_count / total if total else 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'change_pct': self.change_pct,
+            'up_count': self.up_count,
+            'down_count': self.down_count,
+            'leader': self.leader,
+        }
+
+
+def _column(frame, name: str, dtype=float) -> Optional[np.ndarray]:
+    if name not in frame.columns:
+        return None
+    if dtype is float:
+        return frame[name].to_numpy(dtype=float, na_value=np.nan)
+    return frame[name].astype(str).to_numpy()
+
+
+def classify_boards(codes: np.ndarray) -> np.ndarray:
+    """按代码前缀划分板块（主板 / 创业板 / 科创板 / 北交所）"""
+    codes = codes.astype(str)
+    boards = np.full(codes.shape, BOARD_MAIN, dtype=object)
+    boards[np.char.startswith(codes, '30')] = BOARD_CHINEXT
+    boards[np.char.startswith(codes, '68')] = BOARD_STAR
+    is_bj = (
+        np.char.startswith(codes, '8')
+        | np.char.startswith(codes, '4')
+        | np.char.startswith(codes, '92')
+    )
+    boards[is_bj] = BOARD_BJ
+    return boards
+
+
+def limit_percents(boards: np.ndarray, names: Optional[np.ndarray]) -> np.ndarray:
+    """每只股票的涨跌停幅度（%）；上市首日（名称以 N / C 开头）无涨跌幅限制，返回 NaN"""
+    limits = np.full(boards.shape, BOARD_LIMITS[BOARD_MAIN])
+    for board in (BOARD_CHINEXT, BOARD_STAR, BOARD_BJ):
+        limits[boards == board] = BOARD_LIMITS[board]
+    if names is not None:
+        names = names.astype(str)
+        is_new = np.char.startswith(names, 'N') | np.char.startswith(names, 'C')
+        limits[is_new] = np.nan
+    return limits
+
+
+def _round_price(values: np.ndarray) -> np.ndarray:
+    """按四舍五入保留两位小数（交易所规则，np.round 为银行家舍入）"""
+    return np.floor(values * 100 + 0.5) / 100
+
+
+def compute_breadth(frame) -> MarketBreadth:
+    """
+    一次向量化计算全市场宽度
+
+    Args:
+        frame: 统一列名的全市场行情表（见 data_provider/market_snapshot.py 的 SNAPSHOT_COLUMNS）
+    """
+    result = MarketBreadth()
+    if frame is None or frame.empty or 'change_pct' not in frame.columns:
+        return result
+
+    change = _column(frame, 'change_pct')
+    valid = ~np.isnan(change)
+    codes = _column(frame, 'code', dtype=str)
+    if codes is None:
+        codes = frame.index.astype(str).to_numpy()
+    names = _column(frame, 'name', dtype=str)
+
+    up = valid & (change > 0)
+    down = valid & (change < 0)
+    result.up_count = int(up.sum())
+    result.down_count = int(down.sum())
+    result.flat_count = int((valid & (change == 0)).sum())
+    if valid.any():
+        result.median_change = float(np.median(change[valid]))
+
+    # 涨跌停：有昨收和现价时比较涨跌停价，否则按涨跌幅容差判定
+    boards = classify_boards(codes)
+    limits = limit_percents(boards, names)
+    limit_up = valid & (change >= limits - LIMIT_PCT_TOLERANCE)
+    limit_down = valid & (change <= -limits + LIMIT_PCT_TOLERANCE)
+    price = _column(frame, 'price')
+    pre_close = _column(frame, 'pre_close')
+    if price is not None and pre_close is not None:
+        priced = valid & (pre_close > 0) & (price > 0)
+        up_price = _round_price(pre_close * (1 + limits / 100))
+        down_price = _round_price(pre_close * (1 - limits / 100))
+        limit_up = np.where(priced, price >= up_price - 0.005, limit_up)
+        limit_down = np.where(priced, price <= down_price + 0.005, limit_down)
+    limit_up &= up
+    limit_down &= down
+    result.limit_up_count = int(limit_up.sum())
+    result.limit_down_count = int(limit_down.sum())
+
+    for board in BOARDS:
+        mask = boards == board
+        result.boards[board] = BoardBreadth(
+            count=int(mask.sum()),
+            up_count=int((mask & up).sum()),
+            down_count=int((mask & down).sum()),
+            limit_up_count=int((mask & limit_up).sum()),
+            limit_down_count=int((mask & limit_down).sum()),
+        )
+
+    # 涨跌幅分布：平盘单独成桶，其余按区间归入
+    buckets = np.digitize(change[valid], CHANGE_EDGES)
+    buckets = np.where(buckets >= _FLAT_BUCKET, buckets + 1, buckets)
+    buckets[change[valid] == 0] = _FLAT_BUCKET
+    counts = np.bincount(buckets, minlength=len(CHANGE_LABELS))
+    result.change_distribution = dict(zip(CHANGE_LABELS, counts.tolist()))
+
+    turnover = _column(frame, 'turnover_rate')
+    if turnover is not None:
+        turnover = turnover[~np.isnan(turnover)]
+        counts = np.bincount(np.digitize(turnover, TURNOVER_EDGES), minlength=len(TURNOVER_LABELS))
+        result.turnover_distribution = dict(zip(TURNOVER_LABELS, counts.tolist()))
+
+    amount = _column(frame, 'amount')
+    if amount is not None:
+        result.total_amount = float(np.nansum(amount)) / 1e8
+
+    return result
+
+
+def sector_heatmap(frame) -> List[SectorHeat]:
+    """
+    行业板块热力图（按涨跌幅降序）
+
+    Args:
+        frame: 东财行业板块行情表（ak.stock_board_industry_name_em）
+    """
+    if frame is None or frame.empty or '板块名称' not in frame.columns or '涨跌幅' not in frame.columns:
+        return []
+    change = _column(frame, '涨跌幅')
+    valid = ~np.isnan(change)
+    names = _column(frame, '板块名称', dtype=str)[valid]
+    change = change[valid]
+    up = _column(frame, '上涨家数')
+    down = _column(frame, '下跌家数')
+    leaders = _column(frame, '领涨股票', dtype=str)
+    up = np.zeros(len(change)) if up is None else np.nan_to_num(up[valid])
+    down = np.zeros(len(change)) if down is None else np.nan_to_num(down[valid])
+    leaders = np.full(len(change), '') if leaders is None else leaders[valid]
+
+    order = np.argsort(-change, kind='stable')
+    return [
+        SectorHeat(name=name, change_pct=round(float(pct), 2), up_count=int(u), down_count=int(d), leader=leader)
+        for name, pct, u, d, leader in zip(
+            names[order].tolist(), change[order].tolist(), up[order].tolist(),
+            down[order].tolist(), leaders[order].tolist(),
+        )
+    ]
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    demo = pd.DataFrame({
+        'code': ['600000', '600001', '300001', '688001', '830001', '000001', '600002'],
+        'name': ['浦发银行', '*ST某某', '特锐德', '华兴源创', '北交样本', '平安银行', 'N新股'],
+        'price': [11.00, 2.10, 12.00, 6.00, 13.00, 9.50, 30.0],
+        'pre_close': [10.00, 2.00, 10.00, 5.00, 10.00, 10.00, 10.0],
+        'change_pct': [10.0, 5.0, 20.0, 20.0, 30.0, -5.0, 200.0],
+        'turnover_rate': [0.5, 2.0, 15.0, 8.0, 30.0, 1.2, 70.0],
+        'amount': [1e9, 1e7, 5e8, 3e8, 1e8, 2e9, 4e9],
+    })
+    breadth = compute_breadth(demo)
+    print(breadth.format_boards())
+    print(MarketBreadth.format_distribution(breadth.change_distribution))
+    print(MarketBreadth.format_distribution(breadth.turnover_distribution))
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 资金流向本地库
+===================================
+
+职责：
+1. 按交易日批量入库全市场个股资金流向（stock_moneyflow_daily 表）：
+   首选 Tushare moneyflow(trade_date=...) 一次返回全市场，补齐最近 N 个交易日中缺失的日期；
+   无 Tushare 权限时用东方财富资金流排行补当日（仅当日收盘后；排行只有"今日"数据，
+   收盘前或非交易日不能代表任何已收盘交易日，不写入）
+2. 收盘后批量入库全市场北向持股与增持估计（stock_north_holding 表）
+3. 个股分析时从本地库汇总最近 N 日主力 / 北向资金，不再逐只请求接口和随机休眠
+
+每次运行在预取阶段同步一次（同步间隔内重复调用直接返回），见 src/core/pipeline.py。
+"""
+
+import logging
+import threading
+import time
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# A 股收盘时间：交易日该时间之前当日资金流尚未完整，不入库
+MARKET_CLOSE = dt_time(15, 30)
+
+# 同步间隔（秒）：间隔内重复调用 sync 不再检查缺失日期
+SYNC_INTERVAL = 3600
+
+
+class MoneyFlowStore:
+    """
+    资金流向本地库（单例）
+
+    使用示例:
+        store = get_moneyflow_store()
+        store.sync()                         # 批量补齐缺失交易日
+        store.get_moneyflow('600519')        # 最近交易日 + 近 5 日主力汇总
+        store.get_north_moneyflow('600519')  # 近 5 日北向资金汇总
+    """
+
+    _instance: Optional['MoneyFlowStore'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, history_days: int = 10, fetcher=None):
+        """
+        Args:
+            history_days: 同步时检查并补齐的最近交易日数（更早的历史保留不删）
+            fetcher: MoneyFlowFetcher（默认首次同步时创建）
+        """
+        self.history_days = max(history_days, 1)
+        self._fetcher = fetcher
+        self._synced_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'MoneyFlowStore':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from src.config import get_config
+                    cls._instance = cls(history_days=get_config().moneyflow_history_days)
+        return cls._instance
+
+    @property
+    def fetcher(self):
+        if self._fetcher is None:
+            from data_provider.moneyflow_fetcher import MoneyFlowFetcher
+            self._fetcher = MoneyFlowFetcher()
+        return self._fetcher
+
+    # === 交易日 ===
+
+    @staticmethod
+    def _calendar():
+        from data_provider.trading_calendar import get_trading_calendar
+        return get_trading_calendar()
+
+    def latest_session(self, now: Optional[datetime] = None) -> date:
+        """已收盘的最近交易日（交易日收盘前为上一交易日）"""
+        return self._calendar().latest_closed_session(now, ready=MARKET_CLOSE)
+
+    def window_start(self, days: int, now: Optional[datetime] = None) -> date:
+        """最近 days 个已收盘交易日中最早的一天"""
+        return self._calendar().shift_trading_days(self.latest_session(now), days)
+
+    # === 批量入库 ===
+
+    def sync(self, force: bool = False) -> int:
+        """
+        补齐最近 history_days 个交易日中缺失的全市场资金流向与北向持股
+
+        Returns:
+            本次写入的交易日数
+        """
+        with self._lock:
+            if not force and self._synced_at is not None and time.time() - self._synced_at < SYNC_INTERVAL:
+                return 0
+            self._synced_at = time.time()
+            try:
+                return self._sync_moneyflow() + self._sync_north()
+            except Exception as e:
+                logger.warning(f"[资金流库] 同步失败，使用已有数据: {e}")
+                return 0
+
+    def _sync_moneyflow(self) -> int:
+        from src.storage import get_db
+
+        db = get_db()
+        now = datetime.now()
+        latest = self.latest_session(now)
+        sessions = self._calendar().sessions_between(self.window_start(self.history_days, now), latest)
+        stored = set(db.get_moneyflow_dates(sessions[0])) if sessions else set()
+        missing = [day for day in reversed(sessions) if day not in stored]
+        if not missing:
+            return 0
+
+        saved = 0
+        if self.fetcher.has_tushare:
+            logger.info(f"[资金流库] 缺少 {len(missing)} 个交易日的全市场资金流，按日批量拉取 (tushare)...")
+            for day in missing:
+                df = self.fetcher.get_market_moneyflow(day.strftime('%Y%m%d'))
+                if df is None:
+                    break  # 无权限或接口异常，剩余日期不再尝试
+                if df.empty:
+                    logger.debug(f"[资金流库] {day} 资金流尚未更新")
+                    continue
+                db.save_moneyflow_daily(day, df.to_dict('records'), source='tushare_moneyflow')
+                stored.add(day)
+                saved += 1
+
+        # 东方财富排行只有"今日"数据：仅在今天是交易日且已收盘（latest 即今天）时入库
+        if latest not in stored and latest == now.date():
+            df = self.fetcher.get_market_moneyflow_today()
+            if df is not None and not df.empty:
+                db.save_moneyflow_daily(latest, df.to_dict('records'), source='akshare_fund_flow_rank')
+                saved += 1
+        if saved:
+            logger.info(f"[资金流库] 写入 {saved} 个交易日的全市场资金流")
+        return saved
+
+    def _sync_north(self) -> int:
+        from src.storage import get_db
+
+        db = get_db()
+        latest = self.latest_session()
+        if latest in set(db.get_north_holding_dates(latest)):
+            return 0
+        df = self.fetcher.get_market_north_holdings()
+        if df is None or df.empty:
+            return 0
+
+        # 披露日期以接口返回为准（港交所披露可能滞后于最近交易日）
+        trade_date = latest
+        if 'date' in df.columns:
+            dates = [d for d in (_to_date(v) for v in df['date'].tolist()) if d is not None]
+            if dates:
+                trade_date = max(dates)
+        if trade_date != latest and trade_date in set(db.get_north_holding_dates(trade_date)):
+            logger.debug(f"[资金流库] 北向持股最新披露日 {trade_date} 已入库")
+            return 0
+        count = db.save_north_holdings(trade_date, df.to_dict('records'), source='akshare_hsgt_hold')
+        logger.info(f"[资金流库] 写入 {trade_date} 北向持股 {count} 条")
+        return 1
+
+    # === 个股查询（只读本地库）===
+
+    @staticmethod
+    def _is_cn_stock(code: str) -> bool:
+        from data_provider.securities import lookup
+        info = lookup(code)
+        return info.market == 'cn' and not info.is_etf
+
+    def get_moneyflow(self, code: str, days: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        最近交易日的资金流向（MoneyFlowData.to_dict 字段）及近 N 日主力汇总
+
+        附加字段：days（实际天数）、main_net_inflow_total（万元）、inflow_days（主力净流入天数）
+        """
+        if not self._is_cn_stock(code):
+            return None
+        self.sync()
+
+        from data_provider.moneyflow_fetcher import FLOW_FIELDS, MoneyFlowData
+        from src.storage import get_db
+
+        rows = get_db().get_moneyflow_history(code, days, since=self.window_start(days))
+        if not rows:
+            return None
+        latest = rows[0]
+        data = MoneyFlowData(
+            code=code,
+            trade_date=latest['date'].strftime('%Y%m%d'),
+            data_source=latest.get('data_source') or 'unknown',
+            **{name: latest.get(name) for name in FLOW_FIELDS},
+        )
+        mains = [row['main_net_inflow'] for row in rows if row.get('main_net_inflow') is not None]
+        result = data.to_dict()
+        result.update({
+            'days': len(rows),
+            'main_net_inflow_total': sum(mains) if mains else None,
+            'inflow_days': sum(1 for value in mains if value > 0),
+        })
+        return result
+
+    def get_north_moneyflow(self, code: str, days: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        近 N 个交易日北向资金汇总（与 MoneyFlowFetcher.get_north_moneyflow 返回字段一致，另含持股占比）
+        """
+        if not self._is_cn_stock(code):
+            return None
+        self.sync()
+
+        from data_provider.moneyflow_fetcher import north_trend_label
+        from src.storage import get_db
+
+        rows = get_db().get_north_holding_history(code, days, since=self.window_start(days))
+        amounts = [row['net_amount'] for row in rows if row.get('net_amount') is not None]
+        if not amounts:
+            return None
+        total = sum(amounts)
+        return {
+            'code': code,
+            'days': days,
+            'total_net_amount': total,               # 单位：万元
+            'avg_net_amount': total / len(amounts),  # 单位：万元
+            'hold_ratio': rows[0].get('hold_ratio'),
+            'trend': north_trend_label(total),
+            'trade_date': rows[0]['date'].strftime('%Y%m%d'),
+            'data_source': rows[0].get('data_source') or 'unknown',
+        }
+
+
+def _to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value).replace('-', '')[:8], '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+def get_moneyflow_store() -> MoneyFlowStore:
+    """获取资金流向本地库单例"""
+    return MoneyFlowStore.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    store = get_moneyflow_store()
+    print(f"已收盘的最近交易日: {store.latest_session()}")
+    store.sync(force=True)
+    print(store.get_moneyflow('600519'))
+    print(store.get_north_moneyflow('600519'))
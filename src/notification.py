@@ -6,36 +6,44 @@ A股自选股智能分析系统 - 通知层
 
 职责：
 1. 汇总分析结果生成日报
-2. 支持 Markdown 格式输出
+2. 报告只构建一次为渠道无关的文档（report_ast），各渠道按需序列化为 Markdown / 飞书 / Telegram / HTML / 纯文本
 3. 多渠道推送（自动识别）：
    - 企业微信 Webhook
    - 飞书 Webhook
    - Telegram Bot
    - 邮件 SMTP
    - Pushover（手机/桌面推送）
+4. 多渠道并发推送：渠道节流 + 整体截止时间 + 逐渠道投递结果
 """
 
 import logging
 import json
 import smtplib
-import re
-import markdown2
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Tuple, Union
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.header import Header
 from enum import Enum
 
 import requests
-try:
-    import discord
-    discord_available = True
-except ImportError:
-    discord_available = False
 
+from src import pacing
 from src.config import get_config
 from src.analyzer import AnalysisResult
+from src.report_ast import HTML, FEISHU, MARKDOWN, PLAIN, TELEGRAM, ReportDocument, render
+from src.report_builder import ReportBuilder, get_signal_level
+from src.markdown_chunker import (
+    UNIT_CHARS,
+    ChunkProfile,
+    chunk_markdown,
+    parse_markdown,
+    truncate_text,
+)
 from bot.models import BotMessage
 
 logger = logging.getLogger(__name__)
@@ -103,6 +111,121 @@ class ChannelDetector:
         return names.get(channel, "未知渠道")
 
 
+# 同一渠道相邻两次推送的最小间隔（秒），依据各平台 Webhook 频率限制
+CHANNEL_MIN_INTERVALS: Dict[NotificationChannel, float] = {
+    NotificationChannel.WECHAT: 3.0,     # 企业微信：20 条/分钟
+    NotificationChannel.FEISHU: 0.5,     # 飞书：100 次/分钟
+    NotificationChannel.TELEGRAM: 1.0,   # Telegram：同一会话约 1 条/秒
+    NotificationChannel.EMAIL: 1.0,
+    NotificationChannel.PUSHOVER: 0.5,
+    NotificationChannel.PUSHPLUS: 1.0,
+    NotificationChannel.CUSTOM: 0.5,
+    NotificationChannel.DISCORD: 0.5,
+}
+
+# 渠道推送内容：Markdown 文本或报告文档（ReportDocument 由各渠道序列化器渲染）
+Content = Union[str, ReportDocument]
+
+# 消息上下文渠道（钉钉/飞书会话回复）在投递结果中的标识
+CONTEXT_CHANNEL_KEY = "context"
+
+# 分批发送的分页标记（见 markdown_chunker.ChunkProfile.marker）
+WECHAT_PAGE_MARKER = "\n\n📄 *({index}/{total})*"
+FEISHU_PAGE_MARKER = "\n\n📄 ({index}/{total})"
+DINGTALK_PAGE_MARKER = "\n\n📄 *({index}/{total})*"
+
+# Telegram 单条消息上限（字符）
+TELEGRAM_MAX_LENGTH = 4096
+
+# Bark 按股票分条：股票标题行（emoji + 名称 + (代码)）
+BARK_STOCK_TITLE = r'[🟢🟡🔴🟠💚❌⚪].*[\(（]\d{6}[\)）]'
+
+
+class ChannelPacer:
+    """
+    渠道节流器（进程级共享）
+
+    为每个渠道预约发送时间槽，保证相邻两次推送的间隔不小于最小间隔；
+    单股推送模式下连续调用 send()、或多个 NotificationService 实例同时推送时同样生效。
+    """
+
+    def __init__(self, intervals: Dict[NotificationChannel, float]):
+        self._intervals = dict(intervals)
+        self._next_slot: Dict[NotificationChannel, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, channel: NotificationChannel) -> float:
+        """等待直到该渠道允许发送，返回等待秒数"""
+        interval = self._intervals.get(channel, 0.0)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(channel, 0.0))
+            self._next_slot[channel] = slot + interval
+        delay = slot - now
+        pacing.pause(delay, 'push_delay', host=channel.value)
+        return delay
+
+
+_channel_pacer = ChannelPacer(CHANNEL_MIN_INTERVALS)
+
+
+@dataclass
+class ChannelDeliveryResult:
+    """单个渠道的投递结果"""
+    channel: str                    # NotificationChannel.value 或 CONTEXT_CHANNEL_KEY
+    name: str                       # 渠道中文名
+    success: bool = False
+    elapsed: float = 0.0            # 发送耗时（秒，不含节流等待）
+    waited: float = 0.0             # 节流等待（秒）
+    timed_out: bool = False         # 超过整体截止时间仍未完成
+    error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'channel': self.channel,
+            'name': self.name,
+            'success': self.success,
+            'elapsed': round(self.elapsed, 3),
+            'waited': round(self.waited, 3),
+            'timed_out': self.timed_out,
+            'error': self.error,
+        }
+
+
+@dataclass
+class DeliveryReport:
+    """一次多渠道推送的汇总结果"""
+    results: List[ChannelDeliveryResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        """是否至少有一个渠道发送成功"""
+        return any(r.success for r in self.results)
+
+    @property
+    def succeeded(self) -> List[ChannelDeliveryResult]:
+        return [r for r in self.results if r.success]
+
+    @property
+    def failed(self) -> List[ChannelDeliveryResult]:
+        return [r for r in self.results if not r.success]
+
+    def summary(self) -> str:
+        parts = []
+        for r in self.results:
+            status = "✓" if r.success else ("超时" if r.timed_out else "✗")
+            parts.append(f"{r.name}{status}({r.elapsed:.1f}s)")
+        return f"成功 {len(self.succeeded)} 个，失败 {len(self.failed)} 个，总耗时 {self.elapsed:.1f}s：" + ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'success': self.success,
+            'elapsed': round(self.elapsed, 3),
+            'results': [r.to_dict() for r in self.results],
+        }
+
+
 class NotificationService:
     """
     通知服务
@@ -302,14 +425,14 @@ class NotificationService:
             return None
         return {"chat_id": chat_id}
 
-    def send_to_context(self, content: str) -> bool:
+    def send_to_context(self, content: Content) -> bool:
         """
         向基于消息上下文的渠道发送消息（例如钉钉 Stream 会话）
         
         Args:
             content: Markdown 格式内容
         """
-        return self._send_via_source_context(content)
+        return self._send_via_source_context(render(content, MARKDOWN))
     
     def generate_daily_report(
         self,
@@ -505,29 +628,19 @@ class NotificationService:
         return "\n".join(report_lines)
     
     def _get_signal_level(self, result: AnalysisResult) -> tuple:
+        """根据操作建议获取信号等级和颜色：(信号文字, emoji, 颜色标记)"""
+        return get_signal_level(result)
+    
+    def build_report(self, results: List[AnalysisResult], report_date: Optional[str] = None) -> ReportBuilder:
         """
-        根据操作建议获取信号等级和颜色
+        构建报告（一次遍历分析结果，各视图与各渠道格式共享）
         
-        Returns:
-            (信号文字, emoji, 颜色标记)
-        """
-        advice = result.operation_advice
-        score = result.sentiment_score
-        
-        if advice in ['强烈买入'] or score >= 80:
-            return ('强烈买入', '💚', '强买')
-        elif advice in ['买入', '加仓'] or score >= 65:
-            return ('买入', '🟢', '买入')
-        elif advice in ['持有'] or 55 <= score < 65:
-            return ('持有', '🟡', '持有')
-        elif advice in ['观望'] or 45 <= score < 55:
-            return ('观望', '⚪', '观望')
-        elif advice in ['减仓'] or 35 <= score < 45:
-            return ('减仓', '🟠', '减仓')
-        elif advice in ['卖出', '强烈卖出'] or score < 35:
-            return ('卖出', '🔴', '卖出')
-        else:
-            return ('观望', '⚪', '观望')
+        使用示例:
+            builder = notifier.build_report(results)
+            report = builder.dashboard()            # ReportDocument，可直接交给 send/deliver
+            notifier.save_report_to_file(report)
+        """
+        return ReportBuilder(results, report_date)
     
     def generate_dashboard_report(
         self,
@@ -546,314 +659,7 @@ class NotificationService:
         Returns:
             Markdown 格式的决策仪表盘日报
         """
-        if report_date is None:
-            report_date = datetime.now().strftime('%Y-%m-%d')
-
-        # 按评分排序（高分在前）
-        sorted_results = sorted(results, key=lambda x: x.sentiment_score, reverse=True)
-
-        # 统计信息
-        buy_count = sum(1 for r in results if r.operation_advice in ['买入', '加仓', '强烈买入'])
-        sell_count = sum(1 for r in results if r.operation_advice in ['卖出', '减仓', '强烈卖出'])
-        hold_count = sum(1 for r in results if r.operation_advice in ['持有', '观望'])
-
-        report_lines = [
-            f"# 🎯 {report_date} 决策仪表盘",
-            "",
-            f"> 共分析 **{len(results)}** 只股票 | 🟢买入:{buy_count} 🟡观望:{hold_count} 🔴卖出:{sell_count}",
-            "",
-        ]
-
-        # === 新增：分析结果摘要 (Issue #112) ===
-        if results:
-            report_lines.extend([
-                "## 📊 分析结果摘要",
-                "",
-            ])
-            for r in sorted_results:
-                emoji = r.get_emoji()
-                # 如果有4维度评分，显示详细评分
-                if hasattr(r, 'dimensions') and r.dimensions:
-                    report_lines.append(
-                        f"{emoji} **{r.name}({r.code})**: {r.operation_advice} | "
-                        f"总分{r.sentiment_score} (💎{r.value_score} 💰{r.funding_score} 📰{r.news_score} 📈{r.trend_score})"
-                    )
-                else:
-                    report_lines.append(
-                        f"{emoji} **{r.name}({r.code})**: {r.operation_advice} | "
-                        f"评分 {r.sentiment_score} | {r.trend_prediction}"
-                    )
-            report_lines.extend([
-                "",
-                "---",
-                "",
-            ])
-
-        # 逐个股票的决策仪表盘
-        for result in sorted_results:
-            signal_text, signal_emoji, signal_tag = self._get_signal_level(result)
-            # 确保 dashboard 是字典类型（修复 'str' object has no attribute 'get' 错误）
-            dashboard = result.dashboard if hasattr(result, 'dashboard') and isinstance(result.dashboard, dict) else {}
-            
-            # 股票名称（优先使用 dashboard 或 result 中的名称）
-            stock_name = result.name if result.name and not result.name.startswith('股票') else f'股票{result.code}'
-            
-            report_lines.extend([
-                f"## {signal_emoji} {stock_name} ({result.code})",
-                "",
-            ])
-            
-            # ========== 舆情与基本面概览（放在最前面）==========
-            intel = dashboard.get('intelligence', {}) if dashboard else {}
-            if intel:
-                report_lines.extend([
-                    "### 📰 重要信息速览",
-                    "",
-                ])
-                
-                # 舆情情绪总结
-                if intel.get('sentiment_summary'):
-                    report_lines.append(f"**💭 舆情情绪**: {intel['sentiment_summary']}")
-                
-                # 业绩预期
-                if intel.get('earnings_outlook'):
-                    report_lines.append(f"**📊 业绩预期**: {intel['earnings_outlook']}")
-                
-                # 风险警报（醒目显示）
-                risk_alerts = intel.get('risk_alerts', [])
-                if risk_alerts:
-                    report_lines.append("")
-                    report_lines.append("**🚨 风险警报**:")
-                    for alert in risk_alerts:
-                        report_lines.append(f"- {alert}")
-                
-                # 利好催化
-                catalysts = intel.get('positive_catalysts', [])
-                if catalysts:
-                    report_lines.append("")
-                    report_lines.append("**✨ 利好催化**:")
-                    for cat in catalysts:
-                        report_lines.append(f"- {cat}")
-                
-                # 最新消息
-                if intel.get('latest_news'):
-                    report_lines.append("")
-                    report_lines.append(f"**📢 最新动态**: {intel['latest_news']}")
-                
-                report_lines.append("")
-            
-            # ========== 4维度评分（新增）==========
-            dimensions = result.dimensions if hasattr(result, 'dimensions') and result.dimensions else {}
-            if dimensions:
-                report_lines.extend([
-                    "### 🎯 综合评分",
-                    "",
-                    f"**总分**: {result.sentiment_score}/100 "
-                    f"(💎价值{result.value_score}×0.4 + 💰资金{result.funding_score}×0.25 "
-                    f"+ 📰消息{result.news_score}×0.25 + 📈趋势{result.trend_score}×0.1)",
-                    "",
-                ])
-                
-                # 各维度详情
-                value_dim = dimensions.get('value_investment', {})
-                funding_dim = dimensions.get('funding_flow', {})
-                news_dim = dimensions.get('news_sentiment', {})
-                trend_dim = dimensions.get('trend_analysis', {})
-                
-                report_lines.extend([
-                    "| 维度 | 评分 | 关键指标 | 总结 |",
-                    "|------|------|---------|------|",
-                    f"| 💎 价值投资面 | **{result.value_score}**/100 | "
-                    f"PE:{value_dim.get('pe_ratio', 'N/A')} PB:{value_dim.get('pb_ratio', 'N/A')} ROE:{value_dim.get('roe', 'N/A')} | "
-                    f"{value_dim.get('summary', 'N/A')} |",
-                    f"| 💰 资金面 | **{result.funding_score}**/100 | "
-                    f"{funding_dim.get('fund_trend', 'N/A')} | "
-                    f"{funding_dim.get('summary', 'N/A')} |",
-                    f"| 📰 消息面 | **{result.news_score}**/100 | "
-                    f"{news_dim.get('sentiment', 'N/A')} | "
-                    f"{news_dim.get('summary', 'N/A')} |",
-                    f"| 📈 趋势面 | **{result.trend_score}**/100 | "
-                    f"{trend_dim.get('ma_alignment', 'N/A')} | "
-                    f"{trend_dim.get('summary', 'N/A')} |",
-                    "",
-                ])
-            
-            # ========== 核心结论 ==========
-            core = dashboard.get('core_conclusion', {}) if dashboard else {}
-            one_sentence = core.get('one_sentence', result.analysis_summary)
-            time_sense = core.get('time_sensitivity', '本周内')
-            pos_advice = core.get('position_advice', {})
-            
-            report_lines.extend([
-                "### 📌 核心结论",
-                "",
-                f"**{signal_emoji} {signal_text}** | {result.trend_prediction}",
-                "",
-                f"> **一句话决策**: {one_sentence}",
-                "",
-                f"⏰ **时效性**: {time_sense}",
-                "",
-            ])
-            
-            # 持仓分类建议
-            if pos_advice:
-                report_lines.extend([
-                    "| 持仓情况 | 操作建议 |",
-                    "|---------|---------|",
-                    f"| 🆕 **空仓者** | {pos_advice.get('no_position', result.operation_advice)} |",
-                    f"| 💼 **持仓者** | {pos_advice.get('has_position', '继续持有')} |",
-                    "",
-                ])
-            
-            # ========== 数据透视 ==========
-            data_persp = dashboard.get('data_perspective', {}) if dashboard else {}
-            if data_persp:
-                trend_data = data_persp.get('trend_status', {})
-                price_data = data_persp.get('price_position', {})
-                vol_data = data_persp.get('volume_analysis', {})
-                chip_data = data_persp.get('chip_structure', {})
-                
-                report_lines.extend([
-                    "### 📊 数据透视",
-                    "",
-                ])
-                
-                # 趋势状态
-                if trend_data:
-                    is_bullish = "✅ 是" if trend_data.get('is_bullish', False) else "❌ 否"
-                    report_lines.extend([
-                        f"**均线排列**: {trend_data.get('ma_alignment', 'N/A')} | 多头排列: {is_bullish} | 趋势强度: {trend_data.get('trend_score', 'N/A')}/100",
-                        "",
-                    ])
-                
-                # 价格位置
-                if price_data:
-                    bias_status = price_data.get('bias_status', 'N/A')
-                    bias_emoji = "✅" if bias_status == "安全" else ("⚠️" if bias_status == "警戒" else "🚨")
-                    report_lines.extend([
-                        "| 价格指标 | 数值 |",
-                        "|---------|------|",
-                        f"| 当前价 | {price_data.get('current_price', 'N/A')} |",
-                        f"| MA5 | {price_data.get('ma5', 'N/A')} |",
-                        f"| MA10 | {price_data.get('ma10', 'N/A')} |",
-                        f"| MA20 | {price_data.get('ma20', 'N/A')} |",
-                        f"| 乖离率(MA5) | {price_data.get('bias_ma5', 'N/A')}% {bias_emoji}{bias_status} |",
-                        f"| 支撑位 | {price_data.get('support_level', 'N/A')} |",
-                        f"| 压力位 | {price_data.get('resistance_level', 'N/A')} |",
-                        "",
-                    ])
-                
-                # 量能分析
-                if vol_data:
-                    report_lines.extend([
-                        f"**量能**: 量比 {vol_data.get('volume_ratio', 'N/A')} ({vol_data.get('volume_status', '')}) | 换手率 {vol_data.get('turnover_rate', 'N/A')}%",
-                        f"💡 *{vol_data.get('volume_meaning', '')}*",
-                        "",
-                    ])
-                
-                # 筹码结构
-                if chip_data:
-                    chip_health = chip_data.get('chip_health', 'N/A')
-                    chip_emoji = "✅" if chip_health == "健康" else ("⚠️" if chip_health == "一般" else "🚨")
-                    report_lines.extend([
-                        f"**筹码**: 获利比例 {chip_data.get('profit_ratio', 'N/A')} | 平均成本 {chip_data.get('avg_cost', 'N/A')} | 集中度 {chip_data.get('concentration', 'N/A')} {chip_emoji}{chip_health}",
-                        "",
-                    ])
-            
-            # 舆情情报已移至顶部显示
-            
-            # ========== 作战计划 ==========
-            battle = dashboard.get('battle_plan', {}) if dashboard else {}
-            if battle:
-                report_lines.extend([
-                    "### 🎯 作战计划",
-                    "",
-                ])
-                
-                # 狙击点位
-                sniper = battle.get('sniper_points', {})
-                if sniper:
-                    report_lines.extend([
-                        "**📍 狙击点位**",
-                        "",
-                        "| 点位类型 | 价格 |",
-                        "|---------|------|",
-                        f"| 🎯 理想买入点 | {sniper.get('ideal_buy', 'N/A')} |",
-                        f"| 🔵 次优买入点 | {sniper.get('secondary_buy', 'N/A')} |",
-                        f"| 🛑 止损位 | {sniper.get('stop_loss', 'N/A')} |",
-                        f"| 🎊 目标位 | {sniper.get('take_profit', 'N/A')} |",
-                        "",
-                    ])
-                
-                # 仓位策略
-                position = battle.get('position_strategy', {})
-                if position:
-                    report_lines.extend([
-                        f"**💰 仓位建议**: {position.get('suggested_position', 'N/A')}",
-                        f"- 建仓策略: {position.get('entry_plan', 'N/A')}",
-                        f"- 风控策略: {position.get('risk_control', 'N/A')}",
-                        "",
-                    ])
-                
-                # 检查清单
-                checklist = battle.get('action_checklist', []) if battle else []
-                if checklist:
-                    report_lines.extend([
-                        "**✅ 检查清单**",
-                        "",
-                    ])
-                    for item in checklist:
-                        report_lines.append(f"- {item}")
-                    report_lines.append("")
-            
-            # 如果没有 dashboard，显示传统格式
-            if not dashboard:
-                # 操作理由
-                if result.buy_reason:
-                    report_lines.extend([
-                        f"**💡 操作理由**: {result.buy_reason}",
-                        "",
-                    ])
-                
-                # 风险提示
-                if result.risk_warning:
-                    report_lines.extend([
-                        f"**⚠️ 风险提示**: {result.risk_warning}",
-                        "",
-                    ])
-                
-                # 技术面分析
-                if result.ma_analysis or result.volume_analysis:
-                    report_lines.extend([
-                        "### 📊 技术面",
-                        "",
-                    ])
-                    if result.ma_analysis:
-                        report_lines.append(f"**均线**: {result.ma_analysis}")
-                    if result.volume_analysis:
-                        report_lines.append(f"**量能**: {result.volume_analysis}")
-                    report_lines.append("")
-                
-                # 消息面
-                if result.news_summary:
-                    report_lines.extend([
-                        "### 📰 消息面",
-                        f"{result.news_summary}",
-                        "",
-                    ])
-            
-            report_lines.extend([
-                "---",
-                "",
-            ])
-        
-        # 底部（去除免责声明）
-        report_lines.extend([
-            "",
-            f"*报告生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}*",
-        ])
-        
-        return "\n".join(report_lines)
+        return self.build_report(results, report_date).dashboard().markdown
     
     def generate_wechat_dashboard(self, results: List[AnalysisResult]) -> str:
         """
@@ -867,129 +673,7 @@ class NotificationService:
         Returns:
             精简版决策仪表盘
         """
-        report_date = datetime.now().strftime('%Y-%m-%d')
-        
-        # 按评分排序
-        sorted_results = sorted(results, key=lambda x: x.sentiment_score, reverse=True)
-        
-        # 统计
-        buy_count = sum(1 for r in results if r.operation_advice in ['买入', '加仓', '强烈买入'])
-        sell_count = sum(1 for r in results if r.operation_advice in ['卖出', '减仓', '强烈卖出'])
-        hold_count = sum(1 for r in results if r.operation_advice in ['持有', '观望'])
-        
-        lines = [
-            f"## 🎯 {report_date} 决策仪表盘",
-            "",
-            f"> {len(results)}只股票 | 🟢买入:{buy_count} 🟡观望:{hold_count} 🔴卖出:{sell_count}",
-            "",
-        ]
-        
-        for result in sorted_results:
-            signal_text, signal_emoji, _ = self._get_signal_level(result)
-            # 确保 dashboard 是字典类型
-            dashboard = result.dashboard if hasattr(result, 'dashboard') and isinstance(result.dashboard, dict) else {}
-            core = dashboard.get('core_conclusion', {}) if dashboard else {}
-            battle = dashboard.get('battle_plan', {}) if dashboard else {}
-            intel = dashboard.get('intelligence', {}) if dashboard else {}
-            
-            # 股票名称
-            stock_name = result.name if result.name and not result.name.startswith('股票') else f'股票{result.code}'
-            
-            # 标题行：信号等级 + 股票名称
-            lines.append(f"### {signal_emoji} **{signal_text}** | {stock_name}({result.code})")
-            lines.append("")
-            
-            # 核心决策（一句话）
-            one_sentence = core.get('one_sentence', result.analysis_summary) if core else result.analysis_summary
-            if one_sentence:
-                lines.append(f"📌 **{one_sentence[:80]}**")
-                lines.append("")
-            
-            # 重要信息区（舆情+基本面）
-            info_lines = []
-            
-            # 业绩预期
-            if intel.get('earnings_outlook'):
-                outlook = intel['earnings_outlook'][:60]
-                info_lines.append(f"📊 业绩: {outlook}")
-            
-            # 舆情情绪
-            if intel.get('sentiment_summary'):
-                sentiment = intel['sentiment_summary'][:50]
-                info_lines.append(f"💭 舆情: {sentiment}")
-            
-            if info_lines:
-                lines.extend(info_lines)
-                lines.append("")
-            
-            # 风险警报（最重要，醒目显示）
-            risks = intel.get('risk_alerts', []) if intel else []
-            if risks:
-                lines.append("🚨 **风险**:")
-                for risk in risks[:2]:  # 最多显示2条
-                    risk_text = risk[:50] + "..." if len(risk) > 50 else risk
-                    lines.append(f"   • {risk_text}")
-                lines.append("")
-            
-            # 利好催化
-            catalysts = intel.get('positive_catalysts', []) if intel else []
-            if catalysts:
-                lines.append("✨ **利好**:")
-                for cat in catalysts[:2]:  # 最多显示2条
-                    cat_text = cat[:50] + "..." if len(cat) > 50 else cat
-                    lines.append(f"   • {cat_text}")
-                lines.append("")
-            
-            # 狙击点位
-            sniper = battle.get('sniper_points', {}) if battle else {}
-            if sniper:
-                ideal_buy = sniper.get('ideal_buy', '')
-                stop_loss = sniper.get('stop_loss', '')
-                take_profit = sniper.get('take_profit', '')
-                
-                points = []
-                if ideal_buy:
-                    points.append(f"🎯买点:{ideal_buy[:15]}")
-                if stop_loss:
-                    points.append(f"🛑止损:{stop_loss[:15]}")
-                if take_profit:
-                    points.append(f"🎊目标:{take_profit[:15]}")
-                
-                if points:
-                    lines.append(" | ".join(points))
-                    lines.append("")
-            
-            # 持仓建议
-            pos_advice = core.get('position_advice', {}) if core else {}
-            if pos_advice:
-                no_pos = pos_advice.get('no_position', '')
-                has_pos = pos_advice.get('has_position', '')
-                if no_pos:
-                    lines.append(f"🆕 空仓者: {no_pos[:50]}")
-                if has_pos:
-                    lines.append(f"💼 持仓者: {has_pos[:50]}")
-                lines.append("")
-            
-            # 检查清单简化版
-            checklist = battle.get('action_checklist', []) if battle else []
-            if checklist:
-                # 只显示不通过的项目
-                failed_checks = [c for c in checklist if c.startswith('❌') or c.startswith('⚠️')]
-                if failed_checks:
-                    lines.append("**检查未通过项**:")
-                    for check in failed_checks[:3]:
-                        lines.append(f"   {check[:40]}")
-                    lines.append("")
-            
-            lines.append("---")
-            lines.append("")
-        
-        # 底部
-        lines.append(f"*生成时间: {datetime.now().strftime('%H:%M')}*")
-        
-        content = "\n".join(lines)
-        
-        return content
+        return self.build_report(results).wechat_dashboard().markdown
     
     def generate_wechat_summary(self, results: List[AnalysisResult]) -> str:
         """
@@ -1068,62 +752,7 @@ class NotificationService:
         Returns:
             超精简版 Markdown 内容
         """
-        report_date = datetime.now().strftime('%m-%d')
-        
-        # 按评分排序
-        sorted_results = sorted(results, key=lambda x: x.sentiment_score, reverse=True)
-        
-        # 统计
-        buy_count = sum(1 for r in results if r.operation_advice in ['买入', '加仓', '强烈买入'])
-        sell_count = sum(1 for r in results if r.operation_advice in ['卖出', '减仓', '强烈卖出'])
-        hold_count = len(results) - buy_count - sell_count
-        
-        lines = [
-            f"📊 {report_date} ({len(results)}只)",
-            f"🟢{buy_count} 🟡{hold_count} 🔴{sell_count}",
-            ""
-        ]
-        
-        # 逐只添加，直到超过字符限制
-        current_length = len("\n".join(lines))
-        added_count = 0
-        
-        for result in sorted_results:
-            emoji = result.get_emoji()
-            
-            # 构建单只股票信息（超精简格式）
-            if hasattr(result, 'dimensions') and result.dimensions:
-                # 有4维度评分，显示详细评分
-                stock_line = (
-                    f"{emoji} {result.name}({result.code})\n"
-                    f"{result.operation_advice} {result.sentiment_score}分\n"
-                    f"💎{result.value_score} 💰{result.funding_score} "
-                    f"📰{result.news_score} 📈{result.trend_score}"
-                )
-            else:
-                # 无4维度评分，显示基础信息
-                stock_line = (
-                    f"{emoji} {result.name}({result.code})\n"
-                    f"{result.operation_advice} {result.sentiment_score}分"
-                )
-            
-            # 检查是否会超出限制
-            test_length = current_length + len(stock_line) + 2  # +2 for \n\n
-            if test_length > max_chars and added_count >= 3:  # 至少显示3只
-                remaining = len(sorted_results) - added_count
-                if remaining > 0:
-                    lines.append(f"\n... 还有{remaining}只")
-                break
-            
-            lines.append(stock_line)
-            lines.append("")
-            current_length = test_length
-            added_count += 1
-        
-        # 底部精简提示
-        lines.append("*AI分析仅供参考*")
-        
-        content = "\n".join(lines)
+        content = self.build_report(results).bark_summary(max_chars).markdown
         
         # 最终检查，如果还是超了就强制截断
         if len(content) > max_chars:
@@ -1143,135 +772,9 @@ class NotificationService:
         Returns:
             Markdown 格式的单股报告
         """
-        report_date = datetime.now().strftime('%Y-%m-%d %H:%M')
-        signal_text, signal_emoji, _ = self._get_signal_level(result)
-        # 确保 dashboard 是字典类型
-        dashboard = result.dashboard if hasattr(result, 'dashboard') and isinstance(result.dashboard, dict) else {}
-        core = dashboard.get('core_conclusion', {}) if dashboard else {}
-        battle = dashboard.get('battle_plan', {}) if dashboard else {}
-        intel = dashboard.get('intelligence', {}) if dashboard else {}
-        
-        # 股票名称
-        stock_name = result.name if result.name and not result.name.startswith('股票') else f'股票{result.code}'
-        
-        lines = [
-            f"## {signal_emoji} {stock_name} ({result.code})",
-            "",
-            f"> {report_date} | 评分: **{result.sentiment_score}** | {result.trend_prediction}",
-            "",
-        ]
-        
-        # 4维度评分（新增）
-        if hasattr(result, 'dimensions') and result.dimensions:
-            lines.extend([
-                "### 🎯 综合评分",
-                "",
-                f"💎价值{result.value_score} 💰资金{result.funding_score} "
-                f"📰消息{result.news_score} 📈趋势{result.trend_score}",
-                "",
-            ])
-            
-            # 各维度简要总结
-            dimensions = result.dimensions
-            summaries = []
-            if dimensions.get('value_investment', {}).get('summary'):
-                summaries.append(f"💎 {dimensions['value_investment']['summary']}")
-            if dimensions.get('funding_flow', {}).get('summary'):
-                summaries.append(f"💰 {dimensions['funding_flow']['summary']}")
-            if dimensions.get('news_sentiment', {}).get('summary'):
-                summaries.append(f"📰 {dimensions['news_sentiment']['summary']}")
-            if dimensions.get('trend_analysis', {}).get('summary'):
-                summaries.append(f"📈 {dimensions['trend_analysis']['summary']}")
-            
-            if summaries:
-                for s in summaries:
-                    lines.append(s)
-                lines.append("")
-        
-        # 核心决策（一句话）
-        one_sentence = core.get('one_sentence', result.analysis_summary) if core else result.analysis_summary
-        if one_sentence:
-            lines.extend([
-                "### 📌 核心结论",
-                "",
-                f"**{signal_text}**: {one_sentence}",
-                "",
-            ])
-        
-        # 重要信息（舆情+基本面）
-        info_added = False
-        if intel:
-            if intel.get('earnings_outlook'):
-                if not info_added:
-                    lines.append("### 📰 重要信息")
-                    lines.append("")
-                    info_added = True
-                lines.append(f"📊 **业绩预期**: {intel['earnings_outlook'][:100]}")
-            
-            if intel.get('sentiment_summary'):
-                if not info_added:
-                    lines.append("### 📰 重要信息")
-                    lines.append("")
-                    info_added = True
-                lines.append(f"💭 **舆情情绪**: {intel['sentiment_summary'][:80]}")
-            
-            # 风险警报
-            risks = intel.get('risk_alerts', [])
-            if risks:
-                if not info_added:
-                    lines.append("### 📰 重要信息")
-                    lines.append("")
-                    info_added = True
-                lines.append("")
-                lines.append("🚨 **风险警报**:")
-                for risk in risks[:3]:
-                    lines.append(f"- {risk[:60]}")
-            
-            # 利好催化
-            catalysts = intel.get('positive_catalysts', [])
-            if catalysts:
-                lines.append("")
-                lines.append("✨ **利好催化**:")
-                for cat in catalysts[:3]:
-                    lines.append(f"- {cat[:60]}")
-        
-        if info_added:
-            lines.append("")
-        
-        # 狙击点位
-        sniper = battle.get('sniper_points', {}) if battle else {}
-        if sniper:
-            lines.extend([
-                "### 🎯 操作点位",
-                "",
-                "| 买点 | 止损 | 目标 |",
-                "|------|------|------|",
-            ])
-            ideal_buy = sniper.get('ideal_buy', '-')
-            stop_loss = sniper.get('stop_loss', '-')
-            take_profit = sniper.get('take_profit', '-')
-            lines.append(f"| {ideal_buy} | {stop_loss} | {take_profit} |")
-            lines.append("")
-        
-        # 持仓建议
-        pos_advice = core.get('position_advice', {}) if core else {}
-        if pos_advice:
-            lines.extend([
-                "### 💼 持仓建议",
-                "",
-                f"- 🆕 **空仓者**: {pos_advice.get('no_position', result.operation_advice)}",
-                f"- 💼 **持仓者**: {pos_advice.get('has_position', '继续持有')}",
-                "",
-            ])
-        
-        lines.extend([
-            "---",
-            "*AI生成，仅供参考，不构成投资建议*",
-        ])
-        
-        return "\n".join(lines)
+        return ReportBuilder.single_stock(result).markdown
     
-    def send_to_wechat(self, content: str) -> bool:
+    def send_to_wechat(self, content: Content) -> bool:
         """
         推送消息到企业微信机器人
         
@@ -1296,6 +799,7 @@ class NotificationService:
             logger.warning("企业微信 Webhook 未配置，跳过推送")
             return False
         
+        content = render(content, MARKDOWN)
         max_bytes = self._wechat_max_bytes  # 从配置读取，默认 4000 字节
         
         # 检查字节长度，超长则分批发送
@@ -1314,7 +818,7 @@ class NotificationService:
         """
         分批发送长消息到企业微信
         
-        按股票分析块（以 --- 或 ### 分隔）智能分割，确保每批不超过限制
+        按股票分析块（以 --- 或标题分隔）智能分割，确保每批不超过限制
         
         Args:
             content: 完整消息内容
@@ -1323,174 +827,28 @@ class NotificationService:
         Returns:
             是否全部发送成功
         """
-        import time
-        
-        def get_bytes(s: str) -> int:
-            """获取字符串的 UTF-8 字节数"""
-            return len(s.encode('utf-8'))
-        
-        # 智能分割：优先按 "---" 分隔（股票之间的分隔线）
-        # 其次尝试各级标题分割
-        if "\n---\n" in content:
-            sections = content.split("\n---\n")
-            separator = "\n---\n"
-        elif "\n### " in content:
-            # 按 ### 分割
-            parts = content.split("\n### ")
-            sections = [parts[0]] + [f"### {p}" for p in parts[1:]]
-            separator = "\n"
-        elif "\n## " in content:
-            # 按 ## 分割 (兼容二级标题)
-            parts = content.split("\n## ")
-            sections = [parts[0]] + [f"## {p}" for p in parts[1:]]
-            separator = "\n"
-        elif "\n**" in content:
-            # 按 ** 加粗标题分割 (兼容 AI 未输出标准 Markdown 标题的情况)
-            parts = content.split("\n**")
-            sections = [parts[0]] + [f"**{p}" for p in parts[1:]]
-            separator = "\n"
-        else:
-            # 无法智能分割，按字符强制分割
-            return self._send_wechat_force_chunked(content, max_bytes)
-        
-        chunks = []
-        current_chunk = []
-        current_bytes = 0
-        separator_bytes = get_bytes(separator)
-        
-        for section in sections:
-            section_bytes = get_bytes(section) + separator_bytes
-            
-            # 如果单个 section 就超长，需要强制截断
-            if section_bytes > max_bytes:
-                # 先发送当前积累的内容
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                    current_chunk = []
-                    current_bytes = 0
-                
-                # 强制截断这个超长 section（按字节截断）
-                truncated = self._truncate_to_bytes(section, max_bytes - 200)
-                truncated += "\n\n...(本段内容过长已截断)"
-                chunks.append(truncated)
-                continue
-            
-            # 检查加入后是否超长
-            if current_bytes + section_bytes > max_bytes:
-                # 保存当前块，开始新块
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                current_chunk = [section]
-                current_bytes = section_bytes
-            else:
-                current_chunk.append(section)
-                current_bytes += section_bytes
-        
-        # 添加最后一块
-        if current_chunk:
-            chunks.append(separator.join(current_chunk))
-        
-        # 分批发送
+        chunks = chunk_markdown(content, ChunkProfile(max_bytes, marker=WECHAT_PAGE_MARKER))
         total_chunks = len(chunks)
         success_count = 0
         
         logger.info(f"企业微信分批发送：共 {total_chunks} 批")
         
         for i, chunk in enumerate(chunks):
-            # 添加分页标记
-            if total_chunks > 1:
-                page_marker = f"\n\n📄 *({i+1}/{total_chunks})*"
-                chunk_with_marker = chunk + page_marker
-            else:
-                chunk_with_marker = chunk
-            
             try:
-                if self._send_wechat_message(chunk_with_marker):
+                if self._send_wechat_message(chunk):
                     success_count += 1
                     logger.info(f"企业微信第 {i+1}/{total_chunks} 批发送成功")
                 else:
                     logger.error(f"企业微信第 {i+1}/{total_chunks} 批发送失败")
             except Exception as e:
                 logger.error(f"企业微信第 {i+1}/{total_chunks} 批发送异常: {e}")
-
-            # 批次间隔，避免触发频率限制
-            if i < total_chunks - 1:
-                time.sleep(2.5)  # 增加到 2.5s，避免企业微信限流
-
-        return success_count == total_chunks
-    
-    def _send_wechat_force_chunked(self, content: str, max_bytes: int) -> bool:
-        """
-        强制按字节分割发送（无法智能分割时的 fallback）
-        
-        Args:
-            content: 完整消息内容
-            max_bytes: 单条消息最大字节数
-        """
-        import time
-        
-        chunks = []
-        current_chunk = ""
-        
-        # 按行分割，确保不会在多字节字符中间截断
-        lines = content.split('\n')
-        
-        for line in lines:
-            test_chunk = current_chunk + ('\n' if current_chunk else '') + line
-            if len(test_chunk.encode('utf-8')) > max_bytes - 100:  # 预留空间给分页标记
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = line
-            else:
-                current_chunk = test_chunk
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-        
-        total_chunks = len(chunks)
-        success_count = 0
-        
-        logger.info(f"企业微信强制分批发送：共 {total_chunks} 批")
-        
-        for i, chunk in enumerate(chunks):
-            page_marker = f"\n\n📄 *({i+1}/{total_chunks})*" if total_chunks > 1 else ""
-            
-            try:
-                if self._send_wechat_message(chunk + page_marker):
-                    success_count += 1
-            except Exception as e:
-                logger.error(f"企业微信第 {i+1}/{total_chunks} 批发送异常: {e}")
             
+            # 批次间隔，避免触发频率限制
             if i < total_chunks - 1:
-                time.sleep(1)
+                pacing.pause(2.5, 'push_delay', host='wechat')
         
         return success_count == total_chunks
     
-    def _truncate_to_bytes(self, text: str, max_bytes: int) -> str:
-        """
-        按字节数截断字符串，确保不会在多字节字符中间截断
-        
-        Args:
-            text: 要截断的字符串
-            max_bytes: 最大字节数
-            
-        Returns:
-            截断后的字符串
-        """
-        encoded = text.encode('utf-8')
-        if len(encoded) <= max_bytes:
-            return text
-        
-        # 从 max_bytes 位置往前找，确保不截断多字节字符
-        truncated = encoded[:max_bytes]
-        # 尝试解码，如果失败则继续往前
-        while truncated:
-            try:
-                return truncated.decode('utf-8')
-            except UnicodeDecodeError:
-                truncated = truncated[:-1]
-        return ""
-    
     def _send_wechat_message(self, content: str) -> bool:
         """发送企业微信消息"""
         payload = {
@@ -1518,7 +876,7 @@ class NotificationService:
             logger.error(f"企业微信请求失败: {response.status_code}")
             return False
     
-    def send_to_feishu(self, content: str) -> bool:
+    def send_to_feishu(self, content: Content) -> bool:
         """
         推送消息到飞书机器人
         
@@ -1545,15 +903,15 @@ class NotificationService:
             logger.warning("飞书 Webhook 未配置，跳过推送")
             return False
         
-        # 飞书 lark_md 支持有限，先做格式转换
-        formatted_content = self._format_feishu_markdown(content)
+        # 飞书 lark_md 支持有限，使用飞书序列化器（标题转加粗、表格转条目等）
+        formatted_content = render(content, FEISHU)
 
         max_bytes = self._feishu_max_bytes  # 从配置读取，默认 20000 字节
         
         # 检查字节长度，超长则分批发送
         content_bytes = len(formatted_content.encode('utf-8'))
         if content_bytes > max_bytes:
-            logger.info(f"飞书消息内容超长({content_bytes}字节/{len(content)}字符)，将分批发送")
+            logger.info(f"飞书消息内容超长({content_bytes}字节/{len(formatted_content)}字符)，将分批发送")
             return self._send_feishu_chunked(formatted_content, max_bytes)
         
         try:
@@ -1566,7 +924,7 @@ class NotificationService:
         """
         分批发送长消息到飞书
         
-        按股票分析块（以 --- 或 ### 分隔）智能分割，确保每批不超过限制
+        按股票分析块（以 --- 或标题分隔）智能分割，确保每批不超过限制
         
         Args:
             content: 完整消息内容
@@ -1575,79 +933,15 @@ class NotificationService:
         Returns:
             是否全部发送成功
         """
-        import time
-        
-        def get_bytes(s: str) -> int:
-            """获取字符串的 UTF-8 字节数"""
-            return len(s.encode('utf-8'))
-        
-        # 智能分割：优先按 "---" 分隔（股票之间的分隔线）
-        # 如果没有分隔线，按 "### " 标题分割（每只股票的标题）
-        if "\n---\n" in content:
-            sections = content.split("\n---\n")
-            separator = "\n---\n"
-        elif "\n### " in content:
-            # 按 ### 分割，但保留 ### 前缀
-            parts = content.split("\n### ")
-            sections = [parts[0]] + [f"### {p}" for p in parts[1:]]
-            separator = "\n"
-        else:
-            # 无法智能分割，按行强制分割
-            return self._send_feishu_force_chunked(content, max_bytes)
-        
-        chunks = []
-        current_chunk = []
-        current_bytes = 0
-        separator_bytes = get_bytes(separator)
-        
-        for section in sections:
-            section_bytes = get_bytes(section) + separator_bytes
-            
-            # 如果单个 section 就超长，需要强制截断
-            if section_bytes > max_bytes:
-                # 先发送当前积累的内容
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                    current_chunk = []
-                    current_bytes = 0
-                
-                # 强制截断这个超长 section（按字节截断）
-                truncated = self._truncate_to_bytes(section, max_bytes - 200)
-                truncated += "\n\n...(本段内容过长已截断)"
-                chunks.append(truncated)
-                continue
-            
-            # 检查加入后是否超长
-            if current_bytes + section_bytes > max_bytes:
-                # 保存当前块，开始新块
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                current_chunk = [section]
-                current_bytes = section_bytes
-            else:
-                current_chunk.append(section)
-                current_bytes += section_bytes
-        
-        # 添加最后一块
-        if current_chunk:
-            chunks.append(separator.join(current_chunk))
-        
-        # 分批发送
+        chunks = chunk_markdown(content, ChunkProfile(max_bytes, marker=FEISHU_PAGE_MARKER))
         total_chunks = len(chunks)
         success_count = 0
         
         logger.info(f"飞书分批发送：共 {total_chunks} 批")
         
         for i, chunk in enumerate(chunks):
-            # 添加分页标记
-            if total_chunks > 1:
-                page_marker = f"\n\n📄 ({i+1}/{total_chunks})"
-                chunk_with_marker = chunk + page_marker
-            else:
-                chunk_with_marker = chunk
-            
             try:
-                if self._send_feishu_message(chunk_with_marker):
+                if self._send_feishu_message(chunk):
                     success_count += 1
                     logger.info(f"飞书第 {i+1}/{total_chunks} 批发送成功")
                 else:
@@ -1657,54 +951,7 @@ class NotificationService:
             
             # 批次间隔，避免触发频率限制
             if i < total_chunks - 1:
-                time.sleep(1)
-        
-        return success_count == total_chunks
-    
-    def _send_feishu_force_chunked(self, content: str, max_bytes: int) -> bool:
-        """
-        强制按字节分割发送（无法智能分割时的 fallback）
-        
-        Args:
-            content: 完整消息内容
-            max_bytes: 单条消息最大字节数
-        """
-        import time
-        
-        chunks = []
-        current_chunk = ""
-        
-        # 按行分割，确保不会在多字节字符中间截断
-        lines = content.split('\n')
-        
-        for line in lines:
-            test_chunk = current_chunk + ('\n' if current_chunk else '') + line
-            if len(test_chunk.encode('utf-8')) > max_bytes - 100:  # 预留空间给分页标记
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = line
-            else:
-                current_chunk = test_chunk
-        
-        if current_chunk:
-            chunks.append(current_chunk)
-        
-        total_chunks = len(chunks)
-        success_count = 0
-        
-        logger.info(f"飞书强制分批发送：共 {total_chunks} 批")
-        
-        for i, chunk in enumerate(chunks):
-            page_marker = f"\n\n📄 ({i+1}/{total_chunks})" if total_chunks > 1 else ""
-            
-            try:
-                if self._send_feishu_message(chunk + page_marker):
-                    success_count += 1
-            except Exception as e:
-                logger.error(f"飞书第 {i+1}/{total_chunks} 批发送异常: {e}")
-            
-            if i < total_chunks - 1:
-                time.sleep(1)
+                pacing.pause(1, 'push_delay', host='feishu')
         
         return success_count == total_chunks
     
@@ -1776,75 +1023,7 @@ class NotificationService:
 
         return _post_payload(text_payload)
 
-    def _format_feishu_markdown(self, content: str) -> str:
-        """
-        将通用 Markdown 转换为飞书 lark_md 更友好的格式
-        - 飞书不支持 Markdown 标题（# / ## / ###），用加粗代替
-        - 引用块使用前缀替代
-        - 分隔线统一为细线
-        - 表格转换为条目列表
-        """
-        def _flush_table_rows(buffer: List[str], output: List[str]) -> None:
-            if not buffer:
-                return
-
-            def _parse_row(row: str) -> List[str]:
-                cells = [c.strip() for c in row.strip().strip('|').split('|')]
-                return [c for c in cells if c]
-
-            rows = []
-            for raw in buffer:
-                if re.match(r'^\s*\|?\s*[:-]+\s*(\|\s*[:-]+\s*)+\|?\s*$', raw):
-                    continue
-                parsed = _parse_row(raw)
-                if parsed:
-                    rows.append(parsed)
-
-            if not rows:
-                return
-
-            header = rows[0]
-            data_rows = rows[1:] if len(rows) > 1 else []
-            for row in data_rows:
-                pairs = []
-                for idx, cell in enumerate(row):
-                    key = header[idx] if idx < len(header) else f"列{idx + 1}"
-                    pairs.append(f"{key}：{cell}")
-                output.append(f"• {' | '.join(pairs)}")
-
-        lines = []
-        table_buffer: List[str] = []
-
-        for raw_line in content.splitlines():
-            line = raw_line.rstrip()
-
-            if line.strip().startswith('|'):
-                table_buffer.append(line)
-                continue
-
-            if table_buffer:
-                _flush_table_rows(table_buffer, lines)
-                table_buffer = []
-
-            if re.match(r'^#{1,6}\s+', line):
-                title = re.sub(r'^#{1,6}\s+', '', line).strip()
-                line = f"**{title}**" if title else ""
-            elif line.startswith('> '):
-                quote = line[2:].strip()
-                line = f"💬 {quote}" if quote else ""
-            elif line.strip() == '---':
-                line = '────────'
-            elif line.startswith('- '):
-                line = f"• {line[2:].strip()}"
-
-            lines.append(line)
-
-        if table_buffer:
-            _flush_table_rows(table_buffer, lines)
-
-        return "\n".join(lines).strip()
-    
-    def send_to_email(self, content: str, subject: Optional[str] = None) -> bool:
+    def send_to_email(self, content: Content, subject: Optional[str] = None) -> bool:
         """
         通过 SMTP 发送邮件（自动识别 SMTP 服务器）
         
@@ -1869,8 +1048,9 @@ class NotificationService:
                 date_str = datetime.now().strftime('%Y-%m-%d')
                 subject = f"📈 股票智能分析报告 - {date_str}"
             
-            # 将 Markdown 转换为简单 HTML
-            html_content = self._markdown_to_html(content)
+            # 渲染 HTML 正文与纯文本备用版本
+            html_content = self._render_email_html(content)
+            plain_content = render(content, PLAIN)
             
             # 构建邮件
             msg = MIMEMultipart('alternative')
@@ -1879,7 +1059,7 @@ class NotificationService:
             msg['To'] = ', '.join(receivers)
             
             # 添加纯文本和 HTML 两个版本
-            text_part = MIMEText(content, 'plain', 'utf-8')
+            text_part = MIMEText(plain_content, 'plain', 'utf-8')
             html_part = MIMEText(html_content, 'html', 'utf-8')
             msg.attach(text_part)
             msg.attach(html_part)
@@ -1926,20 +1106,15 @@ class NotificationService:
             logger.error(f"发送邮件失败: {e}")
             return False
     
-    def _markdown_to_html(self, markdown_text: str) -> str:
+    def _render_email_html(self, content: Content) -> str:
         """
-        将 Markdown 转换为 HTML，支持表格并优化排版
+        渲染邮件 HTML（报告文档经 HTML 序列化器输出，外部 Markdown 先解析为文档）
 
-        使用 markdown2 库进行转换，并添加优化的 CSS 样式
         解决问题：
         1. 邮件表格未渲染问题
         2. 邮件内容排版过于松散问题
         """
-        # 使用 markdown2 转换，开启表格和其他扩展支持
-        html_content = markdown2.markdown(
-            markdown_text,
-            extras=["tables", "fenced-code-blocks", "break-on-newline", "cuddled-lists"]
-        )
+        html_content = render(content, HTML)
 
         # 优化 CSS 样式：更紧凑的排版，美观的表格
         css_style = """
@@ -2055,7 +1230,7 @@ class NotificationService:
         </html>
         """
     
-    def send_to_telegram(self, content: str) -> bool:
+    def send_to_telegram(self, content: Content) -> bool:
         """
         推送消息到 Telegram 机器人
         
@@ -2084,15 +1259,18 @@ class NotificationService:
             # Telegram API 端点
             api_url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
             
+            # Telegram 不支持标题 / 表格，使用 Telegram 序列化器
+            text = render(content, TELEGRAM)
+            
             # Telegram 消息最大长度 4096 字符
-            max_length = 4096
+            max_length = TELEGRAM_MAX_LENGTH
             
-            if len(content) <= max_length:
+            if len(text) <= max_length:
                 # 单条消息发送
-                return self._send_telegram_message(api_url, chat_id, content)
+                return self._send_telegram_message(api_url, chat_id, text)
             else:
                 # 分段发送长消息
-                return self._send_telegram_chunked(api_url, chat_id, content, max_length)
+                return self._send_telegram_chunked(api_url, chat_id, text, max_length)
                 
         except Exception as e:
             logger.error(f"发送 Telegram 消息失败: {e}")
@@ -2101,14 +1279,10 @@ class NotificationService:
             return False
     
     def _send_telegram_message(self, api_url: str, chat_id: str, text: str) -> bool:
-        """发送单条 Telegram 消息"""
-        # 转换 Markdown 为 Telegram 支持的格式
-        # Telegram 的 Markdown 格式稍有不同，做简单处理
-        telegram_text = self._convert_to_telegram_markdown(text)
-        
+        """发送单条 Telegram 消息（text 已是 Telegram Markdown 格式）"""
         payload = {
             "chat_id": chat_id,
-            "text": telegram_text,
+            "text": text,
             "parse_mode": "Markdown",
             "disable_web_page_preview": True
         }
@@ -2128,7 +1302,6 @@ class NotificationService:
                 if 'parse' in error_desc.lower() or 'markdown' in error_desc.lower():
                     logger.info("尝试使用纯文本格式重新发送...")
                     payload['parse_mode'] = None
-                    payload['text'] = text  # 使用原始文本
                     del payload['parse_mode']
                     
                     response = requests.post(api_url, json=payload, timeout=10)
@@ -2144,67 +1317,18 @@ class NotificationService:
     
     def _send_telegram_chunked(self, api_url: str, chat_id: str, content: str, max_length: int) -> bool:
         """分段发送长 Telegram 消息"""
-        # 按段落分割
-        sections = content.split("\n---\n")
-        
-        current_chunk = []
-        current_length = 0
+        chunks = chunk_markdown(content, ChunkProfile(max_length, unit=UNIT_CHARS))
+        total_chunks = len(chunks)
         all_success = True
-        chunk_index = 1
-        
-        for section in sections:
-            section_length = len(section) + 5  # +5 for "\n---\n"
-            
-            if current_length + section_length > max_length:
-                # 发送当前块
-                if current_chunk:
-                    chunk_content = "\n---\n".join(current_chunk)
-                    logger.info(f"发送 Telegram 消息块 {chunk_index}...")
-                    if not self._send_telegram_message(api_url, chat_id, chunk_content):
-                        all_success = False
-                    chunk_index += 1
-                
-                # 重置
-                current_chunk = [section]
-                current_length = section_length
-            else:
-                current_chunk.append(section)
-                current_length += section_length
-        
-        # 发送最后一块
-        if current_chunk:
-            chunk_content = "\n---\n".join(current_chunk)
-            logger.info(f"发送 Telegram 消息块 {chunk_index}（最后）...")
-            if not self._send_telegram_message(api_url, chat_id, chunk_content):
+        
+        for i, chunk in enumerate(chunks):
+            logger.info(f"发送 Telegram 消息块 {i+1}/{total_chunks}...")
+            if not self._send_telegram_message(api_url, chat_id, chunk):
                 all_success = False
         
         return all_success
     
-    def _convert_to_telegram_markdown(self, text: str) -> str:
-        """
-        将标准 Markdown 转换为 Telegram 支持的格式
-        
-        Telegram Markdown 限制：
-        - 不支持 # 标题
-        - 使用 *bold* 而非 **bold**
-        - 使用 _italic_ 
-        """
-        result = text
-        
-        # 移除 # 标题标记（Telegram 不支持）
-        result = re.sub(r'^#{1,6}\s+', '', result, flags=re.MULTILINE)
-        
-        # 转换 **bold** 为 *bold*
-        result = re.sub(r'\*\*(.+?)\*\*', r'*\1*', result)
-        
-        # 转义特殊字符（Telegram Markdown 需要）
-        # 注意：不转义已经用于格式的 * _ `
-        for char in ['[', ']', '(', ')']:
-            result = result.replace(char, f'\\{char}')
-        
-        return result
-    
-    def send_to_pushover(self, content: str, title: Optional[str] = None) -> bool:
+    def send_to_pushover(self, content: Content, title: Optional[str] = None) -> bool:
         """
         推送消息到 Pushover
         
@@ -2249,7 +1373,7 @@ class NotificationService:
         max_length = 1024
         
         # 转换 Markdown 为纯文本（Pushover 支持 HTML，但纯文本更通用）
-        plain_content = self._markdown_to_plain_text(content)
+        plain_content = render(content, PLAIN)
         
         if len(plain_content) <= max_length:
             # 单条消息发送
@@ -2258,41 +1382,6 @@ class NotificationService:
             # 分段发送长消息
             return self._send_pushover_chunked(api_url, user_key, api_token, plain_content, title, max_length)
     
-    def _markdown_to_plain_text(self, markdown_text: str) -> str:
-        """
-        将 Markdown 转换为纯文本
-        
-        移除 Markdown 格式标记，保留可读性
-        """
-        text = markdown_text
-        
-        # 移除标题标记 # ## ###
-        text = re.sub(r'^#{1,6}\s+', '', text, flags=re.MULTILINE)
-        
-        # 移除加粗 **text** -> text
-        text = re.sub(r'\*\*(.+?)\*\*', r'\1', text)
-        
-        # 移除斜体 *text* -> text
-        text = re.sub(r'\*(.+?)\*', r'\1', text)
-        
-        # 移除引用 > text -> text
-        text = re.sub(r'^>\s+', '', text, flags=re.MULTILINE)
-        
-        # 移除列表标记 - item -> item
-        text = re.sub(r'^[-*]\s+', '• ', text, flags=re.MULTILINE)
-        
-        # 移除分隔线 ---
-        text = re.sub(r'^---+$', '────────', text, flags=re.MULTILINE)
-        
-        # 移除表格语法 |---|---|
-        text = re.sub(r'\|[-:]+\|[-:|\s]+\|', '', text)
-        text = re.sub(r'^\|(.+)\|$', r'\1', text, flags=re.MULTILINE)
-        
-        # 清理多余空行
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        
-        return text.strip()
-    
     def _send_pushover_message(
         self, 
         api_url: str, 
@@ -2356,42 +1445,8 @@ class NotificationService:
         
         按段落分割，确保每段不超过最大长度
         """
-        import time
-        
-        # 按段落（分隔线或双换行）分割
-        if "────────" in content:
-            sections = content.split("────────")
-            separator = "────────"
-        else:
-            sections = content.split("\n\n")
-            separator = "\n\n"
-        
-        chunks = []
-        current_chunk = []
-        current_length = 0
-        
-        for section in sections:
-            # 计算添加这个 section 后的实际长度
-            # join() 只在元素之间放置分隔符，不是每个元素后面
-            # 所以：第一个元素不需要分隔符，后续元素需要一个分隔符连接
-            if current_chunk:
-                # 已有元素，添加新元素需要：当前长度 + 分隔符 + 新 section
-                new_length = current_length + len(separator) + len(section)
-            else:
-                # 第一个元素，不需要分隔符
-                new_length = len(section)
-            
-            if new_length > max_length:
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                current_chunk = [section]
-                current_length = len(section)
-            else:
-                current_chunk.append(section)
-                current_length = new_length
-        
-        if current_chunk:
-            chunks.append(separator.join(current_chunk))
+        # 按分隔线 / 段落分割
+        chunks = chunk_markdown(content, ChunkProfile(max_length, unit=UNIT_CHARS))
         
         total_chunks = len(chunks)
         success_count = 0
@@ -2410,11 +1465,11 @@ class NotificationService:
             
             # 批次间隔，避免触发频率限制
             if i < total_chunks - 1:
-                time.sleep(1)
+                pacing.pause(1, 'push_delay', host='pushover')
         
         return success_count == total_chunks
     
-    def send_to_custom(self, content: str) -> bool:
+    def send_to_custom(self, content: Content) -> bool:
         """
         推送消息到自定义 Webhook
         
@@ -2438,6 +1493,7 @@ class NotificationService:
             logger.warning("未配置自定义 Webhook，跳过推送")
             return False
         
+        content = render(content, MARKDOWN)
         success_count = 0
         
         for i, url in enumerate(self._custom_webhook_urls):
@@ -2504,8 +1560,6 @@ class NotificationService:
         Returns:
             是否全部发送成功
         """
-        import time
-        
         # 按段落分割内容
         chunks = self._split_bark_content(content, max_chars)
         
@@ -2535,7 +1589,7 @@ class NotificationService:
                 
                 # 避免发送过快，间隔0.5秒
                 if i < len(chunks) - 1:
-                    time.sleep(0.5)
+                    pacing.pause(0.5, 'push_delay', host='bark')
                     
             except Exception as e:
                 logger.error(f"Bark 第 {i+1} 条发送异常: {e}")
@@ -2543,14 +1597,12 @@ class NotificationService:
         logger.info(f"Bark 分批推送完成：成功 {success_count}/{len(chunks)}")
         return success_count == len(chunks)
     
-    def _split_bark_content(self, content: str, max_chars: int = 1000) -> list:
+    def _split_bark_content(self, content: str, max_chars: int = 1000) -> List[str]:
         """
         智能分割内容为适合 Bark 的多条消息
         
-        按以下规则分割：
-        1. 优先按股票分割（每只股票独立成条）
-        2. 如果单只股票超长，按段落分割
-        3. 保持 Markdown 格式完整性
+        每只股票（emoji + 名称 + (代码) 标题行起始）独立成条，标题和统计信息并入第一条；
+        单只股票超长时再按标题 / 段落分割，免责声明附在最后一条
         
         Args:
             content: 原始内容
@@ -2559,90 +1611,12 @@ class NotificationService:
         Returns:
             分割后的消息列表
         """
-        import re
-        
-        chunks = []
-        lines = content.split('\n')
-        
-        # 提取标题和统计信息（第一条必含）
-        header_lines = []
-        content_start_idx = 0
-        
-        for i, line in enumerate(lines[:30]):
-            # 标题行、统计行
-            if any(keyword in line for keyword in ['📊', '📅', '股票', '分析', '🟢', '🟡', '🔴']):
-                header_lines.append(line)
-            elif line.strip() == '' and header_lines:
-                content_start_idx = i + 1
-                break
-            elif header_lines:
-                content_start_idx = i
-                break
-        
-        # 找到所有股票块的起始位置（包含 emoji + 代码的行）
-        stock_starts = []
-        for i, line in enumerate(lines):
-            # 匹配股票标题行：emoji + 名称 + (代码)
-            if re.search(r'[🟢🟡🔴🟠💚❌⚪].*[\(（]\d{6}[\)）]', line):
-                stock_starts.append(i)
-        
-        # 如果没找到股票块，按字符数简单分割
-        if not stock_starts:
-            current_chunk = '\n'.join(header_lines) + '\n\n'
-            for line in lines[content_start_idx:]:
-                if len(current_chunk) + len(line) + 1 <= max_chars:
-                    current_chunk += line + '\n'
-                else:
-                    if current_chunk.strip():
-                        chunks.append(current_chunk.strip())
-                    current_chunk = line + '\n'
-            if current_chunk.strip():
-                chunks.append(current_chunk.strip())
-            return chunks
-        
-        # 按股票块分割
-        for i, start_idx in enumerate(stock_starts):
-            # 确定这只股票的结束位置（下一只股票开始或文件结束）
-            if i < len(stock_starts) - 1:
-                end_idx = stock_starts[i + 1]
-            else:
-                end_idx = len(lines)
-            
-            # 提取这只股票的所有行
-            stock_lines = lines[start_idx:end_idx]
-            stock_content = '\n'.join(stock_lines).strip()
-            
-            # 如果是第一只股票，加上头部信息
-            if i == 0:
-                header_text = '\n'.join(header_lines)
-                full_content = header_text + '\n\n' + stock_content
-            else:
-                full_content = stock_content
-            
-            # 如果单只股票超长，继续分割
-            if len(full_content) > max_chars:
-                # 按段落分割
-                paragraphs = full_content.split('\n\n')
-                current_chunk = ''
-                for para in paragraphs:
-                    if len(current_chunk) + len(para) + 2 <= max_chars:
-                        if current_chunk:
-                            current_chunk += '\n\n' + para
-                        else:
-                            current_chunk = para
-                    else:
-                        if current_chunk.strip():
-                            chunks.append(current_chunk.strip())
-                        current_chunk = para
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-            else:
-                chunks.append(full_content)
-        
-        # 添加免责声明到最后一条
+        profile = ChunkProfile(
+            max_chars, unit=UNIT_CHARS, section_pattern=BARK_STOCK_TITLE, isolate_sections=True
+        )
+        chunks = list(parse_markdown(content).pack(profile))
         if chunks:
             chunks[-1] += '\n\n*AI分析仅供参考*'
-        
         return chunks
 
     def _post_custom_webhook(self, url: str, payload: dict, timeout: int = 30) -> bool:
@@ -2661,90 +1635,22 @@ class NotificationService:
         logger.debug(f"响应内容: {response.text[:200]}")
         return False
 
-    def _chunk_markdown_by_bytes(self, content: str, max_bytes: int) -> List[str]:
-        def get_bytes(s: str) -> int:
-            return len(s.encode('utf-8'))
-
-        def split_by_bytes(text: str, limit: int) -> List[str]:
-            parts: List[str] = []
-            remaining = text
-            while remaining:
-                part = self._truncate_to_bytes(remaining, limit)
-                if not part:
-                    break
-                parts.append(part)
-                remaining = remaining[len(part):]
-            return parts
-
-        # 优先按分隔线/标题分割，保证分页自然
-        if "\n---\n" in content:
-            sections = content.split("\n---\n")
-            separator = "\n---\n"
-        elif "\n### " in content:
-            parts = content.split("\n### ")
-            sections = [parts[0]] + [f"### {p}" for p in parts[1:]]
-            separator = "\n"
-        else:
-            # fallback：按行拼接
-            sections = content.split("\n")
-            separator = "\n"
-
-        chunks: List[str] = []
-        current_chunk: List[str] = []
-        current_bytes = 0
-        sep_bytes = get_bytes(separator)
-
-        for section in sections:
-            section_bytes = get_bytes(section)
-            extra = sep_bytes if current_chunk else 0
-
-            # 单段超长：截断
-            if section_bytes + extra > max_bytes:
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                    current_chunk = []
-                    current_bytes = 0
-
-                # 无法按结构拆分时，按字节强制拆分，避免整段被截断丢失
-                for part in split_by_bytes(section, max(200, max_bytes - 200)):
-                    chunks.append(part)
-                continue
-
-            if current_bytes + section_bytes + extra > max_bytes:
-                chunks.append(separator.join(current_chunk))
-                current_chunk = [section]
-                current_bytes = section_bytes
-            else:
-                if current_chunk:
-                    current_bytes += sep_bytes
-                current_chunk.append(section)
-                current_bytes += section_bytes
-
-        if current_chunk:
-            chunks.append(separator.join(current_chunk))
-
-        # 移除空块
-        return [c for c in (c.strip() for c in chunks) if c]
-
     def _send_dingtalk_chunked(self, url: str, content: str, max_bytes: int = 20000) -> bool:
-        import time as _time
-
         # 为 payload 开销预留空间，避免 body 超限
         budget = max(1000, max_bytes - 1500)
-        chunks = self._chunk_markdown_by_bytes(content, budget)
-        if not chunks:
+        chunks = chunk_markdown(content, ChunkProfile(budget, marker=DINGTALK_PAGE_MARKER))
+        if not chunks or not chunks[0].strip():
             return False
 
         total = len(chunks)
         ok = 0
 
         for idx, chunk in enumerate(chunks):
-            marker = f"\n\n📄 *({idx+1}/{total})*" if total > 1 else ""
             payload = {
                 "msgtype": "markdown",
                 "markdown": {
                     "title": "股票分析报告",
-                    "text": chunk + marker,
+                    "text": chunk,
                 },
             }
 
@@ -2752,7 +1658,7 @@ class NotificationService:
             body_bytes = len(json.dumps(payload, ensure_ascii=False).encode('utf-8'))
             if body_bytes > max_bytes:
                 hard_budget = max(200, budget - (body_bytes - max_bytes) - 200)
-                payload["markdown"]["text"] = self._truncate_to_bytes(payload["markdown"]["text"], hard_budget)
+                payload["markdown"]["text"] = truncate_text(payload["markdown"]["text"], hard_budget)
 
             if self._post_custom_webhook(url, payload, timeout=30):
                 ok += 1
@@ -2760,7 +1666,7 @@ class NotificationService:
                 logger.error(f"钉钉分批发送失败: 第 {idx+1}/{total} 批")
 
             if idx < total - 1:
-                _time.sleep(1)
+                pacing.pause(1, 'push_delay', host='dingtalk')
 
         return ok == total
     
@@ -2914,49 +1820,13 @@ class NotificationService:
         Returns:
             是否全部发送成功
         """
-        import time
-        
-        def get_bytes(s: str) -> int:
-            return len(s.encode('utf-8'))
-        
-        # 按段落或分隔线分割
-        if "\n---\n" in content:
-            sections = content.split("\n---\n")
-            separator = "\n---\n"
-        elif "\n### " in content:
-            parts = content.split("\n### ")
-            sections = [parts[0]] + [f"### {p}" for p in parts[1:]]
-            separator = "\n"
-        else:
-            # 按行分割
-            sections = content.split("\n")
-            separator = "\n"
-        
-        chunks = []
-        current_chunk = []
-        current_bytes = 0
-        separator_bytes = get_bytes(separator)
-        
-        for section in sections:
-            section_bytes = get_bytes(section) + separator_bytes
-            
-            if current_bytes + section_bytes > max_bytes:
-                if current_chunk:
-                    chunks.append(separator.join(current_chunk))
-                current_chunk = [section]
-                current_bytes = section_bytes
-            else:
-                current_chunk.append(section)
-                current_bytes += section_bytes
-        
-        if current_chunk:
-            chunks.append(separator.join(current_chunk))
+        chunks = chunk_markdown(content, ChunkProfile(max_bytes))
         
         # 发送每个分块
         success = True
         for i, chunk in enumerate(chunks):
             if i > 0:
-                time.sleep(0.5)  # 避免请求过快
+                pacing.pause(0.5, 'push_delay', host='feishu')  # 避免请求过快
             
             if not reply_client.send_to_chat(chat_id, chunk):
                 success = False
@@ -2964,7 +1834,7 @@ class NotificationService:
         
         return success
     
-    def send_to_pushplus(self, content: str, title: Optional[str] = None) -> bool:
+    def send_to_pushplus(self, content: Content, title: Optional[str] = None) -> bool:
         """
         推送消息到 PushPlus
 
@@ -2993,6 +1863,8 @@ class NotificationService:
             logger.warning("PushPlus Token 未配置，跳过推送")
             return False
 
+        content = render(content, MARKDOWN)
+
         # PushPlus API 端点
         api_url = "http://www.pushplus.plus/send"
 
@@ -3028,7 +1900,7 @@ class NotificationService:
             logger.error(f"发送 PushPlus 消息失败: {e}")
             return False
 
-    def send_to_discord(self, content: str) -> bool:
+    def send_to_discord(self, content: Content) -> bool:
         """
         推送消息到 Discord（支持 Webhook 和 Bot API）
         
@@ -3038,6 +1910,8 @@ class NotificationService:
         Returns:
             是否发送成功
         """
+        content = render(content, MARKDOWN)
+        
         # 优先使用 Webhook（配置简单，权限低）
         if self._discord_config['webhook_url']:
             return self._send_discord_webhook(content)
@@ -3117,114 +1991,238 @@ class NotificationService:
             logger.error(f"Discord Bot 发送异常: {e}")
             return False
     
-    def send(self, content: str) -> bool:
+    def send(self, content: Content) -> bool:
         """
         统一发送接口 - 向所有已配置的渠道发送
         
-        遍历所有已配置的渠道，逐一发送消息
+        各渠道并发发送（见 dispatch），整体耗时取决于最慢的渠道
         
         Args:
-            content: 消息内容（Markdown 格式）
+            content: 消息内容（Markdown 文本或报告文档）
             
         Returns:
             是否至少有一个渠道发送成功
         """
-        context_success = self.send_to_context(content)
+        return self.dispatch(content).success
 
-        if not self._available_channels:
-            if context_success:
-                logger.info("已通过消息上下文渠道完成推送（无其他通知渠道）")
-                return True
-            logger.warning("通知服务不可用，跳过推送")
-            return False
-        
-        channel_names = self.get_channel_names()
-        logger.info(f"正在向 {len(self._available_channels)} 个渠道发送通知：{channel_names}")
-        
-        success_count = 0
-        fail_count = 0
-        
-        for channel in self._available_channels:
-            channel_name = ChannelDetector.get_channel_name(channel)
+    def deliver(
+        self,
+        content: Content,
+        overrides: Optional[Dict[NotificationChannel, Content]] = None,
+        message_key: Optional[str] = None,
+        channels: Optional[List[NotificationChannel]] = None,
+    ) -> bool:
+        """
+        推送报告 - 启用通知发件箱（NOTIFICATION_OUTBOX_ENABLED）时写入发件箱后立即返回
+
+        发件箱由后台线程限速发送并在失败时重试；消息上下文渠道（钉钉/飞书会话）属于即时回复，始终直接发送。
+        未启用发件箱或写入失败时退化为 dispatch 直接并发推送。
+
+        Args:
+            content: 默认消息内容（Markdown 文本或报告文档）
+            overrides: 指定渠道使用的专属内容
+            message_key: 消息标识（发件箱按此去重，默认按内容生成）
+            channels: 目标渠道（默认全部已配置渠道；消息上下文渠道不受此限制）
+
+        Returns:
+            是否至少有一个渠道发送成功或已入队
+        """
+        channels = self._available_channels if channels is None else channels
+        if not getattr(get_config(), 'notification_outbox_enabled', False):
+            return self.dispatch(content, overrides=overrides, channels=channels).success
+
+        from src.notification_outbox import get_notification_outbox
+
+        success = False
+        if self._has_context_channel():
+            success = self.dispatch(content, channels=[]).success
+        if channels:
             try:
-                if channel == NotificationChannel.WECHAT:
-                    result = self.send_to_wechat(content)
-                elif channel == NotificationChannel.FEISHU:
-                    result = self.send_to_feishu(content)
-                elif channel == NotificationChannel.TELEGRAM:
-                    result = self.send_to_telegram(content)
-                elif channel == NotificationChannel.EMAIL:
-                    result = self.send_to_email(content)
-                elif channel == NotificationChannel.PUSHOVER:
-                    result = self.send_to_pushover(content)
-                elif channel == NotificationChannel.PUSHPLUS:
-                    result = self.send_to_pushplus(content)
-                elif channel == NotificationChannel.CUSTOM:
-                    result = self.send_to_custom(content)
-                elif channel == NotificationChannel.DISCORD:
-                    result = self.send_to_discord(content)
-                else:
-                    logger.warning(f"不支持的通知渠道: {channel}")
-                    result = False
-                
-                if result:
-                    success_count += 1
-                else:
-                    fail_count += 1
-                    
+                get_notification_outbox().enqueue(
+                    content, overrides=overrides, channels=channels, message_key=message_key
+                )
+                success = True
             except Exception as e:
-                logger.error(f"{channel_name} 发送失败: {e}")
-                fail_count += 1
-        
-        logger.info(f"通知发送完成：成功 {success_count} 个，失败 {fail_count} 个")
-        return success_count > 0 or context_success
+                logger.error(f"写入通知发件箱失败，改为直接推送: {e}")
+                delivery = self.dispatch(content, overrides=overrides, channels=channels, include_context=False)
+                success = delivery.success or success
+        return success
+
+    def send_to_channel(self, channel: NotificationChannel, content: Content) -> bool:
+        """向单个渠道发送"""
+        senders: Dict[NotificationChannel, Callable[[Content], bool]] = {
+            NotificationChannel.WECHAT: self.send_to_wechat,
+            NotificationChannel.FEISHU: self.send_to_feishu,
+            NotificationChannel.TELEGRAM: self.send_to_telegram,
+            NotificationChannel.EMAIL: self.send_to_email,
+            NotificationChannel.PUSHOVER: self.send_to_pushover,
+            NotificationChannel.PUSHPLUS: self.send_to_pushplus,
+            NotificationChannel.CUSTOM: self.send_to_custom,
+            NotificationChannel.DISCORD: self.send_to_discord,
+        }
+        sender = senders.get(channel)
+        if sender is None:
+            logger.warning(f"不支持的通知渠道: {channel}")
+            return False
+        return sender(content)
+
+    def chunk_spec(self, channel: NotificationChannel) -> Optional[Tuple[str, ChunkProfile]]:
+        """
+        可预先分块渠道的 (序列化目标, 分块规格)；其余渠道返回 None
+
+        企业微信 / 飞书 / Telegram 的消息块可逐块调用 send_prepared 直接发送，
+        因此支持发件箱逐块持久化与超大报告流式推送。
+        """
+        if channel == NotificationChannel.WECHAT:
+            return MARKDOWN, ChunkProfile(self._wechat_max_bytes, marker=WECHAT_PAGE_MARKER)
+        if channel == NotificationChannel.FEISHU:
+            return FEISHU, ChunkProfile(self._feishu_max_bytes, marker=FEISHU_PAGE_MARKER)
+        if channel == NotificationChannel.TELEGRAM:
+            return TELEGRAM, ChunkProfile(TELEGRAM_MAX_LENGTH, unit=UNIT_CHARS)
+        return None
+
+    def prepare_for_channel(self, channel: NotificationChannel, content: Content) -> List[str]:
+        """
+        将消息预先切分为该渠道可直接发送的消息块（供发件箱逐块持久化）
+
+        企业微信 / 飞书 / Telegram 在此完成格式转换与分批（含分页标记），逐块调用 send_prepared 即可；
+        其余渠道返回单块 Markdown，由 send_to_xxx 自行转换格式并处理长度限制。
+        """
+        spec = self.chunk_spec(channel)
+        if spec is None:
+            return [render(content, MARKDOWN)]
+        target, profile = spec
+        return chunk_markdown(render(content, target), profile)
+
+    def send_prepared(self, channel: NotificationChannel, payload: str) -> bool:
+        """发送 prepare_for_channel 产出的单个消息块"""
+        if channel == NotificationChannel.WECHAT:
+            if not self._wechat_url:
+                logger.warning("企业微信 Webhook 未配置，跳过推送")
+                return False
+            return self._send_wechat_message(payload)
+        if channel == NotificationChannel.FEISHU:
+            if not self._feishu_url:
+                logger.warning("飞书 Webhook 未配置，跳过推送")
+                return False
+            return self._send_feishu_message(payload)
+        if channel == NotificationChannel.TELEGRAM:
+            if not self._is_telegram_configured():
+                logger.warning("Telegram 配置不完整，跳过推送")
+                return False
+            api_url = f"https://api.telegram.org/bot{self._telegram_config['bot_token']}/sendMessage"
+            return self._send_telegram_message(api_url, self._telegram_config['chat_id'], payload)
+        return self.send_to_channel(channel, payload)
+
+    def dispatch(
+        self,
+        content: Content,
+        overrides: Optional[Dict[NotificationChannel, Content]] = None,
+        channels: Optional[List[NotificationChannel]] = None,
+        deadline: Optional[float] = None,
+        include_context: bool = True,
+    ) -> DeliveryReport:
+        """
+        多渠道并发推送
+
+        每个渠道一个线程：先经过渠道节流（ChannelPacer），再调用对应的 send_to_xxx。
+        到达整体截止时间仍未完成的渠道记为超时，不再等待（后台线程自然结束）。
+
+        Args:
+            content: 默认消息内容（Markdown 文本或报告文档，各渠道按需序列化）
+            overrides: 指定渠道使用的专属内容（如企业微信发精简版）
+            channels: 目标渠道（默认全部已配置渠道）
+            deadline: 整体截止时间（秒，默认 NOTIFICATION_DEADLINE）
+            include_context: 是否同时回复消息上下文渠道（钉钉/飞书会话）
+
+        Returns:
+            DeliveryReport 逐渠道投递结果
+        """
+        start = time.monotonic()
+        overrides = overrides or {}
+        channels = self._available_channels if channels is None else channels
+        if deadline is None:
+            deadline = getattr(get_config(), 'notification_deadline', 120.0)
+
+        # (key, 名称, 渠道, 发送函数)
+        tasks = []
+        if include_context and self._has_context_channel():
+            tasks.append((CONTEXT_CHANNEL_KEY, "消息上下文", None, lambda: self.send_to_context(content)))
+        for channel in channels:
+            body = overrides.get(channel, content)
+            tasks.append((
+                channel.value,
+                ChannelDetector.get_channel_name(channel),
+                channel,
+                lambda ch=channel, text=body: self.send_to_channel(ch, text),
+            ))
+
+        report = DeliveryReport()
+        if not tasks:
+            logger.warning("通知服务不可用，跳过推送")
+            return report
+
+        logger.info(f"正在向 {len(tasks)} 个渠道并发发送通知：{', '.join(t[1] for t in tasks)}")
+
+        executor = ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="notify")
+        futures = {
+            executor.submit(self._deliver_one, key, name, channel, fn): (key, name)
+            for key, name, channel, fn in tasks
+        }
+        done, _ = wait(futures, timeout=deadline)
+        executor.shutdown(wait=False)
+
+        for future, (key, name) in futures.items():
+            if future in done:
+                report.results.append(future.result())
+            else:
+                logger.warning(f"{name} 推送超过截止时间 {deadline:g}s，记为超时")
+                report.results.append(ChannelDeliveryResult(
+                    channel=key, name=name, timed_out=True, elapsed=time.monotonic() - start,
+                    error=f"超过截止时间 {deadline:g}s",
+                ))
+
+        report.elapsed = time.monotonic() - start
+        logger.info(f"通知发送完成：{report.summary()}")
+        return report
+
+    @staticmethod
+    def _deliver_one(
+        key: str,
+        name: str,
+        channel: Optional[NotificationChannel],
+        fn: Callable[[], bool],
+    ) -> ChannelDeliveryResult:
+        """单渠道投递（线程内执行，异常转为失败结果）"""
+        result = ChannelDeliveryResult(channel=key, name=name)
+        if channel is not None:
+            result.waited = _channel_pacer.wait(channel)
+        start = time.monotonic()
+        try:
+            result.success = bool(fn())
+        except Exception as e:
+            logger.error(f"{name} 发送失败: {e}")
+            result.error = str(e)
+        result.elapsed = time.monotonic() - start
+        return result
     
-    def _send_chunked_messages(self, content: str, max_length: int) -> bool:
+    def get_report_path(self, filename: Optional[str] = None) -> str:
         """
-        分段发送长消息
-        
-        按段落（---）分割，确保每段不超过最大长度
+        日报文件路径（默认按日期命名，位于项目根目录下的 reports，目录不存在时自动创建）
         """
-        # 按分隔线分割
-        sections = content.split("\n---\n")
+        from pathlib import Path
         
-        current_chunk = []
-        current_length = 0
-        all_success = True
-        chunk_index = 1
-        
-        for section in sections:
-            section_with_divider = section + "\n---\n"
-            section_length = len(section_with_divider)
-            
-            if current_length + section_length > max_length:
-                # 发送当前块
-                if current_chunk:
-                    chunk_content = "\n---\n".join(current_chunk)
-                    logger.info(f"发送消息块 {chunk_index}...")
-                    if not self.send(chunk_content):
-                        all_success = False
-                    chunk_index += 1
-                
-                # 重置
-                current_chunk = [section]
-                current_length = section_length
-            else:
-                current_chunk.append(section)
-                current_length += section_length
-        
-        # 发送最后一块
-        if current_chunk:
-            chunk_content = "\n---\n".join(current_chunk)
-            logger.info(f"发送消息块 {chunk_index}（最后）...")
-            if not self.send(chunk_content):
-                all_success = False
+        if filename is None:
+            date_str = datetime.now().strftime('%Y%m%d')
+            filename = f"report_{date_str}.md"
         
-        return all_success
+        reports_dir = Path(__file__).parent.parent / 'reports'
+        reports_dir.mkdir(parents=True, exist_ok=True)
+        return str(reports_dir / filename)
     
     def save_report_to_file(
         self, 
-        content: str, 
+        content: Content, 
         filename: Optional[str] = None
     ) -> str:
         """
@@ -3237,20 +2235,10 @@ class NotificationService:
         Returns:
             保存的文件路径
         """
-        from pathlib import Path
-        
-        if filename is None:
-            date_str = datetime.now().strftime('%Y%m%d')
-            filename = f"report_{date_str}.md"
-        
-        # 确保 reports 目录存在（使用项目根目录下的 reports）
-        reports_dir = Path(__file__).parent.parent / 'reports'
-        reports_dir.mkdir(parents=True, exist_ok=True)
-        
-        filepath = reports_dir / filename
+        filepath = self.get_report_path(filename)
         
         with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+            f.write(render(content, MARKDOWN))
         
         logger.info(f"日报已保存到: {filepath}")
         return str(filepath)
@@ -0,0 +1,512 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 通知发件箱
+===================================
+
+职责：
+1. 将待推送报告按渠道预先分批后写入 SQLite（notification_outbox 表）
+2. 后台线程按渠道限速发送，失败按指数退避重试，超过次数标记为失败
+3. 幂等键去重：同一报告重复入队、进程重启后续发，均不会重复推送已发出的分块
+4. 同一渠道的分块严格按顺序发送，前一块未发出前不发后一块
+5. 流式报告可逐块追加（append），总块数未知时记为 0，生成完毕后 seal 补全
+
+流水线只负责入队，不再等待各渠道 Webhook 返回；
+程序退出前 flush() 在截止时间内尽量发完，剩余消息留待下次启动继续发送。
+"""
+
+import atexit
+import hashlib
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.config import get_config
+from src.notification import (
+    ChannelDetector,
+    Content,
+    NotificationChannel,
+    NotificationService,
+    _channel_pacer,
+)
+from src.report_ast import MARKDOWN, render
+from src.storage import DatabaseManager, NotificationOutbox as OutboxRow, get_db
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = 'pending'
+STATUS_SENDING = 'sending'
+STATUS_SENT = 'sent'
+STATUS_FAILED = 'failed'
+
+# 认领租期（秒）：发送中进程崩溃时，超过租期的 sending 记录会重新变为待发送
+CLAIM_LEASE = 600
+
+# 重试间隔上限（秒）
+MAX_BACKOFF = 3600
+
+# 后台线程空闲轮询间隔（秒）
+POLL_INTERVAL = 30.0
+
+# 已发送 / 已放弃记录的保留天数
+PURGE_DAYS = 30
+
+
+def make_message_key(content: Content, overrides: Optional[Dict[NotificationChannel, Content]] = None) -> str:
+    """按内容生成消息标识（Markdown 内容完全相同的报告视为同一条消息）"""
+    digest = hashlib.sha1(render(content, MARKDOWN).encode('utf-8'))
+    for channel in sorted(overrides or {}, key=lambda ch: ch.value):
+        digest.update(f"\0{channel.value}\0".encode('utf-8'))
+        digest.update(render(overrides[channel], MARKDOWN).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_idempotency_key(message_key: str, channel: NotificationChannel, index: int, total: int) -> str:
+    """分块幂等键"""
+    return f"{message_key}:{channel.value}:{index}/{total}"
+
+
+class NotificationOutbox:
+    """
+    通知发件箱 - 单例模式
+
+    使用示例:
+        outbox = get_notification_outbox()
+        outbox.enqueue(report, overrides={NotificationChannel.WECHAT: brief})
+        ...
+        outbox.flush(timeout=120)   # 程序退出前尽量发完
+    """
+
+    _instance: Optional['NotificationOutbox'] = None
+
+    def __init__(
+        self,
+        notifier: Optional[NotificationService] = None,
+        db: Optional[DatabaseManager] = None,
+        config=None,
+    ):
+        self.config = config or get_config()
+        self.db = db or get_db()
+        self._notifier = notifier
+        self.max_attempts = max(1, getattr(self.config, 'notification_outbox_max_attempts', 6))
+        self.backoff = max(1.0, getattr(self.config, 'notification_outbox_backoff', 30.0))
+
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._idle = threading.Condition()
+        self._busy = False
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._exit_hook_registered = False
+
+    @classmethod
+    def get_instance(cls) -> 'NotificationOutbox':
+        """获取单例实例"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    @property
+    def notifier(self) -> NotificationService:
+        if self._notifier is None:
+            self._notifier = NotificationService()
+        return self._notifier
+
+    # === 入队 ===
+
+    def enqueue(
+        self,
+        content: Content,
+        overrides: Optional[Dict[NotificationChannel, Content]] = None,
+        channels: Optional[List[NotificationChannel]] = None,
+        message_key: Optional[str] = None,
+    ) -> int:
+        """
+        将消息写入发件箱并唤醒后台发送线程
+
+        Args:
+            content: 默认消息内容（Markdown 文本或报告文档）
+            overrides: 指定渠道使用的专属内容（如企业微信发精简版）
+            channels: 目标渠道（默认全部已配置渠道）
+            message_key: 消息标识（默认按内容生成；相同标识的消息只会发送一次）
+
+        Returns:
+            新写入的分块数（已存在的分块跳过）
+        """
+        overrides = overrides or {}
+        channels = self.notifier.get_available_channels() if channels is None else channels
+        if not channels:
+            logger.warning("通知渠道未配置，发件箱不入队")
+            return 0
+        message_key = message_key or make_message_key(content, overrides)
+
+        rows = []
+        for channel in channels:
+            chunks = self.notifier.prepare_for_channel(channel, overrides.get(channel, content))
+            total = len(chunks)
+            for index, chunk in enumerate(chunks):
+                rows.append(OutboxRow(
+                    idempotency_key=make_idempotency_key(message_key, channel, index, total),
+                    message_key=message_key,
+                    channel=channel.value,
+                    chunk_index=index,
+                    chunk_total=total,
+                    payload=chunk,
+                    status=STATUS_PENDING,
+                    attempts=0,
+                    next_attempt_at=datetime.now(),
+                ))
+
+        inserted = self._insert_new(message_key, rows)
+        if inserted:
+            logger.info(f"[发件箱] 消息 {message_key[:12]} 入队 {inserted} 个分块（{len(channels)} 个渠道）")
+        else:
+            logger.info(f"[发件箱] 消息 {message_key[:12]} 已入队过，跳过")
+
+        self.start()
+        self._wake.set()
+        return inserted
+
+    def append(self, message_key: str, channel: NotificationChannel, index: int, payload: str) -> bool:
+        """
+        追加流式报告的单个分块（总块数未知，记为 0）并唤醒后台发送线程
+
+        Returns:
+            是否新写入（同一幂等键已存在时返回 False）
+        """
+        row = OutboxRow(
+            idempotency_key=make_idempotency_key(message_key, channel, index, 0),
+            message_key=message_key,
+            channel=channel.value,
+            chunk_index=index,
+            chunk_total=0,
+            payload=payload,
+            status=STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now(),
+        )
+        inserted = self._insert_new(message_key, [row])
+        self.start()
+        self._wake.set()
+        return bool(inserted)
+
+    def seal(self, message_key: str, channel: NotificationChannel, total: int) -> None:
+        """流式报告生成完毕：补全该渠道各分块的总块数"""
+        with self.db.get_session() as session:
+            session.execute(
+                update(OutboxRow)
+                .where(and_(OutboxRow.message_key == message_key, OutboxRow.channel == channel.value))
+                .values(chunk_total=total)
+            )
+            session.commit()
+        logger.info(f"[发件箱] 流式消息 {message_key[:12]} {channel.value} 共 {total} 个分块")
+
+    def _insert_new(self, message_key: str, rows: List[OutboxRow]) -> int:
+        """写入尚不存在的分块（按幂等键去重）"""
+        with self.db.get_session() as session:
+            existing = set(session.execute(
+                select(OutboxRow.idempotency_key).where(OutboxRow.message_key == message_key)
+            ).scalars())
+            new_rows = [row for row in rows if row.idempotency_key not in existing]
+            if not new_rows:
+                return 0
+            session.add_all(new_rows)
+            try:
+                session.commit()
+                return len(new_rows)
+            except IntegrityError:
+                # 其他进程并发写入了同一消息，逐条插入以跳过重复键
+                session.rollback()
+
+        inserted = 0
+        for row in new_rows:
+            with self.db.get_session() as session:
+                session.add(row)
+                try:
+                    session.commit()
+                    inserted += 1
+                except IntegrityError:
+                    session.rollback()
+        return inserted
+
+    # === 后台发送 ===
+
+    def start(self) -> None:
+        """启动后台发送线程（幂等）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="notify-outbox", daemon=True)
+            self._thread.start()
+            if not self._exit_hook_registered:
+                atexit.register(self._flush_at_exit)
+                self._exit_hook_registered = True
+
+    def stop(self) -> None:
+        """停止后台发送线程（未发送的消息保留在数据库中）"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待发件箱发送完毕
+
+        Args:
+            timeout: 最长等待秒数（默认 NOTIFICATION_DEADLINE）
+
+        Returns:
+            是否已全部发送（False 表示仍有待重试的消息，留待下次发送）
+        """
+        if timeout is None:
+            timeout = getattr(self.config, 'notification_deadline', 120.0)
+        self.start()
+        end = time.monotonic() + timeout
+        while True:
+            self._wake.set()
+            with self._idle:
+                self._idle.wait_for(lambda: not self._busy, timeout=max(0.0, end - time.monotonic()))
+            unsent = self.pending_count()
+            remaining = end - time.monotonic()
+            if unsent == 0:
+                return True
+            if remaining <= 0:
+                logger.warning(f"[发件箱] 截止时间内仍有 {unsent} 个分块未发送，将在下次启动后继续发送")
+                return False
+            time.sleep(min(1.0, remaining))
+
+    def _flush_at_exit(self) -> None:
+        try:
+            if self.pending_count():
+                self.flush()
+        except Exception as e:
+            logger.warning(f"[发件箱] 退出前发送失败: {e}")
+
+    def pending_count(self) -> int:
+        """未完成（待发送 / 发送中）的分块数"""
+        with self.db.get_session() as session:
+            return session.execute(
+                select(func.count()).select_from(OutboxRow).where(
+                    OutboxRow.status.in_((STATUS_PENDING, STATUS_SENDING))
+                )
+            ).scalar_one()
+
+    def _run(self) -> None:
+        logger.debug("[发件箱] 后台发送线程启动")
+        try:
+            purged = self.purge()
+            if purged:
+                logger.info(f"[发件箱] 清理 {purged} 条过期记录")
+        except Exception as e:
+            logger.warning(f"[发件箱] 清理过期记录失败: {e}")
+        while not self._stop.is_set():
+            with self._idle:
+                self._busy = True
+            try:
+                self.process_due()
+                wait_seconds = self._seconds_until_next()
+            except Exception as e:
+                logger.error(f"[发件箱] 发送循环异常: {e}")
+                wait_seconds = POLL_INTERVAL
+            finally:
+                with self._idle:
+                    self._busy = False
+                    self._idle.notify_all()
+            self._wake.wait(timeout=wait_seconds)
+            self._wake.clear()
+
+    def _seconds_until_next(self) -> float:
+        """距离下一个分块到期的秒数"""
+        with self.db.get_session() as session:
+            next_at = session.execute(
+                select(func.min(OutboxRow.next_attempt_at)).where(OutboxRow.status == STATUS_PENDING)
+            ).scalar()
+        if next_at is None:
+            return POLL_INTERVAL
+        return min(POLL_INTERVAL, max(0.0, (next_at - datetime.now()).total_seconds()))
+
+    def process_due(self) -> int:
+        """
+        发送所有已到期的分块（各渠道并发，渠道内按消息、分块顺序串行）
+
+        Returns:
+            本轮发送成功的分块数
+        """
+        self._release_expired_claims()
+        queues = self._due_heads()
+        if not queues:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=len(queues), thread_name_prefix="outbox") as executor:
+            return sum(executor.map(self._drain_channel, queues.items()))
+
+    def _release_expired_claims(self) -> None:
+        """超过租期仍处于发送中的分块（进程崩溃遗留）重新置为待发送"""
+        with self.db.get_session() as session:
+            result = session.execute(
+                update(OutboxRow)
+                .where(and_(OutboxRow.status == STATUS_SENDING, OutboxRow.next_attempt_at <= datetime.now()))
+                .values(status=STATUS_PENDING)
+            )
+            session.commit()
+            if result.rowcount:
+                logger.info(f"[发件箱] 恢复 {result.rowcount} 个中断的分块")
+
+    def _due_heads(self) -> Dict[str, List[Tuple[str, int]]]:
+        """
+        按渠道列出可发送的消息：每个 (消息, 渠道) 只取第一个未完成的分块，且须已到期
+
+        Returns:
+            {channel: [(message_key, chunk_index), ...]}（按入队顺序）
+        """
+        now = datetime.now()
+        with self.db.get_session() as session:
+            rows = session.execute(
+                select(
+                    OutboxRow.message_key, OutboxRow.channel, OutboxRow.chunk_index,
+                    OutboxRow.status, OutboxRow.next_attempt_at,
+                )
+                .where(OutboxRow.status.in_((STATUS_PENDING, STATUS_SENDING)))
+                .order_by(OutboxRow.id)
+            ).all()
+
+        heads: Dict[Tuple[str, str], Tuple[int, str, datetime]] = {}
+        for message_key, channel, index, status, next_at in rows:
+            head = heads.get((message_key, channel))
+            if head is None or index < head[0]:
+                heads[(message_key, channel)] = (index, status, next_at)
+
+        queues: Dict[str, List[Tuple[str, int]]] = {}
+        for (message_key, channel), (index, status, next_at) in heads.items():
+            if status == STATUS_PENDING and next_at <= now:
+                queues.setdefault(channel, []).append((message_key, index))
+        return queues
+
+    def _drain_channel(self, item: Tuple[str, List[Tuple[str, int]]]) -> int:
+        """发送单个渠道的到期消息；分块失败即停止该消息的后续分块"""
+        channel_value, heads = item
+        try:
+            channel = NotificationChannel(channel_value)
+        except ValueError:
+            logger.error(f"[发件箱] 未知渠道 {channel_value}，跳过")
+            return 0
+
+        sent = 0
+        for message_key, index in heads:
+            while not self._stop.is_set():
+                outcome = self._send_chunk(channel, message_key, index)
+                if outcome is None:
+                    break
+                sent += 1
+                index = outcome
+        return sent
+
+    def _send_chunk(self, channel: NotificationChannel, message_key: str, index: int) -> Optional[int]:
+        """
+        认领并发送单个分块
+
+        Returns:
+            发送成功时返回下一分块序号，否则 None（失败、已被其他进程认领或已是最后一块）
+        """
+        with self.db.get_session() as session:
+            row = session.execute(
+                select(OutboxRow).where(and_(
+                    OutboxRow.message_key == message_key,
+                    OutboxRow.channel == channel.value,
+                    OutboxRow.chunk_index == index,
+                ))
+            ).scalar_one_or_none()
+            if row is None or row.status != STATUS_PENDING:
+                return None
+            row_id, payload, total = row.id, row.payload, row.chunk_total
+            attempts = row.attempts + 1
+
+            # 乐观认领：同一数据库被多个进程共享时只有一个能认领成功
+            claimed = session.execute(
+                update(OutboxRow)
+                .where(and_(OutboxRow.id == row_id, OutboxRow.status == STATUS_PENDING))
+                .values(
+                    status=STATUS_SENDING,
+                    attempts=OutboxRow.attempts + 1,
+                    next_attempt_at=datetime.now() + timedelta(seconds=CLAIM_LEASE),
+                )
+            ).rowcount
+            session.commit()
+            if not claimed:
+                return None
+
+        name = ChannelDetector.get_channel_name(channel)
+        label = f"{name} {message_key[:12]} 第 {index + 1}/{total or '?'} 块"
+        _channel_pacer.wait(channel)
+        error = None
+        try:
+            success = bool(self.notifier.send_prepared(channel, payload))
+            if not success:
+                error = "发送失败"
+        except Exception as e:
+            success = False
+            error = str(e)
+
+        with self.db.get_session() as session:
+            if success:
+                values = dict(status=STATUS_SENT, sent_at=datetime.now(), last_error=None)
+                logger.info(f"[发件箱] {label}发送成功")
+            elif attempts >= self.max_attempts:
+                values = dict(status=STATUS_FAILED, last_error=error[:500])
+                logger.error(f"[发件箱] {label}已重试 {attempts} 次仍失败，放弃: {error}")
+            else:
+                delay = min(MAX_BACKOFF, self.backoff * 2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+                values = dict(
+                    status=STATUS_PENDING,
+                    next_attempt_at=datetime.now() + timedelta(seconds=delay),
+                    last_error=error[:500],
+                )
+                logger.warning(f"[发件箱] {label}发送失败（第 {attempts} 次），{delay:.0f}s 后重试: {error}")
+            session.execute(update(OutboxRow).where(OutboxRow.id == row_id).values(**values))
+            session.commit()
+
+        # 总块数未知（流式追加中）时尝试下一块，尚未写入则本轮结束
+        has_next = total == 0 or index + 1 < total
+        if success:
+            return index + 1 if has_next else None
+        # 失败的分块已放弃时，继续发送后续分块（部分内容优于全部丢失）
+        if values['status'] == STATUS_FAILED and has_next:
+            return index + 1
+        return None
+
+    # === 维护 ===
+
+    def purge(self, days: int = PURGE_DAYS) -> int:
+        """删除指定天数前已发送 / 已放弃的记录"""
+        cutoff = datetime.now() - timedelta(days=days)
+        with self.db.get_session() as session:
+            result = session.execute(
+                OutboxRow.__table__.delete().where(and_(
+                    OutboxRow.status.in_((STATUS_SENT, STATUS_FAILED)),
+                    or_(OutboxRow.sent_at < cutoff, and_(OutboxRow.sent_at.is_(None), OutboxRow.created_at < cutoff)),
+                ))
+            )
+            session.commit()
+            return result.rowcount
+
+
+def get_notification_outbox() -> NotificationOutbox:
+    """获取通知发件箱实例的快捷方式"""
+    return NotificationOutbox.get_instance()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    outbox = get_notification_outbox()
+    print(f"待发送分块: {outbox.pending_count()}")
+    print(f"发送完毕: {outbox.flush(timeout=30)}")
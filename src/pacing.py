@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 请求节奏控制
+===================================
+
+职责：
+1. 统一代替各处的主动休眠（数据源 jitter / 限速补充休眠、LLM 请求间隔、搜索间隔、
+   分析间隔、推送分批间隔），按主机（数据源 / 服务）和原因累计休眠时长
+2. 自适应 jitter：主机持续无限流信号时逐步缩小休眠倍率，遇到 429 / 封禁时倍率翻倍，
+   不再每次请求都按最坏情况休眠
+3. 与固定策略对比，统计节省（或多付）的休眠时长，并输出摘要
+
+使用方式：
+- 自适应休眠：pacing.wait('eastmoney', 2.0, 5.0)（min_interval 默认取下限，语义同原 _enforce_rate_limit）
+- 固定休眠：pacing.pause(1.0, 'push_delay', host='feishu')
+- 限流信号：pacing.throttled('eastmoney', reason) 或 pacing.observe('gemini', exc)
+
+倍率只作用于自适应休眠，固定休眠（重试退避、配置的分析间隔等）只记账不缩放。
+休眠同时计入当前运行的遥测（见 src/telemetry.py），按主机的累计值为进程级。
+"""
+
+import logging
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from src import telemetry
+
+logger = logging.getLogger(__name__)
+
+# 视为限流 / 封禁的错误特征（东方财富封禁时通常表现为连接被远端断开）
+THROTTLE_KEYWORDS = (
+    '429', 'too many requests', 'rate limit', 'ratelimit', 'quota',
+    'banned', 'blocked', 'remotedisconnected', 'connection aborted',
+    '频率', '频繁', '限流', '限制',
+)
+
+# 倍率调整幅度
+RELAX_FACTOR = 0.85     # 连续无限流后倍率乘以该值
+BACKOFF_FACTOR = 2.0    # 遇到限流后倍率乘以该值
+
+
+def is_throttle_message(text: str) -> bool:
+    """判断错误信息是否为限流 / 封禁信号"""
+    text = (text or '').lower()
+    return any(keyword in text for keyword in THROTTLE_KEYWORDS)
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """判断异常是否为限流 / 封禁信号"""
+    if type(error).__name__ == 'RateLimitError':
+        return True
+    return is_throttle_message(f"{type(error).__name__} {error}")
+
+
+@dataclass
+class HostStats:
+    """单个主机的节奏统计（进程级累计）"""
+    host: str
+    scale: float = 1.0
+    waits: int = 0
+    sleep_seconds: float = 0.0      # 实际休眠（自适应 + 固定）
+    adaptive_seconds: float = 0.0   # 其中自适应休眠的时长
+    baseline_seconds: float = 0.0   # 固定策略下自适应部分本应休眠的时长
+    throttles: int = 0
+
+    @property
+    def saved_seconds(self) -> float:
+        """自适应休眠相比固定策略节省的时长（负数表示因限流多付）"""
+        return self.baseline_seconds - self.adaptive_seconds
+
+
+class _HostState:
+    """单个主机的运行状态"""
+
+    def __init__(self, host: str):
+        self.stats = HostStats(host)
+        self.last_request: Optional[float] = None
+        self.clean_streak = 0
+        self.throttled_since_wait = False
+        self.lock = threading.Lock()
+
+
+class Pacer:
+    """
+    请求节奏控制器（单例）
+
+    使用示例:
+        pacer = get_pacer()
+        pacer.wait('eastmoney', 2.0, 5.0)
+        try:
+            df = ak.stock_zh_a_hist(...)
+        except Exception as e:
+            pacer.observe('eastmoney', e)
+            raise
+    """
+
+    _instance: Optional['Pacer'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        adaptive: bool = True,
+        min_scale: float = 0.3,
+        max_scale: float = 4.0,
+        relax_after: int = 10,
+    ):
+        """
+        Args:
+            adaptive: 是否启用自适应倍率（关闭后等同固定策略，仍然记账）
+            min_scale: 倍率下限
+            max_scale: 倍率上限
+            relax_after: 连续多少次无限流请求后缩小一次倍率
+        """
+        self.adaptive = adaptive
+        self.min_scale = min_scale
+        self.max_scale = max(max_scale, 1.0)
+        self.relax_after = max(relax_after, 1)
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_instance(cls) -> 'Pacer':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from src.config import get_config
+                    config = get_config()
+                    cls._instance = cls(
+                        adaptive=config.pacing_adaptive,
+                        min_scale=config.pacing_min_scale,
+                        max_scale=config.pacing_max_scale,
+                        relax_after=config.pacing_relax_after,
+                    )
+        return cls._instance
+
+    def _state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            with self._lock:
+                state = self._hosts.setdefault(host, _HostState(host))
+        return state
+
+    # === 休眠 ===
+
+    def wait(
+        self,
+        host: str,
+        min_seconds: float,
+        max_seconds: float,
+        min_interval: Optional[float] = None,
+        reason: str = 'jitter',
+    ) -> float:
+        """
+        自适应休眠：补足距上次请求的最小间隔，再随机 jitter，两者都乘以当前倍率
+
+        Args:
+            host: 主机标识（同一主机的多个数据源共享倍率与间隔）
+            min_seconds / max_seconds: 固定策略下的 jitter 范围
+            min_interval: 相邻请求的最小间隔（默认取 min_seconds）
+            reason: jitter 部分的休眠原因
+
+        Returns:
+            实际休眠秒数
+        """
+        state = self._state(host)
+        min_interval = min_seconds if min_interval is None else min_interval
+        draw = random.uniform(min_seconds, max_seconds)
+
+        with state.lock:
+            self._settle(state)
+            scale = state.stats.scale
+            gap = baseline_gap = 0.0
+            if state.last_request is not None:
+                elapsed = time.time() - state.last_request
+                gap = max(0.0, min_interval * scale - elapsed)
+                baseline_gap = max(0.0, min_interval - elapsed)
+            state.stats.waits += 1
+            state.stats.baseline_seconds += baseline_gap + draw
+            state.stats.adaptive_seconds += gap + draw * scale
+
+        if gap > 0:
+            logger.debug(f"[节奏] {host} 补充休眠 {gap:.2f} 秒")
+            self._sleep(state, gap, 'rate_limit')
+        jitter = draw * scale
+        logger.debug(f"[节奏] {host} 随机休眠 {jitter:.2f} 秒（倍率 {scale:.2f}）")
+        self._sleep(state, jitter, reason)
+        telemetry.incr('pacing_saved_seconds', baseline_gap + draw - gap - jitter, host=host)
+
+        with state.lock:
+            state.last_request = time.time()
+        return gap + jitter
+
+    def pause(self, seconds: float, reason: str, host: Optional[str] = None) -> None:
+        """固定休眠（不缩放，只记账）"""
+        if seconds <= 0:
+            return
+        if host is None:
+            telemetry.sleep(seconds, reason)
+            return
+        self._sleep(self._state(host), seconds, reason)
+
+    def _sleep(self, state: _HostState, seconds: float, reason: str) -> None:
+        if seconds <= 0:
+            return
+        telemetry.sleep(seconds, reason)
+        telemetry.incr('pacing_sleep_seconds', seconds, host=state.stats.host)
+        with state.lock:
+            state.stats.sleep_seconds += seconds
+
+    # === 限流信号 ===
+
+    def _settle(self, state: _HostState) -> None:
+        """上一次请求未出现限流信号时计为一次无限流请求，累计够次数后缩小倍率（需持有 state.lock）"""
+        if state.throttled_since_wait:
+            state.throttled_since_wait = False
+            return
+        if state.last_request is None or not self.adaptive:
+            return
+        state.clean_streak += 1
+        if state.clean_streak >= self.relax_after and state.stats.scale > self.min_scale:
+            state.clean_streak = 0
+            state.stats.scale = max(self.min_scale, state.stats.scale * RELAX_FACTOR)
+            logger.debug(f"[节奏] {state.stats.host} 持续无限流，倍率降至 {state.stats.scale:.2f}")
+
+    def throttled(self, host: str, reason: str = '') -> None:
+        """记录一次限流 / 封禁：倍率翻倍（不超过上限），重新累计无限流次数"""
+        state = self._state(host)
+        with state.lock:
+            state.stats.throttles += 1
+            state.clean_streak = 0
+            state.throttled_since_wait = True
+            if self.adaptive:
+                state.stats.scale = min(self.max_scale, max(state.stats.scale, 1.0) * BACKOFF_FACTOR)
+            scale = state.stats.scale
+        telemetry.incr('throttles', host=host)
+        logger.warning(f"[节奏] {host} 出现限流信号，倍率升至 {scale:.2f}" + (f": {reason[:100]}" if reason else ""))
+
+    def observe(self, host: str, error: BaseException) -> bool:
+        """检查异常，是限流信号时记录并返回 True"""
+        if is_throttle_error(error):
+            self.throttled(host, str(error))
+            return True
+        return False
+
+    # === 汇总 ===
+
+    def scale(self, host: str) -> float:
+        return self._state(host).stats.scale
+
+    def stats(self) -> List[HostStats]:
+        """各主机统计快照（按休眠时长降序）"""
+        with self._lock:
+            states = list(self._hosts.values())
+        snapshot = []
+        for state in states:
+            with state.lock:
+                snapshot.append(HostStats(**vars(state.stats)))
+        return sorted(snapshot, key=lambda s: -s.sleep_seconds)
+
+    def format_summary(self) -> str:
+        """各主机休眠摘要（进程级累计）"""
+        stats = self.stats()
+        if not stats:
+            return ""
+        lines = ["===== 请求节奏 ====="]
+        for s in stats:
+            line = f"{s.host}: 休眠 {s.sleep_seconds:.1f}s"
+            if s.waits:
+                line += (
+                    f"（自适应 {s.waits} 次，当前倍率 {s.scale:.2f}，"
+                    f"较固定策略节省 {s.saved_seconds:.1f}s）"
+                )
+            if s.throttles:
+                line += f"，限流 {s.throttles} 次"
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+def get_pacer() -> Pacer:
+    """获取节奏控制器单例"""
+    return Pacer.get_instance()
+
+
+# === 便捷函数 ===
+
+def wait(host: str, min_seconds: float, max_seconds: float, **kwargs) -> float:
+    return get_pacer().wait(host, min_seconds, max_seconds, **kwargs)
+
+
+def pause(seconds: float, reason: str, host: Optional[str] = None) -> None:
+    get_pacer().pause(seconds, reason, host)
+
+
+def throttled(host: str, reason: str = '') -> None:
+    get_pacer().throttled(host, reason)
+
+
+def observe(host: str, error: BaseException) -> bool:
+    return get_pacer().observe(host, error)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
+
+    pacer = Pacer(relax_after=3)
+    for i in range(8):
+        pacer.wait('demo', 0.01, 0.02)
+        if i == 5:
+            pacer.throttled('demo', 'HTTP 429 Too Many Requests')
+    pacer.pause(0.01, 'push_delay', host='feishu')
+    print(pacer.format_summary())
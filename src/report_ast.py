@@ -0,0 +1,591 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 报告文档模型
+===================================
+
+职责：
+1. 定义与渠道无关的报告文档模型（ReportDocument：分节 > 块 > 行内片段）
+2. 提供各渠道序列化器（Markdown / 飞书 lark_md / Telegram / 纯文本 / HTML），结果按文档缓存
+3. 将外部 Markdown（如 LLM 生成的大盘复盘）解析为同一模型，同一内容只解析一次
+
+新增渠道只需实现一个 Serializer 子类并注册到 SERIALIZERS。
+"""
+
+import html
+import re
+import threading
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+# === 序列化目标 ===
+MARKDOWN = 'markdown'
+FEISHU = 'feishu'
+TELEGRAM = 'telegram'
+PLAIN = 'plain'
+HTML = 'html'
+
+# === 块类型 ===
+HEADING = 'heading'
+LINE = 'line'
+QUOTE = 'quote'
+ITEM = 'item'
+TABLE = 'table'
+RULE = 'rule'
+BLANK = 'blank'
+CODE = 'code'
+
+
+class Span(NamedTuple):
+    """行内片段"""
+    text: str
+    style: str = ''     # '' 普通 | 'b' 加粗 | 'i' 斜体 | 'code' 行内代码 | 'link' 链接
+    url: str = ''
+
+
+Inline = Tuple[Span, ...]
+Part = Union[str, Span, int, float, None]
+
+
+def bold(text: Part) -> Span:
+    return Span(str(text), 'b')
+
+
+def italic(text: Part) -> Span:
+    return Span(str(text), 'i')
+
+
+def link(text: Part, url: str) -> Span:
+    return Span(str(text), 'link', url)
+
+
+def to_inline(parts: Iterable[Part]) -> Inline:
+    """将字符串 / Span 混合序列规整为行内片段（空串忽略）"""
+    spans = []
+    for part in parts:
+        if isinstance(part, Span):
+            if part.text:
+                spans.append(part)
+        elif part is not None:
+            text = str(part)
+            if text:
+                spans.append(Span(text))
+    return tuple(spans)
+
+
+def plain_text(spans: Inline) -> str:
+    return ''.join(span.text for span in spans)
+
+
+class Block(NamedTuple):
+    """块级元素"""
+    kind: str
+    spans: Inline = ()
+    level: int = 0                                   # 标题级别
+    rows: Tuple[Tuple[Inline, ...], ...] = ()        # 表格行（首行为表头）
+    widths: Tuple[int, ...] = ()                     # 表格分隔行各列的横线数（缺省为 6）
+
+
+class ReportSection:
+    """
+    报告分节（如一只股票的完整分析）
+
+    构建方法均返回自身，可链式调用：
+        section.heading(2, "🟢 贵州茅台 (600519)").blank().line(bold("一句话决策"), ": 持有")
+    """
+
+    __slots__ = ('key', 'blocks')
+
+    def __init__(self, key: Optional[str] = None):
+        self.key = key
+        self.blocks: List[Block] = []
+
+    def heading(self, level: int, *parts: Part) -> 'ReportSection':
+        self.blocks.append(Block(HEADING, to_inline(parts), level=level))
+        return self
+
+    def line(self, *parts: Part) -> 'ReportSection':
+        self.blocks.append(Block(LINE, to_inline(parts)))
+        return self
+
+    def quote(self, *parts: Part) -> 'ReportSection':
+        self.blocks.append(Block(QUOTE, to_inline(parts)))
+        return self
+
+    def item(self, *parts: Part) -> 'ReportSection':
+        self.blocks.append(Block(ITEM, to_inline(parts)))
+        return self
+
+    def items(self, values: Iterable[Part]) -> 'ReportSection':
+        for value in values:
+            self.item(value)
+        return self
+
+    def table(self, header: Sequence, rows: Iterable[Sequence], widths: Sequence[int] = ()) -> 'ReportSection':
+        """表格：单元格可为字符串、Span 或二者组成的列表；widths 控制 Markdown 分隔行宽度"""
+        def cell(value) -> Inline:
+            if isinstance(value, (list, tuple)) and not isinstance(value, Span):
+                return to_inline(value)
+            return to_inline((value,))
+
+        table_rows = [tuple(cell(c) for c in header)]
+        table_rows.extend(tuple(cell(c) for c in row) for row in rows)
+        self.blocks.append(Block(TABLE, rows=tuple(table_rows), widths=tuple(widths)))
+        return self
+
+    def rule(self) -> 'ReportSection':
+        self.blocks.append(Block(RULE))
+        return self
+
+    def blank(self) -> 'ReportSection':
+        self.blocks.append(Block(BLANK))
+        return self
+
+    def code(self, text: str) -> 'ReportSection':
+        self.blocks.append(Block(CODE, (Span(text),)))
+        return self
+
+
+class ReportDocument:
+    """
+    报告文档：有序分节 + 按序列化目标缓存的渲染结果
+
+    使用示例:
+        doc = ReportDocument()
+        doc.section().heading(1, "🎯 决策仪表盘").blank()
+        doc.markdown              # 保存文件 / 企业微信
+        doc.render(FEISHU)        # 飞书 lark_md
+    """
+
+    def __init__(self):
+        self.sections: List[ReportSection] = []
+        self._cache: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def section(self, key: Optional[str] = None) -> ReportSection:
+        section = ReportSection(key)
+        self.sections.append(section)
+        self._cache.clear()
+        return section
+
+    def render(self, target: str = MARKDOWN) -> str:
+        """序列化为指定目标格式（同一文档同一目标只渲染一次）"""
+        text = self._cache.get(target)
+        if text is None:
+            with self._lock:
+                text = self._cache.get(target)
+                if text is None:
+                    serializer = SERIALIZERS[target]
+                    text = self._cache[target] = serializer.finish(
+                        serializer.join(serializer.render_section(s) for s in self.sections)
+                    )
+        return text
+
+    def extend(self, sections: Iterable[ReportSection]) -> 'ReportDocument':
+        self.sections.extend(sections)
+        self._cache.clear()
+        return self
+
+    def iter_render(self, target: str = MARKDOWN) -> Iterator[str]:
+        """逐节序列化（不做整篇收尾处理，供流式写入）"""
+        return render_sections(self.sections, target)
+
+    @property
+    def markdown(self) -> str:
+        return self.render(MARKDOWN)
+
+    def __str__(self) -> str:
+        return self.markdown
+
+
+def render_sections(sections: Iterable[ReportSection], target: str = MARKDOWN) -> Iterator[str]:
+    """
+    逐节序列化（sections 可为生成器：渲染完一节即可丢弃，供超大报告流式输出）
+
+    逐节文本以换行拼接即为整篇 render 结果（不含整篇收尾处理）。
+    """
+    serializer = SERIALIZERS[target]
+    for section in sections:
+        yield serializer.render_section(section)
+
+
+# === 序列化器 ===
+
+class Serializer:
+    """序列化器基类：逐块输出文本行，分节之间以换行拼接"""
+
+    target = ''
+
+    def inline(self, spans: Inline) -> str:
+        return plain_text(spans)
+
+    def render_block(self, block: Block) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render_section(self, section: ReportSection) -> str:
+        lines: List[str] = []
+        for block in section.blocks:
+            lines.extend(self.render_block(block))
+        return '\n'.join(lines)
+
+    def join(self, sections: Iterable[str]) -> str:
+        return '\n'.join(sections)
+
+    def finish(self, text: str) -> str:
+        return text
+
+
+class MarkdownSerializer(Serializer):
+    """标准 Markdown（报告文件、企业微信、钉钉、Discord 等）"""
+
+    target = MARKDOWN
+
+    def inline(self, spans: Inline) -> str:
+        out = []
+        for span in spans:
+            if span.style == 'b':
+                out.append(f"**{span.text}**")
+            elif span.style == 'i':
+                out.append(f"*{span.text}*")
+            elif span.style == 'code':
+                out.append(f"`{span.text}`")
+            elif span.style == 'link':
+                out.append(f"[{span.text}]({span.url})")
+            else:
+                out.append(span.text)
+        return ''.join(out)
+
+    def render_block(self, block: Block) -> Iterator[str]:
+        kind = block.kind
+        if kind == LINE:
+            yield self.inline(block.spans)
+        elif kind == BLANK:
+            yield ''
+        elif kind == HEADING:
+            yield f"{'#' * block.level} {self.inline(block.spans)}"
+        elif kind == QUOTE:
+            yield f"> {self.inline(block.spans)}"
+        elif kind == ITEM:
+            yield f"- {self.inline(block.spans)}"
+        elif kind == RULE:
+            yield '---'
+        elif kind == TABLE:
+            header, *rows = block.rows
+            yield '| ' + ' | '.join(self.inline(c) for c in header) + ' |'
+            widths = block.widths or (6,) * len(header)
+            yield '|' + '|'.join('-' * width for width in widths) + '|'
+            for row in rows:
+                yield '| ' + ' | '.join(self.inline(c) for c in row) + ' |'
+        elif kind == CODE:
+            yield plain_text(block.spans)
+
+
+class FeishuSerializer(MarkdownSerializer):
+    """
+    飞书 lark_md：不支持标题与表格
+    - 标题用加粗代替，引用用 💬 前缀，分隔线统一为细线
+    - 表格转换为“表头：单元格”条目列表
+    """
+
+    target = FEISHU
+
+    def inline(self, spans: Inline) -> str:
+        return super().inline(tuple(s._replace(style='') if s.style == 'code' else s for s in spans))
+
+    def render_block(self, block: Block) -> Iterator[str]:
+        kind = block.kind
+        if kind == HEADING:
+            title = plain_text(block.spans).strip()
+            yield f"**{title}**" if title else ''
+        elif kind == QUOTE:
+            quote = self.inline(block.spans).strip()
+            yield f"💬 {quote}" if quote else ''
+        elif kind == RULE:
+            yield '────────'
+        elif kind == ITEM:
+            yield f"• {self.inline(block.spans).strip()}"
+        elif kind == TABLE:
+            yield from table_as_items(block, self.inline, key_sep='：')
+        else:
+            for line in super().render_block(block):
+                yield line.rstrip()
+
+    def finish(self, text: str) -> str:
+        return text.strip()
+
+
+class TelegramSerializer(Serializer):
+    """
+    Telegram Markdown（legacy）：不支持标题与表格，加粗为 *text*，
+    普通文本中的 [ ] ( ) 需转义
+    """
+
+    target = TELEGRAM
+
+    _ESCAPE = str.maketrans({'[': '\\[', ']': '\\]', '(': '\\(', ')': '\\)'})
+
+    def inline(self, spans: Inline) -> str:
+        out = []
+        for span in spans:
+            text = span.text.translate(self._ESCAPE)
+            if span.style == 'b':
+                out.append(f"*{text}*")
+            elif span.style == 'i':
+                out.append(f"_{text}_")
+            elif span.style == 'code':
+                out.append(f"`{span.text}`")
+            elif span.style == 'link':
+                out.append(f"[{span.text}]({span.url})")
+            else:
+                out.append(text)
+        return ''.join(out)
+
+    def render_block(self, block: Block) -> Iterator[str]:
+        kind = block.kind
+        if kind in (LINE, HEADING):
+            yield self.inline(block.spans)
+        elif kind == BLANK:
+            yield ''
+        elif kind == QUOTE:
+            yield f"> {self.inline(block.spans)}"
+        elif kind == ITEM:
+            yield f"- {self.inline(block.spans)}"
+        elif kind == RULE:
+            yield '---'
+        elif kind == TABLE:
+            yield from table_as_items(block, self.inline, key_sep=': ')
+        elif kind == CODE:
+            yield plain_text(block.spans)
+
+
+class PlainTextSerializer(Serializer):
+    """纯文本（Pushover 等）：去除全部格式标记，保留可读性"""
+
+    target = PLAIN
+
+    def inline(self, spans: Inline) -> str:
+        return ''.join(f"{s.text} {s.url}" if s.style == 'link' else s.text for s in spans)
+
+    def render_block(self, block: Block) -> Iterator[str]:
+        kind = block.kind
+        if kind in (LINE, HEADING, QUOTE):
+            yield self.inline(block.spans)
+        elif kind == BLANK:
+            yield ''
+        elif kind == ITEM:
+            yield f"• {self.inline(block.spans)}"
+        elif kind == RULE:
+            yield '────────'
+        elif kind == TABLE:
+            for row in block.rows:
+                yield ' | '.join(self.inline(c) for c in row)
+        elif kind == CODE:
+            yield plain_text(block.spans)
+
+    def finish(self, text: str) -> str:
+        return re.sub(r'\n{3,}', '\n\n', text).strip()
+
+
+class HtmlSerializer(Serializer):
+    """HTML 片段（邮件正文）：连续行合并为段落（行间换行），连续条目合并为列表"""
+
+    target = HTML
+
+    def inline(self, spans: Inline) -> str:
+        out = []
+        for span in spans:
+            text = html.escape(span.text)
+            if span.style == 'b':
+                out.append(f"<strong>{text}</strong>")
+            elif span.style == 'i':
+                out.append(f"<em>{text}</em>")
+            elif span.style == 'code':
+                out.append(f"<code>{text}</code>")
+            elif span.style == 'link':
+                out.append(f'<a href="{html.escape(span.url, quote=True)}">{text}</a>')
+            else:
+                out.append(text)
+        return ''.join(out)
+
+    def render_section(self, section: ReportSection) -> str:
+        out: List[str] = []
+        group: List[str] = []
+        group_kind = None
+
+        def close() -> None:
+            nonlocal group_kind
+            if group_kind == LINE:
+                out.append('<p>' + '<br>\n'.join(group) + '</p>')
+            elif group_kind == ITEM:
+                out.append('<ul>\n' + '\n'.join(f"<li>{g}</li>" for g in group) + '\n</ul>')
+            elif group_kind == QUOTE:
+                out.append('<blockquote><p>' + '<br>\n'.join(group) + '</p></blockquote>')
+            elif group_kind == CODE:
+                out.append('<pre><code>' + '\n'.join(group) + '</code></pre>')
+            group.clear()
+            group_kind = None
+
+        for block in section.blocks:
+            kind = block.kind
+            if kind in (LINE, ITEM, QUOTE, CODE):
+                if kind != group_kind:
+                    close()
+                    group_kind = kind
+                group.append(html.escape(plain_text(block.spans)) if kind == CODE else self.inline(block.spans))
+                continue
+            close()
+            if kind == HEADING:
+                level = min(max(block.level, 1), 6)
+                out.append(f"<h{level}>{self.inline(block.spans)}</h{level}>")
+            elif kind == RULE:
+                out.append('<hr>')
+            elif kind == TABLE:
+                header, *rows = block.rows
+                out.append('<table>')
+                out.append('<thead><tr>' + ''.join(f"<th>{self.inline(c)}</th>" for c in header) + '</tr></thead>')
+                out.append('<tbody>')
+                for row in rows:
+                    out.append('<tr>' + ''.join(f"<td>{self.inline(c)}</td>" for c in row) + '</tr>')
+                out.append('</tbody></table>')
+        close()
+        return '\n'.join(out)
+
+
+def table_as_items(block: Block, inline, key_sep: str) -> Iterator[str]:
+    """表格转条目：每个数据行输出“• 表头：单元格 | 表头：单元格”（空单元格跳过）"""
+    header, *rows = block.rows
+    keys = [plain_text(c).strip() for c in header]
+    for row in rows:
+        pairs = []
+        for idx, cell in enumerate(row):
+            value = inline(cell).strip()
+            if not value:
+                continue
+            key = keys[idx] if idx < len(keys) and keys[idx] else f"列{idx + 1}"
+            pairs.append(f"{key}{key_sep}{value}")
+        if pairs:
+            yield f"• {' | '.join(pairs)}"
+
+
+SERIALIZERS: Dict[str, Serializer] = {
+    s.target: s for s in (
+        MarkdownSerializer(),
+        FeishuSerializer(),
+        TelegramSerializer(),
+        PlainTextSerializer(),
+        HtmlSerializer(),
+    )
+}
+
+
+# === Markdown 解析 ===
+
+_HEADING_RE = re.compile(r'^(#{1,6})\s+(.*)$')
+_RULE_RE = re.compile(r'^\s*(?:-{3,}|\*{3,}|_{3,})\s*$')
+_ITEM_RE = re.compile(r'^[-*•]\s+(.*)$')
+_TABLE_SEP_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+_INLINE_RE = re.compile(
+    r'\*\*(?P<b>.+?)\*\*'
+    r'|`(?P<code>[^`]+)`'
+    r'|\[(?P<text>[^\]]+)\]\((?P<url>[^)\s]+)\)'
+    r'|(?<![\w*])\*(?P<i>[^*\s](?:[^*]*[^*\s])?)\*(?![\w*])'
+)
+
+
+def parse_inline(text: str) -> Inline:
+    """解析行内格式：**加粗**、*斜体*、`代码`、[链接](url)"""
+    spans = []
+    pos = 0
+    for match in _INLINE_RE.finditer(text):
+        if match.start() > pos:
+            spans.append(Span(text[pos:match.start()]))
+        if match.group('b') is not None:
+            spans.append(Span(match.group('b'), 'b'))
+        elif match.group('code') is not None:
+            spans.append(Span(match.group('code'), 'code'))
+        elif match.group('text') is not None:
+            spans.append(Span(match.group('text'), 'link', match.group('url')))
+        else:
+            spans.append(Span(match.group('i'), 'i'))
+        pos = match.end()
+    if pos < len(text):
+        spans.append(Span(text[pos:]))
+    return tuple(spans)
+
+
+def parse_markdown_report(text: str) -> ReportDocument:
+    """将 Markdown 文本解析为报告文档（分隔线处分节）"""
+    doc = ReportDocument()
+    section = doc.section()
+    table: List[str] = []
+    in_code = False
+
+    def flush_table() -> None:
+        if not table:
+            return
+        rows = [
+            tuple(parse_inline(c.strip()) for c in row.strip().strip('|').split('|'))
+            for row in table if not _TABLE_SEP_RE.match(row)
+        ]
+        widths = next((
+            tuple(len(c.strip()) for c in row.strip().strip('|').split('|'))
+            for row in table if _TABLE_SEP_RE.match(row)
+        ), ())
+        table.clear()
+        if rows:
+            section.blocks.append(Block(TABLE, rows=tuple(rows), widths=widths))
+
+    for raw in text.split('\n'):
+        line = raw.rstrip()
+        if line.lstrip().startswith('```'):
+            flush_table()
+            in_code = not in_code
+            continue
+        if in_code:
+            section.code(raw)
+            continue
+        if line.lstrip().startswith('|'):
+            table.append(line)
+            continue
+        flush_table()
+
+        if not line.strip():
+            section.blank()
+        elif _RULE_RE.match(line):
+            section.rule()
+            section = doc.section()
+        elif line.startswith('#'):
+            match = _HEADING_RE.match(line)
+            if match:
+                section.blocks.append(Block(HEADING, parse_inline(match.group(2).strip()), level=len(match.group(1))))
+            else:
+                section.blocks.append(Block(LINE, parse_inline(line)))
+        elif line.startswith('>'):
+            section.blocks.append(Block(QUOTE, parse_inline(line[1:].strip())))
+        else:
+            match = _ITEM_RE.match(line)
+            if match and not line.startswith('**'):
+                section.blocks.append(Block(ITEM, parse_inline(match.group(1).strip())))
+            else:
+                section.blocks.append(Block(LINE, parse_inline(line)))
+    flush_table()
+    return doc
+
+
+@lru_cache(maxsize=32)
+def _parse_cached(text: str) -> ReportDocument:
+    return parse_markdown_report(text)
+
+
+def as_document(content: Union[str, ReportDocument]) -> ReportDocument:
+    """统一入口：文档原样返回，Markdown 文本解析为文档（同一文本多渠道共享解析结果）"""
+    if isinstance(content, ReportDocument):
+        return content
+    return _parse_cached(content)
+
+
+def render(content: Union[str, ReportDocument], target: str) -> str:
+    """将文档或 Markdown 文本序列化为指定目标格式"""
+    if target == MARKDOWN and not isinstance(content, ReportDocument):
+        return content
+    return as_document(content).render(target)
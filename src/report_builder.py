@@ -0,0 +1,558 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 报告构建
+===================================
+
+职责：
+1. 一次遍历分析结果，规整为 StockEntry（信号等级、名称、dashboard 各部分）
+2. 基于同一批条目构建各报告视图（决策仪表盘、企业微信精简版、Bark 摘要、单股报告）
+3. 视图均为 ReportDocument，由各渠道序列化器按需渲染并缓存
+"""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.analyzer import AnalysisResult
+from src.report_ast import ReportDocument, ReportSection, bold, italic
+
+BUY_ADVICES = ('买入', '加仓', '强烈买入')
+SELL_ADVICES = ('卖出', '减仓', '强烈卖出')
+HOLD_ADVICES = ('持有', '观望')
+
+
+def get_signal_level(result: AnalysisResult) -> Tuple[str, str, str]:
+    """
+    根据操作建议获取信号等级和颜色
+
+    Returns:
+        (信号文字, emoji, 颜色标记)
+    """
+    advice = result.operation_advice
+    score = result.sentiment_score
+
+    if advice in ['强烈买入'] or score >= 80:
+        return ('强烈买入', '💚', '强买')
+    elif advice in ['买入', '加仓'] or score >= 65:
+        return ('买入', '🟢', '买入')
+    elif advice in ['持有'] or 55 <= score < 65:
+        return ('持有', '🟡', '持有')
+    elif advice in ['观望'] or 45 <= score < 55:
+        return ('观望', '⚪', '观望')
+    elif advice in ['减仓'] or 35 <= score < 45:
+        return ('减仓', '🟠', '减仓')
+    elif advice in ['卖出', '强烈卖出'] or score < 35:
+        return ('卖出', '🔴', '卖出')
+    else:
+        return ('观望', '⚪', '观望')
+
+
+def score_change_text(result: AnalysisResult) -> str:
+    """与上次分析相比的评分变化，如 " (较上次↑5)"；无历史记录时为空串"""
+    change = result.score_change
+    if change is None:
+        return ""
+    if change > 0:
+        return f" (较上次↑{change})"
+    if change < 0:
+        return f" (较上次↓{-change})"
+    return " (较上次持平)"
+
+
+def _clip(text: str, limit: int, ellipsis: bool = False) -> str:
+    if ellipsis and len(text) > limit:
+        return text[:limit] + "..."
+    return text[:limit]
+
+
+@dataclass
+class StockEntry:
+    """单只股票的报告素材（由 AnalysisResult 规整一次，各视图共享）"""
+    result: AnalysisResult
+    signal_text: str
+    signal_emoji: str
+    stock_name: str
+    dashboard: Dict[str, Any] = field(default_factory=dict)
+    core: Dict[str, Any] = field(default_factory=dict)
+    battle: Dict[str, Any] = field(default_factory=dict)
+    intel: Dict[str, Any] = field(default_factory=dict)
+    data_perspective: Dict[str, Any] = field(default_factory=dict)
+    dimensions: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_result(cls, result: AnalysisResult) -> 'StockEntry':
+        signal_text, signal_emoji, _ = get_signal_level(result)
+        # 确保 dashboard 是字典类型（修复 'str' object has no attribute 'get' 错误）
+        dashboard = result.dashboard if isinstance(getattr(result, 'dashboard', None), dict) else {}
+        # 股票名称（优先使用 result 中的名称）
+        stock_name = result.name if result.name and not result.name.startswith('股票') else f'股票{result.code}'
+        return cls(
+            result=result,
+            signal_text=signal_text,
+            signal_emoji=signal_emoji,
+            stock_name=stock_name,
+            dashboard=dashboard,
+            core=dashboard.get('core_conclusion', {}) or {},
+            battle=dashboard.get('battle_plan', {}) or {},
+            intel=dashboard.get('intelligence', {}) or {},
+            data_perspective=dashboard.get('data_perspective', {}) or {},
+            dimensions=getattr(result, 'dimensions', None) or {},
+        )
+
+    @property
+    def one_sentence(self) -> str:
+        return self.core.get('one_sentence', self.result.analysis_summary) if self.core else self.result.analysis_summary
+
+
+class ReportBuilder:
+    """
+    报告构建器
+
+    使用示例:
+        builder = ReportBuilder(results)
+        builder.dashboard().markdown           # 完整决策仪表盘
+        builder.wechat_dashboard()             # 企业微信精简版（ReportDocument）
+    """
+
+    def __init__(self, results: List[AnalysisResult], report_date: Optional[str] = None):
+        self.results = list(results)
+        self.report_date = report_date or datetime.now().strftime('%Y-%m-%d')
+        # 按评分排序（高分在前）
+        self.entries = [
+            StockEntry.from_result(r)
+            for r in sorted(self.results, key=lambda x: x.sentiment_score, reverse=True)
+        ]
+        self.buy_count = sum(1 for r in self.results if r.operation_advice in BUY_ADVICES)
+        self.sell_count = sum(1 for r in self.results if r.operation_advice in SELL_ADVICES)
+        self.hold_count = sum(1 for r in self.results if r.operation_advice in HOLD_ADVICES)
+        self._views: Dict[Any, ReportDocument] = {}
+
+    def _cached(self, key, build) -> ReportDocument:
+        doc = self._views.get(key)
+        if doc is None:
+            doc = self._views[key] = build()
+        return doc
+
+    # === 决策仪表盘（完整版） ===
+
+    def dashboard(self) -> ReportDocument:
+        """
+        决策仪表盘格式的日报（详细版）
+
+        格式：市场概览 + 重要信息 + 核心结论 + 数据透视 + 作战计划
+        """
+        return self._cached('dashboard', self._build_dashboard)
+
+    def _build_dashboard(self) -> ReportDocument:
+        return ReportDocument().extend(self.iter_dashboard())
+
+    def iter_dashboard(self) -> Iterator[ReportSection]:
+        """逐节生成决策仪表盘（不保留已生成的分节，供超大自选股列表流式输出）"""
+        header = ReportSection('header')
+        self.dashboard_header(header)
+        yield header
+        for entry in self.entries:
+            sec = ReportSection(entry.result.code)
+            self.dashboard_stock(sec, entry)
+            yield sec
+        footer = ReportSection('footer')
+        self.dashboard_footer(footer)
+        yield footer
+
+    def dashboard_header(self, sec: ReportSection) -> None:
+        sec.heading(1, f"🎯 {self.report_date} 决策仪表盘").blank()
+        sec.quote(
+            "共分析 ", bold(len(self.results)),
+            f" 只股票 | 🟢买入:{self.buy_count} 🟡观望:{self.hold_count} 🔴卖出:{self.sell_count}",
+        ).blank()
+
+        # === 分析结果摘要 (Issue #112) ===
+        if self.entries:
+            sec.heading(2, "📊 分析结果摘要").blank()
+            for entry in self.entries:
+                r = entry.result
+                # 如果有4维度评分，显示详细评分
+                if entry.dimensions:
+                    sec.line(
+                        f"{r.get_emoji()} ", bold(f"{r.name}({r.code})"),
+                        f": {r.operation_advice} | 总分{r.sentiment_score}{score_change_text(r)} "
+                        f"(💎{r.value_score} 💰{r.funding_score} 📰{r.news_score} 📈{r.trend_score})",
+                    )
+                else:
+                    sec.line(
+                        f"{r.get_emoji()} ", bold(f"{r.name}({r.code})"),
+                        f": {r.operation_advice} | 评分 {r.sentiment_score}{score_change_text(r)} | {r.trend_prediction}",
+                    )
+            sec.blank().rule().blank()
+
+    def dashboard_stock(self, sec: ReportSection, entry: StockEntry) -> None:
+        result = entry.result
+        sec.heading(2, f"{entry.signal_emoji} {entry.stock_name} ({result.code})").blank()
+
+        # ========== 舆情与基本面概览（放在最前面）==========
+        intel = entry.intel
+        if intel:
+            sec.heading(3, "📰 重要信息速览").blank()
+            if intel.get('sentiment_summary'):
+                sec.line(bold("💭 舆情情绪"), f": {intel['sentiment_summary']}")
+            if intel.get('earnings_outlook'):
+                sec.line(bold("📊 业绩预期"), f": {intel['earnings_outlook']}")
+            # 风险警报（醒目显示）
+            risk_alerts = intel.get('risk_alerts', [])
+            if risk_alerts:
+                sec.blank().line(bold("🚨 风险警报"), ":").items(risk_alerts)
+            # 利好催化
+            catalysts = intel.get('positive_catalysts', [])
+            if catalysts:
+                sec.blank().line(bold("✨ 利好催化"), ":").items(catalysts)
+            # 最新消息
+            if intel.get('latest_news'):
+                sec.blank().line(bold("📢 最新动态"), f": {intel['latest_news']}")
+            sec.blank()
+
+        # ========== 4维度评分 ==========
+        dimensions = entry.dimensions
+        if dimensions:
+            sec.heading(3, "🎯 综合评分").blank()
+            sec.line(
+                bold("总分"),
+                f": {result.sentiment_score}/100 "
+                f"(💎价值{result.value_score}×0.4 + 💰资金{result.funding_score}×0.25 "
+                f"+ 📰消息{result.news_score}×0.25 + 📈趋势{result.trend_score}×0.1)",
+            ).blank()
+
+            value_dim = dimensions.get('value_investment', {})
+            funding_dim = dimensions.get('funding_flow', {})
+            news_dim = dimensions.get('news_sentiment', {})
+            trend_dim = dimensions.get('trend_analysis', {})
+            sec.table(["维度", "评分", "关键指标", "总结"], widths=(6, 6, 9, 6), rows=[
+                ["💎 价值投资面", [bold(result.value_score), "/100"],
+                 f"PE:{value_dim.get('pe_ratio', 'N/A')} PB:{value_dim.get('pb_ratio', 'N/A')} ROE:{value_dim.get('roe', 'N/A')}",
+                 value_dim.get('summary', 'N/A')],
+                ["💰 资金面", [bold(result.funding_score), "/100"],
+                 funding_dim.get('fund_trend', 'N/A'), funding_dim.get('summary', 'N/A')],
+                ["📰 消息面", [bold(result.news_score), "/100"],
+                 news_dim.get('sentiment', 'N/A'), news_dim.get('summary', 'N/A')],
+                ["📈 趋势面", [bold(result.trend_score), "/100"],
+                 trend_dim.get('ma_alignment', 'N/A'), trend_dim.get('summary', 'N/A')],
+            ]).blank()
+
+        # ========== 核心结论 ==========
+        core = entry.core
+        one_sentence = core.get('one_sentence', result.analysis_summary)
+        time_sense = core.get('time_sensitivity', '本周内')
+        pos_advice = core.get('position_advice', {})
+
+        sec.heading(3, "📌 核心结论").blank()
+        sec.line(bold(f"{entry.signal_emoji} {entry.signal_text}"), f" | {result.trend_prediction}").blank()
+        sec.quote(bold("一句话决策"), f": {one_sentence}").blank()
+        sec.line("⏰ ", bold("时效性"), f": {time_sense}").blank()
+
+        # 持仓分类建议
+        if pos_advice:
+            sec.table(["持仓情况", "操作建议"], widths=(9, 9), rows=[
+                [["🆕 ", bold("空仓者")], pos_advice.get('no_position', result.operation_advice)],
+                [["💼 ", bold("持仓者")], pos_advice.get('has_position', '继续持有')],
+            ]).blank()
+
+        # ========== 数据透视 ==========
+        data_persp = entry.data_perspective
+        if data_persp:
+            trend_data = data_persp.get('trend_status', {})
+            price_data = data_persp.get('price_position', {})
+            vol_data = data_persp.get('volume_analysis', {})
+            chip_data = data_persp.get('chip_structure', {})
+
+            sec.heading(3, "📊 数据透视").blank()
+
+            if trend_data:
+                is_bullish = "✅ 是" if trend_data.get('is_bullish', False) else "❌ 否"
+                sec.line(
+                    bold("均线排列"),
+                    f": {trend_data.get('ma_alignment', 'N/A')} | 多头排列: {is_bullish} | "
+                    f"趋势强度: {trend_data.get('trend_score', 'N/A')}/100",
+                ).blank()
+
+            if price_data:
+                bias_status = price_data.get('bias_status', 'N/A')
+                bias_emoji = "✅" if bias_status == "安全" else ("⚠️" if bias_status == "警戒" else "🚨")
+                sec.table(["价格指标", "数值"], widths=(9, 6), rows=[
+                    ["当前价", price_data.get('current_price', 'N/A')],
+                    ["MA5", price_data.get('ma5', 'N/A')],
+                    ["MA10", price_data.get('ma10', 'N/A')],
+                    ["MA20", price_data.get('ma20', 'N/A')],
+                    ["乖离率(MA5)", f"{price_data.get('bias_ma5', 'N/A')}% {bias_emoji}{bias_status}"],
+                    ["支撑位", price_data.get('support_level', 'N/A')],
+                    ["压力位", price_data.get('resistance_level', 'N/A')],
+                ]).blank()
+
+            if vol_data:
+                sec.line(
+                    bold("量能"),
+                    f": 量比 {vol_data.get('volume_ratio', 'N/A')} ({vol_data.get('volume_status', '')}) | "
+                    f"换手率 {vol_data.get('turnover_rate', 'N/A')}%",
+                )
+                sec.line("💡 ", italic(vol_data.get('volume_meaning', ''))).blank()
+
+            if chip_data:
+                chip_health = chip_data.get('chip_health', 'N/A')
+                chip_emoji = "✅" if chip_health == "健康" else ("⚠️" if chip_health == "一般" else "🚨")
+                sec.line(
+                    bold("筹码"),
+                    f": 获利比例 {chip_data.get('profit_ratio', 'N/A')} | 平均成本 {chip_data.get('avg_cost', 'N/A')} | "
+                    f"集中度 {chip_data.get('concentration', 'N/A')} {chip_emoji}{chip_health}",
+                ).blank()
+
+        # ========== 作战计划 ==========
+        battle = entry.battle
+        if battle:
+            sec.heading(3, "🎯 作战计划").blank()
+
+            sniper = battle.get('sniper_points', {})
+            if sniper:
+                sec.line(bold("📍 狙击点位")).blank()
+                sec.table(["点位类型", "价格"], widths=(9, 6), rows=[
+                    ["🎯 理想买入点", sniper.get('ideal_buy', 'N/A')],
+                    ["🔵 次优买入点", sniper.get('secondary_buy', 'N/A')],
+                    ["🛑 止损位", sniper.get('stop_loss', 'N/A')],
+                    ["🎊 目标位", sniper.get('take_profit', 'N/A')],
+                ]).blank()
+
+            position = battle.get('position_strategy', {})
+            if position:
+                sec.line(bold("💰 仓位建议"), f": {position.get('suggested_position', 'N/A')}")
+                sec.item(f"建仓策略: {position.get('entry_plan', 'N/A')}")
+                sec.item(f"风控策略: {position.get('risk_control', 'N/A')}").blank()
+
+            checklist = battle.get('action_checklist', [])
+            if checklist:
+                sec.line(bold("✅ 检查清单")).blank().items(checklist).blank()
+
+        # 如果没有 dashboard，显示传统格式
+        if not entry.dashboard:
+            if result.buy_reason:
+                sec.line(bold("💡 操作理由"), f": {result.buy_reason}").blank()
+            if result.risk_warning:
+                sec.line(bold("⚠️ 风险提示"), f": {result.risk_warning}").blank()
+            if result.ma_analysis or result.volume_analysis:
+                sec.heading(3, "📊 技术面").blank()
+                if result.ma_analysis:
+                    sec.line(bold("均线"), f": {result.ma_analysis}")
+                if result.volume_analysis:
+                    sec.line(bold("量能"), f": {result.volume_analysis}")
+                sec.blank()
+            if result.news_summary:
+                sec.heading(3, "📰 消息面").line(result.news_summary).blank()
+
+        sec.rule().blank()
+
+    def dashboard_footer(self, sec: ReportSection) -> None:
+        sec.blank().line(italic(f"报告生成时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"))
+
+    # === 企业微信精简版 ===
+
+    def wechat_dashboard(self) -> ReportDocument:
+        """企业微信决策仪表盘精简版（控制在4000字符内），只保留核心结论和狙击点位"""
+        return self._cached('wechat', self._build_wechat_dashboard)
+
+    def _build_wechat_dashboard(self) -> ReportDocument:
+        return ReportDocument().extend(self.iter_wechat_dashboard())
+
+    def iter_wechat_dashboard(self) -> Iterator[ReportSection]:
+        """逐节生成企业微信精简版"""
+        yield ReportSection('header').heading(2, f"🎯 {self.report_date} 决策仪表盘").blank().quote(
+            f"{len(self.results)}只股票 | 🟢买入:{self.buy_count} 🟡观望:{self.hold_count} 🔴卖出:{self.sell_count}"
+        ).blank()
+
+        for entry in self.entries:
+            result = entry.result
+            sec = ReportSection(result.code)
+            core, battle, intel = entry.core, entry.battle, entry.intel
+
+            # 标题行：信号等级 + 股票名称
+            sec.heading(3, f"{entry.signal_emoji} ", bold(entry.signal_text), f" | {entry.stock_name}({result.code})").blank()
+
+            # 核心决策（一句话）
+            if entry.one_sentence:
+                sec.line("📌 ", bold(entry.one_sentence[:80])).blank()
+
+            # 重要信息区（舆情+基本面）
+            info_lines = []
+            if intel.get('earnings_outlook'):
+                info_lines.append(f"📊 业绩: {intel['earnings_outlook'][:60]}")
+            if intel.get('sentiment_summary'):
+                info_lines.append(f"💭 舆情: {intel['sentiment_summary'][:50]}")
+            if info_lines:
+                for line in info_lines:
+                    sec.line(line)
+                sec.blank()
+
+            # 风险警报（最重要，醒目显示）
+            risks = intel.get('risk_alerts', [])
+            if risks:
+                sec.line("🚨 ", bold("风险"), ":")
+                for risk in risks[:2]:  # 最多显示2条
+                    sec.line(f"   • {_clip(risk, 50, ellipsis=True)}")
+                sec.blank()
+
+            # 利好催化
+            catalysts = intel.get('positive_catalysts', [])
+            if catalysts:
+                sec.line("✨ ", bold("利好"), ":")
+                for cat in catalysts[:2]:  # 最多显示2条
+                    sec.line(f"   • {_clip(cat, 50, ellipsis=True)}")
+                sec.blank()
+
+            # 狙击点位
+            sniper = battle.get('sniper_points', {})
+            if sniper:
+                points = []
+                if sniper.get('ideal_buy', ''):
+                    points.append(f"🎯买点:{sniper['ideal_buy'][:15]}")
+                if sniper.get('stop_loss', ''):
+                    points.append(f"🛑止损:{sniper['stop_loss'][:15]}")
+                if sniper.get('take_profit', ''):
+                    points.append(f"🎊目标:{sniper['take_profit'][:15]}")
+                if points:
+                    sec.line(" | ".join(points)).blank()
+
+            # 持仓建议
+            pos_advice = core.get('position_advice', {})
+            if pos_advice:
+                if pos_advice.get('no_position', ''):
+                    sec.line(f"🆕 空仓者: {pos_advice['no_position'][:50]}")
+                if pos_advice.get('has_position', ''):
+                    sec.line(f"💼 持仓者: {pos_advice['has_position'][:50]}")
+                sec.blank()
+
+            # 检查清单简化版：只显示不通过的项目
+            checklist = battle.get('action_checklist', [])
+            failed_checks = [c for c in checklist if c.startswith('❌') or c.startswith('⚠️')]
+            if failed_checks:
+                sec.line(bold("检查未通过项"), ":")
+                for check in failed_checks[:3]:
+                    sec.line(f"   {check[:40]}")
+                sec.blank()
+
+            sec.rule().blank()
+            yield sec
+
+        yield ReportSection('footer').line(italic(f"生成时间: {datetime.now().strftime('%H:%M')}"))
+
+    # === Bark 超精简版 ===
+
+    def bark_summary(self, max_chars: int = 1000) -> ReportDocument:
+        """Bark 超精简版日报（严格控制字符数，至少显示3只）"""
+        return self._cached(('bark', max_chars), lambda: self._build_bark_summary(max_chars))
+
+    def _build_bark_summary(self, max_chars: int) -> ReportDocument:
+        doc = ReportDocument()
+        sec = doc.section()
+        report_date = datetime.strptime(self.report_date, '%Y-%m-%d').strftime('%m-%d')
+        hold_count = len(self.results) - self.buy_count - self.sell_count
+        header = [f"📊 {report_date} ({len(self.results)}只)", f"🟢{self.buy_count} 🟡{hold_count} 🔴{self.sell_count}", ""]
+        for line in header:
+            sec.line(line)
+
+        current_length = len("\n".join(header))
+        added_count = 0
+        for entry in self.entries:
+            r = entry.result
+            stock_lines = [f"{r.get_emoji()} {r.name}({r.code})", f"{r.operation_advice} {r.sentiment_score}分{score_change_text(r)}"]
+            if entry.dimensions:
+                stock_lines.append(f"💎{r.value_score} 💰{r.funding_score} 📰{r.news_score} 📈{r.trend_score}")
+
+            # 检查是否会超出限制（+2 为段落换行）
+            test_length = current_length + len("\n".join(stock_lines)) + 2
+            if test_length > max_chars and added_count >= 3:
+                remaining = len(self.entries) - added_count
+                if remaining > 0:
+                    sec.blank().line(f"... 还有{remaining}只")
+                break
+
+            for line in stock_lines:
+                sec.line(line)
+            sec.blank()
+            current_length = test_length
+            added_count += 1
+
+        # 底部精简提示
+        sec.line(italic("AI分析仅供参考"))
+        return doc
+
+    # === 单股报告 ===
+
+    @staticmethod
+    def single_stock(result: AnalysisResult) -> ReportDocument:
+        """单只股票的分析报告（单股推送模式 #55）：格式精简但信息完整"""
+        entry = StockEntry.from_result(result)
+        core, battle, intel = entry.core, entry.battle, entry.intel
+        report_date = datetime.now().strftime('%Y-%m-%d %H:%M')
+
+        doc = ReportDocument()
+        sec = doc.section(result.code)
+        sec.heading(2, f"{entry.signal_emoji} {entry.stock_name} ({result.code})").blank()
+        sec.quote(
+            f"{report_date} | 评分: ", bold(result.sentiment_score),
+            f"{score_change_text(result)} | {result.trend_prediction}",
+        ).blank()
+
+        # 4维度评分
+        dimensions = entry.dimensions
+        if dimensions:
+            sec.heading(3, "🎯 综合评分").blank()
+            sec.line(
+                f"💎价值{result.value_score} 💰资金{result.funding_score} "
+                f"📰消息{result.news_score} 📈趋势{result.trend_score}"
+            ).blank()
+            summaries = []
+            for key, emoji in (('value_investment', '💎'), ('funding_flow', '💰'),
+                               ('news_sentiment', '📰'), ('trend_analysis', '📈')):
+                if dimensions.get(key, {}).get('summary'):
+                    summaries.append(f"{emoji} {dimensions[key]['summary']}")
+            if summaries:
+                for s in summaries:
+                    sec.line(s)
+                sec.blank()
+
+        # 核心决策（一句话）
+        if entry.one_sentence:
+            sec.heading(3, "📌 核心结论").blank()
+            sec.line(bold(entry.signal_text), f": {entry.one_sentence}").blank()
+
+        # 重要信息（舆情+基本面）
+        if intel:
+            risks = intel.get('risk_alerts', [])
+            catalysts = intel.get('positive_catalysts', [])
+            info_added = bool(intel.get('earnings_outlook') or intel.get('sentiment_summary') or risks)
+            if info_added:
+                sec.heading(3, "📰 重要信息").blank()
+            if intel.get('earnings_outlook'):
+                sec.line("📊 ", bold("业绩预期"), f": {intel['earnings_outlook'][:100]}")
+            if intel.get('sentiment_summary'):
+                sec.line("💭 ", bold("舆情情绪"), f": {intel['sentiment_summary'][:80]}")
+            if risks:
+                sec.blank().line("🚨 ", bold("风险警报"), ":").items(risk[:60] for risk in risks[:3])
+            if catalysts:
+                sec.blank().line("✨ ", bold("利好催化"), ":").items(cat[:60] for cat in catalysts[:3])
+            if info_added:
+                sec.blank()
+
+        # 狙击点位
+        sniper = battle.get('sniper_points', {})
+        if sniper:
+            sec.heading(3, "🎯 操作点位").blank()
+            sec.table(["买点", "止损", "目标"], [[
+                sniper.get('ideal_buy', '-'), sniper.get('stop_loss', '-'), sniper.get('take_profit', '-'),
+            ]]).blank()
+
+        # 持仓建议
+        pos_advice = core.get('position_advice', {})
+        if pos_advice:
+            sec.heading(3, "💼 持仓建议").blank()
+            sec.item("🆕 ", bold("空仓者"), f": {pos_advice.get('no_position', result.operation_advice)}")
+            sec.item("💼 ", bold("持仓者"), f": {pos_advice.get('has_position', '继续持有')}").blank()
+
+        sec.rule().line(italic("AI生成，仅供参考，不构成投资建议"))
+        return doc
@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 报告流式输出
+===================================
+
+职责：
+1. 逐节生成超大报告：每节渲染后立即写入报告文件，并喂给各渠道的流式分块器
+2. 可预分块渠道（企业微信 / 飞书 / Telegram）凑满一块即推送或写入发件箱，
+   首块无需等待整篇报告生成完毕
+3. 每个渠道一个有界队列 + 发送线程，发送慢于生成时反压生成端，
+   内存占用只与单节 / 单块大小有关，与自选股数量无关
+4. 其余渠道（邮件、Pushover 等需要整篇内容）在生成完毕后从报告文件读取一次再推送
+
+自选股数量达到 REPORT_STREAM_THRESHOLD 时由流水线启用。
+"""
+
+import logging
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Dict, IO, Iterable, List, Optional
+
+from src.config import get_config
+from src.markdown_chunker import ChunkProfile, StreamChunker
+from src.notification import (
+    ChannelDetector,
+    NotificationChannel,
+    NotificationService,
+    _channel_pacer,
+)
+from src.report_ast import MARKDOWN, SERIALIZERS, ReportSection
+
+logger = logging.getLogger(__name__)
+
+# 每个渠道排队等待发送的消息块上限（超出时阻塞报告生成）
+STREAM_QUEUE_SIZE = 4
+
+
+@dataclass
+class StreamReport:
+    """一次流式输出的汇总结果"""
+    filepath: Optional[str] = None
+    sections: int = 0
+    chunks: Dict[str, int] = field(default_factory=dict)       # 渠道 -> 产出块数
+    failed: Dict[str, int] = field(default_factory=dict)       # 渠道 -> 发送失败 / 超时丢弃块数
+    delivered: bool = False                                    # 其余渠道（读取报告文件推送）是否成功
+    elapsed: float = 0.0
+
+    @property
+    def success(self) -> bool:
+        """是否至少有一个渠道全部发送成功（或已入队）"""
+        streamed = any(count and not self.failed.get(ch) for ch, count in self.chunks.items())
+        return streamed or self.delivered
+
+
+class _ChannelStream:
+    """单个渠道的流式发送：分块器 + 有界队列 + 发送线程（启用发件箱时改为逐块追加）"""
+
+    def __init__(
+        self,
+        notifier: NotificationService,
+        channel: NotificationChannel,
+        target: str,
+        profile: ChunkProfile,
+        message_key: str,
+        outbox=None,
+    ):
+        self.notifier = notifier
+        self.channel = channel
+        self.target = target
+        self.name = ChannelDetector.get_channel_name(channel)
+        self.chunker = StreamChunker(profile)
+        self.message_key = message_key
+        self.outbox = outbox
+        self.emitted = 0
+        self.failed = 0
+        self.deadline: Optional[float] = None
+        self._closed = False
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        if outbox is None:
+            self._thread = threading.Thread(
+                target=self._run, name=f"stream-{channel.value}", daemon=True
+            )
+            self._thread.start()
+
+    def feed(self, text: str) -> None:
+        for chunk in self.chunker.feed(text):
+            self._emit(chunk)
+
+    def close(self, deadline: float) -> None:
+        """结束输入：产出剩余块；直连发送时此后开始计算截止时间"""
+        for chunk in self.chunker.close():
+            self._emit(chunk)
+        self._finish(deadline)
+
+    def abort(self, deadline: float) -> None:
+        """
+        报告生成中途异常：不再产出剩余块，只结束已产出的部分
+
+        发件箱消息按已写入块数封口，直连发送线程收到结束标记后退出，避免线程永久阻塞。
+        """
+        if self._closed:
+            return
+        try:
+            self._finish(deadline)
+        except Exception as e:
+            logger.error(f"[流式推送] {self.name} 中止失败: {e}")
+
+    def _finish(self, deadline: float) -> None:
+        self._closed = True
+        if self.outbox is not None:
+            self.outbox.seal(self.message_key, self.channel, self.emitted)
+        else:
+            self.deadline = deadline
+            self._queue.put(None)
+
+    def join(self, timeout: float) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout=max(0.0, timeout))
+            if self._thread.is_alive():
+                # 仍在发送的块计为失败（线程在截止时间后丢弃剩余块并自然结束）
+                self.failed += self._queue.qsize() + 1
+
+    def _emit(self, chunk: str) -> None:
+        index = self.emitted
+        self.emitted += 1
+        if self.outbox is not None:
+            self.outbox.append(self.message_key, self.channel, index, chunk)
+        else:
+            self._queue.put(chunk)
+
+    def _run(self) -> None:
+        sent = 0
+        while True:
+            chunk = self._queue.get()
+            if chunk is None:
+                break
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self.failed += 1
+                continue
+            _channel_pacer.wait(self.channel)
+            try:
+                ok = self.notifier.send_prepared(self.channel, chunk)
+            except Exception as e:
+                logger.error(f"[流式推送] {self.name} 第 {sent + self.failed + 1} 块发送异常: {e}")
+                ok = False
+            if ok:
+                sent += 1
+            else:
+                self.failed += 1
+        logger.info(f"[流式推送] {self.name} 发送完成：成功 {sent} 块，失败 {self.failed} 块")
+
+
+class ReportStreamer:
+    """
+    报告流式输出器
+
+    使用示例:
+        builder = notifier.build_report(results)
+        streamer = ReportStreamer(notifier)
+        report = streamer.stream(builder.iter_dashboard(), filepath=notifier.get_report_path())
+    """
+
+    def __init__(self, notifier: Optional[NotificationService] = None, config=None):
+        self.config = config or get_config()
+        self.notifier = notifier or NotificationService()
+
+    def stream(
+        self,
+        sections: Iterable[ReportSection],
+        filepath: Optional[str] = None,
+        channels: Optional[List[NotificationChannel]] = None,
+        include_context: bool = True,
+        message_key: Optional[str] = None,
+    ) -> StreamReport:
+        """
+        逐节生成、写入并推送报告
+
+        Args:
+            sections: 报告分节（通常为 ReportBuilder.iter_xxx() 生成器）
+            filepath: 报告文件路径（None 表示不保存）
+            channels: 目标渠道（默认全部已配置渠道；空列表表示只保存文件）
+            include_context: 是否同时回复消息上下文渠道（钉钉 / 飞书会话）
+            message_key: 发件箱消息标识（默认随机生成）
+
+        Returns:
+            StreamReport
+        """
+        start = time.monotonic()
+        notifier = self.notifier
+        channels = notifier.get_available_channels() if channels is None else channels
+        message_key = message_key or uuid.uuid4().hex
+
+        specs = {channel: notifier.chunk_spec(channel) for channel in channels}
+        rest = [channel for channel, spec in specs.items() if spec is None]
+        outbox = self._outbox() if len(rest) < len(specs) else None
+        streams = [
+            _ChannelStream(notifier, channel, spec[0], spec[1], message_key, outbox)
+            for channel, spec in specs.items() if spec is not None
+        ]
+
+        wants_file = bool(rest) or (include_context and notifier._has_context_channel())
+        report = StreamReport(filepath=filepath)
+        sink: Optional[IO[str]] = None
+        if filepath:
+            sink = open(filepath, 'w', encoding='utf-8')
+        elif wants_file:
+            sink = tempfile.TemporaryFile('w+', encoding='utf-8')
+
+        deadline_seconds = getattr(self.config, 'notification_deadline', 120.0)
+        try:
+            for section in sections:
+                rendered: Dict[str, str] = {}
+                markdown = rendered[MARKDOWN] = SERIALIZERS[MARKDOWN].render_section(section)
+                if sink is not None:
+                    if report.sections:
+                        sink.write('\n')
+                    sink.write(markdown)
+                for stream in streams:
+                    text = rendered.get(stream.target)
+                    if text is None:
+                        text = rendered[stream.target] = SERIALIZERS[stream.target].render_section(section)
+                    stream.feed(text)
+                report.sections += 1
+
+            deadline = time.monotonic() + deadline_seconds
+            for stream in streams:
+                stream.close(deadline)
+            for stream in streams:
+                stream.join(deadline - time.monotonic())
+                report.chunks[stream.channel.value] = stream.emitted
+                if stream.failed:
+                    report.failed[stream.channel.value] = stream.failed
+
+            # 需要整篇内容的渠道：从报告文件读取一次
+            if wants_file and sink is not None:
+                if filepath:
+                    sink.close()
+                    with open(filepath, 'r', encoding='utf-8') as f:
+                        content = f.read()
+                else:
+                    sink.seek(0)
+                    content = sink.read()
+                report.delivered = notifier.deliver(content, channels=rest, message_key=message_key)
+        except BaseException:
+            # 分节生成器或推送中途异常：结束各渠道已产出的部分，发送线程不能一直等在队列上
+            deadline = time.monotonic() + deadline_seconds
+            for stream in streams:
+                stream.abort(deadline)
+            raise
+        finally:
+            if sink is not None and not sink.closed:
+                sink.close()
+
+        report.elapsed = time.monotonic() - start
+        if filepath:
+            logger.info(f"日报已保存到: {filepath}")
+        logger.info(
+            f"[流式推送] {report.sections} 节，"
+            f"分块 {report.chunks or '-'}，失败 {report.failed or '-'}，耗时 {report.elapsed:.1f}s"
+        )
+        return report
+
+    def _outbox(self):
+        if not getattr(self.config, 'notification_outbox_enabled', False):
+            return None
+        from src.notification_outbox import get_notification_outbox
+        return get_notification_outbox()
+
+
+def stream_report(
+    sections: Iterable[ReportSection],
+    filepath: Optional[str] = None,
+    channels: Optional[List[NotificationChannel]] = None,
+    notifier: Optional[NotificationService] = None,
+) -> StreamReport:
+    """流式输出报告的快捷方式"""
+    return ReportStreamer(notifier).stream(sections, filepath=filepath, channels=channels)
+
+
+if __name__ == "__main__":
+    import tracemalloc
+
+    from src.analyzer import AnalysisResult
+    from src.report_builder import ReportBuilder
+
+    logging.basicConfig(level=logging.INFO)
+
+    results = [
+        AnalysisResult(
+            code=f"{600000 + i}", name=f"测试股票{i}", sentiment_score=50 + i % 40,
+            trend_prediction="震荡", operation_advice="持有",
+            analysis_summary="技术面分析内容。" * 40,
+        )
+        for i in range(3000)
+    ]
+    builder = ReportBuilder(results)
+
+    tracemalloc.start()
+    report = ReportStreamer(NotificationService()).stream(
+        builder.iter_dashboard(), filepath=tempfile.mktemp(suffix='.md'), channels=[]
+    )
+    _, peak = tracemalloc.get_traced_memory()
+    print(f"{report.sections} 节，耗时 {report.elapsed:.2f}s，生成期间内存峰值 {peak / 1024:.0f}KB")
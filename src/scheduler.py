@@ -8,6 +8,7 @@
 1. 支持每日定时执行股票分析
 2. 支持定时执行大盘复盘
 3. 优雅处理信号，确保可靠退出
+4. 按交易日历跳过非交易日（周末/节假日）
 
 依赖：
 - schedule: 轻量级定时任务库
@@ -18,8 +19,8 @@ import signal
 import sys
 import time
 import threading
-from datetime import datetime
-from typing import Callable, Optional
+from datetime import date, datetime
+from typing import Callable, Iterable, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -60,15 +61,18 @@ class Scheduler:
     基于 schedule 库实现，支持：
     - 每日定时执行
     - 启动时立即执行
+    - 非交易日自动跳过
     - 优雅退出
     """
     
-    def __init__(self, schedule_time: str = "18:00"):
+    def __init__(self, schedule_time: str = "18:00", trading_markets: Optional[Iterable[str]] = None):
         """
         初始化调度器
         
         Args:
             schedule_time: 每日执行时间，格式 "HH:MM"
+            trading_markets: 关注的市场（cn/hk/us），任一市场当日开市才执行；
+                             为 None 时不做交易日检查
         """
         try:
             import schedule
@@ -78,6 +82,7 @@ class Scheduler:
             raise ImportError("请安装 schedule 库: pip install schedule")
         
         self.schedule_time = schedule_time
+        self.trading_markets = sorted(set(trading_markets)) if trading_markets else None
         self.shutdown_handler = GracefulShutdown()
         self._task_callback: Optional[Callable] = None
         self._running = False
@@ -93,13 +98,39 @@ class Scheduler:
         self._task_callback = task
         
         # 设置每日定时任务
-        self.schedule.every().day.at(self.schedule_time).do(self._safe_run_task)
+        self.schedule.every().day.at(self.schedule_time).do(self._run_scheduled_task)
         logger.info(f"已设置每日定时任务，执行时间: {self.schedule_time}")
+        if self.trading_markets:
+            logger.info(f"非交易日自动跳过，关注市场: {', '.join(self.trading_markets)}")
         
         if run_immediately:
             logger.info("立即执行一次任务...")
             self._safe_run_task()
     
+    def _is_trading_day(self, day: Optional[date] = None) -> bool:
+        """任一关注市场当日开市即视为交易日；日历不可用时不拦截"""
+        if not self.trading_markets:
+            return True
+        day = day or date.today()
+        try:
+            from data_provider.trading_calendar import get_trading_calendar
+            return any(
+                get_trading_calendar(market).is_trading_day(day)
+                for market in self.trading_markets
+            )
+        except Exception as e:
+            logger.warning(f"交易日历检查失败，照常执行任务: {e}")
+            return True
+    
+    def _run_scheduled_task(self):
+        """定时触发入口：非交易日直接跳过"""
+        if not self._is_trading_day():
+            logger.info(
+                f"{date.today()} 为非交易日（{', '.join(self.trading_markets)}），跳过本次定时任务"
+            )
+            return
+        self._safe_run_task()
+    
     def _safe_run_task(self):
         """安全执行任务（带异常捕获）"""
         if self._task_callback is None:
@@ -153,7 +184,8 @@ class Scheduler:
 def run_with_schedule(
     task: Callable,
     schedule_time: str = "18:00",
-    run_immediately: bool = True
+    run_immediately: bool = True,
+    trading_markets: Optional[Iterable[str]] = None
 ):
     """
     便捷函数：使用定时调度运行任务
@@ -162,8 +194,9 @@ def run_with_schedule(
         task: 要执行的任务函数
         schedule_time: 每日执行时间
         run_immediately: 是否立即执行一次
+        trading_markets: 关注的市场，非交易日跳过定时任务（None 表示不检查）
     """
-    scheduler = Scheduler(schedule_time=schedule_time)
+    scheduler = Scheduler(schedule_time=schedule_time, trading_markets=trading_markets)
     scheduler.set_daily_task(task, run_immediately=run_immediately)
     scheduler.run()
 
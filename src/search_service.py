@@ -20,6 +20,8 @@ from datetime import datetime
 from typing import List, Dict, Any, Optional
 from itertools import cycle
 
+from src import pacing
+
 logger = logging.getLogger(__name__)
 
 
@@ -754,9 +756,11 @@ class SearchService:
                 logger.info(f"[情报搜索] {dim['desc']}: 获取 {len(response.results)} 条结果")
             else:
                 logger.warning(f"[情报搜索] {dim['desc']}: 搜索失败 - {response.error_message}")
+                if pacing.is_throttle_message(response.error_message):
+                    pacing.throttled(provider.name, response.error_message)
             
-            # 短暂延迟避免请求过快
-            time.sleep(0.5)
+            # 短暂延迟避免请求过快（按搜索引擎自适应）
+            pacing.wait(provider.name, 0.5, 0.5, min_interval=0, reason='search_delay')
         
         return results
     
@@ -830,7 +834,7 @@ class SearchService:
         
         for i, stock in enumerate(stocks):
             if i > 0:
-                time.sleep(delay_between)
+                pacing.pause(delay_between, 'search_delay')
             
             code = stock.get('code', '')
             name = stock.get('name', '')
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 启动耗时分析
+===================================
+
+职责：
+1. 在全新的子进程中用 `python -X importtime` 测量各运行模式的导入耗时
+   （与容器冷启动 / 定时任务拉起时的真实开销一致，不受当前进程已导入模块影响）
+2. 按第三方包汇总自身耗时，列出最慢的项目模块（含其依赖的累计耗时）
+3. 与启动耗时预算（STARTUP_BUDGET_MS）比较，超出预算时返回非零退出码，便于 CI 检查
+
+使用方式：
+    python main.py --profile-startup                    # 默认模式（个股分析）
+    python main.py --profile-startup --market-review    # 仅大盘复盘
+    python main.py --profile-startup --bot              # 机器人模式
+"""
+
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 各运行模式在启动阶段需要导入的模块（运行期按需导入的数据栈不计入）
+STARTUP_MODULES: Dict[str, Tuple[str, ...]] = {
+    'analysis': ('main', 'src.core.pipeline', 'src.feishu_doc'),
+    'market-review': ('main', 'src.core.market_review'),
+    'watch': ('main', 'src.intraday_watch'),
+    'schedule': ('main', 'src.scheduler', 'src.core.pipeline', 'src.feishu_doc'),
+    'bot': ('main', 'bot.dispatcher', 'bot.commands', 'bot.platforms'),
+}
+
+
+@dataclass
+class ImportRecord:
+    """单个模块的导入耗时（微秒）"""
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+@dataclass
+class StartupProfile:
+    """一次启动导入分析的结果"""
+    mode: str
+    modules: Tuple[str, ...]
+    records: List[ImportRecord] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def total_ms(self) -> float:
+        """启动阶段导入总耗时（顶层导入的累计耗时之和）"""
+        return sum(r.cumulative_us for r in self.records if r.depth == 0) / 1000
+
+    def packages(self, limit: int = 15) -> List[Tuple[str, float, int]]:
+        """按顶层包汇总自身耗时：[(包名, 毫秒, 模块数)]"""
+        totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+        for r in self.records:
+            entry = totals[r.module.split('.')[0]]
+            entry[0] += r.self_us
+            entry[1] += 1
+        ranked = sorted(totals.items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, us / 1000, count) for name, (us, count) in ranked[:limit]]
+
+    def first_party(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """项目自身模块的累计耗时（含其导入的依赖）：[(模块, 毫秒)]"""
+        roots = ('main', 'src', 'bot', 'data_provider', 'analyzer_service')
+        own = [r for r in self.records if r.module.split('.')[0] in roots]
+        own.sort(key=lambda r: r.cumulative_us, reverse=True)
+        return [(r.module, r.cumulative_us / 1000) for r in own[:limit]]
+
+
+def _parse_importtime(stderr: str) -> List[ImportRecord]:
+    """解析 -X importtime 输出：`import time: 自身 | 累计 | <缩进>模块名`，顶层模块缩进 1 个空格，每层加 2 个"""
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # 表头
+        name = parts[2]
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        records.append(ImportRecord(name.strip(), self_us, cumulative_us, depth))
+    return records
+
+
+def profile_startup(mode: str = 'analysis', modules: Optional[Sequence[str]] = None) -> StartupProfile:
+    """
+    在全新子进程中测量指定模式的启动导入耗时
+
+    Args:
+        mode: 运行模式（见 STARTUP_MODULES）
+        modules: 自定义要导入的模块（默认按模式选取）
+    """
+    modules = tuple(modules or STARTUP_MODULES.get(mode, STARTUP_MODULES['analysis']))
+    profile = StartupProfile(mode=mode, modules=modules)
+
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get('PYTHONPATH')]))
+    code = '; '.join(f'import {name}' for name in modules)
+    try:
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            capture_output=True, text=True, cwd=str(PROJECT_ROOT), env=env, timeout=300,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        profile.error = str(e)
+        return profile
+
+    profile.records = _parse_importtime(proc.stderr)
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        profile.error = (errors[-1] if errors else f"exit code {proc.returncode}")
+    return profile
+
+
+def format_profile(profile: StartupProfile, budget_ms: Optional[float] = None) -> str:
+    """生成启动耗时报告（纯文本）"""
+    lines = [
+        f"启动耗时分析 - 模式: {profile.mode}",
+        f"导入模块: {', '.join(profile.modules)}",
+        "",
+        f"导入总耗时: {profile.total_ms:.0f} ms"
+        + (f"（预算 {budget_ms:.0f} ms）" if budget_ms else ""),
+    ]
+    if profile.error:
+        lines.append(f"⚠️ 导入失败: {profile.error}")
+
+    lines += ["", "按包汇总（自身耗时）:"]
+    for name, ms, count in profile.packages():
+        lines.append(f"  {ms:8.1f} ms  {name} ({count} 个模块)")
+
+    lines += ["", "项目模块（累计耗时）:"]
+    for name, ms in profile.first_party():
+        lines.append(f"  {ms:8.1f} ms  {name}")
+    return '\n'.join(lines)
+
+
+def run_startup_profile(mode: str, budget_ms: Optional[float] = None) -> int:
+    """
+    执行启动耗时分析并打印报告
+
+    Returns:
+        退出码：0 表示在预算内，1 表示超出预算或导入失败
+    """
+    profile = profile_startup(mode)
+    print(format_profile(profile, budget_ms))
+    if profile.error:
+        return 1
+    if budget_ms and profile.total_ms > budget_ms:
+        print(f"\n❌ 启动耗时超出预算 {profile.total_ms - budget_ms:.0f} ms")
+        return 1
+    if budget_ms:
+        print("\n✅ 启动耗时在预算内")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run_startup_profile(sys.argv[1] if len(sys.argv) > 1 else 'analysis'))
@@ -18,12 +18,15 @@
 
 import logging
 from dataclasses import dataclass, field
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, TYPE_CHECKING
 from enum import Enum
 
 import pandas as pd
 import numpy as np
 
+if TYPE_CHECKING:
+    from src.indicator_state import IndicatorState
+
 logger = logging.getLogger(__name__)
 
 
@@ -229,6 +232,42 @@ class StockTrendAnalyzer:
         df = self._calculate_macd(df)
         df = self._calculate_rsi(df)
 
+        return self._evaluate(df, result)
+
+    def analyze_state(
+        self,
+        state: 'IndicatorState',
+        price: float,
+        volume: Optional[float] = None,
+        high: Optional[float] = None,
+    ) -> TrendAnalysisResult:
+        """
+        基于增量指标状态分析（盘中实时价格刷新使用）
+
+        指标由 IndicatorState 以 O(1) 增量更新，这里只对最近一个窗口做规则判断，
+        不再对完整历史重算均线 / EMA / RSI。
+
+        Args:
+            state: 股票的增量指标状态（见 src.indicator_state）
+            price: 最新价（作为当日未收盘 K 线的收盘价）
+            volume: 当日累计成交量
+            high: 当日最高价
+
+        Returns:
+            TrendAnalysisResult 分析结果
+        """
+        result = TrendAnalysisResult(code=state.code)
+        df = state.frame(price, volume, high)
+
+        if len(df) < 20:
+            logger.warning(f"{state.code} 数据不足，无法进行趋势分析")
+            result.risk_factors.append("数据不足，无法完成分析")
+            return result
+
+        return self._evaluate(df, result)
+
+    def _evaluate(self, df: pd.DataFrame, result: TrendAnalysisResult) -> TrendAnalysisResult:
+        """基于已计算指标的 DataFrame 执行各项规则判断与评分"""
         # 获取最新数据
         latest = df.iloc[-1]
         result.current_price = float(latest['close'])
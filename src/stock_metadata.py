@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 股票元数据缓存
+===================================
+
+职责：
+1. 股票名称、所属行业、上市日期、流通股本等元数据存入 SQLite（stock_metadata 表），
+   进程内首次使用时整体加载到内存，之后的查询不再访问数据库或接口
+2. 批量刷新：全市场行情快照拉取后顺带更新名称与流通股本（流通市值 / 现价）；
+   自选股缺少行业或数据过期时，一次 ef.stock.get_base_info 批量补齐
+3. 实时行情返回的名称回填缓存（港股、美股等没有批量来源的代码）
+
+实时行情关闭或异常时，名称与行业仍可直接从缓存取得，个股分析不必等待行情接口。
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 内置名称（常见股票；港股美股没有批量名称来源，主要依赖此表与实时行情回填）
+BUILTIN_NAMES = {
+    # === A股 ===
+    '600519': '贵州茅台',
+    '000001': '平安银行',
+    '300750': '宁德时代',
+    '002594': '比亚迪',
+    '600036': '招商银行',
+    '601318': '中国平安',
+    '000858': '五粮液',
+    '600276': '恒瑞医药',
+    '601012': '隆基绿能',
+    '002475': '立讯精密',
+    '300059': '东方财富',
+    '002415': '海康威视',
+    '600900': '长江电力',
+    '601166': '兴业银行',
+    '600028': '中国石化',
+
+    # === 美股 ===
+    'AAPL': '苹果',
+    'TSLA': '特斯拉',
+    'MSFT': '微软',
+    'GOOGL': '谷歌A',
+    'GOOG': '谷歌C',
+    'AMZN': '亚马逊',
+    'NVDA': '英伟达',
+    'META': 'Meta',
+    'AMD': 'AMD',
+    'INTC': '英特尔',
+    'BABA': '阿里巴巴',
+    'PDD': '拼多多',
+    'JD': '京东',
+    'BIDU': '百度',
+    'NIO': '蔚来',
+    'XPEV': '小鹏汽车',
+    'LI': '理想汽车',
+    'COIN': 'Coinbase',
+    'MSTR': 'MicroStrategy',
+
+    # === 港股 (5位数字) ===
+    '00700': '腾讯控股',
+    '03690': '美团',
+    '01810': '小米集团',
+    '09988': '阿里巴巴',
+    '09618': '京东集团',
+    '09888': '百度集团',
+    '01024': '快手',
+    '00981': '中芯国际',
+    '02015': '理想汽车',
+    '09868': '小鹏汽车',
+    '00005': '汇丰控股',
+    '01299': '友邦保险',
+    '00941': '中国移动',
+    '00883': '中国海洋石油',
+}
+
+
+# 批量基本信息列名 -> 元数据字段
+BASE_INFO_COLUMNS = {
+    '股票代码': 'code',
+    '股票名称': 'name',
+    '所处行业': 'industry',
+    '上市时间': 'list_date',
+}
+
+
+@dataclass
+class StockMeta:
+    """单只股票的元数据"""
+    code: str
+    name: str = ''
+    industry: str = ''
+    list_date: Optional[date] = None
+    float_shares: Optional[float] = None    # 流通股本（股）
+    info_updated_at: Optional[datetime] = None   # 行业等基本信息的最近批量刷新时间
+
+
+def _clean_text(value: Any) -> str:
+    if value is None:
+        return ''
+    text = str(value).strip()
+    return '' if text in ('', '-', 'nan', 'None') else text
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    text = _clean_text(value).replace('-', '')[:8]
+    try:
+        return datetime.strptime(text, '%Y%m%d').date()
+    except ValueError:
+        return None
+
+
+class StockMetadataCache:
+    """
+    股票元数据缓存（单例）
+
+    使用示例:
+        cache = get_stock_metadata()
+        cache.get_name('600519')        # '贵州茅台'
+        cache.get('600519').industry    # '酿酒行业'
+    """
+
+    _instance: Optional['StockMetadataCache'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_age_days: int = 30, persist: bool = True):
+        """
+        Args:
+            max_age_days: 行业等基本信息超过该天数后在下次运行时重新批量拉取
+            persist: 是否读写 SQLite（False 时只在内存中维护）
+        """
+        self.max_age = timedelta(days=max(max_age_days, 1))
+        self.persist = persist
+        self._records: Dict[str, StockMeta] = {}
+        self._loaded = not persist
+        self._lock = threading.RLock()
+
+    @classmethod
+    def get_instance(cls) -> 'StockMetadataCache':
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    from src.config import get_config
+                    cls._instance = cls(max_age_days=get_config().stock_metadata_max_age_days)
+        return cls._instance
+
+    # === 查询 ===
+
+    def get(self, code: str) -> Optional[StockMeta]:
+        if not self._loaded:
+            self._load()
+        return self._records.get(code)
+
+    def get_name(self, code: str, default: str = '') -> str:
+        """股票名称：缓存 -> 内置名称 -> default"""
+        meta = self.get(code)
+        if meta is not None and meta.name:
+            return meta.name
+        return BUILTIN_NAMES.get(code, default)
+
+    def get_industry(self, code: str) -> str:
+        meta = self.get(code)
+        return meta.industry if meta is not None else ''
+
+    def __len__(self) -> int:
+        if not self._loaded:
+            self._load()
+        return len(self._records)
+
+    # === 更新 ===
+
+    def remember_name(self, code: str, name: str, source: str = 'realtime') -> None:
+        """记录从其他渠道（如实时行情）得到的名称，与缓存不同时更新并落盘"""
+        name = _clean_text(name)
+        if not code or not name or name.startswith('股票') or self.get_name(code) == name:
+            return
+        self._apply([{'code': code, 'name': name}], source)
+
+    def update_from_snapshot(self, frame, source: str = 'snapshot') -> int:
+        """
+        用全市场行情快照（统一列名，见 data_provider/market_snapshot.py）更新名称与流通股本
+
+        Returns:
+            发生变化的股票数
+        """
+        if frame is None or frame.empty or 'code' not in frame.columns:
+            return 0
+        codes = frame['code'].astype(str).tolist()
+        names = frame['name'].tolist() if 'name' in frame.columns else [None] * len(codes)
+        shares: List[Optional[float]] = [None] * len(codes)
+        if 'circ_mv' in frame.columns and 'price' in frame.columns:
+            price = frame['price'].where(frame['price'] > 0)
+            shares = (frame['circ_mv'] / price).round(-2).tolist()
+        records = []
+        for code, name, float_shares in zip(codes, names, shares):
+            record = {'code': code, 'name': _clean_text(name) or None}
+            if float_shares == float_shares and float_shares is not None:  # 排除 NaN
+                record['float_shares'] = float(float_shares)
+            records.append(record)
+        return self._apply(records, source)
+
+    def refresh(self, codes: Iterable[str], fetcher_manager=None) -> int:
+        """
+        为从未拉取过基本信息或已过期的 A 股一次批量拉取（名称、行业、上市日期）
+
+        Args:
+            codes: 待分析的股票代码
+            fetcher_manager: DataFetcherManager（提供 get_base_info_bulk）
+
+        Returns:
+            更新的股票数
+        """
+        from data_provider.securities import lookup
+
+        now = datetime.now()
+        stale = []
+        for code in codes:
+            info = lookup(code)
+            if info.market != 'cn' or info.is_etf:
+                continue
+            meta = self.get(code)
+            if meta is None or meta.info_updated_at is None or now - meta.info_updated_at > self.max_age:
+                stale.append(info.code)
+        if not stale or fetcher_manager is None:
+            return 0
+
+        logger.info(f"[元数据] {len(stale)} 只股票缺少基本信息或已过期，批量拉取...")
+        df = fetcher_manager.get_base_info_bulk(stale)
+        if df is None or df.empty:
+            return 0
+        columns = {col: key for col, key in BASE_INFO_COLUMNS.items() if col in df.columns}
+        if 'code' not in columns.values():
+            logger.warning(f"[元数据] 基本信息缺少代码列: {list(df.columns)[:10]}")
+            return 0
+        records = []
+        for row in df[list(columns)].rename(columns=columns).to_dict('records'):
+            records.append({
+                'code': _clean_text(row.get('code')),
+                'name': _clean_text(row.get('name')) or None,
+                'industry': _clean_text(row.get('industry')) or None,
+                'list_date': _parse_date(row.get('list_date')),
+                'info_updated_at': now,
+            })
+        return self._apply(records, 'base_info')
+
+    def _apply(self, records: List[Dict[str, Any]], source: str) -> int:
+        """合并到内存，只把有变化的记录写入数据库"""
+        if not self._loaded:
+            self._load()
+        changed = []
+        with self._lock:
+            for record in records:
+                code = record.get('code')
+                if not code:
+                    continue
+                meta = self._records.get(code)
+                if meta is None:
+                    meta = self._records[code] = StockMeta(code=code)
+                diff = {
+                    key: value for key, value in record.items()
+                    if key != 'code' and value is not None and getattr(meta, key) != value
+                }
+                if not diff:
+                    continue
+                for key, value in diff.items():
+                    setattr(meta, key, value)
+                changed.append(record)
+        if changed:
+            logger.debug(f"[元数据] 更新 {len(changed)} 只股票（来源 {source}）")
+            self._save(changed, source)
+        return len(changed)
+
+    # === 持久化 ===
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+            self._loaded = True
+            try:
+                from src.storage import get_db
+                rows = get_db().get_all_stock_metadata()
+            except Exception as e:
+                logger.warning(f"[元数据] 读取股票元数据失败，仅使用内置名称: {e}")
+                return
+            for row in rows:
+                self._records[row['code']] = StockMeta(
+                    code=row['code'],
+                    name=row.get('name') or '',
+                    industry=row.get('industry') or '',
+                    list_date=row.get('list_date'),
+                    float_shares=row.get('float_shares'),
+                    info_updated_at=row.get('info_updated_at'),
+                )
+            logger.debug(f"[元数据] 加载 {len(rows)} 只股票元数据")
+
+    def _save(self, records: List[Dict[str, Any]], source: str) -> None:
+        if not self.persist:
+            return
+        try:
+            from src.storage import get_db
+            get_db().save_stock_metadata(records, source=source)
+        except Exception as e:
+            logger.warning(f"[元数据] 保存股票元数据失败: {e}")
+
+
+def get_stock_metadata() -> StockMetadataCache:
+    """获取股票元数据缓存单例"""
+    return StockMetadataCache.get_instance()
+
+
+def get_stock_name(code: str, default: str = '') -> str:
+    """股票名称（便捷函数）"""
+    return get_stock_metadata().get_name(code, default)
+
+
+if __name__ == "__main__":
+    import pandas as pd
+
+    logging.basicConfig(level=logging.DEBUG)
+
+    cache = StockMetadataCache(persist=False)
+    cache.update_from_snapshot(pd.DataFrame({
+        'code': ['600519', '000001'],
+        'name': ['贵州茅台', '平安银行'],
+        'price': [1500.0, 10.0],
+        'circ_mv': [1.884e12, 1.94e11],
+    }))
+    cache.remember_name('AAPL', 'Apple Inc.')
+    for code in ['600519', '000001', 'AAPL', '00700', '999999']:
+        meta = cache.get(code)
+        print(code, cache.get_name(code, f'股票{code}'), meta.float_shares if meta else None)
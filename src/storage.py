@@ -5,30 +5,36 @@ A股自选股智能分析系统 - 存储层
 ===================================
 
 职责：
-1. 管理 SQLite 数据库连接（单例模式）
+1. 管理 SQLite 数据库连接（单例模式，WAL 与 PRAGMA 调优见 src/db_engine.py）
 2. 定义 ORM 数据模型
 3. 提供数据存取接口
 4. 实现智能更新逻辑（断点续传）
 """
 
 import atexit
+import json
 import logging
 from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict, Any
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 from sqlalchemy import (
-    create_engine,
+    Boolean,
     Column,
     String,
     Float,
     Date,
     DateTime,
     Integer,
+    Text,
     Index,
     UniqueConstraint,
     select,
+    insert,
+    delete,
+    func,
     and_,
     desc,
 )
@@ -40,6 +46,7 @@ from sqlalchemy.orm import (
 from sqlalchemy.exc import IntegrityError
 
 from src.config import get_config
+from src.db_engine import create_db_engine, get_engine_options
 
 logger = logging.getLogger(__name__)
 
@@ -97,6 +104,18 @@ class StockDaily(Base):
         Index('ix_code_date', 'code', 'date'),
     )
     
+    # Core 读取（不构造 ORM 对象）返回的列，与 to_dict 字段一致
+    ROW_COLUMNS = (
+        'code', 'date', 'open', 'high', 'low', 'close', 'volume', 'amount',
+        'pct_chg', 'ma5', 'ma10', 'ma20', 'volume_ratio', 'data_source',
+    )
+
+    # 行情数组列（get_bar_arrays 默认返回）
+    BAR_COLUMNS = (
+        'date', 'open', 'high', 'low', 'close', 'volume', 'amount',
+        'pct_chg', 'ma5', 'ma10', 'ma20', 'volume_ratio',
+    )
+
     def __repr__(self):
         return f"<StockDaily(code={self.code}, date={self.date}, close={self.close})>"
     
@@ -120,6 +139,415 @@ class StockDaily(Base):
         }
 
 
+class NotificationOutbox(Base):
+    """
+    通知发件箱模型
+
+    每行对应某渠道的一个待发送消息块（长消息已按渠道预先分批）；
+    idempotency_key 唯一，重复入队同一消息不会产生重复推送。
+    """
+    __tablename__ = 'notification_outbox'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    # 幂等键：{message_key}:{channel}:{chunk_index}/{chunk_total}
+    idempotency_key = Column(String(128), nullable=False, unique=True)
+
+    # 消息标识（同一条报告在各渠道、各分块间共享）
+    message_key = Column(String(64), nullable=False, index=True)
+
+    # 渠道（NotificationChannel.value）
+    channel = Column(String(20), nullable=False)
+
+    # 分块序号（从 0 开始）与总块数
+    chunk_index = Column(Integer, nullable=False, default=0)
+    chunk_total = Column(Integer, nullable=False, default=1)
+
+    # 可直接发送的消息块
+    payload = Column(Text, nullable=False)
+
+    # 状态：pending / sending / sent / failed
+    status = Column(String(10), nullable=False, default='pending')
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.now)
+    last_error = Column(String(500))
+
+    created_at = Column(DateTime, default=datetime.now)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_outbox_status_next', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return (
+            f"<NotificationOutbox(key={self.idempotency_key}, status={self.status}, "
+            f"attempts={self.attempts})>"
+        )
+
+
+class MarketBreadthDaily(Base):
+    """
+    每日市场宽度模型
+
+    每个交易日一条，记录大盘复盘时的涨跌家数、涨跌停与分布，
+    复盘 Prompt 读取近几日记录形成宽度趋势。
+    """
+    __tablename__ = 'market_breadth_daily'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    # 交易日期（唯一）
+    date = Column(Date, nullable=False, unique=True, index=True)
+
+    # 涨跌家数
+    up_count = Column(Integer, default=0)
+    down_count = Column(Integer, default=0)
+    flat_count = Column(Integer, default=0)
+
+    # 涨跌停家数（按各板块涨跌幅限制判定）
+    limit_up_count = Column(Integer, default=0)
+    limit_down_count = Column(Integer, default=0)
+
+    total_amount = Column(Float)   # 两市成交额（亿元）
+    median_change = Column(Float)  # 涨跌幅中位数（%）
+
+    # 分板块涨跌停与涨跌幅 / 换手率分布（JSON）
+    boards = Column(Text)
+    change_distribution = Column(Text)
+    turnover_distribution = Column(Text)
+
+    # 快照来源（akshare_em / efinance）
+    data_source = Column(String(50))
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return (
+            f"<MarketBreadthDaily(date={self.date}, up={self.up_count}, down={self.down_count}, "
+            f"limit_up={self.limit_up_count})>"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（JSON 列解析为字典）"""
+        return {
+            'date': self.date,
+            'up_count': self.up_count,
+            'down_count': self.down_count,
+            'flat_count': self.flat_count,
+            'limit_up_count': self.limit_up_count,
+            'limit_down_count': self.limit_down_count,
+            'total_amount': self.total_amount,
+            'median_change': self.median_change,
+            'boards': json.loads(self.boards) if self.boards else {},
+            'change_distribution': json.loads(self.change_distribution) if self.change_distribution else {},
+            'turnover_distribution': json.loads(self.turnover_distribution) if self.turnover_distribution else {},
+            'data_source': self.data_source,
+        }
+
+
+class StockMetadata(Base):
+    """
+    股票元数据模型
+
+    名称、行业、上市日期、流通股本等变化很少的信息，每只股票一条；
+    由全市场行情快照与批量基本信息拉取整体刷新，运行时全部加载到内存查询
+    （见 src/stock_metadata.py）。
+    """
+    __tablename__ = 'stock_metadata'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    # 股票代码（唯一）
+    code = Column(String(10), nullable=False, unique=True, index=True)
+
+    name = Column(String(50))
+    industry = Column(String(50))
+    list_date = Column(Date)
+    float_shares = Column(Float)   # 流通股本（股）
+
+    # 最近一次写入的来源（snapshot / base_info / realtime）
+    source = Column(String(20))
+    # 行业等基本信息的最近批量刷新时间（快照 / 实时行情写入不更新）
+    info_updated_at = Column(DateTime)
+
+    created_at = Column(DateTime, default=datetime.now)
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f"<StockMetadata(code={self.code}, name={self.name}, industry={self.industry})>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'code': self.code,
+            'name': self.name,
+            'industry': self.industry,
+            'list_date': self.list_date,
+            'float_shares': self.float_shares,
+            'source': self.source,
+            'info_updated_at': self.info_updated_at,
+        }
+
+
+class StockMoneyflowDaily(Base):
+    """
+    个股资金流向日线模型
+
+    按交易日整体批量写入全市场数据（见 src/moneyflow_store.py），
+    个股分析时读取最近 N 日汇总，不再逐只请求接口。金额单位：万元。
+    """
+    __tablename__ = 'stock_moneyflow_daily'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    code = Column(String(10), nullable=False, index=True)
+    date = Column(Date, nullable=False, index=True)
+
+    # 各档买卖金额（Tushare 提供；东方财富排行只有净额）
+    buy_sm_amount = Column(Float)
+    sell_sm_amount = Column(Float)
+    buy_md_amount = Column(Float)
+    sell_md_amount = Column(Float)
+    buy_lg_amount = Column(Float)
+    sell_lg_amount = Column(Float)
+    buy_elg_amount = Column(Float)
+    sell_elg_amount = Column(Float)
+
+    # 净流入
+    net_mf_amount = Column(Float)
+    net_mf_sm = Column(Float)
+    net_mf_md = Column(Float)
+    net_mf_lg = Column(Float)
+    net_mf_elg = Column(Float)
+
+    # 主力（特大单 + 大单）净流入及占成交额比例（%）
+    main_net_inflow = Column(Float)
+    main_net_inflow_rate = Column(Float)
+
+    data_source = Column(String(50))
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('code', 'date', name='uix_moneyflow_code_date'),
+        Index('ix_moneyflow_code_date', 'code', 'date'),
+    )
+
+    def __repr__(self):
+        return f"<StockMoneyflowDaily(code={self.code}, date={self.date}, main={self.main_net_inflow})>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            column.name: getattr(self, column.name)
+            for column in self.__table__.columns
+            if column.name not in ('id', 'created_at')
+        }
+
+
+class StockNorthHolding(Base):
+    """
+    个股北向持股日线模型
+
+    按交易日整体批量写入全市场北向持股与当日增持估计（万元），
+    个股分析时汇总最近 N 日净流入。
+    """
+    __tablename__ = 'stock_north_holding'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    code = Column(String(10), nullable=False, index=True)
+    date = Column(Date, nullable=False, index=True)
+
+    hold_shares = Column(Float)   # 持股数（股）
+    hold_value = Column(Float)    # 持股市值（万元）
+    hold_ratio = Column(Float)    # 占流通股比（%）
+    net_amount = Column(Float)    # 当日增持估计市值（万元）
+
+    data_source = Column(String(50))
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('code', 'date', name='uix_north_code_date'),
+        Index('ix_north_code_date', 'code', 'date'),
+    )
+
+    def __repr__(self):
+        return f"<StockNorthHolding(code={self.code}, date={self.date}, net={self.net_amount})>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            column.name: getattr(self, column.name)
+            for column in self.__table__.columns
+            if column.name not in ('id', 'created_at')
+        }
+
+
+class StockFinancialReport(Base):
+    """
+    个股财务指标（按报告期）模型
+
+    每只股票每个报告期一条，由财报披露窗口内的后台批量刷新整期写入
+    （见 src/financial_warehouse.py），个股分析按 (code, report_period) 索引读取。
+    """
+    __tablename__ = 'stock_financial_report'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    code = Column(String(10), nullable=False, index=True)
+    # 报告期末日期（03-31 / 06-30 / 09-30 / 12-31）
+    report_period = Column(Date, nullable=False, index=True)
+
+    eps = Column(Float)                   # 每股收益（元）
+    revenue = Column(Float)               # 营业总收入（元）
+    revenue_growth = Column(Float)        # 营收同比增长率（%）
+    net_profit = Column(Float)            # 净利润（元）
+    profit_growth = Column(Float)         # 净利润同比增长率（%）
+    bps = Column(Float)                   # 每股净资产（元）
+    roe = Column(Float)                   # 净资产收益率（%）
+    ocf_per_share = Column(Float)         # 每股经营现金流量（元）
+    gross_profit_margin = Column(Float)   # 销售毛利率（%）
+    net_profit_margin = Column(Float)     # 销售净利率（%）
+    debt_to_asset = Column(Float)         # 资产负债率（%）
+
+    announce_date = Column(Date)          # 最新公告日期
+    data_source = Column(String(50))
+    fetched_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('code', 'report_period', name='uix_financial_code_period'),
+        Index('ix_financial_code_period', 'code', 'report_period'),
+    )
+
+    def __repr__(self):
+        return f"<StockFinancialReport(code={self.code}, period={self.report_period}, roe={self.roe})>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            column.name: getattr(self, column.name)
+            for column in self.__table__.columns
+            if column.name != 'id'
+        }
+
+
+class StockChipDaily(Base):
+    """
+    个股筹码分布日线模型
+
+    筹码分布每个交易日只变化一次：一次接口请求返回的整段序列全部入库，
+    同一交易日重复分析直接读取，历史序列用于获利比例走势等趋势特征。
+    """
+    __tablename__ = 'stock_chip_daily'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    code = Column(String(10), nullable=False, index=True)
+    date = Column(Date, nullable=False, index=True)
+
+    profit_ratio = Column(Float)        # 获利比例（0-1）
+    avg_cost = Column(Float)            # 平均成本
+    cost_90_low = Column(Float)
+    cost_90_high = Column(Float)
+    concentration_90 = Column(Float)    # 90%筹码集中度
+    cost_70_low = Column(Float)
+    cost_70_high = Column(Float)
+    concentration_70 = Column(Float)    # 70%筹码集中度
+
+    data_source = Column(String(50))
+    created_at = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint('code', 'date', name='uix_chip_code_date'),
+        Index('ix_chip_code_date', 'code', 'date'),
+    )
+
+    def __repr__(self):
+        return f"<StockChipDaily(code={self.code}, date={self.date}, profit_ratio={self.profit_ratio})>"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            column.name: getattr(self, column.name)
+            for column in self.__table__.columns
+            if column.name not in ('id', 'created_at')
+        }
+
+
+class AnalysisHistory(Base):
+    """
+    个股 AI 分析结果历史模型
+
+    每次分析一条：评分、操作建议、信号等级、模型与调用耗时 / token 用量，
+    仪表盘与维度详情以 JSON 保存。评分走势、信号筛选只查询标量列（见 src/analysis_history.py）。
+    """
+    __tablename__ = 'analysis_history'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+
+    code = Column(String(10), nullable=False)
+    name = Column(String(50))
+    trade_date = Column(Date, nullable=False)   # 分析所依据的交易日
+
+    # 评分与结论
+    sentiment_score = Column(Integer)
+    value_score = Column(Integer)
+    funding_score = Column(Integer)
+    news_score = Column(Integer)
+    trend_score = Column(Integer)
+    trend_prediction = Column(String(20))
+    operation_advice = Column(String(20))
+    signal = Column(String(20))                 # 信号等级（strong_buy / buy / hold / watch / reduce / sell）
+    confidence_level = Column(String(10))
+    success = Column(Boolean, default=True)
+    error_message = Column(Text)
+
+    # 调用信息
+    model_name = Column(String(100))
+    latency_ms = Column(Integer)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+
+    # 详情（JSON）
+    analysis_summary = Column(Text)
+    dashboard = Column(Text)
+    dimensions = Column(Text)
+
+    created_at = Column(DateTime, default=datetime.now, index=True)
+
+    __table_args__ = (
+        Index('ix_analysis_code_date', 'code', 'trade_date'),
+        Index('ix_analysis_signal_date', 'signal', 'trade_date'),
+    )
+
+    # 走势 / 信号查询返回的标量列（不读取 JSON 大字段）
+    SUMMARY_COLUMNS = (
+        'id', 'code', 'name', 'trade_date', 'sentiment_score', 'value_score', 'funding_score',
+        'news_score', 'trend_score', 'trend_prediction', 'operation_advice', 'signal',
+        'confidence_level', 'success', 'model_name', 'latency_ms', 'prompt_tokens',
+        'completion_tokens', 'created_at',
+    )
+
+    def __repr__(self):
+        return (
+            f"<AnalysisHistory(code={self.code}, date={self.trade_date}, "
+            f"score={self.sentiment_score}, signal={self.signal})>"
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典（JSON 列解析为字典）"""
+        data = {name: getattr(self, name) for name in self.SUMMARY_COLUMNS}
+        data.update({
+            'error_message': self.error_message,
+            'analysis_summary': self.analysis_summary,
+            'dashboard': json.loads(self.dashboard) if self.dashboard else None,
+            'dimensions': json.loads(self.dimensions) if self.dimensions else None,
+        })
+        return data
+
+
 class DatabaseManager:
     """
     数据库管理器 - 单例模式
@@ -128,6 +556,9 @@ class DatabaseManager:
     1. 管理数据库连接池
     2. 提供 Session 上下文管理
     3. 封装数据存取操作
+
+    读取行情优先使用 Core 查询（has_today_data / get_latest_bars / get_bar_arrays），
+    直接返回元组或 NumPy 数组，不构造 ORM 对象、不开启 Session。
     """
     
     _instance: Optional['DatabaseManager'] = None
@@ -153,12 +584,8 @@ class DatabaseManager:
             config = get_config()
             db_url = config.get_db_url()
         
-        # 创建数据库引擎
-        self._engine = create_engine(
-            db_url,
-            echo=False,  # 设为 True 可查看 SQL 语句
-            pool_pre_ping=True,  # 连接健康检查
-        )
+        # 创建数据库引擎（SQLite：WAL + busy_timeout + 连接池，见 src/db_engine.py）
+        self._engine = create_db_engine(db_url, **get_engine_options())
         
         # 创建 Session 工厂
         self._SessionLocal = sessionmaker(
@@ -231,25 +658,95 @@ class DatabaseManager:
         
         Args:
             code: 股票代码
-            target_date: 目标日期（默认今天）
+            target_date: 目标日期（默认为该股票所属市场的最近交易日）
             
         Returns:
             是否存在数据
         """
         if target_date is None:
-            target_date = date.today()
+            target_date = self.get_latest_trading_day(code)
         
-        with self.get_session() as session:
-            result = session.execute(
-                select(StockDaily).where(
-                    and_(
-                        StockDaily.code == code,
-                        StockDaily.date == target_date
-                    )
-                )
-            ).scalar_one_or_none()
-            
-            return result is not None
+        rows = self._read(
+            select(StockDaily.id)
+            .where(and_(StockDaily.code == code, StockDaily.date == target_date))
+            .limit(1)
+        )
+        return bool(rows)
+
+    def _read(self, query) -> list:
+        """Core 只读查询：直接从连接池取连接执行，返回 Row 元组列表"""
+        with self._engine.connect() as conn:
+            return conn.execute(query).all()
+
+    def get_latest_bars(
+        self,
+        code: str,
+        days: int = 2,
+        columns: tuple = StockDaily.ROW_COLUMNS,
+    ) -> list:
+        """
+        最近 N 天的日线（Core 查询，不构造 ORM 对象）
+
+        Returns:
+            Row 列表（按日期降序），可按列名属性访问或当作元组解包，dict(row._mapping) 转字典
+        """
+        return self._read(
+            select(*(getattr(StockDaily, name) for name in columns))
+            .where(StockDaily.code == code)
+            .order_by(desc(StockDaily.date))
+            .limit(days)
+        )
+
+    def get_bar_arrays(
+        self,
+        code: str,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        columns: tuple = StockDaily.BAR_COLUMNS,
+    ) -> Dict[str, np.ndarray]:
+        """
+        日期区间内的日线按列返回 NumPy 数组（按日期升序）
+
+        date 列为 datetime64[D]，其余为 float64（缺失值为 NaN）；无数据时各列为空数组。
+        """
+        query = select(*(getattr(StockDaily, name) for name in columns)).where(StockDaily.code == code)
+        if start_date is not None:
+            query = query.where(StockDaily.date >= start_date)
+        if end_date is not None:
+            query = query.where(StockDaily.date <= end_date)
+        rows = self._read(query.order_by(StockDaily.date))
+
+        arrays: Dict[str, np.ndarray] = {}
+        for i, name in enumerate(columns):
+            values = [row[i] for row in rows]
+            if name == 'date':
+                arrays[name] = np.array(values, dtype='datetime64[D]')
+            elif name in ('code', 'data_source'):
+                arrays[name] = np.array(values, dtype=object)
+            else:
+                arrays[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+        return arrays
+    
+    @staticmethod
+    def get_latest_trading_day(code: str, target_date: Optional[date] = None) -> date:
+        """
+        获取不晚于 target_date 的最近交易日
+        
+        周末/节假日时返回上一个交易日，使断点续传在非交易日也能命中缓存；
+        交易日历不可用时退回 target_date 本身。
+        
+        Args:
+            code: 股票代码（用于判断所属市场）
+            target_date: 参考日期（默认今天）
+        """
+        if target_date is None:
+            target_date = date.today()
+        try:
+            from data_provider.trading_calendar import get_calendar_for_code
+            return get_calendar_for_code(code).latest_trading_day(target_date)
+        except Exception as e:
+            logger.debug(f"交易日历不可用，使用自然日: {e}")
+            return target_date
     
     def get_latest_data(
         self, 
@@ -403,8 +900,495 @@ class DatabaseManager:
                 logger.error(f"保存 {code} 数据失败: {e}")
                 raise
         
+        # 同步写入列式存储（失败不影响主流程，可通过 rebuild 从 SQLite 恢复）
+        self._sync_bar_store(df, code)
+        
         return saved_count
     
+    def _sync_bar_store(self, df: pd.DataFrame, code: str) -> None:
+        """
+        将刚保存的日线数据追加到列式存储
+        
+        该股票首次写入列式存储时从 SQLite 全量重建，而不是只写入本次的几十行，
+        否则升级后列式文件只有最近一次拉取的窗口。
+        """
+        try:
+            from src.bar_store import get_bar_store
+            store = get_bar_store()
+            if store is None:
+                return
+            if not store.has_symbol(code):
+                rebuilt = store.rebuild_from_db(code, db=self)
+                logger.info(f"[BarStore] {code} 首次写入，从 SQLite 重建 {rebuilt} 行")
+            else:
+                appended = store.append(code, df)
+                logger.debug(f"[BarStore] {code} 追加 {appended} 行")
+        except Exception as e:
+            logger.warning(f"[BarStore] {code} 同步列式存储失败: {e}")
+    
+    def get_history_dataframe(self, code: str, days: int = 120) -> Optional[pd.DataFrame]:
+        """
+        获取最近 N 个交易日的历史行情（供趋势分析使用）
+        
+        优先从列式存储零拷贝读取；列式存储不可用、无数据或行数不足 days
+        （且 SQLite 中更多）时回退到 SQLite。
+        
+        Args:
+            code: 股票代码
+            days: 交易日数量
+            
+        Returns:
+            按日期升序的 DataFrame，无数据返回 None
+        """
+        df = None
+        try:
+            from src.bar_store import get_bar_store
+            store = get_bar_store()
+            if store is not None:
+                df = store.to_dataframe(code, last_n=days)
+                if df is not None and len(df) >= days:
+                    return df
+        except Exception as e:
+            logger.debug(f"[BarStore] {code} 读取失败，回退到 SQLite: {e}")
+        
+        rows = self.get_latest_bars(code, days=days)
+        if df is not None and not df.empty and len(df) >= len(rows):
+            # 上市不足 days 天：列式存储已是全部历史
+            return df
+        if not rows:
+            return None
+        df = pd.DataFrame(list(reversed(rows)), columns=list(StockDaily.ROW_COLUMNS))
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+    
+    def save_market_breadth(
+        self,
+        breadth,
+        trade_date: Optional[date] = None,
+        data_source: str = "Unknown",
+    ) -> None:
+        """
+        保存当日市场宽度（同一日期重复保存时覆盖）
+
+        Args:
+            breadth: src.market_breadth.MarketBreadth
+            trade_date: 交易日期（默认今天）
+            data_source: 快照来源
+        """
+        trade_date = trade_date or date.today()
+        values = {
+            'up_count': breadth.up_count,
+            'down_count': breadth.down_count,
+            'flat_count': breadth.flat_count,
+            'limit_up_count': breadth.limit_up_count,
+            'limit_down_count': breadth.limit_down_count,
+            'total_amount': breadth.total_amount,
+            'median_change': breadth.median_change,
+            'boards': json.dumps(
+                {board: vars(stats) for board, stats in breadth.boards.items()}, ensure_ascii=False
+            ),
+            'change_distribution': json.dumps(breadth.change_distribution, ensure_ascii=False),
+            'turnover_distribution': json.dumps(breadth.turnover_distribution, ensure_ascii=False),
+            'data_source': data_source,
+        }
+
+        with self.get_session() as session:
+            try:
+                existing = session.execute(
+                    select(MarketBreadthDaily).where(MarketBreadthDaily.date == trade_date)
+                ).scalar_one_or_none()
+                if existing:
+                    for key, value in values.items():
+                        setattr(existing, key, value)
+                    existing.updated_at = datetime.now()
+                else:
+                    session.add(MarketBreadthDaily(date=trade_date, **values))
+                session.commit()
+                logger.debug(f"保存 {trade_date} 市场宽度成功")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存 {trade_date} 市场宽度失败: {e}")
+                raise
+
+    def get_market_breadth_history(
+        self,
+        days: int = 5,
+        before: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        获取最近若干个交易日的市场宽度（按日期升序）
+
+        Args:
+            days: 天数
+            before: 只取该日期之前的记录（不含），默认不限
+        """
+        with self.get_session() as session:
+            query = select(MarketBreadthDaily)
+            if before is not None:
+                query = query.where(MarketBreadthDaily.date < before)
+            rows = session.execute(
+                query.order_by(desc(MarketBreadthDaily.date)).limit(days)
+            ).scalars().all()
+            return [row.to_dict() for row in reversed(rows)]
+
+    def save_stock_metadata(self, records: List[Dict[str, Any]], source: str = "Unknown") -> int:
+        """
+        批量保存股票元数据（按代码 UPSERT，值为 None 的字段不覆盖已有数据）
+
+        Args:
+            records: 字典列表，键为 code / name / industry / list_date / float_shares / info_updated_at
+            source: 数据来源
+
+        Returns:
+            新增的记录数
+        """
+        records = [r for r in records if r.get('code')]
+        if not records:
+            return 0
+
+        fields = ('name', 'industry', 'list_date', 'float_shares', 'info_updated_at')
+        created = 0
+        with self.get_session() as session:
+            try:
+                codes = [r['code'] for r in records]
+                existing = {}
+                # 分批查询已有记录（全市场 5000+ 只，避免超出 SQLite 参数上限）
+                for i in range(0, len(codes), 500):
+                    existing.update(
+                        (row.code, row)
+                        for row in session.execute(
+                            select(StockMetadata).where(StockMetadata.code.in_(codes[i:i + 500]))
+                        ).scalars()
+                    )
+                now = datetime.now()
+                for record in records:
+                    row = existing.get(record['code'])
+                    if row is None:
+                        row = StockMetadata(code=record['code'])
+                        session.add(row)
+                        existing[row.code] = row
+                        created += 1
+                    for key in fields:
+                        if record.get(key) is not None:
+                            setattr(row, key, record[key])
+                    row.source = source
+                    row.updated_at = now
+                session.commit()
+                logger.debug(f"保存股票元数据 {len(records)} 条（新增 {created} 条，来源 {source}）")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存股票元数据失败: {e}")
+                raise
+        return created
+
+    def get_all_stock_metadata(self) -> List[Dict[str, Any]]:
+        """读取全部股票元数据"""
+        with self.get_session() as session:
+            rows = session.execute(select(StockMetadata)).scalars().all()
+            return [row.to_dict() for row in rows]
+
+    # === 资金流向 / 北向持股（按交易日批量写入，按股票读取最近 N 日）===
+
+    def save_moneyflow_daily(
+        self,
+        trade_date: date,
+        records: List[Dict[str, Any]],
+        source: str = "Unknown",
+    ) -> int:
+        """整体替换某个交易日的全市场个股资金流向，返回写入条数"""
+        return self._replace_trade_date(StockMoneyflowDaily, trade_date, records, source)
+
+    def get_moneyflow_history(
+        self,
+        code: str,
+        days: int = 5,
+        since: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """个股最近 N 个交易日的资金流向（按日期降序，since 之前的旧记录不返回）"""
+        return self._recent_rows(StockMoneyflowDaily, code, days, since)
+
+    def get_moneyflow_dates(self, since: date) -> List[date]:
+        """since（含）之后已入库的资金流向交易日"""
+        return self._stored_dates(StockMoneyflowDaily, since)
+
+    def save_north_holdings(
+        self,
+        trade_date: date,
+        records: List[Dict[str, Any]],
+        source: str = "Unknown",
+    ) -> int:
+        """整体替换某个交易日的全市场北向持股，返回写入条数"""
+        return self._replace_trade_date(StockNorthHolding, trade_date, records, source)
+
+    def get_north_holding_history(
+        self,
+        code: str,
+        days: int = 5,
+        since: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """个股最近 N 个交易日的北向持股（按日期降序，since 之前的旧记录不返回）"""
+        return self._recent_rows(StockNorthHolding, code, days, since)
+
+    def get_north_holding_dates(self, since: date) -> List[date]:
+        """since（含）之后已入库的北向持股交易日"""
+        return self._stored_dates(StockNorthHolding, since)
+
+    # === AI 分析结果历史 ===
+
+    def save_analysis_result(self, record: Dict[str, Any]) -> int:
+        """
+        保存一条分析结果
+
+        Args:
+            record: AnalysisHistory 列名 -> 值（dashboard / dimensions 为字典）
+
+        Returns:
+            新记录 id
+        """
+        values = dict(record)
+        for key in ('dashboard', 'dimensions'):
+            if values.get(key) is not None and not isinstance(values[key], str):
+                values[key] = json.dumps(values[key], ensure_ascii=False, default=str)
+        with self.get_session() as session:
+            try:
+                row = AnalysisHistory(**values)
+                session.add(row)
+                session.commit()
+                return row.id
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存 {record.get('code')} 分析结果失败: {e}")
+                raise
+
+    def _analysis_summary_query(self):
+        return select(*(getattr(AnalysisHistory, name) for name in AnalysisHistory.SUMMARY_COLUMNS))
+
+    def get_analysis_history(
+        self,
+        code: str,
+        since: Optional[date] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """个股分析记录（标量列，按交易日、时间升序），用于评分走势"""
+        query = self._analysis_summary_query().where(AnalysisHistory.code == code)
+        if since is not None:
+            query = query.where(AnalysisHistory.trade_date >= since)
+        query = query.order_by(desc(AnalysisHistory.trade_date), desc(AnalysisHistory.created_at))
+        if limit is not None:
+            query = query.limit(limit)
+        with self.get_session() as session:
+            rows = session.execute(query).mappings().all()
+            return [dict(row) for row in reversed(rows)]
+
+    def get_signal_history(
+        self,
+        signal: str,
+        since: date,
+        until: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """某信号等级在日期区间内的全部分析记录（标量列，按交易日降序）"""
+        query = self._analysis_summary_query().where(and_(
+            AnalysisHistory.signal == signal,
+            AnalysisHistory.trade_date >= since,
+        ))
+        if until is not None:
+            query = query.where(AnalysisHistory.trade_date <= until)
+        query = query.order_by(desc(AnalysisHistory.trade_date), desc(AnalysisHistory.sentiment_score))
+        with self.get_session() as session:
+            return [dict(row) for row in session.execute(query).mappings().all()]
+
+    def get_latest_analysis(
+        self,
+        code: str,
+        before: Optional[date] = None,
+        full: bool = False,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        个股最近一次成功的分析记录
+
+        Args:
+            before: 只取该交易日之前（不含）的记录，用于与上一交易日对比
+            full: 是否包含仪表盘等 JSON 字段
+        """
+        query = select(AnalysisHistory) if full else self._analysis_summary_query()
+        query = query.where(and_(AnalysisHistory.code == code, AnalysisHistory.success.is_(True)))
+        if before is not None:
+            query = query.where(AnalysisHistory.trade_date < before)
+        query = query.order_by(desc(AnalysisHistory.trade_date), desc(AnalysisHistory.created_at)).limit(1)
+        with self.get_session() as session:
+            if full:
+                row = session.execute(query).scalar_one_or_none()
+                return row.to_dict() if row else None
+            row = session.execute(query).mappings().first()
+            return dict(row) if row else None
+
+    # === 筹码分布（按股票写入整段序列）===
+
+    def save_chip_history(self, code: str, records: List[Dict[str, Any]], source: str = "Unknown") -> int:
+        """
+        写入个股筹码分布序列（同一交易日已有记录时覆盖）
+
+        Args:
+            records: 字典列表，键为 date + 各筹码字段
+
+        Returns:
+            写入条数
+        """
+        columns = {column.name for column in StockChipDaily.__table__.columns} - {
+            'id', 'code', 'date', 'data_source', 'created_at'
+        }
+        now = datetime.now()
+        rows = [
+            {
+                **{key: (None if record.get(key) != record.get(key) else record.get(key)) for key in columns},
+                'code': code,
+                'date': record['date'],
+                'data_source': source,
+                'created_at': now,
+            }
+            for record in records if record.get('date')
+        ]
+        if not rows:
+            return 0
+
+        with self.get_session() as session:
+            try:
+                session.execute(delete(StockChipDaily).where(and_(
+                    StockChipDaily.code == code,
+                    StockChipDaily.date.in_([row['date'] for row in rows]),
+                )))
+                session.execute(insert(StockChipDaily), rows)
+                session.commit()
+                logger.debug(f"保存 {code} 筹码分布 {len(rows)} 条（来源 {source}）")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存 {code} 筹码分布失败: {e}")
+                raise
+        return len(rows)
+
+    def get_chip_history(self, code: str, days: int = 1) -> List[Dict[str, Any]]:
+        """个股最近 N 个交易日的筹码分布（按日期降序）"""
+        return self._recent_rows(StockChipDaily, code, days)
+
+    # === 财务指标（按报告期批量写入）===
+
+    def save_financial_reports(
+        self,
+        report_period: date,
+        records: List[Dict[str, Any]],
+        source: str = "Unknown",
+    ) -> int:
+        """
+        批量写入某个报告期的财务指标（同代码同报告期覆盖，未出现在本批次中的已有记录保留）
+
+        Returns:
+            写入条数
+        """
+        columns = {column.name for column in StockFinancialReport.__table__.columns} - {
+            'id', 'code', 'report_period', 'data_source', 'fetched_at'
+        }
+        now = datetime.now()
+        rows = []
+        for record in records:
+            if not record.get('code'):
+                continue
+            row = {key: record.get(key) for key in columns}
+            rows.append({
+                **{key: (None if value != value else value) for key, value in row.items()},
+                'code': record['code'],
+                'report_period': report_period,
+                'data_source': source,
+                'fetched_at': now,
+            })
+        if not rows:
+            return 0
+
+        codes = [row['code'] for row in rows]
+        with self.get_session() as session:
+            try:
+                for i in range(0, len(codes), 500):
+                    session.execute(delete(StockFinancialReport).where(and_(
+                        StockFinancialReport.report_period == report_period,
+                        StockFinancialReport.code.in_(codes[i:i + 500]),
+                    )))
+                session.execute(insert(StockFinancialReport), rows)
+                session.commit()
+                logger.debug(f"保存 {report_period} 财务指标 {len(rows)} 条（来源 {source}）")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存 {report_period} 财务指标失败: {e}")
+                raise
+        return len(rows)
+
+    def get_financial_reports(self, code: str, periods: int = 4) -> List[Dict[str, Any]]:
+        """个股最近若干个报告期的财务指标（按报告期降序）"""
+        with self.get_session() as session:
+            rows = session.execute(
+                select(StockFinancialReport)
+                .where(StockFinancialReport.code == code)
+                .order_by(desc(StockFinancialReport.report_period))
+                .limit(periods)
+            ).scalars().all()
+            return [row.to_dict() for row in rows]
+
+    def get_financial_period_status(self, since: date) -> Dict[date, datetime]:
+        """since（含）之后各报告期的最近刷新时间"""
+        with self.get_session() as session:
+            rows = session.execute(
+                select(StockFinancialReport.report_period, func.max(StockFinancialReport.fetched_at))
+                .where(StockFinancialReport.report_period >= since)
+                .group_by(StockFinancialReport.report_period)
+            ).all()
+            return {period: fetched_at for period, fetched_at in rows}
+
+    def _replace_trade_date(self, model, trade_date: date, records: List[Dict[str, Any]], source: str) -> int:
+        """
+        删除该交易日已有记录后一次 executemany 批量插入（全市场 5000+ 行，不逐行构造 ORM 对象）
+        """
+        columns = {column.name for column in model.__table__.columns} - {'id', 'code', 'date', 'data_source', 'created_at'}
+        now = datetime.now()
+        rows = []
+        for record in records:
+            if not record.get('code'):
+                continue
+            row = {key: record.get(key) for key in columns}
+            # NaN -> NULL
+            rows.append({
+                **{key: (None if value != value else value) for key, value in row.items()},
+                'code': record['code'],
+                'date': trade_date,
+                'data_source': source,
+                'created_at': now,
+            })
+        if not rows:
+            return 0
+
+        with self.get_session() as session:
+            try:
+                session.execute(delete(model).where(model.date == trade_date))
+                session.execute(insert(model), rows)
+                session.commit()
+                logger.debug(f"保存 {model.__tablename__} {trade_date} 共 {len(rows)} 条（来源 {source}）")
+            except Exception as e:
+                session.rollback()
+                logger.error(f"保存 {model.__tablename__} {trade_date} 失败: {e}")
+                raise
+        return len(rows)
+
+    def _recent_rows(self, model, code: str, days: int, since: Optional[date] = None) -> List[Dict[str, Any]]:
+        with self.get_session() as session:
+            query = select(model).where(model.code == code)
+            if since is not None:
+                query = query.where(model.date >= since)
+            rows = session.execute(query.order_by(desc(model.date)).limit(days)).scalars().all()
+            return [row.to_dict() for row in rows]
+
+    def _stored_dates(self, model, since: date) -> List[date]:
+        with self.get_session() as session:
+            return list(session.execute(
+                select(model.date).where(model.date >= since).distinct()
+            ).scalars())
+
     def get_analysis_context(
         self, 
         code: str,
@@ -425,8 +1409,8 @@ class DatabaseManager:
         if target_date is None:
             target_date = date.today()
         
-        # 获取最近2天数据
-        recent_data = self.get_latest_data(code, days=2)
+        # 获取最近2天数据（Core 查询）
+        recent_data = self.get_latest_bars(code, days=2)
         
         if not recent_data:
             logger.warning(f"未找到 {code} 的数据")
@@ -438,11 +1422,11 @@ class DatabaseManager:
         context = {
             'code': code,
             'date': today_data.date.isoformat(),
-            'today': today_data.to_dict(),
+            'today': dict(today_data._mapping),
         }
         
         if yesterday_data:
-            context['yesterday'] = yesterday_data.to_dict()
+            context['yesterday'] = dict(yesterday_data._mapping)
             
             # 计算相比昨日的变化
             if yesterday_data.volume and yesterday_data.volume > 0:
@@ -458,52 +1442,44 @@ class DatabaseManager:
             # 均线形态判断
             context['ma_status'] = self._analyze_ma_status(today_data)
         
-        # 获取财务指标数据（ROE、增长率等）
+        # 财务指标（ROE、增长率等）：读取本地财务仓库，按报告期在后台批量刷新
         try:
-            from data_provider.financial_fetcher import FinancialFetcher
-            financial_fetcher = FinancialFetcher()
-            financial_data = financial_fetcher.get_financial_indicators(code)
+            from src.financial_warehouse import get_financial_warehouse
+            financial_data = get_financial_warehouse().get_indicators(code)
             
             if financial_data:
                 context['financial'] = financial_data.to_dict()
                 logger.debug(f"[财务数据] {code} 已添加到context: ROE={financial_data.roe}")
             else:
-                logger.debug(f"[财务数据] {code} 未获取到财务指标")
+                logger.debug(f"[财务数据] {code} 财务仓库中无数据")
                 context['financial'] = None
         except Exception as e:
-            logger.warning(f"[财务数据] {code} 获取财务指标失败: {e}")
+            logger.warning(f"[财务数据] {code} 读取财务指标失败: {e}")
             context['financial'] = None
         
-        # 获取资金流数据（主力资金、北向资金等）
+        # 资金流数据（主力资金、北向资金）：读取本地资金流库，运行开始时已按交易日批量入库
         try:
-            from data_provider.moneyflow_fetcher import MoneyFlowFetcher
-            moneyflow_fetcher = MoneyFlowFetcher()
-            
-            # 获取个股资金流
-            moneyflow_data = moneyflow_fetcher.get_moneyflow(code)
-            if moneyflow_data:
-                context['moneyflow'] = moneyflow_data.to_dict()
-                logger.debug(f"[资金流] {code} 已添加到context: {moneyflow_data.get_main_flow_summary()}")
-            else:
-                logger.debug(f"[资金流] {code} 未获取到资金流数据")
-                context['moneyflow'] = None
-            
-            # 获取北向资金（如果是沪深港通标的）
-            north_data = moneyflow_fetcher.get_north_moneyflow(code, days=5)
-            if north_data:
-                context['north_moneyflow'] = north_data
-                logger.debug(f"[北向资金] {code} 已添加到context: {north_data['trend']}")
+            from src.moneyflow_store import get_moneyflow_store
+            store = get_moneyflow_store()
+
+            context['moneyflow'] = store.get_moneyflow(code)
+            if context['moneyflow']:
+                logger.debug(f"[资金流] {code} 已添加到context: {context['moneyflow']['trade_date']}")
             else:
-                context['north_moneyflow'] = None
-                
+                logger.debug(f"[资金流] {code} 本地库无资金流数据")
+
+            context['north_moneyflow'] = store.get_north_moneyflow(code, days=5)
+            if context['north_moneyflow']:
+                logger.debug(f"[北向资金] {code} 已添加到context: {context['north_moneyflow']['trend']}")
+
         except Exception as e:
-            logger.warning(f"[资金流] {code} 获取资金流数据失败: {e}")
+            logger.warning(f"[资金流] {code} 读取资金流数据失败: {e}")
             context['moneyflow'] = None
             context['north_moneyflow'] = None
         
         return context
     
-    def _analyze_ma_status(self, data: StockDaily) -> str:
+    def _analyze_ma_status(self, data) -> str:
         """
         分析均线形态
         
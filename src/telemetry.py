@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+A股自选股智能分析系统 - 运行遥测
+===================================
+
+职责：
+1. 按股票记录流水线各阶段耗时（span）：fetch / db_save / realtime / chip / trend /
+   search / db_read / llm / render / push
+2. 汇总计数器：缓存命中、重试、熔断、休眠时长（按原因区分），可区分"慢在休眠"还是"慢在 I/O"
+3. 运行结束时导出 JSON（每次运行一份）与 Prometheus 文本格式（node_exporter textfile collector），
+   并输出耗时分布摘要
+
+埋点方式：
+- 流水线：with telemetry.span('llm'): ...
+- 数据源 / 分析器：主动休眠经 src/pacing.py（内部调用 telemetry.sleep 按原因记账）；telemetry.incr('cache_hits', cache='realtime_em')
+- tenacity 重试：before_sleep=telemetry.retry_hook(logger, logging.WARNING)
+
+没有进行中的运行时（如机器人单股分析、单独调用数据源），所有埋点函数均为空操作。
+运行上下文按线程绑定，工作线程需通过 RunTelemetry.bind() 包装任务函数。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import unicodedata
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 阶段展示顺序（未列出的阶段排在最后）
+STAGES = (
+    'prefetch', 'fetch', 'db_save', 'realtime', 'chip', 'trend',
+    'search', 'db_read', 'llm', 'render', 'push',
+)
+
+# 休眠原因说明
+SLEEP_REASONS = {
+    'jitter': '数据源随机休眠',
+    'rate_limit': '数据源限速补充休眠',
+    'retry': '重试退避',
+    'llm_delay': 'LLM 请求间隔',
+    'search_delay': '搜索请求间隔',
+    'analysis_delay': '分析间隔',
+    'push_delay': '推送间隔',
+}
+
+PROMETHEUS_PREFIX = 'dsa'
+
+CounterKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+_local = threading.local()
+
+
+def _width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(ch) in 'WF' else 1 for ch in text)
+
+
+def _ljust(text: str, width: int) -> str:
+    return text + ' ' * max(0, width - _width(text))
+
+
+def _rjust(text: str, width: int) -> str:
+    return ' ' * max(0, width - _width(text)) + text
+
+
+@dataclass
+class Span:
+    """一个阶段的一次执行"""
+    stage: str
+    code: Optional[str]
+    start: float                 # 相对运行开始的秒数
+    duration: float = 0.0
+    sleep: float = 0.0           # 阶段内的休眠时长（已包含在 duration 中）
+    ok: bool = True
+
+
+@dataclass
+class StageStats:
+    """阶段汇总"""
+    stage: str
+    count: int = 0
+    total: float = 0.0
+    sleep: float = 0.0
+    max: float = 0.0
+    errors: int = 0
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class RunTelemetry:
+    """
+    单次流水线运行的遥测数据
+
+    使用示例:
+        telemetry = RunTelemetry('daily', stocks=len(codes))
+        with telemetry.activate():
+            executor.submit(telemetry.bind(process, code), code)
+            with telemetry.span('render'):
+                ...
+        telemetry.finish()
+        logger.info(telemetry.format_summary())
+        telemetry.export('./data/telemetry')
+    """
+
+    def __init__(self, name: str = 'pipeline', **meta: Any):
+        self.name = name
+        self.meta = meta
+        self.run_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.started_at = datetime.now()
+        self._t0 = time.perf_counter()
+        self.wall: Optional[float] = None
+        self.spans: List[Span] = []
+        self.counters: Dict[CounterKey, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    # === 上下文 ===
+
+    @contextmanager
+    def activate(self, code: Optional[str] = None) -> Iterator['RunTelemetry']:
+        """在当前线程绑定本次运行（可选绑定股票代码，之后的 span 自动归属该股票）"""
+        previous = (getattr(_local, 'run', None), getattr(_local, 'code', None), getattr(_local, 'stack', None))
+        _local.run, _local.code, _local.stack = self, code, []
+        try:
+            yield self
+        finally:
+            _local.run, _local.code, _local.stack = previous
+
+    def bind(self, func: Callable, code: Optional[str] = None) -> Callable:
+        """包装任务函数：在执行它的工作线程中绑定本次运行"""
+        def wrapper(*args, **kwargs):
+            with self.activate(code):
+                return func(*args, **kwargs)
+        return wrapper
+
+    # === 记录 ===
+
+    @contextmanager
+    def span(self, stage: str, code: Optional[str] = None) -> Iterator[Span]:
+        """记录一个阶段的耗时（异常照常抛出，span 标记为失败）"""
+        start = time.perf_counter()
+        record = Span(stage=stage, code=code or getattr(_local, 'code', None), start=start - self._t0)
+        stack = getattr(_local, 'stack', None)
+        if stack is not None:
+            stack.append(record)
+        try:
+            yield record
+        except BaseException:
+            record.ok = False
+            raise
+        finally:
+            record.duration = time.perf_counter() - start
+            if stack is not None and stack and stack[-1] is record:
+                stack.pop()
+            with self._lock:
+                self.spans.append(record)
+
+    def incr(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def add_sleep(self, seconds: float, reason: str) -> None:
+        """记录休眠（计入当前线程最内层的 span）"""
+        self.incr('sleep_seconds', seconds, reason=reason)
+        stack = getattr(_local, 'stack', None)
+        if stack:
+            stack[-1].sleep += seconds
+
+    def finish(self) -> None:
+        if self.wall is None:
+            self.wall = time.perf_counter() - self._t0
+
+    # === 汇总 ===
+
+    def stage_stats(self) -> List[StageStats]:
+        stats: Dict[str, StageStats] = {}
+        with self._lock:
+            spans = list(self.spans)
+        for s in spans:
+            entry = stats.setdefault(s.stage, StageStats(s.stage))
+            entry.count += 1
+            entry.total += s.duration
+            entry.sleep += s.sleep
+            entry.max = max(entry.max, s.duration)
+            entry.errors += 0 if s.ok else 1
+        order = {stage: i for i, stage in enumerate(STAGES)}
+        return sorted(stats.values(), key=lambda e: (order.get(e.stage, len(order)), e.stage))
+
+    def stock_totals(self) -> Dict[str, Dict[str, float]]:
+        """每只股票各阶段耗时：{code: {stage: 秒}}"""
+        totals: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        with self._lock:
+            for s in self.spans:
+                if s.code:
+                    totals[s.code][s.stage] += s.duration
+        return {code: dict(stages) for code, stages in totals.items()}
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """计数器取值（不指定标签时按名称求和）"""
+        with self._lock:
+            items = list(self.counters.items())
+        if labels:
+            key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+            return dict(items).get(key, 0.0)
+        return sum(v for (n, _), v in items if n == name)
+
+    def format_summary(self, top: int = 5) -> str:
+        """运行耗时摘要（多行文本）"""
+        self.finish()
+        stages = self.stage_stats()
+        busy = sum(s.total for s in stages) or 1.0
+        meta = '，'.join(f"{k}={v}" for k, v in self.meta.items())
+        lines = [
+            "===== 运行耗时分析 =====",
+            f"总耗时 {self.wall:.1f}s" + (f"（{meta}）" if meta else ""),
+            _ljust('阶段', 10) + ''.join(
+                _rjust(title, width) for title, width in
+                (('次数', 6), ('累计(s)', 10), ('休眠(s)', 10), ('平均(s)', 9), ('最大(s)', 9), ('占比', 7))
+            ),
+        ]
+        for s in stages:
+            lines.append(
+                f"{s.stage:<10}{s.count:>6}{s.total:>10.1f}{s.sleep:>10.1f}"
+                f"{s.avg:>9.2f}{s.max:>9.2f}{s.total / busy:>7.0%}"
+                + (f"  失败 {s.errors}" if s.errors else "")
+            )
+
+        sleeps = {
+            dict(labels).get('reason', ''): value
+            for (name, labels), value in list(self.counters.items()) if name == 'sleep_seconds'
+        }
+        if sleeps:
+            detail = ' / '.join(
+                f"{SLEEP_REASONS.get(reason, reason)} {value:.1f}s"
+                for reason, value in sorted(sleeps.items(), key=lambda item: -item[1])
+            )
+            lines.append(f"休眠合计 {sum(sleeps.values()):.1f}s（{detail}）")
+
+        others = [
+            (name, labels, value) for (name, labels), value in sorted(self.counters.items())
+            if name != 'sleep_seconds'
+        ]
+        if others:
+            lines.append("计数: " + '，'.join(
+                f"{name}" + (f"[{','.join(v for _, v in labels)}]" if labels else "") + f"={value:g}"
+                for name, labels, value in others
+            ))
+
+        stocks = sorted(self.stock_totals().items(), key=lambda item: -sum(item[1].values()))
+        if stocks:
+            lines.append(f"最慢的 {min(top, len(stocks))} 只股票:")
+            for code, per_stage in stocks[:top]:
+                slowest = max(per_stage.items(), key=lambda item: item[1])
+                lines.append(
+                    f"  {code}: {sum(per_stage.values()):.1f}s（最慢阶段 {slowest[0]} {slowest[1]:.1f}s）"
+                )
+        return '\n'.join(lines)
+
+    # === 导出 ===
+
+    def to_dict(self) -> Dict[str, Any]:
+        self.finish()
+        with self._lock:
+            spans = [asdict(s) for s in self.spans]
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+        return {
+            'name': self.name,
+            'run_id': self.run_id,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'wall_seconds': round(self.wall, 3),
+            'meta': self.meta,
+            'stages': [
+                {**asdict(s), 'avg': round(s.avg, 3)} for s in self.stage_stats()
+            ],
+            'counters': counters,
+            'spans': spans,
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus 文本格式（阶段汇总 + 计数器，不含逐条 span）"""
+        self.finish()
+        p = PROMETHEUS_PREFIX
+        run = f'run="{self.name}"'
+        lines = [
+            f"# HELP {p}_run_wall_seconds 最近一次运行的总耗时",
+            f"# TYPE {p}_run_wall_seconds gauge",
+            f"{p}_run_wall_seconds{{{run}}} {self.wall:.3f}",
+            f"# HELP {p}_run_timestamp_seconds 最近一次运行的开始时间",
+            f"# TYPE {p}_run_timestamp_seconds gauge",
+            f"{p}_run_timestamp_seconds{{{run}}} {self.started_at.timestamp():.0f}",
+        ]
+        stage_metrics = (
+            ('stage_seconds', 'total', '各阶段累计耗时'),
+            ('stage_sleep_seconds', 'sleep', '各阶段内的休眠时长'),
+            ('stage_calls', 'count', '各阶段执行次数'),
+            ('stage_errors', 'errors', '各阶段失败次数'),
+        )
+        stages = self.stage_stats()
+        for metric, attr, help_text in stage_metrics:
+            lines += [f"# HELP {p}_{metric} {help_text}", f"# TYPE {p}_{metric} gauge"]
+            for s in stages:
+                lines.append(f'{p}_{metric}{{{run},stage="{s.stage}"}} {getattr(s, attr):g}')
+
+        by_name: Dict[str, List[Tuple[Tuple[Tuple[str, str], ...], float]]] = defaultdict(list)
+        for (name, labels), value in sorted(self.counters.items()):
+            by_name[name].append((labels, value))
+        for name, series in by_name.items():
+            lines += [f"# TYPE {p}_{name} gauge"]
+            for labels, value in series:
+                label_text = ''.join(f',{k}="{v}"' for k, v in labels)
+                lines.append(f"{p}_{name}{{{run}{label_text}}} {value:g}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, directory: str) -> Tuple[str, str]:
+        """
+        导出到目录：<name>_<run_id>.json（每次运行一份，run_id 为启动时间 YYYYMMDD_HHMMSS）与 <name>.prom（覆盖写入，供 textfile collector 采集）
+
+        Returns:
+            (json 路径, prom 路径)
+        """
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{self.name}_{self.run_id}.json")
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+        prom_path = os.path.join(directory, f"{self.name}.prom")
+        tmp_path = prom_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, prom_path)
+        return json_path, prom_path
+
+
+# === 埋点函数（无进行中的运行时为空操作） ===
+
+def current() -> Optional[RunTelemetry]:
+    """当前线程绑定的运行"""
+    return getattr(_local, 'run', None)
+
+
+@contextmanager
+def span(stage: str, code: Optional[str] = None) -> Iterator[Optional[Span]]:
+    """记录阶段耗时"""
+    run = current()
+    if run is None:
+        yield None
+        return
+    with run.span(stage, code) as record:
+        yield record
+
+
+def incr(name: str, value: float = 1.0, **labels: Any) -> None:
+    """累加计数器"""
+    run = current()
+    if run is not None:
+        run.incr(name, value, **labels)
+
+
+def sleep(seconds: float, reason: str) -> None:
+    """休眠并记录（代替 time.sleep，原因见 SLEEP_REASONS）"""
+    if seconds <= 0:
+        return
+    time.sleep(seconds)
+    run = current()
+    if run is not None:
+        run.add_sleep(seconds, reason)
+
+
+def retry_hook(log: logging.Logger, level: int = logging.WARNING) -> Callable:
+    """
+    tenacity before_sleep 回调：记录重试次数与退避时长，并保留原有日志
+
+    退避本身由 tenacity 执行，这里按即将休眠的时长记账。
+    """
+    from tenacity import before_sleep_log
+
+    log_hook = before_sleep_log(log, level)
+
+    def hook(retry_state) -> None:
+        log_hook(retry_state)
+        run = current()
+        if run is None:
+            return
+        fn = getattr(retry_state.fn, '__qualname__', 'unknown')
+        run.incr('retries', func=fn)
+        upcoming = getattr(retry_state, 'upcoming_sleep', None)
+        if upcoming is None and retry_state.next_action is not None:
+            upcoming = retry_state.next_action.sleep
+        if upcoming:
+            run.add_sleep(upcoming, 'retry')
+
+    return hook
+
+
+if __name__ == "__main__":
+    import random
+    from concurrent.futures import ThreadPoolExecutor
+
+    logging.basicConfig(level=logging.INFO)
+
+    def work(code: str) -> None:
+        with span('fetch'):
+            sleep(random.uniform(0.01, 0.03), 'jitter')
+            time.sleep(0.02)
+        incr('cache_hits', cache='realtime')
+        with span('llm'):
+            time.sleep(random.uniform(0.05, 0.1))
+
+    telemetry = RunTelemetry('demo', stocks=6, workers=3)
+    with telemetry.activate():
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            list(pool.map(lambda c: telemetry.bind(work, c)(c), [f"60000{i}" for i in range(6)]))
+        with span('push'):
+            time.sleep(0.02)
+    print(telemetry.format_summary())
+    print(telemetry.to_prometheus())
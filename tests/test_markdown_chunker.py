@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+===================================
+Markdown 分块引擎 - 流式分块一致性测试
+===================================
+
+StreamChunker 逐节喂入的产出应与对整篇报告（各节以换行拼接）调用 chunk_markdown 一致，
+唯一区别是非最后一块的分页标记 total 以 "…" 占位。
+"""
+
+import random
+from typing import List
+
+import pytest
+
+from src.markdown_chunker import (
+    UNIT_BYTES,
+    UNIT_CHARS,
+    ChunkProfile,
+    StreamChunker,
+    chunk_markdown,
+    parse_markdown,
+)
+
+MARKER = "\n\n📄 ({index}/{total})"
+
+
+def _stream(sections: List[str], profile: ChunkProfile) -> List[str]:
+    chunker = StreamChunker(profile)
+    chunks = []
+    for text in sections:
+        chunks.extend(chunker.feed(text))
+    chunks.extend(chunker.close())
+    # 占位的 total 换成实际块数后应与整篇打包逐字相同
+    pending = f"/{StreamChunker.PENDING_TOTAL})"
+    return [chunk.replace(pending, f"/{len(chunks)})") for chunk in chunks]
+
+
+def _one_shot(sections: List[str], profile: ChunkProfile) -> List[str]:
+    parse_markdown.cache_clear()
+    return chunk_markdown('\n'.join(sections), profile)
+
+
+def _random_line(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.1:
+        return ''
+    if kind < 0.15:
+        return rng.choice(['---', '───'])
+    if kind < 0.25:
+        return '### ' + '标题' * rng.randint(1, 5)
+    if kind < 0.3:
+        return '**小标题**'
+    length = rng.randint(1, rng.choice([10, 40, 200, 600]))
+    return ''.join(rng.choice('ab中文 📈') for _ in range(length))
+
+
+def _random_sections(rng: random.Random) -> List[str]:
+    return [
+        '' if rng.random() < 0.05 else '\n'.join(_random_line(rng) for _ in range(rng.randint(1, 15)))
+        for _ in range(rng.randint(1, 30))
+    ]
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_stream_matches_one_shot_random(seed):
+    rng = random.Random(seed)
+    sections = _random_sections(rng)
+    profile = ChunkProfile(
+        rng.choice([60, 200, 400, 1000, 3000]),
+        unit=rng.choice([UNIT_BYTES, UNIT_CHARS]),
+        marker=rng.choice(['', MARKER]),
+        section_pattern=rng.choice([None, None, r'^### ']),
+        isolate_sections=rng.random() < 0.2,
+    )
+    assert _stream(sections, profile) == _one_shot(sections, profile)
+
+
+def test_small_report_is_single_unmarked_chunk():
+    sections = ["# 📊 决策仪表盘", "### 贵州茅台\n\n持有", "---"]
+    profile = ChunkProfile(4000, marker=MARKER)
+    assert _stream(sections, profile) == ['\n'.join(sections)]
+
+
+def test_section_continuing_across_feeds():
+    """节末不是分隔线时，顶层分节会延续到下一节，不能按单节提前打包"""
+    sections = [
+        "**总览**\n" + "甲" * 30,
+        "### 乙\n" + "乙" * 30,
+        "丙" * 30 + "\n---\n" + "丁" * 30,
+    ]
+    profile = ChunkProfile(80, unit=UNIT_CHARS)
+    assert _stream(sections, profile) == _one_shot(sections, profile)
+
+
+def test_hard_split_line_not_merged_with_next_section():
+    sections = ["长" * 250, "短行\n---", "尾"]
+    profile = ChunkProfile(100, unit=UNIT_CHARS, marker=MARKER)
+    assert _stream(sections, profile) == _one_shot(sections, profile)